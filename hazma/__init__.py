@@ -7,6 +7,7 @@ __all__ = [
     "gamma_ray_parameters",
     "gamma_ray",
     "hazma_errors",
+    "parallel",
     "parameters",
     "positron_spectra",
     "rambo",
@@ -19,7 +19,8 @@ def msqrd_xx_to_a_to_ff(moms, mx, mf, ma, cxxa, cffa):
         Array of four momenta of the final state particles. The first two must
         for momenta must be the fermions and the last must be the photon.
         moms must be in the form {{ke1, kx1, ky1, kz1}, ..., {keN, kxN, kyN,
-        kzN}}.
+        kzN}}. A stack of such arrays with shape (..., num_fsp, 4) may be
+        passed to evaluate the matrix element for many events at once.
     mx : float
         Mass of incoming fermions.
     mf : float
@@ -35,19 +36,20 @@ def msqrd_xx_to_a_to_ff(moms, mx, mf, ma, cxxa, cffa):
 
     Returns
     -------
-    mat_elem_sqrd : float
+    mat_elem_sqrd : float or numpy.ndarray
         Spin averaged, squared matrix element for x + x -> A^* -> f + f.
     """
-    p3 = moms[0]
-    p4 = moms[1]
+    p3 = moms[..., 0, :]
+    p4 = moms[..., 1, :]
 
-    Q = p3[0] + p4[0]
+    Q = p3[..., 0] + p4[..., 0]
 
     E = Q / 2.0
     p = np.sqrt(E ** 2 - mx ** 2)
 
-    p1 = np.array([E, 0.0, 0.0, p])
-    p2 = np.array([E, 0.0, 0.0, -p])
+    zero = np.zeros_like(p)
+    p1 = np.stack([E, zero, zero, p], axis=-1)
+    p2 = np.stack([E, zero, zero, -p], axis=-1)
 
     p1DOTp4 = minkowski_dot(p1, p4)
     p2DOTp3 = minkowski_dot(p2, p3)
@@ -80,7 +82,8 @@ def msqrd_xx_to_a_to_ffg(moms, mx, mf, ma, qf, cxxa, cffa):
         Array of four momenta of the final state particles. The first two must
         for momenta must be the fermions and the last must be the photon.
         moms must be in the form {{ke1, kx1, ky1, kz1}, ..., {keN, kxN, kyN,
-        kzN}}.
+        kzN}}. A stack of such arrays with shape (..., num_fsp, 4) may be
+        passed to evaluate the matrix element for many events at once.
     mx : float
         Mass of incoming fermions.
     mf : float
@@ -96,20 +99,21 @@ def msqrd_xx_to_a_to_ffg(moms, mx, mf, ma, qf, cxxa, cffa):
 
     Returns
     -------
-    mat_elem_sqrd : float
+    mat_elem_sqrd : float or numpy.ndarray
         Spin averaged, squared matrix element for x + x -> a^* -> f + f + g.
     """
-    p3 = moms[0]
-    p4 = moms[1]
-    k = moms[2]
+    p3 = moms[..., 0, :]
+    p4 = moms[..., 1, :]
+    k = moms[..., 2, :]
 
-    Q = p3[0] + p4[0] + k[0]
+    Q = p3[..., 0] + p4[..., 0] + k[..., 0]
 
     E = Q / 2
     p = np.sqrt(E ** 2 - mx ** 2)
 
-    p1 = np.array([E, 0, 0, p])
-    p2 = np.array([E, 0, 0, -p])
+    zero = np.zeros_like(p)
+    p1 = np.stack([E, zero, zero, p], axis=-1)
+    p2 = np.stack([E, zero, zero, -p], axis=-1)
 
     kDOTp3 = minkowski_dot(k, p3)
     kDOTp4 = minkowski_dot(k, p4)
@@ -1,7 +1,7 @@
 from scipy.interpolate import interp1d
 import numpy as np
 from pkg_resources import resource_filename
-from hazma.parameters import temp_cmb_formation
+from hazma.parameters import load_table, temp_cmb_formation
 
 """
 Functions required for computing CMB limits and related quantities.
@@ -12,11 +12,11 @@ f_eff_ep_rf = resource_filename(__name__, "cmb_data/f_eff_ep.dat")
 f_eff_g_rf = resource_filename(__name__, "cmb_data/f_eff_g.dat")
 
 # Load f_eff^{e+ e-}
-f_eff_ep_data = np.loadtxt(f_eff_ep_rf, delimiter=",").T
+f_eff_ep_data = load_table(f_eff_ep_rf)
 f_eff_ep = interp1d(f_eff_ep_data[0] / 1.0e6, f_eff_ep_data[1])  # eV -> MeV
 
 # Load f_eff^{e+ e-}
-f_eff_g_data = np.loadtxt(f_eff_g_rf, delimiter=",").T
+f_eff_g_data = load_table(f_eff_g_rf)
 f_eff_g = interp1d(f_eff_g_data[0] / 1.0e6, f_eff_g_data[1])  # eV -> MeV
 
 #: Planck 2018 95% upper limit on p_ann from temperature + polarization
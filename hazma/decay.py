@@ -22,8 +22,11 @@ def muon(photon_energies, muon_energy):
     ----------
     photon_energies : float or numpy.ndarray
         Photon energy(ies) in laboratory frame.
-    muon_energy : double
-        Muon energy in laboratory frame.
+    muon_energy : double or numpy.ndarray
+        Muon energy(ies) in laboratory frame.
+        If an array is given, the spectra of all of the energies are
+        computed in a single compiled loop and returned as an array of
+        shape ``(len(muon_energy), len(photon_energies))``.
 
     Returns
     -------
@@ -47,8 +50,17 @@ def muon(photon_energies, muon_energy):
         photon_energies = np.logspace(0.0, 3.0, num=200, dtype=float)
         muon_energy = 1000.
         decay.muon(photon_energies, muon_energy)
+
+    Calculate spectra for arrays of gamma ray and muon energies::
+
+        from hazma import decay
+        import numpy as np
+        photon_energies = np.logspace(0.0, 3.0, num=200, dtype=float)
+        muon_energies = np.linspace(110., 1000., num=50)
+        decay.muon(photon_energies, muon_energies)  # shape (50, 200)
     """
-    # mu = decay_muon.Muon()
+    if np.ndim(muon_energy) > 0:
+        return decay_muon.SpectrumMatrix(photon_energies, muon_energy)
     if hasattr(photon_energies, "__len__"):
         return decay_muon.Spectrum(photon_energies, muon_energy)
     return decay_muon.SpectrumPoint(photon_energies, muon_energy)
@@ -62,8 +74,11 @@ def neutral_pion(photon_energies, pion_energy):
     ----------
     photon_energies : float or numpy.ndarray
         Photon energy(ies) in laboratory frame.
-    pion_energy : float
-        Neutral pion energy in laboratory frame.
+    pion_energy : float or numpy.ndarray
+        Neutral pion energy(ies) in laboratory frame.
+        If an array is given, the spectra of all of the energies are
+        computed in a single compiled loop and returned as an array of
+        shape ``(len(pion_energy), len(photon_energies))``.
 
     Returns
     -------
@@ -88,6 +103,8 @@ def neutral_pion(photon_energies, pion_energy):
         pion_energy = 1000.
         decay.neutral_pion(photon_energies, pion_energy)
     """
+    if np.ndim(pion_energy) > 0:
+        return decay_neutral_pion.SpectrumMatrix(photon_energies, pion_energy)
     if hasattr(photon_energies, "__len__"):
         return decay_neutral_pion.Spectrum(photon_energies, pion_energy)
     return decay_neutral_pion.SpectrumPoint(photon_energies, pion_energy)
@@ -101,8 +118,11 @@ def charged_pion(photon_energies, pion_energy, mode="total"):
     ----------
     photon_energies : float or numpy.ndarray
         Photon energy(ies) in laboratory frame.
-    pion_energy : double
-        Charged pion energy in laboratory frame.
+    pion_energy : double or numpy.ndarray
+        Charged pion energy(ies) in laboratory frame.
+        If an array is given, the spectra of all of the energies are
+        computed in a single compiled loop and returned as an array of
+        shape ``(len(pion_energy), len(photon_energies))``.
     mode : str {"total"}
         The mode the user would like to have returned. The options are "total",
         "munu", "munug" and "enug".
@@ -137,6 +157,9 @@ def charged_pion(photon_energies, pion_energy, mode="total"):
         )
         raise ValueError(val_err_mess)
 
+    if np.ndim(pion_energy) > 0:
+        return decay_charged_pion.SpectrumMatrix(
+            photon_energies, pion_energy, mode)
     if hasattr(photon_energies, "__len__"):
         return decay_charged_pion.Spectrum(photon_energies, pion_energy, mode)
     return decay_charged_pion.SpectrumPoint(photon_energies, pion_energy, mode)
@@ -149,8 +172,11 @@ def charged_kaon(photon_energies, kaon_energy, mode="total"):
     ----------
     photon_energies : float or numpy.ndarray
         Photon energy(ies) in laboratory frame.
-    kaon_energy : float
-        Charged kaon energy in laboratory frame.
+    kaon_energy : float or numpy.ndarray
+        Charged kaon energy(ies) in laboratory frame.
+        If an array is given, the spectra of all of the energies are
+        computed in a single compiled loop and returned as an array of
+        shape ``(len(kaon_energy), len(photon_energies))``.
     mode : str {"total"}
         The mode the user would like to have returned. The options are "total",
         "0enu", "0munu", "00p", "mmug", "munu", "p0", "p0g" and "ppm". Here
@@ -214,6 +240,9 @@ def charged_kaon(photon_energies, kaon_energy, mode="total"):
         )
         raise ValueError(val_err_mess)
 
+    if np.ndim(kaon_energy) > 0:
+        return decay_charged_kaon.SpectrumMatrix(
+            photon_energies, kaon_energy, mode)
     if hasattr(photon_energies, "__len__"):
         return decay_charged_kaon.Spectrum(photon_energies, kaon_energy, mode)
     return decay_charged_kaon.SpectrumPoint(photon_energies, kaon_energy, mode)
@@ -226,8 +255,11 @@ def short_kaon(photon_energies, kaon_energy, mode="total"):
     ----------
     photon_energies : float or numpy.ndarray
         Photon energy(ies) in laboratory frame.
-    kaon_energy : float
-        Charged kaon energy in laboratory frame.
+    kaon_energy : float or numpy.ndarray
+        Charged kaon energy(ies) in laboratory frame.
+        If an array is given, the spectra of all of the energies are
+        computed in a single compiled loop and returned as an array of
+        shape ``(len(kaon_energy), len(photon_energies))``.
     mode : str
         The mode the user would like to have returned. The options are "total",
         "00", "pm" or "pmg". Here "p" stands for pi plus, "m" stands for pi
@@ -271,6 +303,9 @@ def short_kaon(photon_energies, kaon_energy, mode="total"):
         )
         raise ValueError(val_err_mess)
 
+    if np.ndim(kaon_energy) > 0:
+        return decay_short_kaon.SpectrumMatrix(
+            photon_energies, kaon_energy, mode)
     if hasattr(photon_energies, "__len__"):
         return decay_short_kaon.Spectrum(photon_energies, kaon_energy, mode)
     return decay_short_kaon.SpectrumPoint(photon_energies, kaon_energy, mode)
@@ -284,8 +319,11 @@ def long_kaon(photon_energies, kaon_energy, mode="total"):
     ----------
     photon_energies : float or numpy.ndarray
         Photon energy(ies) in laboratory frame.
-    kaon_energy : float
-        Charged kaon energy in laboratory frame.
+    kaon_energy : float or numpy.ndarray
+        Charged kaon energy(ies) in laboratory frame.
+        If an array is given, the spectra of all of the energies are
+        computed in a single compiled loop and returned as an array of
+        shape ``(len(kaon_energy), len(photon_energies))``.
     mode : str
         The mode the user would like to have returned. The options are "total",
         "000", "penu", "penug", "pm0", "pm0g", "pmunu" or "pmunug". Here "p"
@@ -343,6 +381,9 @@ def long_kaon(photon_energies, kaon_energy, mode="total"):
         )
         raise ValueError(val_err_mess)
 
+    if np.ndim(kaon_energy) > 0:
+        return decay_long_kaon.SpectrumMatrix(
+            photon_energies, kaon_energy, mode)
     if hasattr(photon_energies, "__len__"):
         return decay_long_kaon.Spectrum(photon_energies, kaon_energy, mode)
     return decay_long_kaon.SpectrumPoint(photon_energies, kaon_energy, mode)
@@ -358,14 +399,18 @@ def electron(photon_energies, electron_energy):
     ----------
     photon_energies : float or numpy.ndarray
         Photon energy(ies) in laboratory frame.
-    electron_energy : double
-        Electron energy in laboratory frame.
+    electron_energy : double or numpy.ndarray
+        Electron energy(ies) in laboratory frame.
 
     Returns
     -------
     spec : numpy.ndarray
-        An array of zeros.
+        An array of zeros, of shape
+        ``(len(electron_energy), len(photon_energies))`` if
+        ``electron_energy`` is an array.
     """
+    if np.ndim(electron_energy) > 0:
+        return np.zeros(np.shape(electron_energy) + np.shape(photon_energies))
     if hasattr(photon_energies, "__len__"):
         return np.array([0.0 for _ in photon_energies])
     return 0.0
@@ -1,8 +1,13 @@
 __all__ = [
+    "boost",
+    "build_tables",
     "decay_charged_kaon",
     "decay_charged_pion",
     "decay_long_kaon",
     "decay_muon",
     "decay_neutral_pion",
     "decay_short_kaon",
+    "integrate",
+    "tables",
+    "threads",
 ]
@@ -0,0 +1,31 @@
+import numpy as np
+cimport numpy as np
+
+cdef class BoostTable:
+    cdef double[::1] xs
+    cdef double[:, ::1] fs
+    cdef double[:, ::1] slopes
+    cdef double[:, ::1] tails
+    cdef double[::1] low_powers
+    cdef Py_ssize_t num_nodes
+    cdef readonly Py_ssize_t num_channels
+    cdef bint uniform_log
+    cdef double log_x0
+    cdef double inv_log_step
+
+    cdef double cell_integral(self, Py_ssize_t k, Py_ssize_t i, double lo,
+                              double hi) nogil
+    cdef Py_ssize_t cell(self, double eng) nogil
+    cdef double rest(self, double eng, Py_ssize_t k=*) nogil
+    cdef double tail(self, Py_ssize_t k, Py_ssize_t i, double eng) nogil
+    cdef double integral(self, Py_ssize_t k, Py_ssize_t ilo, double lo,
+                         Py_ssize_t ihi, double hi) nogil
+    cdef double boost(self, double eng, double gamma, double beta,
+                      Py_ssize_t k=*) nogil
+    cdef void boost_all(self, double eng, double gamma, double beta,
+                        double* out) nogil
+    cdef double lab(self, double eng_gam, double eng, double mass,
+                    Py_ssize_t k=*) nogil
+    cdef void lab_all(self, double eng_gam, double eng, double mass,
+                      double* out) nogil
+    cdef Py_ssize_t __check_channel(self, Py_ssize_t channel) except -1
@@ -0,0 +1,499 @@
+"""
+Module for boosting photon spectra from the rest frame of a decaying particle
+into the laboratory frame.
+
+Description:
+    If a particle with boost factors gamma and beta has the rest frame
+    photon spectrum f(E'), the spectrum in the laboratory frame is
+
+        dN/dE = 1 / (2 gamma beta)
+                * int_{E gamma (1 - beta)}^{E gamma (1 + beta)} f(E') / E' dE'.
+
+    The rest frame spectrum is tabulated once as a piecewise linear function
+    of E'. On each cell the integral of f(E') / E' is known in closed form,
+    so the cumulative integrals from every node up to the largest one are
+    computed when the table is built. Boosting then only requires locating
+    the two integration limits in the table, which replaces an adaptive
+    integration over the photon angle for each photon energy. The accuracy
+    is set by the resolution of the table (see ``log_grid``).
+"""
+import numpy as np
+cimport numpy as np
+import cython
+from cython.parallel cimport prange
+from hazma.decay_helper_functions.threads cimport num_threads
+from libc.math cimport log, pow, sqrt, fabs
+
+# Spacing in log(E') of the default grid
+LOG_STEP = 1e-3
+# Number of nodes placed on either side of each breakpoint
+NUM_REFINE = 2000
+# Lower end of the default grid relative to the upper end
+REL_ENG_MIN = 1e-7
+
+# Below this velocity, the boosted spectrum is the rest frame spectrum
+cdef double __BETA_MIN = 1e-8
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef class BoostTable:
+    """
+    Piecewise linear rest frame photon spectra which can be boosted into
+    the laboratory frame in closed form.
+
+    A table holds one or several spectra, called channels (e.g. the decay
+    modes of a particle), tabulated at the same nodes. The cell containing
+    a photon energy is located once and shared by all of the channels. If
+    the nodes are evenly spaced in log(E'), the cell is computed directly
+    instead of with a binary search.
+
+    Below the first node, the spectra are extrapolated as power laws. Above
+    the last node, the spectra vanish. Repeated nodes are allowed and
+    describe discontinuities.
+
+    Parameters
+    ----------
+    xs : np.ndarray
+        Non-decreasing, positive photon energies in the rest frame.
+    fs : np.ndarray
+        Rest frame spectra dN/dE' at ``xs``: either an array with the same
+        shape as ``xs`` or an array of shape (num_channels, len(xs)).
+    low_power : float or np.ndarray {None]
+        Power of the extrapolation below the first node, either for all of
+        the channels or for each channel. If None, the power law going
+        through the first two nodes is used. Noisy tables should use 0,
+        which extrapolates with a constant.
+    """
+
+    def __init__(self, xs, fs, low_power=None):
+        cdef Py_ssize_t i
+        cdef Py_ssize_t k
+        cdef double dx
+
+        xs = np.ascontiguousarray(xs, dtype=np.float64)
+        fs = np.ascontiguousarray(np.atleast_2d(fs), dtype=np.float64)
+
+        if xs.ndim != 1 or fs.ndim != 2 or fs.shape[1] != len(xs):
+            raise ValueError(
+                "fs must have shape (len(xs),) or (num_channels, len(xs)).")
+        if len(xs) < 2:
+            raise ValueError("At least two nodes are required.")
+        if xs[0] <= 0.0 or np.any(np.diff(xs) < 0.0):
+            raise ValueError("xs must be positive and non-decreasing.")
+
+        self.xs = xs
+        self.fs = fs
+        self.num_nodes = fs.shape[1]
+        self.num_channels = fs.shape[0]
+        self.slopes = np.zeros((self.num_channels, self.num_nodes - 1),
+                               dtype=np.float64)
+        self.tails = np.zeros((self.num_channels, self.num_nodes),
+                              dtype=np.float64)
+        self.low_powers = np.zeros(self.num_channels, dtype=np.float64)
+
+        # Nodes evenly spaced in log(E') allow for direct cell lookups
+        log_steps = np.diff(np.log(xs))
+        self.uniform_log = bool(np.all(log_steps > 0.0) and np.allclose(
+            log_steps, log_steps.mean(), rtol=1e-6, atol=0.0))
+        self.log_x0 = log(self.xs[0])
+        self.inv_log_step = 0.0
+        if self.uniform_log:
+            self.inv_log_step = 1.0 / log_steps.mean()
+
+        for k in range(self.num_channels):
+            for i in range(self.num_nodes - 1):
+                dx = self.xs[i + 1] - self.xs[i]
+                if dx > 0.0:
+                    self.slopes[k, i] = (self.fs[k, i + 1] - self.fs[k, i]) / dx
+
+            for i in range(self.num_nodes - 2, -1, -1):
+                self.tails[k, i] = self.tails[k, i + 1] + \
+                    self.cell_integral(k, i, self.xs[i], self.xs[i + 1])
+
+            if low_power is not None:
+                self.low_powers[k] = np.broadcast_to(
+                    low_power, (self.num_channels,))[k]
+            elif self.fs[k, 0] > 0.0 and self.fs[k, 1] > 0.0 and \
+                    self.xs[1] > self.xs[0]:
+                self.low_powers[k] = log(self.fs[k, 1] / self.fs[k, 0]) / \
+                    log(self.xs[1] / self.xs[0])
+
+    def __reduce__(self):
+        fs = np.asarray(self.fs)
+        if self.num_channels == 1:
+            fs = fs[0]
+        return (BoostTable, (np.asarray(self.xs), fs,
+                             np.asarray(self.low_powers)))
+
+    @property
+    def low_power(self):
+        """
+        Powers of the extrapolations below the first node.
+        """
+        if self.num_channels == 1:
+            return self.low_powers[0]
+        return np.asarray(self.low_powers)
+
+    cdef double cell_integral(self, Py_ssize_t k, Py_ssize_t i, double lo,
+                              double hi) nogil:
+        """
+        Returns the integral of f(E') / E' of channel k from lo to hi inside
+        of cell i.
+        """
+        cdef double b = self.slopes[k, i]
+        cdef double a = self.fs[k, i] - b * self.xs[i]
+
+        if hi <= lo:
+            return 0.0
+        return a * log(hi / lo) + b * (hi - lo)
+
+    cdef Py_ssize_t cell(self, double eng) nogil:
+        """
+        Returns the index i of the cell with xs[i] <= eng < xs[i + 1], -1 if
+        eng lies below the table and num_nodes - 1 if it lies above.
+        """
+        cdef Py_ssize_t lo = 0
+        cdef Py_ssize_t hi = self.num_nodes - 1
+        cdef Py_ssize_t mid
+
+        if eng < self.xs[0]:
+            return -1
+        if eng >= self.xs[hi]:
+            return hi
+
+        if self.uniform_log:
+            # Correct for rounding errors in the logarithm
+            lo = <Py_ssize_t>((log(eng) - self.log_x0) * self.inv_log_step)
+            lo = min(max(lo, 0), self.num_nodes - 2)
+            while lo > 0 and self.xs[lo] > eng:
+                lo -= 1
+            while lo < self.num_nodes - 2 and self.xs[lo + 1] <= eng:
+                lo += 1
+            return lo
+
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if self.xs[mid] <= eng:
+                lo = mid
+            else:
+                hi = mid
+        return lo
+
+    cdef double rest(self, double eng, Py_ssize_t k=0) nogil:
+        """
+        Returns the rest frame spectrum of channel k at eng.
+        """
+        cdef Py_ssize_t i = self.cell(eng)
+
+        if i == -1:
+            if self.fs[k, 0] == 0.0:
+                return 0.0
+            return self.fs[k, 0] * pow(eng / self.xs[0], self.low_powers[k])
+        if i == self.num_nodes - 1:
+            if eng == self.xs[i]:
+                return self.fs[k, i]
+            return 0.0
+        return self.fs[k, i] + self.slopes[k, i] * (eng - self.xs[i])
+
+    cdef double tail(self, Py_ssize_t k, Py_ssize_t i, double eng) nogil:
+        """
+        Returns the integral of f(E') / E' of channel k from eng to
+        infinity, where i is the cell containing eng.
+        """
+        cdef double x0 = self.xs[0]
+        cdef double f0 = self.fs[k, 0]
+        cdef double p = self.low_powers[k]
+
+        if i == -1:
+            if fabs(p) < 1e-12:
+                return self.tails[k, 0] + f0 * log(x0 / eng)
+            return self.tails[k, 0] + f0 / p * (1.0 - pow(eng / x0, p))
+        if i == self.num_nodes - 1:
+            return 0.0
+        return self.tails[k, i + 1] + \
+            self.cell_integral(k, i, eng, self.xs[i + 1])
+
+    cdef double integral(self, Py_ssize_t k, Py_ssize_t ilo, double lo,
+                         Py_ssize_t ihi, double hi) nogil:
+        """
+        Returns the integral of f(E') / E' of channel k from lo to hi, where
+        ilo and ihi are the cells containing lo and hi.
+        """
+        if hi <= lo:
+            return 0.0
+        # Avoid cancellations between the tails for narrow intervals
+        if ilo == ihi and 0 <= ilo < self.num_nodes - 1:
+            return self.cell_integral(k, ilo, lo, hi)
+        return self.tail(k, ilo, lo) - self.tail(k, ihi, hi)
+
+    cdef double boost(self, double eng, double gamma, double beta,
+                      Py_ssize_t k=0) nogil:
+        """
+        Returns the spectrum of channel k at photon energy eng in a frame
+        where the decaying particle has boost factors gamma and beta.
+        """
+        cdef double lo
+        cdef double hi
+
+        if beta < __BETA_MIN:
+            return self.rest(eng, k)
+
+        # gamma (1 - beta) = 1 / (gamma (1 + beta)) is stable for large gamma
+        hi = eng * gamma * (1.0 + beta)
+        lo = eng / (gamma * (1.0 + beta))
+
+        return self.integral(k, self.cell(lo), lo, self.cell(hi), hi) / \
+            (2.0 * gamma * beta)
+
+    cdef void boost_all(self, double eng, double gamma, double beta,
+                        double* out) nogil:
+        """
+        Stores the spectra of all of the channels at photon energy eng in a
+        frame where the decaying particle has boost factors gamma and beta
+        in out, locating the integration limits only once.
+        """
+        cdef double lo
+        cdef double hi
+        cdef Py_ssize_t ilo
+        cdef Py_ssize_t ihi
+        cdef Py_ssize_t k
+
+        if beta < __BETA_MIN:
+            for k in range(self.num_channels):
+                out[k] = self.rest(eng, k)
+            return
+
+        hi = eng * gamma * (1.0 + beta)
+        lo = eng / (gamma * (1.0 + beta))
+        ilo = self.cell(lo)
+        ihi = self.cell(hi)
+
+        for k in range(self.num_channels):
+            out[k] = self.integral(k, ilo, lo, ihi, hi) / (2.0 * gamma * beta)
+
+    cdef double lab(self, double eng_gam, double eng, double mass,
+                    Py_ssize_t k=0) nogil:
+        """
+        Returns the spectrum of channel k at photon energy eng_gam in the
+        laboratory frame, where the decaying particle with mass mass has
+        energy eng. Returns zero if eng < mass.
+        """
+        if eng < mass:
+            return 0.0
+        return self.boost(eng_gam, eng / mass, sqrt(1.0 - (mass / eng)**2), k)
+
+    cdef void lab_all(self, double eng_gam, double eng, double mass,
+                      double* out) nogil:
+        """
+        Stores the spectra of all of the channels at photon energy eng_gam
+        in the laboratory frame in out, see ``lab``.
+        """
+        cdef Py_ssize_t k
+
+        if eng < mass or eng_gam <= 0.0:
+            for k in range(self.num_channels):
+                out[k] = 0.0
+            return
+        self.boost_all(eng_gam, eng / mass, sqrt(1.0 - (mass / eng)**2), out)
+
+    cdef Py_ssize_t __check_channel(self, Py_ssize_t channel) except -1:
+        if not 0 <= channel < self.num_channels:
+            raise ValueError("channel must be between 0 and {}.".format(
+                self.num_channels - 1))
+        return channel
+
+    def rest_spectrum(self, eng_gams, Py_ssize_t channel=0):
+        """
+        Returns the rest frame spectrum.
+
+        Parameters
+        ----------
+        eng_gams : float or np.ndarray
+            Photon energies in the rest frame.
+        channel : int {0]
+            Channel whose spectrum is returned.
+
+        Returns
+        -------
+        spec : float or np.ndarray
+            Rest frame spectrum at ``eng_gams``.
+        """
+        cdef double[::1] es = np.ascontiguousarray(
+            np.ravel(eng_gams), dtype=np.float64)
+        cdef double[::1] spec = np.zeros(len(es), dtype=np.float64)
+        cdef Py_ssize_t k = self.__check_channel(channel)
+        cdef Py_ssize_t i
+
+        with nogil:
+            for i in range(es.shape[0]):
+                spec[i] = self.rest(es[i], k)
+
+        if np.ndim(eng_gams) == 0:
+            return spec[0]
+        return np.asarray(spec).reshape(np.shape(eng_gams))
+
+    def spectrum(self, eng_gams, double eng, double mass,
+                 Py_ssize_t channel=0):
+        """
+        Returns the spectrum in the laboratory frame.
+
+        Parameters
+        ----------
+        eng_gams : float or np.ndarray
+            Photon energies in the laboratory frame.
+        eng : float
+            Energy of the decaying particle in the laboratory frame.
+        mass : float
+            Mass of the decaying particle.
+        channel : int {0]
+            Channel whose spectrum is returned.
+
+        Returns
+        -------
+        spec : float or np.ndarray
+            Laboratory frame spectrum at ``eng_gams``. Vanishes if
+            ``eng < mass``.
+        """
+        cdef double[::1] es = np.ascontiguousarray(
+            np.ravel(eng_gams), dtype=np.float64)
+        cdef double[::1] spec = np.zeros(len(es), dtype=np.float64)
+        cdef Py_ssize_t k = self.__check_channel(channel)
+        cdef int nt = num_threads(es.shape[0])
+        cdef Py_ssize_t i
+
+        with nogil:
+            for i in prange(es.shape[0], num_threads=nt, schedule="static"):
+                spec[i] = self.lab(es[i], eng, mass, k)
+
+        if np.ndim(eng_gams) == 0:
+            return spec[0]
+        return np.asarray(spec).reshape(np.shape(eng_gams))
+
+    def spectrum_matrix(self, eng_gams, engs, double mass,
+                        Py_ssize_t channel=0):
+        """
+        Returns the spectra in the laboratory frame for many energies of the
+        decaying particle.
+
+        Parameters
+        ----------
+        eng_gams : float or np.ndarray
+            Photon energies in the laboratory frame.
+        engs : float or np.ndarray
+            Energies of the decaying particle in the laboratory frame.
+        mass : float
+            Mass of the decaying particle.
+        channel : int {0]
+            Channel whose spectra are returned.
+
+        Returns
+        -------
+        spec : np.ndarray
+            Array of shape ``np.shape(engs) + np.shape(eng_gams)`` with the
+            laboratory frame spectra at ``eng_gams``. Spectra vanish at
+            non-positive photon energies and for ``engs < mass``.
+        """
+        cdef double[::1] es = np.ascontiguousarray(
+            np.ravel(eng_gams), dtype=np.float64)
+        cdef double[::1] ps = np.ascontiguousarray(
+            np.ravel(engs), dtype=np.float64)
+        cdef double[:, ::1] spec = np.zeros(
+            (ps.shape[0], es.shape[0]), dtype=np.float64)
+        cdef Py_ssize_t k = self.__check_channel(channel)
+        cdef Py_ssize_t num_es = es.shape[0]
+        cdef int nt = num_threads(ps.shape[0] * num_es)
+        cdef Py_ssize_t n
+        cdef Py_ssize_t i
+        cdef Py_ssize_t j
+
+        with nogil:
+            for n in prange(ps.shape[0] * num_es, num_threads=nt,
+                            schedule="static"):
+                i = n // num_es
+                j = n % num_es
+                if es[j] > 0.0:
+                    spec[i, j] = self.lab(es[j], ps[i], mass, k)
+
+        return np.asarray(spec).reshape(np.shape(engs) + np.shape(eng_gams))
+
+    def spectrum_all(self, eng_gams, double eng, double mass):
+        """
+        Returns the spectra of all of the channels in the laboratory frame,
+        computed in a single pass over the photon energies.
+
+        Parameters
+        ----------
+        eng_gams : float or np.ndarray
+            Photon energies in the laboratory frame.
+        eng : float
+            Energy of the decaying particle in the laboratory frame.
+        mass : float
+            Mass of the decaying particle.
+
+        Returns
+        -------
+        spec : np.ndarray
+            Array of shape ``(num_channels,) + np.shape(eng_gams)`` with the
+            laboratory frame spectra of each channel at ``eng_gams``.
+        """
+        cdef double[::1] es = np.ascontiguousarray(
+            np.ravel(eng_gams), dtype=np.float64)
+        cdef double[:, ::1] spec = np.zeros(
+            (es.shape[0], self.num_channels), dtype=np.float64)
+        cdef int nt = num_threads(es.shape[0])
+        cdef Py_ssize_t i
+
+        with nogil:
+            for i in prange(es.shape[0], num_threads=nt, schedule="static"):
+                self.lab_all(es[i], eng, mass, &spec[i, 0])
+
+        return np.asarray(spec).T.reshape(
+            (self.num_channels,) + np.shape(eng_gams))
+
+
+def log_grid(double eng_max, breakpoints=(), double eng_min=-1.0,
+             double step=LOG_STEP, int num_refine=NUM_REFINE):
+    """
+    Returns nodes for tabulating a rest frame spectrum which vanishes above
+    ``eng_max``.
+
+    The nodes are evenly spaced in log(E') and refined geometrically on both
+    sides of ``eng_max`` and of each breakpoint, where the spectrum has a
+    kink, a jump or a logarithmic endpoint behavior.
+
+    Parameters
+    ----------
+    eng_max : float
+        Largest node.
+    breakpoints : iterable of float {()]
+        Energies around which the grid is refined. Breakpoints outside of
+        the grid are ignored.
+    eng_min : float {REL_ENG_MIN * eng_max]
+        Smallest node. Below it, tables extrapolate the spectrum as a power
+        law.
+    step : float {LOG_STEP]
+        Spacing of the nodes in log(E').
+    num_refine : int {NUM_REFINE]
+        Number of nodes placed on either side of each breakpoint.
+
+    Returns
+    -------
+    nodes : np.ndarray
+        Sorted, unique nodes.
+    """
+    if eng_min <= 0.0:
+        eng_min = REL_ENG_MIN * eng_max
+
+    cdef int num = max(int(np.ceil(np.log(eng_max / eng_min) / step)), 1) + 1
+
+    nodes = [np.geomspace(eng_min, eng_max, num)]
+    offsets = np.geomspace(1e-12, 0.1, num_refine)
+
+    for bp in tuple(breakpoints) + (eng_max,):
+        if eng_min <= bp <= eng_max:
+            nodes += [[bp], bp * (1.0 - offsets), bp * (1.0 + offsets)]
+
+    nodes = np.concatenate(nodes)
+    return np.unique(nodes[(nodes >= eng_min) & (nodes <= eng_max)])
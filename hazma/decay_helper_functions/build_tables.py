@@ -0,0 +1,703 @@
+"""
+Pipeline regenerating the tabulated rest frame spectra of the kaons.
+
+The spectra of the decay modes of the charged, long and short kaons are
+stored in ``interpolation_data/ckaon``, ``lkaon`` and ``skaon`` as
+``<kaon>_interp_<mode>.dat``, together with the binary copies loaded by the
+decay modules (see ``hazma.parameters.save_table``). The spectrum of a mode
+is its branching fraction times the sum of the decay spectra of the final
+state particles. In two-body modes the particles have fixed energies, while
+in three-body modes the spectra are averaged over the energy distributions
+of the particles, which are computed with
+``hazma.rambo.generate_energy_histogram`` from the squared matrix elements
+below. The spectra of the radiative modes (``mmug``, ``p0g``, ``penug``,
+``pm0g``, ``pmunug`` and ``pmg``) are not computed here: they are taken from
+the packaged tables and interpolated to the new grid. The ``total`` spectrum
+is the sum of the spectra of all modes.
+
+The work is done in two stages. First, the energy distributions of the
+three-body modes are computed one mode at a time, each on the shared pool
+of ``hazma.parallel``. Then the spectra are computed for chunks of photon
+energies, one task per mode and chunk, on the same pool. The result of each
+step is written to a checkpoint directory as soon as it is done, so a run
+which was interrupted resumes where it stopped when it is started again
+with the same arguments.
+
+Examples
+--------
+
+Rebuild the tables on a grid of 4000 photon energies, with distributions of
+100 bins sampled from 10^8 RAMBO points::
+
+    from hazma.decay_helper_functions.build_tables import build_tables
+    build_tables("interpolation_data", num_eng_gams=4000, num_bins=100,
+                 num_ps_pts=10**8, sampler="flat", seed=1)
+
+The same from the command line::
+
+    python -m hazma.decay_helper_functions.build_tables interpolation_data \\
+        --num-eng-gams 4000 --num-bins 100 --num-ps-pts 100000000 \\
+        --sampler flat --seed 1
+"""
+# author : Logan Morrison and Adam Coogan
+# date : October 2026
+
+import argparse
+import os
+import shutil
+
+import numpy as np
+
+from hazma import decay, parallel, rambo
+from hazma.decay_helper_functions.get_path import get_dir_path
+from hazma.decay_helper_functions.tables import cached_table
+from hazma.field_theory_helper_functions.common_functions import (
+    minkowski_dot as MDot,
+)
+from hazma.parameters import charged_kaon_mass as mk
+from hazma.parameters import charged_pion_mass as mpi
+from hazma.parameters import electron_mass as me
+from hazma.parameters import load_table, save_table
+from hazma.parameters import muon_mass as mmu
+from hazma.parameters import neutral_kaon_mass as mk0
+from hazma.parameters import neutral_pion_mass as mpi0
+
+_VERSION = 2
+
+
+# ############################
+# ##### Matrix Elements ######
+# ############################
+
+# Constants for weak hadronic matrix elements
+alpha1 = 93.16 * 10 ** -8.0
+alpha3 = -6.72 * 10 ** -8.0
+beta1 = -27.06 * 10 ** -8.0
+beta3 = -2.22 * 10 ** -8.0
+gamma3 = 2.95 * 10 ** -8.0
+zeta1 = -0.40 * 10 ** -8.0
+zeta3 = -0.09 * 10 ** -8.0
+xi1 = -1.83 * 10 ** -8.0
+xi3 = -0.17 * 10 ** -8.0
+xi3p = -0.56 * 10 ** -8.0
+A2 = 0.0212 * 10 ** -3.0
+lamp = 0.034
+lam0 = 0.025
+
+
+def dalitz_variables(momenta):
+    """
+    Returns the Dalitz variables of three-body kaon decays.
+
+    Parameters
+    ----------
+    momenta : numpy.ndarray
+        Four-momenta of the three pions with shape (..., 3, 4).
+
+    Returns
+    -------
+    x : numpy.ndarray
+        (s2 - s1) / mpi^2, where si = (k - pi)^2.
+    y : numpy.ndarray
+        (s3 - s0) / mpi^2, where s0 = (s1 + s2 + s3) / 3.
+    """
+    k = np.sum(momenta, axis=-2)
+    s1, s2, s3 = [
+        MDot(k - momenta[..., i, :], k - momenta[..., i, :]) for i in range(3)
+    ]
+    s0 = (s1 + s2 + s3) / 3.0
+
+    return (s2 - s1) / mpi ** 2, (s3 - s0) / mpi ** 2
+
+
+@rambo.vectorized
+def msqrd_L000(momenta):
+    """
+    Squared matrix element for k_L(k) -> pi0(p1) + pi0(p2) + pi0(p3)
+
+    Parameters
+    ----------
+    momenta : numpy.ndarray
+        Four-momenta of pi0, pi0 and pi0 with shape (..., 3, 4).
+    """
+    x, y = dalitz_variables(momenta)
+
+    return (
+        3.0 * (alpha1 + alpha3)
+        - 3.0 * (zeta1 - 2.0 * zeta3) * (y ** 2 + x ** 2 / 3.0)
+    ) ** 2
+
+
+@rambo.vectorized
+def msqrd_Lpm0(momenta):
+    """
+    Squared matrix element for k_L(k) -> pi^+(p1) + pi^-(p2) + pi0(p3)
+
+    Parameters
+    ----------
+    momenta : numpy.ndarray
+        Four-momenta of pi, pi and pi0 with shape (..., 3, 4).
+    """
+    x, y = dalitz_variables(momenta)
+
+    return (
+        (alpha1 + alpha3)
+        - (beta1 + beta3) * y
+        + (zeta1 - 2.0 * zeta3) * (y ** 2 + x ** 2 / 3.0)
+        + (xi1 - 2.0 * xi3) * (y ** 2 - x ** 2 / 3.0)
+    ) ** 2
+
+
+@rambo.vectorized
+def msqrd_00p(momenta):
+    """
+    Squared matrix element for k^+(k) -> pi0(p1) + pi0(p2) + pi^+(p3)
+
+    Parameters
+    ----------
+    momenta : numpy.ndarray
+        Four-momenta of pi0, pi0 and pi with shape (..., 3, 4).
+    """
+    x, y = dalitz_variables(momenta)
+
+    return (
+        -0.5 * (2.0 * alpha1 - alpha3)
+        + (beta1 - 0.5 * beta3 - np.sqrt(3) * gamma3) * y
+        - (zeta1 + zeta3) * (y ** 2 + x ** 2 / 3.0)
+        - (xi1 + xi3 + xi3p) * (y ** 2 - x ** 2 / 3.0)
+    ) ** 2
+
+
+@rambo.vectorized
+def msqrd_ppm(momenta):
+    """
+    Squared matrix element for k^+(k) -> pi^+(p1) + pi^+(p2) + pi^-(p3)
+
+    Parameters
+    ----------
+    momenta : numpy.ndarray
+        Four-momenta of pi, pi and pi with shape (..., 3, 4).
+    """
+    x, y = dalitz_variables(momenta)
+
+    return (
+        (2.0 * alpha1 - alpha3)
+        + (beta1 - 0.5 * beta3 + np.sqrt(3) * gamma3) * y
+        - 2.0 * (zeta1 + zeta3) * (y ** 2 + x ** 2 / 3.0)
+        - (xi1 + xi3 - xi3p) * (y ** 2 - x ** 2 / 3.0)
+    ) ** 2
+
+
+def msqrd_pilnu(momenta, ml):
+    """
+    Squared matrix element for k(k) -> pi(p1) + l(p2) + nu(p3)
+
+    The pion is charged or neutral: its mass is taken from its momentum.
+    The slopes of the form factors are normalized to the charged pion mass.
+
+    Parameters
+    ----------
+    momenta : numpy.ndarray
+        Four-momenta of pi, l and nu with shape (..., 3, 4).
+    ml : float
+        Mass of the lepton.
+    """
+    pp = momenta[..., 0, :]
+    pl = momenta[..., 1, :]
+    pn = momenta[..., 2, :]
+
+    k = pp + pl + pn
+    mk2 = MDot(k, k)
+    mp2 = MDot(pp, pp)
+    # mpi^2 f_+(t), where t = (pl + pn)^2
+    fp = mpi ** 2 + lamp * (mk2 - mp2 - 2 * MDot(pl, pp) - 2 * MDot(pp, pn))
+
+    return (
+        (lam0 - lamp) ** 2
+        * (mk2 - mp2) ** 2
+        * MDot(pl, pn)
+        * (
+            -mk2
+            + 2 * ml ** 2
+            + mp2
+            + 2 * MDot(pl, pn)
+            + 2 * MDot(pl, pp)
+            + 2 * MDot(pp, pn)
+        )
+        - fp ** 2
+        * (
+            -2 * MDot(pl, pn) ** 2
+            + MDot(pl, pn)
+            * (mk2 - 2 * ml ** 2 + 3 * mp2 - 2 * MDot(pl, pp) - 2 * MDot(pp, pn))
+            - 4 * (ml ** 2 + 2 * MDot(pl, pp)) * MDot(pp, pn)
+        )
+        - (lam0 - lamp)
+        * (mk2 - mp2)
+        * (
+            -2 * MDot(pl, pn) ** 2
+            + MDot(pl, pn)
+            * (mk2 - 2 * ml ** 2 - mp2 - 2 * MDot(pl, pp) - 2 * MDot(pp, pn))
+            - 2 * ml ** 2 * MDot(pp, pn)
+        )
+        * fp
+        + (lam0 - lamp)
+        * (mk2 - mp2)
+        * fp
+        * (
+            2 * MDot(pl, pn) ** 2
+            + 2 * ml ** 2 * MDot(pp, pn)
+            + MDot(pl, pn)
+            * (-mk2 + 2 * ml ** 2 + mp2 + 2 * MDot(pl, pp) + 2 * MDot(pp, pn))
+        )
+    ) / mpi ** 4
+
+
+@rambo.vectorized
+def msqrd_pienu(momenta):
+    """
+    Squared matrix element for k(k) -> pi(p1) + e(p2) + nu(p3)
+    """
+    return msqrd_pilnu(momenta, me)
+
+
+@rambo.vectorized
+def msqrd_pimunu(momenta):
+    """
+    Squared matrix element for k(k) -> pi(p1) + mu(p2) + nu(p3)
+    """
+    return msqrd_pilnu(momenta, mmu)
+
+
+# ########################
+# ##### Decay Modes ######
+# ########################
+
+# The decay modes of the kaons. A mode is given by its branching fraction,
+# the masses of the final state particles, the functions of ``hazma.decay``
+# giving the spectra of the particles (None for particles which do not
+# produce photons) and, for three-body modes, the squared matrix element.
+# Radiative modes are None: their spectra are copied from the packaged
+# tables.
+KAONS = {
+    "charged_kaon": {
+        "directory": "ckaon",
+        "mass": mk,
+        "modes": {
+            "munu": {
+                "bf": 0.6356,
+                "masses": (mmu, 0.0),
+                "spectra": ("muon", None),
+            },
+            "p0": {
+                "bf": 0.2067,
+                "masses": (mpi, mpi0),
+                "spectra": ("charged_pion", "neutral_pion"),
+            },
+            "ppm": {
+                "bf": 0.05583,
+                "masses": (mpi, mpi, mpi),
+                "spectra": ("charged_pion", "charged_pion", "charged_pion"),
+                "msqrd": msqrd_ppm,
+            },
+            "0enu": {
+                "bf": 0.0507,
+                "masses": (mpi0, me, 0.0),
+                "spectra": ("neutral_pion", None, None),
+                "msqrd": msqrd_pienu,
+            },
+            "0munu": {
+                "bf": 0.03352,
+                "masses": (mpi0, mmu, 0.0),
+                "spectra": ("neutral_pion", "muon", None),
+                "msqrd": msqrd_pimunu,
+            },
+            "00p": {
+                "bf": 0.01760,
+                "masses": (mpi0, mpi0, mpi),
+                "spectra": ("neutral_pion", "neutral_pion", "charged_pion"),
+                "msqrd": msqrd_00p,
+            },
+            "mmug": None,
+            "p0g": None,
+        },
+    },
+    "long_kaon": {
+        "directory": "lkaon",
+        "mass": mk0,
+        "modes": {
+            "000": {
+                "bf": 0.1952,
+                "masses": (mpi0, mpi0, mpi0),
+                "spectra": ("neutral_pion", "neutral_pion", "neutral_pion"),
+                "msqrd": msqrd_L000,
+            },
+            "penu": {
+                "bf": 0.4055,
+                "masses": (mpi, me, 0.0),
+                "spectra": ("charged_pion", None, None),
+                "msqrd": msqrd_pienu,
+            },
+            "pm0": {
+                "bf": 0.1254,
+                "masses": (mpi, mpi, mpi0),
+                "spectra": ("charged_pion", "charged_pion", "neutral_pion"),
+                "msqrd": msqrd_Lpm0,
+            },
+            "pmunu": {
+                "bf": 0.2704,
+                "masses": (mpi, mmu, 0.0),
+                "spectra": ("charged_pion", "muon", None),
+                "msqrd": msqrd_pimunu,
+            },
+            "penug": None,
+            "pm0g": None,
+            "pmunug": None,
+        },
+    },
+    "short_kaon": {
+        "directory": "skaon",
+        "mass": mk0,
+        "modes": {
+            "00": {
+                "bf": 0.3069,
+                "masses": (mpi0, mpi0),
+                "spectra": ("neutral_pion", "neutral_pion"),
+            },
+            "pm": {
+                "bf": 0.6920,
+                "masses": (mpi, mpi),
+                "spectra": ("charged_pion", "charged_pion"),
+            },
+            "pmg": None,
+        },
+    },
+}
+
+
+def table_file(output_dir, kaon, mode):
+    """
+    Returns the path of the data file of a decay mode.
+
+    Parameters
+    ----------
+    output_dir : str
+        Directory containing the ``ckaon``, ``lkaon`` and ``skaon``
+        directories.
+    kaon : str
+        Name of the kaon, see ``KAONS``.
+    mode : str
+        Name of the decay mode.
+
+    Returns
+    -------
+    path : str
+        Path of ``<kaon>_interp_<mode>.dat``.
+    """
+    return os.path.join(
+        output_dir,
+        KAONS[kaon]["directory"],
+        "{}_interp_{}.dat".format(kaon, mode),
+    )
+
+
+def _checkpointed(checkpoint_dir, name, inputs, compute):
+    """
+    Returns a result stored in the checkpoint directory, computing and
+    storing it if needed. Without a checkpoint directory, the result is
+    always computed.
+    """
+    if checkpoint_dir is None:
+        return compute()
+    return np.array(cached_table(name, inputs, compute, checkpoint_dir))
+
+
+def energy_distributions(kaon, mode, num_ps_pts=10 ** 6, num_bins=25,
+                         sampler="quadrature", binning="linear", seed=0,
+                         chunk_size=None, num_cpus=None,
+                         checkpoint_dir=None):
+    """
+    Returns the energy distributions of the final state particles of a decay
+    mode in the rest frame of the kaon.
+
+    Parameters
+    ----------
+    kaon : str
+        Name of the kaon, see ``KAONS``.
+    mode : str
+        Name of a two- or three-body decay mode of the kaon.
+    num_ps_pts, num_bins, sampler, binning, chunk_size, num_cpus :
+        Options of ``hazma.rambo.generate_energy_histogram`` for three-body
+        modes.
+    seed : int {0]
+        Seed of the random number generator. Each mode uses an independent
+        stream derived from it.
+    checkpoint_dir : str {None]
+        Directory storing the distributions. If None, they are not stored.
+
+    Returns
+    -------
+    distributions : numpy.ndarray
+        Array of shape (num_fsp, 2, num_bins) holding the energies of the
+        particles and their probabilities. In two-body modes, the
+        particles have a single energy with probability one.
+    """
+    mass = KAONS[kaon]["mass"]
+    info = KAONS[kaon]["modes"][mode]
+    masses = np.array(info["masses"], dtype=np.float64)
+
+    if len(masses) == 2:
+        m1, m2 = masses
+        return np.array(
+            [
+                [[(mass ** 2 + m1 ** 2 - m2 ** 2) / (2.0 * mass)], [1.0]],
+                [[(mass ** 2 - m1 ** 2 + m2 ** 2) / (2.0 * mass)], [1.0]],
+            ]
+        )
+
+    # The stream of a mode only depends on its position in KAONS, so that
+    # building a subset of the tables gives the same results.
+    kaon_index = list(KAONS).index(kaon)
+    mode_index = list(KAONS[kaon]["modes"]).index(mode)
+    seq = np.random.SeedSequence(seed, spawn_key=(kaon_index, mode_index))
+
+    # Quadrature is deterministic and takes neither points nor a seed.
+    sampled = sampler != "quadrature"
+
+    def compute():
+        hist, _, bins = rambo.generate_energy_histogram(
+            masses,
+            mass,
+            num_ps_pts=num_ps_pts if sampled else None,
+            mat_elem_sqrd=info["msqrd"],
+            num_bins=num_bins,
+            num_cpus=num_cpus,
+            density=True,
+            seed=seq if sampled else None,
+            chunk_size=chunk_size,
+            sampler=sampler,
+            binning=binning,
+            return_bins=True,
+        )
+        probs = hist[:, 1, :] * np.diff(bins, axis=1)
+        return np.stack([hist[:, 0, :], probs], axis=1)
+
+    inputs = (
+        _VERSION,
+        kaon,
+        mode,
+        num_ps_pts,
+        num_bins,
+        sampler,
+        binning,
+        seed,
+        chunk_size,
+    )
+    return _checkpointed(
+        checkpoint_dir, "distributions_{}_{}".format(kaon, mode), inputs, compute
+    )
+
+
+def mode_spectrum(eng_gams, spectra, distributions):
+    """
+    Returns the photon spectrum of a decay mode in the rest frame of the
+    kaon, not weighted by the branching fraction.
+
+    Parameters
+    ----------
+    eng_gams : numpy.ndarray
+        Photon energies.
+    spectra : tuple
+        Names of the functions of ``hazma.decay`` giving the spectra of the
+        final state particles, or None.
+    distributions : numpy.ndarray
+        Energy distributions of the particles, see ``energy_distributions``.
+
+    Returns
+    -------
+    dnde : numpy.ndarray
+        Spectrum at the photon energies.
+    """
+    dnde = np.zeros(len(eng_gams), dtype=np.float64)
+
+    for spectrum, (engs, probs) in zip(spectra, distributions):
+        if spectrum is not None:
+            dnde += probs @ getattr(decay, spectrum)(eng_gams, engs)
+
+    return dnde
+
+
+def _spectrum_chunk(checkpoint_dir, name, eng_gams, spectra, distributions):
+    """
+    Computes the spectrum of a decay mode at a chunk of photon energies in
+    a worker of the pool, storing it in the checkpoint directory.
+    """
+    inputs = (_VERSION, eng_gams.tolist(), spectra, distributions.tolist())
+    return _checkpointed(
+        checkpoint_dir,
+        name,
+        inputs,
+        lambda: mode_spectrum(eng_gams, spectra, distributions),
+    )
+
+
+def _packaged_spectrum(eng_gams, kaon, mode):
+    """
+    Returns the spectrum of a decay mode from the packaged tables,
+    interpolated linearly in log(E) and extrapolated with a constant below
+    the smallest tabulated energy.
+    """
+    packaged_dir = os.path.join(get_dir_path(), "interpolation_data")
+    xs, ys = load_table(table_file(packaged_dir, kaon, mode))[:2]
+    return np.interp(np.log(eng_gams), np.log(xs), ys, right=0.0)
+
+
+def build_tables(output_dir, kaons=None, num_eng_gams=1000, eng_gam_min=1e-5,
+                 eng_gam_max=1e4, num_ps_pts=10 ** 6, num_bins=25,
+                 sampler="quadrature", binning="linear", seed=0,
+                 chunk_size=None, eng_chunk_size=100, num_cpus=None,
+                 checkpoint_dir=None):
+    """
+    Computes the tables of the rest frame spectra of the kaons and writes
+    them, with their binary copies, to ``output_dir``.
+
+    Parameters
+    ----------
+    output_dir : str
+        Directory the ``ckaon``, ``lkaon`` and ``skaon`` directories are
+        written to. The packaged tables are in
+        ``hazma/decay_helper_functions/interpolation_data``.
+    kaons : list of str {None]
+        Kaons whose tables are built, see ``KAONS``. If None, all of them.
+    num_eng_gams : int {1000]
+        Number of photon energies of the tables.
+    eng_gam_min, eng_gam_max : float {1e-5, 1e4]
+        Smallest and largest photon energies. The energies are evenly
+        spaced in log(E), which the decay modules rely on for fast lookups.
+    num_ps_pts : int {10**6]
+        Number of phase space points of the energy distributions of the
+        three-body modes. Only used by the "flat" and "qmc" samplers.
+    num_bins : int {25]
+        Number of bins of the energy distributions of the three-body modes.
+    sampler : str {"quadrature"]
+        Sampler of ``hazma.rambo.generate_energy_histogram``. The default
+        integrates the distributions by quadrature, without noise. The
+        matrix elements of ``KAONS`` are vectorized, so averaging them over
+        the orientation of the events is cheap.
+    binning : str {"linear"]
+        Spacing of the bins of the energy distributions.
+    seed : int {0]
+        Seed of the random number generator. Runs with the same seed give
+        identical tables, independently of ``num_cpus``.
+    chunk_size : int {None]
+        Number of phase space points generated at a time. Limits the memory
+        used for large ``num_ps_pts``.
+    eng_chunk_size : int {100]
+        Number of photon energies computed by each task.
+    num_cpus : int {None]
+        Number of cpus, see ``hazma.parallel``.
+    checkpoint_dir : str {None]
+        Directory storing the results of finished steps. If None, the
+        directory "checkpoints" in ``output_dir`` is used and removed once
+        all of the tables are written.
+
+    Returns
+    -------
+    paths : list of str
+        Paths of the data files written.
+    """
+    kaons = list(KAONS) if kaons is None else list(kaons)
+    for kaon in kaons:
+        if kaon not in KAONS:
+            raise ValueError(
+                "Unknown kaon '{}', expected one of {}.".format(kaon, list(KAONS))
+            )
+
+    remove_checkpoints = checkpoint_dir is None
+    if checkpoint_dir is None:
+        checkpoint_dir = os.path.join(output_dir, "checkpoints")
+
+    eng_gams = np.geomspace(eng_gam_min, eng_gam_max, num_eng_gams)
+    starts = range(0, num_eng_gams, eng_chunk_size)
+
+    # Energy distributions of the final state particles of each mode
+    tasks = []
+    for kaon in kaons:
+        for mode, info in KAONS[kaon]["modes"].items():
+            if info is None:
+                continue
+            distributions = energy_distributions(
+                kaon,
+                mode,
+                num_ps_pts=num_ps_pts,
+                num_bins=num_bins,
+                sampler=sampler,
+                binning=binning,
+                seed=seed,
+                chunk_size=chunk_size,
+                num_cpus=num_cpus,
+                checkpoint_dir=checkpoint_dir,
+            )
+            for start in starts:
+                tasks.append(
+                    (
+                        checkpoint_dir,
+                        "spectrum_{}_{}_{}".format(kaon, mode, start),
+                        eng_gams[start:start + eng_chunk_size],
+                        info["spectra"],
+                        distributions,
+                    )
+                )
+
+    # Spectra of the modes, one task per mode and chunk of energies
+    chunks = iter(parallel.starmap(_spectrum_chunk, tasks, num_cpus))
+
+    tables = {}
+    for kaon in kaons:
+        spectra = {}
+        for mode, info in KAONS[kaon]["modes"].items():
+            if info is None:
+                spectra[mode] = _packaged_spectrum(eng_gams, kaon, mode)
+            else:
+                dnde = np.concatenate([next(chunks) for _ in starts])
+                spectra[mode] = info["bf"] * dnde
+        spectra["total"] = np.sum(list(spectra.values()), axis=0)
+        tables[kaon] = spectra
+
+    paths = []
+    for kaon, spectra in tables.items():
+        kaon_dir = os.path.join(output_dir, KAONS[kaon]["directory"])
+        os.makedirs(kaon_dir, exist_ok=True)
+        for mode, dnde in spectra.items():
+            path = table_file(output_dir, kaon, mode)
+            np.savetxt(path, np.column_stack((eng_gams, dnde)), delimiter=",")
+            save_table(path)
+            paths.append(path)
+
+    if remove_checkpoints:
+        shutil.rmtree(checkpoint_dir, ignore_errors=True)
+
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Builds the tables of the rest frame spectra of the kaons."
+    )
+    parser.add_argument("output_dir")
+    parser.add_argument("--kaons", nargs="+", choices=list(KAONS))
+    parser.add_argument("--num-eng-gams", type=int, default=1000)
+    parser.add_argument("--eng-gam-min", type=float, default=1e-5)
+    parser.add_argument("--eng-gam-max", type=float, default=1e4)
+    parser.add_argument("--num-ps-pts", type=int, default=10 ** 6)
+    parser.add_argument("--num-bins", type=int, default=25)
+    parser.add_argument("--sampler", default="quadrature")
+    parser.add_argument("--binning", default="linear")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int)
+    parser.add_argument("--eng-chunk-size", type=int, default=100)
+    parser.add_argument("--num-cpus", type=int)
+    parser.add_argument("--checkpoint-dir")
+    args = parser.parse_args()
+
+    for path in build_tables(**vars(args)):
+        print(path)
@@ -1,30 +1,24 @@
 import numpy as np
 cimport numpy as np
+from hazma.decay_helper_functions.boost cimport BoostTable
 
-cdef np.ndarray __e_gams_total
-cdef np.ndarray __e_gams_0enu
-cdef np.ndarray __e_gams_0munu
-cdef np.ndarray __e_gams_00p
-cdef np.ndarray __e_gams_mmug
-cdef np.ndarray __e_gams_munu
-cdef np.ndarray __e_gams_p0
-cdef np.ndarray __e_gams_p0g
-cdef np.ndarray __e_gams_ppm
+# Decay modes of the charged kaon, in the order of MODES
+cdef enum Mode:
+    MODE_TOTAL
+    MODE_0ENU
+    MODE_0MUNU
+    MODE_00P
+    MODE_MMUG
+    MODE_MUNU
+    MODE_P0
+    MODE_P0G
+    MODE_PPM
 
-cdef np.ndarray __spec_total
-cdef np.ndarray __spec_0enu
-cdef np.ndarray __spec_0munu
-cdef np.ndarray __spec_00p
-cdef np.ndarray __spec_mmug
-cdef np.ndarray __spec_munu
-cdef np.ndarray __spec_p0
-cdef np.ndarray __spec_p0g
-cdef np.ndarray __spec_ppm
+cdef BoostTable __table
 
-cdef double __interp_spec(double, str)
+cdef BoostTable __make_table()
+cdef BoostTable get_table()
 
-cdef double __integrand(double, double, double, str)
-
-cdef double CSpectrumPoint(double, double, str)
-
-cdef np.ndarray CSpectrum(np.ndarray[np.float64_t, ndim=1], double, str)
+cdef Mode mode_from_str(str) except *
+cdef double CSpectrumPoint(double, double, Mode) nogil
+cdef np.ndarray CSpectrum(np.ndarray[np.float64_t, ndim=1], double, Mode)
@@ -1,14 +1,14 @@
-cimport decay_muon
-cimport decay_charged_pion
-cimport decay_neutral_pion
+from hazma.decay_helper_functions.boost cimport BoostTable
 import numpy as np
 cimport numpy as np
-from scipy.integrate import quad
 from libc.math cimport sqrt
 import cython
+from cython.parallel cimport prange
+from hazma.decay_helper_functions.threads cimport num_threads
 import os
 import sys
 from .get_path import get_dir_path
+from hazma.parameters import load_table
 include "parameters.pxd"
 import warnings
 
@@ -35,115 +35,51 @@ Description:
 """
 
 
-data_path_total = os.path.join(get_dir_path(),
-                               "interpolation_data",
-                               "ckaon",
-                               "charged_kaon_interp_total.dat")
-data_path_0enu = os.path.join(get_dir_path(),
-                              "interpolation_data",
-                              "ckaon",
-                              "charged_kaon_interp_0enu.dat")
-data_path_0munu = os.path.join(get_dir_path(),
-                               "interpolation_data",
-                               "ckaon",
-                               "charged_kaon_interp_0munu.dat")
-data_path_00p = os.path.join(get_dir_path(),
-                             "interpolation_data",
-                             "ckaon",
-                             "charged_kaon_interp_00p.dat")
-data_path_mmug = os.path.join(get_dir_path(),
-                              "interpolation_data",
-                              "ckaon",
-                              "charged_kaon_interp_mmug.dat")
-data_path_munu = os.path.join(get_dir_path(),
-                              "interpolation_data",
-                              "ckaon",
-                              "charged_kaon_interp_munu.dat")
-data_path_p0 = os.path.join(get_dir_path(),
-                            "interpolation_data",
-                            "ckaon",
-                            "charged_kaon_interp_p0.dat")
-data_path_p0g = os.path.join(get_dir_path(),
-                             "interpolation_data",
-                             "ckaon",
-                             "charged_kaon_interp_p0g.dat")
-data_path_ppm = os.path.join(get_dir_path(),
-                             "interpolation_data",
-                             "ckaon",
-                             "charged_kaon_interp_ppm.dat")
-
-__e_gams_total, __spec_total = np.loadtxt(data_path_total, delimiter=',').T
-__e_gams_0enu, __spec_0enu = np.loadtxt(data_path_0enu, delimiter=',').T
-__e_gams_0munu, __spec_0munu = np.loadtxt(data_path_0munu, delimiter=',').T
-__e_gams_00p, __spec_00p = np.loadtxt(data_path_00p, delimiter=',').T
-__e_gams_mmug, __spec_mmug = np.loadtxt(data_path_mmug, delimiter=',').T
-__e_gams_munu, __spec_munu = np.loadtxt(data_path_munu, delimiter=',').T
-__e_gams_p0, __spec_p0 = np.loadtxt(data_path_p0, delimiter=',').T
-__e_gams_p0g, __spec_p0g = np.loadtxt(data_path_p0g, delimiter=',').T
-__e_gams_ppm, __spec_ppm = np.loadtxt(data_path_ppm, delimiter=',').T
-
-cdef double __interp_spec(double eng_gam, str mode):
-    """
-    Intepolation function for the charged kaon data.
-
-    Parameters
-    ----------
-    eng_gam : double
-        Energy of the photon.
-    mode : str {"total"}
-        Optional. The decay mode to use.
-    """
-    if mode == "total":
-        return np.interp(eng_gam, __e_gams_total, __spec_total)
-    if mode == "0enu":
-        return np.interp(eng_gam, __e_gams_0enu, __spec_0enu)
-    if mode == "0munu":
-        return np.interp(eng_gam, __e_gams_0munu, __spec_0munu)
-    if mode == "00p":
-        return np.interp(eng_gam, __e_gams_00p, __spec_00p)
-    if mode == "mmug":
-        return np.interp(eng_gam, __e_gams_mmug, __spec_mmug)
-    if mode == "munu":
-        return np.interp(eng_gam, __e_gams_munu, __spec_munu)
-    if mode == "p0":
-        return np.interp(eng_gam, __e_gams_p0, __spec_p0)
-    if mode == "p0g":
-        return np.interp(eng_gam, __e_gams_p0g, __spec_p0g)
-    if mode == "ppm":
-        return np.interp(eng_gam, __e_gams_ppm, __spec_ppm)
-
-
-
-@cython.cdivision(True)
-cdef double __integrand(double cl, double eng_gam, double eng_k, str mode):
-    """
-    Integrand for K -> X, where X is a any final state. The X's
-    used are
-        mu + nu
-        pi  + pi0
-        pi + pi + pi
-        pi0 + mu + nu.
-    When the ChargedKaon object is instatiated, the energies of the FSP are
-    computed using RAMBO and energy distributions are formed. All the
-    energies from the energy distributions are summed over against their
-    weights.
+MODES = ("total", "0enu", "0munu", "00p", "mmug", "munu", "p0", "p0g", "ppm")
 
-    Keyword arguments::
-        cl: Angle of photon w.r.t. charged kaon in lab frame.
-        eng_gam: Energy of photon in laboratory frame.
-        eng_k: Energy of kaon in laboratory frame.
+# The table holds the spectra of the decay modes in the rest frame of the
+# kaon, one channel per mode in the order of MODES and of the Mode enum. The
+# spectra are tabulated on the same grid, which is uniform in log(E'), and
+# are extrapolated with a constant below the smallest tabulated energy.
+cdef BoostTable __make_table():
+    """
+    Loads the tabulated rest frame spectra of the decay modes. The spectrum
+    of a mode is stored in "charged_kaon_interp_<mode>.dat".
+    """
+    tables = [
+        load_table(os.path.join(get_dir_path(), "interpolation_data", "ckaon",
+                                "charged_kaon_interp_{}.dat".format(mode)))
+        for mode in MODES
+    ]
+    return BoostTable(tables[0][0], [table[1] for table in tables],
+                      low_power=0.0)
+
+
+cdef BoostTable get_table():
+    """
+    Returns the table of the rest frame spectra, loading it on first use.
     """
-    cdef double gamma_k = eng_k / MASS_K
-    cdef double beta_k = sqrt(1.0 - (MASS_K / eng_k)**2)
-    cdef double eng_gam_k_rf = eng_gam * gamma_k * (1.0 - beta_k * cl)
+    global __table
 
-    cdef double pre_factor \
-        = 1.0 / (2.0 * gamma_k * (1.0 - beta_k * cl))
+    if __table is None:
+        __table = __make_table()
+    return __table
 
-    return  __interp_spec(eng_gam_k_rf, mode)
 
+cdef Mode mode_from_str(str mode) except *:
+    """
+    Returns the decay mode with the given name.
 
-cdef double CSpectrumPoint(double eng_gam, double eng_k, str mode):
+    Keyword arguments::
+        mode: Name of the decay mode, one of MODES.
+    """
+    if mode not in MODES:
+        raise ValueError(
+            "Unknown mode '{}', expected one of {}.".format(mode, MODES))
+    return <Mode><int>MODES.index(mode)
+
+
+cdef double CSpectrumPoint(double eng_gam, double eng_k, Mode mode) nogil:
     """
     Returns the radiative spectrum value from charged kaon at
     a single gamma ray energy.
@@ -151,24 +87,22 @@ cdef double CSpectrumPoint(double eng_gam, double eng_k, str mode):
     Keyword arguments::
         eng_gam: Energy of photon is laboratory frame.
         eng_k: Energy of charged kaon in laboratory frame.
+        mode: Decay mode, see MODES.
     """
-    message = 'Energy of kaon cannot be less than the kaon mass. Returning 0.'
-    if eng_k < MASS_K:
-        # raise warnings.warn(message, RuntimeWarning)
+    if eng_k < MASS_K or eng_gam <= 0.0:
         return 0.0
 
-    cdef double result = 0.0
+    if __table is None:
+        with gil:
+            get_table()
 
-    result = quad(__integrand, -1.0, 1.0, points=[-1.0, 1.0], \
-                  args=(eng_gam, eng_k, mode), epsabs=10**-10., \
-                  epsrel=10**-4.)[0]
+    return __table.lab(eng_gam, eng_k, MASS_K, mode)
 
-    return result
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
 cdef np.ndarray CSpectrum(np.ndarray[np.float64_t, ndim=1] eng_gams,
-                          double eng_k, str mode):
+                          double eng_k, Mode mode):
     """
     Returns the radiative spectrum dNde from charged kaon for a
     list of gamma ray energies.
@@ -176,19 +110,25 @@ cdef np.ndarray CSpectrum(np.ndarray[np.float64_t, ndim=1] eng_gams,
     Keyword arguments::
         eng_gams: List of energies of photon in laboratory frame.
         eng_k: Energy of charged kaon in laboratory frame.
+        mode: Decay mode, see MODES.
     """
-
     cdef int numpts = len(eng_gams)
 
     cdef np.ndarray spec = np.zeros(numpts, dtype=np.float64)
+    cdef double[:] spec_view = spec
+    cdef double[:] engs = eng_gams
 
+    cdef int nt = num_threads(numpts)
     cdef int i = 0
 
-    for i in range(numpts):
-        spec[i] = CSpectrumPoint(eng_gams[i], eng_k, mode)
+    get_table()
+    with nogil:
+        for i in prange(numpts, num_threads=nt, schedule="static"):
+            spec_view[i] = CSpectrumPoint(engs[i], eng_k, mode)
 
     return spec
 
+
 def SpectrumPoint(double eng_gam, double eng_k, str mode):
     """
     Returns the radiative spectrum value from charged kaon at
@@ -197,9 +137,10 @@ def SpectrumPoint(double eng_gam, double eng_k, str mode):
     Keyword arguments::
         eng_gam: Energy of photon is laboratory frame.
         eng_k: Energy of charged kaon in laboratory frame.
+        mode: Decay mode, see MODES.
     """
+    return CSpectrumPoint(eng_gam, eng_k, mode_from_str(mode))
 
-    return CSpectrumPoint(eng_gam, eng_k, mode)
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
@@ -212,5 +153,37 @@ def Spectrum(np.ndarray[np.float64_t, ndim=1] eng_gams, double eng_k,
     Keyword arguments::
         eng_gams: List of energies of photon in laboratory frame.
         eng_k: Energy of charged kaon in laboratory frame.
+        mode: Decay mode, see MODES.
+    """
+    return CSpectrum(eng_gams, eng_k, mode_from_str(mode))
+
+
+def SpectrumMatrix(eng_gams, eng_ks, str mode):
+    """
+    Returns the radiative spectra dNde from charged kaons with many
+    energies for a list of gamma ray energies.
+
+    Keyword arguments::
+        eng_gams: List of energies of photon in laboratory frame.
+        eng_ks: List of energies of charged kaon in laboratory frame.
+        mode: String specifying which decay mode to use.
+
+    Returns an array of shape np.shape(eng_ks) + np.shape(eng_gams).
+    """
+    return get_table().spectrum_matrix(eng_gams, eng_ks, MASS_K,
+                                       mode_from_str(mode))
+
+
+def SpectrumAllModes(eng_gams, double eng_k):
+    """
+    Returns the radiative spectra dNde of all decay modes of the charged kaon
+    for a list of gamma ray energies, computed in a single pass.
+
+    Keyword arguments::
+        eng_gams: List of energies of photon in laboratory frame.
+        eng_k: Energy of charged kaon in laboratory frame.
+
+    Returns an array of shape (len(MODES),) + np.shape(eng_gams) whose rows
+    are the spectra of the modes in MODES.
     """
-    return CSpectrum(eng_gams, eng_k, mode)
+    return get_table().spectrum_all(eng_gams, eng_k, MASS_K)
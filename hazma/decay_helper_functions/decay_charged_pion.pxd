@@ -1,12 +1,26 @@
 import numpy as np
 cimport numpy as np
-from decay_muon cimport CSpectrum  as muspec
+from hazma.decay_helper_functions.boost cimport BoostTable
+
+# Decay modes of the charged pion
+cdef enum Mode:
+    TOTAL
+    MUNU
+    MUNUG
+    ENUG
+
+cdef BoostTable __table
 
 cdef double muon_spectrum(double)
 cdef double gamma(double, double)
 cdef double beta(double, double)
 cdef double eng_gam_max(double)
-cdef double integrand(double, double, double, str)
+cdef double dnde_rest(double, Mode)
+cdef np.ndarray __make_grid()
+cdef np.ndarray __compute_spectra()
+cdef BoostTable __make_table()
+cdef BoostTable get_table()
+cdef Mode mode_from_str(str) except *
 
-cdef double CSpectrumPoint(double, double, str)
-cdef np.ndarray[np.float64_t, ndim=1] CSpectrum(np.ndarray, double, str)
+cdef double CSpectrumPoint(double, double, Mode) nogil
+cdef np.ndarray[np.float64_t, ndim=1] CSpectrum(np.ndarray, double, Mode)
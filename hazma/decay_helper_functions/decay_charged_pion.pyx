@@ -1,14 +1,28 @@
-from hazma.decay_helper_functions.decay_muon cimport CSpectrum as muspec
 from hazma.decay_helper_functions.decay_muon cimport CSpectrumPoint as muspecpt
+from hazma.decay_helper_functions.boost cimport BoostTable
+from hazma.decay_helper_functions import boost
+from hazma.decay_helper_functions.boost import log_grid
+from hazma.decay_helper_functions.tables import cached_table
 import numpy as np
 cimport numpy as np
-from scipy.integrate import quad
 from libc.math cimport exp, log, M_PI, log10, sqrt, abs, pow
 import cython
+from cython.parallel cimport prange
+from hazma.decay_helper_functions.threads cimport num_threads
 include "parameters.pxd"
 
 import warnings
 
+"""
+Module for computing the photon spectrum from radiative charged pion decay.
+
+The rest frame spectra of the individual decay modes are tabulated the first
+time a spectrum is requested and boosted into the laboratory frame with a
+``BoostTable`` holding one channel per mode. The tabulated spectra are
+stored in the cache of ``hazma.decay_helper_functions.tables``, so later
+processes load them instead of recomputing them.
+"""
+
 cdef double eng_gam_max_mu_rf = (MASS_MU**2.0 - MASS_E**2.0) / (2.0 * MASS_MU)
 cdef double eng_mu_pi_rf = (MASS_PI**2.0 + MASS_MU**2.0) / (2.0 * MASS_PI)
 cdef double fpi = DECAY_CONST_PI / sqrt(2.)  # ~92 MeV
@@ -16,19 +30,19 @@ cdef double mpi = MASS_PI
 cdef double me = MASS_E
 cdef double mmu = MASS_MU
 
-cdef np.ndarray eng_gams_mu
-cdef np.ndarray mu_spec
+# Names of the decay modes, in the order of the Mode enum
+MODES = ("total", "munu", "munug", "enug")
 
-# TODO: load from a file
-eng_gams_mu = np.logspace(-5.5, 3.0, num=10000, dtype=np.float64)
-mu_spec = muspec(eng_gams_mu, eng_mu_pi_rf)
+# Version of the tabulated rest frame spectra. Increase it when they change
+# for reasons other than the parameters, so that cached tables are rebuilt.
+__TABLE_VERSION = 1
 
 
 cdef double muon_spectrum(double eng_gam):
     """
-    Returns the interpolated muon spectrum.
+    Returns the spectrum of the muon from pi -> mu nu in the pion rest frame.
     """
-    return np.interp(eng_gam, eng_gams_mu, mu_spec)
+    return muspecpt(eng_gam, eng_mu_pi_rf)
 
 
 @cython.cdivision(True)
@@ -117,89 +131,155 @@ cdef double eng_gam_max(double eng_pi):
         (1.0 + beta_pi) * (1.0 + beta_mu)
 
 
-@cython.cdivision(True)
-cdef double integrand(double cl, double eng_gam, double eng_pi, str mode):
+cdef double dnde_rest(double eng_gam, Mode mode):
     """
-    Returns the integrand of the differential radiative decay spectrum for
-    the charged pion.
+    Returns the spectrum of the charged pion in its rest frame.
 
     Keyword arguments::
-        cl: Angle of photon w.r.t. charged pion in lab frame.
-        engPi: Energy of photon in laboratory frame.
-        engPi: Energy of pion in laboratory frame.
+        eng_gam: Energy of photon in pion rest frame.
+        mode: Decay mode, one of TOTAL, MUNU, MUNUG or ENUG.
     """
-    cdef double beta_pi = beta(eng_pi, MASS_PI)
-    cdef double gamma_pi = gamma(eng_pi, MASS_PI)
-
-    cdef double beta_mu = beta(eng_mu_pi_rf, MASS_MU)
-    cdef double gamma_mu = gamma(eng_mu_pi_rf, MASS_MU)
-
-    cdef double eng_gam_pi_rF = eng_gam * gamma_pi * (1.0 - beta_pi * cl)
-
-    cdef double jac = 1. / (2.0 * gamma_pi * abs(1.0 - beta_pi * cl))
-
     cdef double dnde_munu = 0.
     cdef double dnde_munug = 0.
     cdef double dnde_enug = 0.
 
-    __eng_gam_max_pi_rf = eng_gam_max_mu_rf * gamma_mu * (1.0 + beta_mu)
-
-    if 0. < eng_gam_pi_rF and eng_gam_pi_rF < __eng_gam_max_pi_rf:
-        dnde_munu = BR_PI_TO_MUNU * jac * muon_spectrum(eng_gam_pi_rF)
+    if 0. < eng_gam:
+        dnde_munu = BR_PI_TO_MUNU * muon_spectrum(eng_gam)
 
-    dnde_munug = BR_PI_TO_MUNU * jac * dnde_pi_to_lnug(eng_gam_pi_rF, mmu)
-    dnde_enug = BR_PI_TO_ENU * jac * dnde_pi_to_lnug(eng_gam_pi_rF, me)
+    dnde_munug = BR_PI_TO_MUNU * dnde_pi_to_lnug(eng_gam, mmu)
+    dnde_enug = BR_PI_TO_ENU * dnde_pi_to_lnug(eng_gam, me)
 
-    if mode == "total":
+    if mode == TOTAL:
         return dnde_munu + dnde_munug + dnde_enug
-    if mode == "munu":
+    if mode == MUNU:
         return dnde_munu
-    if mode == "munug":
+    if mode == MUNUG:
         return dnde_munug
-    if mode == "enug":
+    if mode == ENUG:
         return dnde_enug
+    return 0.0
+
+
+cdef np.ndarray __make_grid():
+    """
+    Returns the rest frame photon energies at which the spectra of the decay
+    modes are tabulated.
+    """
+    cdef double beta_mu = beta(eng_mu_pi_rf, MASS_MU)
+    cdef double gamma_mu = gamma(eng_mu_pi_rf, MASS_MU)
+    # Endpoints of pi -> mu nu (and its kink) and of pi -> l nu g
+    cdef tuple breakpoints = (
+        eng_gam_max_mu_rf * gamma_mu * (1.0 + beta_mu),
+        eng_gam_max_mu_rf / (gamma_mu * (1.0 + beta_mu)),
+        0.5 * mpi * (1.0 - (mmu / mpi)**2),
+        0.5 * mpi * (1.0 - (me / mpi)**2),
+    )
+    return log_grid(max(breakpoints), breakpoints)
+
+
+cdef np.ndarray __compute_spectra():
+    """
+    Tabulates the rest frame spectra of all decay modes. Returns an array
+    whose first row holds the photon energies and whose remaining rows hold
+    the spectra of the modes in the order of the Mode enum.
+    """
+    cdef np.ndarray xs = __make_grid()
+    cdef np.ndarray table = np.zeros((len(MODES) + 1, len(xs)),
+                                     dtype=np.float64)
+    cdef int i
+    cdef int k
+
+    table[0] = xs
+    for k in range(len(MODES)):
+        for i in range(len(xs)):
+            table[k + 1, i] = dnde_rest(xs[i], <Mode>k)
 
-cdef double CSpectrumPoint(double eng_gam, double eng_pi, str mode):
+    return table
+
+
+cdef BoostTable __make_table():
+    """
+    Returns the table of the rest frame spectra, one channel per mode in the
+    order of the Mode enum, loading it from the cache if possible.
+    """
+    inputs = (__TABLE_VERSION, MODES, MASS_PI, MASS_MU, MASS_E,
+              BR_PI_TO_MUNU, BR_PI_TO_ENU, F_A_PI, F_V_PI, F_V_PI_SLOPE,
+              DECAY_CONST_PI, ALPHA_EM, boost.LOG_STEP, boost.NUM_REFINE,
+              boost.REL_ENG_MIN)
+    table = cached_table("charged_pion", inputs,
+                         lambda: __compute_spectra())
+    return BoostTable(table[0], table[1:])
+
+
+cdef BoostTable get_table():
+    """
+    Returns the table of the rest frame spectra, building it on first use.
+    """
+    global __table
+
+    if __table is None:
+        __table = __make_table()
+    return __table
+
+
+cdef Mode mode_from_str(str mode) except *:
+    """
+    Returns the decay mode with the given name.
+
+    Keyword arguments::
+        mode: Decay mode, one of "total", "munu", "munug" or "enug".
+    """
+    if mode not in MODES:
+        raise ValueError(
+            "Unknown mode '{}', expected one of {}.".format(mode, MODES))
+    return <Mode><int>MODES.index(mode)
+
+
+cdef double CSpectrumPoint(double eng_gam, double eng_pi, Mode mode) nogil:
     """
     Returns the radiative spectrum value from charged pion given a gamma
-    ray energy eng_gam and charged pion energy eng_pi. When the
-    ChargedPion object is instatiated, an interplating function for the
-    mu spectrum is computed.
+    ray energy eng_gam and charged pion energy eng_pi.
 
     Keyword arguments::
         eng_gam: Energy of photon is laboratory frame.
         eng_pi: Energy of charged pion in laboratory frame.
+        mode: Decay mode, one of TOTAL, MUNU, MUNUG or ENUG.
     """
-    message = 'Energy of pion cannot be less than the pion mass. Returning 0.'
-    if eng_pi < MASS_PI:
+    if eng_pi < MASS_PI or eng_gam <= 0.0:
         return 0.0
 
-    return quad(integrand, -1.0, 1.0, points=[-1.0, 1.0], \
-                  args=(eng_gam, eng_pi, mode), epsabs=10**-10., \
-                  epsrel=10**-5.)[0]
+    if __table is None:
+        with gil:
+            get_table()
 
+    return __table.lab(eng_gam, eng_pi, MASS_PI, mode)
 
-@cython.boundscheck(True)
+
+@cython.boundscheck(False)
 @cython.wraparound(False)
-cdef np.ndarray CSpectrum(np.ndarray eng_gams, double eng_pi, str mode):
+cdef np.ndarray CSpectrum(np.ndarray eng_gams, double eng_pi, Mode mode):
     """
     Returns the radiative spectrum dNde from charged pion given a gamma
     ray energies eng_gams and charged pion energy eng_pi.
-    When the ChargedPion object is instatiated, an interplating function
-    for the mu spectrum is computed.
 
     Keyword arguments::
         eng_gams: Gamma ray energies to evaluate spectrum.
         eng_pi: Energy of charged pion in laboratory frame.
+        mode: Decay mode, one of TOTAL, MUNU, MUNUG or ENUG.
     """
     cdef int numpts = len(eng_gams)
 
     cdef np.ndarray spec = np.zeros(numpts, dtype=np.float64)
+    cdef double[:] spec_view = spec
+    cdef double[:] engs = eng_gams.astype(np.float64)
 
+    cdef int nt = num_threads(numpts)
     cdef int i = 0
 
-    for i in range(numpts):
-        spec[i] = CSpectrumPoint(eng_gams[i], eng_pi, mode)
+    get_table()
+    with nogil:
+        for i in prange(numpts, num_threads=nt, schedule="static"):
+            spec_view[i] = CSpectrumPoint(engs[i], eng_pi, mode)
 
     return spec
 
@@ -207,15 +287,14 @@ cdef np.ndarray CSpectrum(np.ndarray eng_gams, double eng_pi, str mode):
 def SpectrumPoint(double eng_gam, double eng_pi, str mode):
     """
     Returns the radiative spectrum value from charged pion given a gamma
-    ray energy eng_gam and charged pion energy eng_pi. When the
-    ChargedPion object is instatiated, an interplating function for the
-    mu spectrum is computed.
+    ray energy eng_gam and charged pion energy eng_pi.
 
     Keyword arguments::
         eng_gam: Energy of photon is laboratory frame.
         eng_pi: Energy of charged pion in laboratory frame.
+        mode: Decay mode, one of "total", "munu", "munug" or "enug".
     """
-    return CSpectrumPoint(eng_gam, eng_pi, mode)
+    return CSpectrumPoint(eng_gam, eng_pi, mode_from_str(mode))
 
 
 @cython.boundscheck(True)
@@ -224,11 +303,64 @@ def Spectrum(np.ndarray eng_gams, double eng_pi, str mode):
     """
     Returns the radiative spectrum dNde from charged pion given a gamma
     ray energies eng_gams and charged pion energy eng_pi.
-    When the ChargedPion object is instatiated, an interplating function
-    for the mu spectrum is computed.
 
     Keyword arguments::
         eng_gams: Gamma ray energies to evaluate spectrum.
         eng_pi: Energy of charged pion in laboratory frame.
+        mode: Decay mode, one of "total", "munu", "munug" or "enug".
+    """
+    return CSpectrum(eng_gams, eng_pi, mode_from_str(mode))
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def SpectrumMatrix(eng_gams, eng_pis, str mode):
+    """
+    Returns the radiative spectra dNde from charged pions with many energies
+    given gamma ray energies eng_gams.
+
+    Keyword arguments::
+        eng_gams: Gamma ray energies to evaluate spectrum.
+        eng_pis: Energies of charged pion in laboratory frame.
+        mode: Decay mode, one of "total", "munu", "munug" or "enug".
+
+    Returns an array of shape np.shape(eng_pis) + np.shape(eng_gams).
+    """
+    cdef Mode cmode = mode_from_str(mode)
+    cdef double[::1] es = np.ascontiguousarray(
+        np.ravel(eng_gams), dtype=np.float64)
+    cdef double[::1] engs = np.ascontiguousarray(
+        np.ravel(eng_pis), dtype=np.float64)
+    cdef double[:, ::1] spec = np.zeros(
+        (engs.shape[0], es.shape[0]), dtype=np.float64)
+    cdef Py_ssize_t num_es = es.shape[0]
+    cdef Py_ssize_t n
+    cdef Py_ssize_t i
+    cdef Py_ssize_t j
+    cdef int nt = num_threads(engs.shape[0] * num_es)
+
+    get_table()
+    with nogil:
+        for n in prange(engs.shape[0] * num_es, num_threads=nt,
+                        schedule="static"):
+            i = n // num_es
+            j = n % num_es
+            spec[i, j] = CSpectrumPoint(es[j], engs[i], cmode)
+
+    return np.asarray(spec).reshape(np.shape(eng_pis) + np.shape(eng_gams))
+
+
+def SpectrumAllModes(eng_gams, double eng_pi):
+    """
+    Returns the radiative spectra dNde of all decay modes of the charged
+    pion given gamma ray energies eng_gams, computed in a single pass.
+
+    Keyword arguments::
+        eng_gams: Gamma ray energies to evaluate spectrum.
+        eng_pi: Energy of charged pion in laboratory frame.
+
+    Returns an array of shape (len(MODES),) + np.shape(eng_gams) whose rows
+    are the spectra of the modes in MODES.
     """
-    return CSpectrum(eng_gams, eng_pi, mode)
+    return get_table().spectrum_all(eng_gams, eng_pi, MASS_PI)
@@ -1,26 +1,23 @@
 import numpy as np
 cimport numpy as np
+from hazma.decay_helper_functions.boost cimport BoostTable
 
-cdef np.ndarray __e_gams_total
-cdef np.ndarray __e_gams_000
-cdef np.ndarray __e_gams_penu
-cdef np.ndarray __e_gams_penug
-cdef np.ndarray __e_gams_pm0
-cdef np.ndarray __e_gams_pm0g
-cdef np.ndarray __e_gams_pmunu
-cdef np.ndarray __e_gams_pmunug
+# Decay modes of the long kaon, in the order of MODES
+cdef enum Mode:
+    MODE_TOTAL
+    MODE_000
+    MODE_PENU
+    MODE_PENUG
+    MODE_PM0
+    MODE_PM0G
+    MODE_PMUNU
+    MODE_PMUNUG
 
-cdef np.ndarray __spec_total
-cdef np.ndarray __spec_000
-cdef np.ndarray __spec_penu
-cdef np.ndarray __spec_penug
-cdef np.ndarray __spec_pm0
-cdef np.ndarray __spec_pm0g
-cdef np.ndarray __spec_pmunu
-cdef np.ndarray __spec_pmunug
+cdef BoostTable __table
 
-cdef double __interp_spec(double, str)
-cdef double __integrand(double, double, double, str)
+cdef BoostTable __make_table()
+cdef BoostTable get_table()
 
-cdef double CSpectrumPoint(double, double, str)
-cdef np.ndarray CSpectrum(np.ndarray[np.float64_t, ndim=1], double, str)
+cdef Mode mode_from_str(str) except *
+cdef double CSpectrumPoint(double, double, Mode) nogil
+cdef np.ndarray CSpectrum(np.ndarray[np.float64_t, ndim=1], double, Mode)
@@ -1,11 +1,13 @@
 import numpy as np
 cimport numpy as np
+from hazma.decay_helper_functions.boost cimport BoostTable
 
 cdef double __j_plus(double)
 cdef double __j_minus(double)
 cdef double __dBdy(double)
 cdef double __gamma(double, double)
 cdef double __beta(double, double)
-cdef double __integrand(double, double, double)
-cdef double CSpectrumPoint(double, double)
+cdef double __dnde_rest(double)
+cdef BoostTable __make_table()
+cdef double CSpectrumPoint(double, double) nogil
 cdef np.ndarray CSpectrum(np.ndarray, double)
@@ -1,9 +1,11 @@
+from hazma.decay_helper_functions.boost cimport BoostTable
+from hazma.decay_helper_functions.boost import log_grid
+from hazma.decay_helper_functions.threads cimport num_threads
+from cython.parallel cimport prange
 import numpy as np
 cimport numpy as np
-from scipy.integrate import quad
 from libc.math cimport exp, log, M_PI, log10, sqrt
 import cython
-from functools import partial
 include "parameters.pxd"
 import warnings
 
@@ -13,8 +15,13 @@ Module for computing the photon spectrum from radiative muon decay.
 
 The radiative spectrum of the muon was taken from: arXiv:hep-ph/9909265
 "Muon Decay and Physics Beyond the Standard Model".
+
+The rest frame spectrum is tabulated when the module is imported and boosted
+into the laboratory frame with a ``BoostTable``.
 """
 
+cdef double eng_gam_max_mu_rf = (MASS_MU**2.0 - MASS_E**2.0) / (2.0 * MASS_MU)
+
 @cython.cdivision(True)
 cdef double __j_plus(double y):
     """
@@ -86,27 +93,35 @@ cdef double __beta(double eng, double mass):
     return sqrt(1.0 - (mass / eng)**2.0)
 
 @cython.cdivision(True)
-cdef double __integrand(double cl, double engGam, double engMu):
+cdef double __dnde_rest(double eng_gam):
     """
-    Compute integrand of dN_{\gamma}/dE_{\gamma} from mu -> e nu nu gamma
-    in laboratory frame. The integration variable is cl - the angle between
-    gamma ray and muon.
+    Compute dN_{\gamma}/dE_{\gamma} from mu -> e nu nu gamma in the muon
+    rest frame.
 
     Keyword arguments::
-        cl -- Angle between gamma ray and muon in laboratory frame.
-        engGam -- Gamma ray energy in laboratory frame.
-        engMu -- Muon energy in laboratory frame.
+        eng_gam -- Gamma ray energy in muon rest frame.
     """
-    cdef double beta = __beta(engMu, MASS_MU)
-    cdef double gamma = __gamma(engMu, MASS_MU)
+    return (2.0 / MASS_MU) * __dBdy((2.0 / MASS_MU) * eng_gam)
+
+
+cdef BoostTable __make_table():
+    """
+    Tabulates the rest frame spectrum.
+    """
+    cdef np.ndarray xs = log_grid(eng_gam_max_mu_rf)
+    cdef np.ndarray fs = np.zeros(len(xs), dtype=np.float64)
+    cdef int i
+
+    for i in range(len(xs)):
+        fs[i] = __dnde_rest(xs[i])
 
-    cdef double engGamMuRF = gamma * engGam * (1.0 - beta * cl)
+    return BoostTable(xs, fs)
 
-    return __dBdy((2.0 / MASS_MU) * engGamMuRF) \
-        / (engMu * (1.0 - cl * beta))
 
+cdef BoostTable __table = __make_table()
 
-cdef double CSpectrumPoint(double eng_gam, double eng_mu):
+
+cdef double CSpectrumPoint(double eng_gam, double eng_mu) nogil:
     """
     Compute dN_{\gamma}/dE_{\gamma} from mu -> e nu nu gamma in the
     laborartory frame.
@@ -115,27 +130,14 @@ cdef double CSpectrumPoint(double eng_gam, double eng_mu):
         eng_gam (float) -- Gamma ray energy in laboratory frame.
         eng_mu (float) -- Muon energy in laboratory frame.
     """
-    message = 'Energy of muon cannot be less than the muon mass. Returning 0.'
-    if eng_mu < MASS_MU:
-        # raise warnings.warn(message, RuntimeWarning)
+    if eng_mu < MASS_MU or eng_gam <= 0.0:
         return 0.0
 
-    cdef double result = 0.0
-
-    cdef double beta = __beta(eng_mu, MASS_MU)
-    cdef double gamma = __gamma(eng_mu, MASS_MU)
-
-    cdef double eng_gam_max = 0.5 * (MASS_MU - MASS_E**2.0 / MASS_MU) \
-        * gamma * (1.0 + beta)
-
-    if 0 <= eng_gam and eng_gam <= eng_gam_max:
-        result = quad(__integrand, -1.0, 1.0, args=(eng_gam, eng_mu), \
-            points=[-1.0, 1.0], epsabs=10**-10., epsrel=10**-4.)[0]
-
-
-    return result
+    return __table.lab(eng_gam, eng_mu, MASS_MU)
 
 
+@cython.boundscheck(False)
+@cython.wraparound(False)
 @cython.cdivision(True)
 cdef np.ndarray CSpectrum(np.ndarray eng_gams, double eng_mu):
     """
@@ -157,9 +159,14 @@ cdef np.ndarray CSpectrum(np.ndarray eng_gams, double eng_mu):
     cdef int numpts = len(eng_gams)
 
     cdef np.ndarray spec = np.zeros(numpts, dtype=np.float64)
+    cdef double[:] spec_view = spec
+    cdef double[:] engs = eng_gams.astype(np.float64)
+    cdef int nt = num_threads(numpts)
+    cdef int i
 
-    for i in range(numpts):
-        spec[i] = CSpectrumPoint(eng_gams[i], eng_mu)
+    with nogil:
+        for i in prange(numpts, num_threads=nt, schedule="static"):
+            spec_view[i] = CSpectrumPoint(engs[i], eng_mu)
 
     return spec
 
@@ -195,3 +202,25 @@ def Spectrum(np.ndarray eng_gams, double eng_mu):
         given muon energy `eng_mu`.
     """
     return CSpectrum(eng_gams, eng_mu)
+
+
+def SpectrumMatrix(eng_gams, eng_mus):
+    """
+    Compute dN/dE from mu -> e nu nu gamma in the laborartory frame for
+    many muon energies.
+
+    Paramaters
+    ----------
+    eng_gams : float or np.ndarray
+        Gamma ray energies in laboratory frame.
+    eng_mus : float or np.ndarray
+        Muon energies in laboratory frame.
+
+    Returns
+    -------
+    spec : np.ndarray
+        Array of shape ``np.shape(eng_mus) + np.shape(eng_gams)`` with the
+        gamma ray spectrum values, dNdE, evaluated at `eng_gams` given muon
+        energies `eng_mus`.
+    """
+    return __table.spectrum_matrix(eng_gams, eng_mus, MASS_MU)
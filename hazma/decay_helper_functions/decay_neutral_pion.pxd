@@ -1,5 +1,5 @@
 import numpy as np
 cimport numpy as np
 
-cdef double CSpectrumPoint(double, double)
+cdef double CSpectrumPoint(double, double) nogil
 cdef np.ndarray CSpectrum(np.ndarray, double)
@@ -2,6 +2,8 @@ from libc.math cimport sqrt
 import numpy as np
 cimport numpy as np
 import cython
+from cython.parallel cimport prange
+from hazma.decay_helper_functions.threads cimport num_threads
 
 include "parameters.pxd"
 
@@ -10,7 +12,7 @@ Module for computing the decay spectrum from neutral pion.
 """
 
 @cython.cdivision(True)
-cdef double CSpectrumPoint(double eng_gam, double eng_pi):
+cdef double CSpectrumPoint(double eng_gam, double eng_pi) nogil:
     """
     Returns decay spectrum for pi0 -> g g.
     """
@@ -25,6 +27,8 @@ cdef double CSpectrumPoint(double eng_gam, double eng_pi):
 
     return ret_val
 
+@cython.boundscheck(False)
+@cython.wraparound(False)
 @cython.cdivision(True)
 cdef np.ndarray CSpectrum(np.ndarray eng_gam, double eng_pi):
     """
@@ -33,10 +37,14 @@ cdef np.ndarray CSpectrum(np.ndarray eng_gam, double eng_pi):
 
     cdef int num_pts = len(eng_gam)
     cdef np.ndarray spec = np.zeros(num_pts, dtype=np.float64)
+    cdef double[:] spec_view = spec
+    cdef double[:] engs = eng_gam.astype(np.float64)
+    cdef int nt = num_threads(num_pts)
     cdef int i
 
-    for i in range(num_pts):
-        spec[i] = CSpectrumPoint(eng_gam[i], eng_pi)
+    with nogil:
+        for i in prange(num_pts, num_threads=nt, schedule="static"):
+            spec_view[i] = CSpectrumPoint(engs[i], eng_pi)
 
     return spec
 
@@ -53,3 +61,33 @@ def Spectrum(np.ndarray eng_gam, double eng_pi):
     Returns decay spectrum for pi0 -> g g.
     """
     return CSpectrum(eng_gam, eng_pi)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def SpectrumMatrix(eng_gams, eng_pis):
+    """
+    Returns decay spectra for pi0 -> g g for many neutral pion energies, as
+    an array of shape np.shape(eng_pis) + np.shape(eng_gams).
+    """
+    cdef double[::1] es = np.ascontiguousarray(
+        np.ravel(eng_gams), dtype=np.float64)
+    cdef double[::1] engs = np.ascontiguousarray(
+        np.ravel(eng_pis), dtype=np.float64)
+    cdef double[:, ::1] spec = np.zeros(
+        (engs.shape[0], es.shape[0]), dtype=np.float64)
+    cdef Py_ssize_t num_es = es.shape[0]
+    cdef Py_ssize_t n
+    cdef Py_ssize_t i
+    cdef Py_ssize_t j
+    cdef int nt = num_threads(engs.shape[0] * num_es)
+
+    with nogil:
+        for n in prange(engs.shape[0] * num_es, num_threads=nt,
+                        schedule="static"):
+            i = n // num_es
+            j = n % num_es
+            spec[i, j] = CSpectrumPoint(es[j], engs[i])
+
+    return np.asarray(spec).reshape(np.shape(eng_pis) + np.shape(eng_gams))
@@ -1,18 +1,19 @@
 import numpy as np
 cimport numpy as np
+from hazma.decay_helper_functions.boost cimport BoostTable
 
-cdef np.ndarray __e_gams_total
-cdef np.ndarray __e_gams_00
-cdef np.ndarray __e_gams_pm
-cdef np.ndarray __e_gams_pmg
+# Decay modes of the short kaon, in the order of MODES
+cdef enum Mode:
+    MODE_TOTAL
+    MODE_00
+    MODE_PM
+    MODE_PMG
 
-cdef np.ndarray __spec_total
-cdef np.ndarray __spec_00
-cdef np.ndarray __spec_pm
-cdef np.ndarray __spec_pmg
+cdef BoostTable __table
 
-cdef double __interp_spec(double, str)
-cdef double __integrand(double, double, double, str)
+cdef BoostTable __make_table()
+cdef BoostTable get_table()
 
-cdef double CSpectrumPoint(double, double, str)
-cdef np.ndarray CSpectrum(np.ndarray[np.float64_t, ndim=1], double, str)
+cdef Mode mode_from_str(str) except *
+cdef double CSpectrumPoint(double, double, Mode) nogil
+cdef np.ndarray CSpectrum(np.ndarray[np.float64_t, ndim=1], double, Mode)
@@ -3,14 +3,17 @@ TODO: Update documentation.
 """
 from hazma.decay_helper_functions cimport decay_charged_pion
 from hazma.decay_helper_functions cimport decay_neutral_pion
+from hazma.decay_helper_functions.boost cimport BoostTable
 import numpy as np
 cimport numpy as np
-from scipy.integrate import quad
 from libc.math cimport sqrt
 import cython
+from cython.parallel cimport prange
+from hazma.decay_helper_functions.threads cimport num_threads
 import os
 import sys
 from .get_path import get_dir_path
+from hazma.parameters import load_table
 include "parameters.pxd"
 import warnings
 
@@ -30,83 +33,55 @@ Description:
     kaon's rest frame. The spectrum is then boosted into the lab frame.
 """
 
-data_path_total = os.path.join(get_dir_path(),
-                               "interpolation_data",
-                               "skaon",
-                               "short_kaon_interp_total.dat")
-data_path_00 = os.path.join(get_dir_path(),
-                            "interpolation_data",
-                            "skaon",
-                            "short_kaon_interp_00.dat")
-data_path_pm = os.path.join(get_dir_path(),
-                            "interpolation_data",
-                            "skaon",
-                            "short_kaon_interp_pm.dat")
-
-data_path_pmg = os.path.join(get_dir_path(),
-                             "interpolation_data",
-                             "skaon",
-                             "short_kaon_interp_pmg.dat")
-
-__e_gams_total, __spec_total = np.loadtxt(data_path_total, delimiter=',').T
-__e_gams_00, __spec_00 = np.loadtxt(data_path_00, delimiter=',').T
-__e_gams_pm, __spec_pm = np.loadtxt(data_path_pm, delimiter=',').T
-__e_gams_pmg, __spec_pmg = np.loadtxt(data_path_pmg, delimiter=',').T
-
-cdef double __interp_spec(double eng_gam, str mode):
-    """
-    Intepolation function for the short kaon data.
+MODES = ("total", "00", "pm", "pmg")
 
-    Parameters
-    ----------
-    eng_gam : double
-        Energy of the photon.
-    mode : str {"total"}
-        String specifying which decay mode to use.
+# The table holds the spectra of the decay modes in the rest frame of the
+# kaon, one channel per mode in the order of MODES and of the Mode enum. The
+# spectra are tabulated on the same grid, which is uniform in log(E'), and
+# are extrapolated with a constant below the smallest tabulated energy.
+cdef BoostTable __make_table():
+    """
+    Loads the tabulated rest frame spectra of the decay modes. The spectrum
+    of a mode is stored in "short_kaon_interp_<mode>.dat".
     """
-    if mode == "total":
-        return np.interp(eng_gam, __e_gams_total, __spec_total)
-    if mode == "00":
-        return np.interp(eng_gam, __e_gams_00, __spec_00)
-    if mode == "pm":
-        return np.interp(eng_gam, __e_gams_pm, __spec_pm)
-    if mode == "pmg":
-        return np.interp(eng_gam, __e_gams_pmg, __spec_pmg)
+    tables = [
+        load_table(os.path.join(get_dir_path(), "interpolation_data", "skaon",
+                                "short_kaon_interp_{}.dat".format(mode)))
+        for mode in MODES
+    ]
+    return BoostTable(tables[0][0], [table[1] for table in tables],
+                      low_power=0.0)
 
 
-@cython.cdivision(True)
-cdef double __integrand(double cl, double eng_gam, double eng_k, str mode):
+cdef BoostTable get_table():
     """
-    Integrand for K_S -> X, where X is a any final state.
+    Returns the table of the rest frame spectra, loading it on first use.
+    """
+    global __table
+
+    if __table is None:
+        __table = __make_table()
+    return __table
 
-    The X's used are "pi + pi", "pi0 + pi0" and "pi + pi + g".
+
+cdef Mode mode_from_str(str mode) except *:
+    """
+    Returns the decay mode with the given name.
 
     Parameters
     ----------
-    cl: float
-        Angle of photon w.r.t. charged kaon in lab frame.
-    eng_gam: float
-        Energy of photon in laboratory frame.
-    eng_k: float
-        Energy of kaon in laboratory frame.
-    mode : str {"total"}
-        String specifying which decay mode to use.
+    mode : str
+        Name of the decay mode, one of ``MODES``.
     """
-    cdef double gamma_k = eng_k / MASS_K
-    cdef double beta_k = sqrt(1.0 - (MASS_K / eng_k)**2)
-    cdef double eng_gam_k_rf = eng_gam * gamma_k * (1.0 - beta_k * cl)
-
-    cdef int i, j
-    cdef double ret_val
-    cdef double pre_factor \
-        = 1.0 / (2.0 * gamma_k * (1.0 - beta_k * cl))
+    if mode not in MODES:
+        raise ValueError(
+            "Unknown mode '{}', expected one of {}.".format(mode, MODES))
+    return <Mode><int>MODES.index(mode)
 
-    return pre_factor * __interp_spec(eng_gam_k_rf, mode)
 
-
-cdef double CSpectrumPoint(double eng_gam, double eng_k, str mode):
+cdef double CSpectrumPoint(double eng_gam, double eng_k, Mode mode) nogil:
     """
-    Returns the radiative spectrum value from charged kaon at
+    Returns the radiative spectrum value from short kaon at
     a single gamma ray energy.
 
     Parameters
@@ -114,28 +89,26 @@ cdef double CSpectrumPoint(double eng_gam, double eng_k, str mode):
     eng_gam : float
         Energy of photon is laboratory frame.
     eng_k : float
-        Energy of charged kaon in laboratory frame.
-    mode : str {"total"}
-        String specifying which decay mode to use.
+        Energy of short kaon in laboratory frame.
+    mode : Mode
+        Decay mode.
     """
-    message = 'Energy of kaon cannot be less than the kaon mass. Returning 0.'
-    if eng_k < MASS_K0:
-        # raise warnings.warn(message, RuntimeWarning)
+    if eng_k < MASS_K0 or eng_gam <= 0.0:
         return 0.0
 
-    cdef double result = 0.0
+    if __table is None:
+        with gil:
+            get_table()
 
-    return quad(__integrand, -1.0, 1.0, points=[-1.0, 1.0], \
-                  args=(eng_gam, eng_k, mode), epsabs=10**-10., \
-                  epsrel=10**-4.)[0]
+    return __table.lab(eng_gam, eng_k, MASS_K0, mode)
 
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
 cdef np.ndarray CSpectrum(np.ndarray[np.float64_t, ndim=1] eng_gams,
-                          double eng_k, str mode):
+                          double eng_k, Mode mode):
     """
-    Returns the radiative spectrum dNde from charged kaon for a
+    Returns the radiative spectrum dNde from short kaon for a
     list of gamma ray energies.
 
     Parameters
@@ -143,25 +116,30 @@ cdef np.ndarray CSpectrum(np.ndarray[np.float64_t, ndim=1] eng_gams,
     eng_gams : numpy.ndarray
         List of energies of photon in laboratory frame.
     eng_k : float
-        Energy of charged kaon in laboratory frame.
-    mode : str {"total"}
-        String specifying which decay mode to use.
+        Energy of short kaon in laboratory frame.
+    mode : Mode
+        Decay mode.
     """
     cdef int numpts = len(eng_gams)
 
     cdef np.ndarray spec = np.zeros(numpts, dtype=np.float64)
+    cdef double[:] spec_view = spec
+    cdef double[:] engs = eng_gams
 
+    cdef int nt = num_threads(numpts)
     cdef int i = 0
 
-    for i in range(numpts):
-        spec[i] = CSpectrumPoint(eng_gams[i], eng_k, mode)
+    get_table()
+    with nogil:
+        for i in prange(numpts, num_threads=nt, schedule="static"):
+            spec_view[i] = CSpectrumPoint(engs[i], eng_k, mode)
 
     return spec
 
 
 def SpectrumPoint(double eng_gam, double eng_k, str mode):
     """
-    Returns the radiative spectrum value from charged kaon at
+    Returns the radiative spectrum value from short kaon at
     a single gamma ray energy.
 
     Parameters
@@ -169,11 +147,11 @@ def SpectrumPoint(double eng_gam, double eng_k, str mode):
     eng_gam : float
         Energy of photon is laboratory frame.
     eng_k : float
-        Energy of charged kaon in laboratory frame.
-    mode : str {"total"}
+        Energy of short kaon in laboratory frame.
+    mode : str {"total"]
         String specifying which decay mode to use.
     """
-    return CSpectrumPoint(eng_gam, eng_k, mode)
+    return CSpectrumPoint(eng_gam, eng_k, mode_from_str(mode))
 
 
 @cython.boundscheck(False)
@@ -181,16 +159,60 @@ def SpectrumPoint(double eng_gam, double eng_k, str mode):
 def Spectrum(np.ndarray[np.float64_t, ndim=1] eng_gams, double eng_k,
              str mode):
     """
-    Returns the radiative spectrum dNde from charged kaon for a
+    Returns the radiative spectrum dNde from short kaon for a
     list of gamma ray energies.
 
     Parameters
     ----------
     eng_gams : numpy.ndarray
         List of energies of photon in laboratory frame.
-    eng_k :
-        Energy of charged kaon in laboratory frame.
-    mode : str {"total"}
+    eng_k : float
+        Energy of short kaon in laboratory frame.
+    mode : str {"total"]
+        String specifying which decay mode to use.
+    """
+    return CSpectrum(eng_gams, eng_k, mode_from_str(mode))
+
+
+def SpectrumMatrix(eng_gams, eng_ks, str mode):
+    """
+    Returns the radiative spectra dNde from short kaons with many energies
+    for a list of gamma ray energies.
+
+    Parameters
+    ----------
+    eng_gams : float or numpy.ndarray
+        Energies of photon in laboratory frame.
+    eng_ks : float or numpy.ndarray
+        Energies of short kaon in laboratory frame.
+    mode : str {"total"]
         String specifying which decay mode to use.
+
+    Returns
+    -------
+    spec : numpy.ndarray
+        Array of shape ``np.shape(eng_ks) + np.shape(eng_gams)``.
+    """
+    return get_table().spectrum_matrix(eng_gams, eng_ks, MASS_K0,
+                                       mode_from_str(mode))
+
+
+def SpectrumAllModes(eng_gams, double eng_k):
+    """
+    Returns the radiative spectra dNde of all decay modes of the short kaon
+    for a list of gamma ray energies, computed in a single pass.
+
+    Parameters
+    ----------
+    eng_gams : float or numpy.ndarray
+        Energies of photon in laboratory frame.
+    eng_k : float
+        Energy of short kaon in laboratory frame.
+
+    Returns
+    -------
+    spec : numpy.ndarray
+        Array of shape ``(len(MODES),) + np.shape(eng_gams)`` whose rows are
+        the spectra of the modes in ``MODES``.
     """
-    return CSpectrum(eng_gams, eng_k, mode)
+    return get_table().spectrum_all(eng_gams, eng_k, MASS_K0)
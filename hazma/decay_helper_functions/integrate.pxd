@@ -0,0 +1,12 @@
+# Signature of an integrand. ``params`` points to a struct holding the
+# parameters of the integrand.
+ctypedef double (*integrand_t)(double x, void* params) nogil
+
+cdef double gauss_kronrod(integrand_t f, void* params, double a, double b,
+                          double epsabs, double epsrel, int max_depth) nogil
+cdef double gauss_kronrod_points(integrand_t f, void* params, double a,
+                                 double b, const double* points,
+                                 int num_points, double epsabs, double epsrel,
+                                 int max_depth) nogil
+cdef double interp(double x, const double* xs, const double* ys,
+                   Py_ssize_t n) nogil
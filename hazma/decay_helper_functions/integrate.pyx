@@ -0,0 +1,241 @@
+"""
+Module for numerically integrating the boost integrals of the decay and
+positron kernels without the GIL.
+
+Description:
+    Integrals are computed with an adaptive 15 point Gauss-Kronrod rule: the
+    difference between the Kronrod estimate and the embedded 7 point Gauss
+    estimate is used as the error, and intervals whose error is too large
+    are bisected. Integrands are C functions taking the integration variable
+    and a pointer to a struct holding their parameters, so the kernels can
+    run inside of ``nogil`` blocks and ``prange`` loops.
+"""
+import numpy as np
+import cython
+from libc.math cimport fabs, fmax
+
+# Nodes and weights of the 15 point Kronrod rule and of the embedded 7 point
+# Gauss rule, which uses the odd Kronrod nodes (from QUADPACK's qk15).
+cdef double[8] __XGK = [
+    0.991455371120812639206854697526329,
+    0.949107912342758524526189684047851,
+    0.864864423359769072789712788640926,
+    0.741531185599394439863864773280788,
+    0.586087235467691130294144845693013,
+    0.405845151377397166906606412076961,
+    0.207784955007898467600689403773245,
+    0.000000000000000000000000000000000,
+]
+cdef double[8] __WGK = [
+    0.022935322010529224963732008058970,
+    0.063092092629978553290700663189204,
+    0.104790010322250183839876322541518,
+    0.140653259715525918745189590510238,
+    0.169004726639267902826583426598550,
+    0.190350578064785409913256402421014,
+    0.204432940075298892414161999234649,
+    0.209482141084727828012999174891714,
+]
+cdef double[4] __WG = [
+    0.129484966168869693270611432679082,
+    0.279705391489276667901467771423780,
+    0.381830050505118944950369775488975,
+    0.417959183673469387755102040816327,
+]
+
+
+@cython.cdivision(True)
+cdef double __gauss_kronrod_15(integrand_t f, void* params, double a,
+                               double b, double* err) nogil:
+    """
+    Applies the 15 point Kronrod rule to [a, b] and stores the difference
+    to the embedded 7 point Gauss rule in err.
+    """
+    cdef double center = 0.5 * (a + b)
+    cdef double half = 0.5 * (b - a)
+    cdef double f_center = f(center, params)
+    cdef double res_k = __WGK[7] * f_center
+    cdef double res_g = __WG[3] * f_center
+    cdef double fsum
+    cdef int j
+
+    for j in range(7):
+        fsum = f(center - half * __XGK[j], params) + \
+            f(center + half * __XGK[j], params)
+        res_k += __WGK[j] * fsum
+        if j % 2 == 1:
+            res_g += __WG[j // 2] * fsum
+
+    err[0] = fabs((res_k - res_g) * half)
+    return res_k * half
+
+
+cdef double __adaptive(integrand_t f, void* params, double a, double b,
+                       double tol, double epsrel, int depth) nogil:
+    """
+    Recursively bisects [a, b] until the error estimate of each interval
+    is below max(tol, epsrel * |integral|) or the maximum depth is reached.
+    """
+    cdef double err
+    cdef double mid
+    cdef double result = __gauss_kronrod_15(f, params, a, b, &err)
+
+    if err <= fmax(tol, epsrel * fabs(result)) or depth <= 0:
+        return result
+
+    mid = 0.5 * (a + b)
+    return __adaptive(f, params, a, mid, 0.5 * tol, epsrel, depth - 1) + \
+        __adaptive(f, params, mid, b, 0.5 * tol, epsrel, depth - 1)
+
+
+cdef double gauss_kronrod(integrand_t f, void* params, double a, double b,
+                          double epsabs, double epsrel, int max_depth) nogil:
+    """
+    Integrates f from a to b with an adaptive Gauss-Kronrod rule.
+
+    Parameters
+    ----------
+    f : integrand_t
+        Integrand.
+    params : void*
+        Parameters passed to the integrand.
+    a, b : double
+        Limits of integration.
+    epsabs, epsrel : double
+        Absolute and relative error goals.
+    max_depth : int
+        Maximum number of bisections of the interval.
+
+    Returns
+    -------
+    integral : double
+        Estimate of the integral.
+    """
+    if b == a:
+        return 0.0
+    return __adaptive(f, params, a, b, epsabs, epsrel, max_depth)
+
+
+cdef double gauss_kronrod_points(integrand_t f, void* params, double a,
+                                 double b, const double* points,
+                                 int num_points, double epsabs, double epsrel,
+                                 int max_depth) nogil:
+    """
+    Integrates f from a to b with an adaptive Gauss-Kronrod rule, splitting
+    the interval at the given points. These should be the points where the
+    integrand or its derivatives are discontinuous.
+
+    Parameters
+    ----------
+    f : integrand_t
+        Integrand.
+    params : void*
+        Parameters passed to the integrand.
+    a, b : double
+        Limits of integration, with a <= b.
+    points : const double*
+        Sorted points at which to split the interval. Points outside of
+        (a, b) are ignored.
+    num_points : int
+        Number of points.
+    epsabs, epsrel : double
+        Absolute and relative error goals.
+    max_depth : int
+        Maximum number of bisections of each subinterval.
+
+    Returns
+    -------
+    integral : double
+        Estimate of the integral.
+    """
+    cdef double result = 0.0
+    cdef double lo = a
+    cdef int i
+
+    for i in range(num_points):
+        if lo < points[i] < b:
+            result += gauss_kronrod(f, params, lo, points[i], epsabs, epsrel,
+                                    max_depth)
+            lo = points[i]
+
+    return result + gauss_kronrod(f, params, lo, b, epsabs, epsrel, max_depth)
+
+
+@cython.cdivision(True)
+cdef double interp(double x, const double* xs, const double* ys,
+                   Py_ssize_t n) nogil:
+    """
+    Linearly interpolates the points (xs, ys) at x. Like ``numpy.interp``,
+    the end values are returned outside of [xs[0], xs[n - 1]].
+
+    Parameters
+    ----------
+    x : double
+        Point at which to interpolate.
+    xs : const double*
+        Increasing abscissae.
+    ys : const double*
+        Ordinates.
+    n : Py_ssize_t
+        Number of points.
+
+    Returns
+    -------
+    y : double
+        Interpolated value.
+    """
+    cdef Py_ssize_t lo = 0
+    cdef Py_ssize_t hi = n - 1
+    cdef Py_ssize_t mid
+
+    if x <= xs[0]:
+        return ys[0]
+    if x >= xs[n - 1]:
+        return ys[n - 1]
+
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if xs[mid] <= x:
+            lo = mid
+        else:
+            hi = mid
+
+    return ys[lo] + (ys[hi] - ys[lo]) * (x - xs[lo]) / (xs[hi] - xs[lo])
+
+
+cdef double __python_integrand(double x, void* params) nogil:
+    with gil:
+        return (<object>params)(x)
+
+
+def quad(func, double a, double b, double epsabs=1e-10, double epsrel=1e-6,
+         int max_depth=30, points=()):
+    """
+    Integrates a python function with the adaptive Gauss-Kronrod rule used
+    by the compiled kernels.
+
+    Parameters
+    ----------
+    func : callable
+        Integrand, called with a single float.
+    a, b : float
+        Limits of integration.
+    epsabs : float {1e-10]
+        Absolute error goal.
+    epsrel : float {1e-6]
+        Relative error goal.
+    max_depth : int {30]
+        Maximum number of bisections of each subinterval.
+    points : sequence of float {()]
+        Points at which to split the interval.
+
+    Returns
+    -------
+    integral : float
+        Estimate of the integral.
+    """
+    cdef double[::1] pts = np.ascontiguousarray(sorted(points) + [0.0],
+                                                dtype=np.float64)
+    return gauss_kronrod_points(__python_integrand, <void*>func, a, b,
+                                &pts[0], len(points), epsabs, epsrel,
+                                max_depth)
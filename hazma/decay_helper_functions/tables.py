@@ -0,0 +1,118 @@
+"""
+On-disk cache for the tables of rest frame spectra of the decay modules.
+
+Tables which are expensive to compute are built the first time they are
+needed rather than when their module is imported. Once built, a table is
+stored as a ``.npy`` file and later processes load it memory-mapped. Files
+are named after the table and a hash of the inputs it was computed from, so
+a change of a parameter never loads a stale table.
+
+The cache directory is ``$HAZMA_TABLE_CACHE`` if set, and otherwise
+``$XDG_CACHE_HOME/hazma/tables`` or ``~/.cache/hazma/tables``. Setting
+``HAZMA_TABLE_CACHE`` to an empty string disables the cache. If the
+directory cannot be written to, tables are simply recomputed in each
+process.
+"""
+# author : Logan Morrison and Adam Coogan
+# date : October 2026
+
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+_FORMAT_VERSION = 1
+
+
+def cache_directory():
+    """
+    Returns the directory tables are stored in.
+
+    Returns
+    -------
+    directory : str or None
+        Cache directory, or None if the cache is disabled.
+    """
+    directory = os.environ.get("HAZMA_TABLE_CACHE")
+    if directory is not None:
+        return directory or None
+    root = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(root, "hazma", "tables")
+
+
+def table_path(name, inputs, directory=None):
+    """
+    Returns the path of the file storing a table, or None if the cache is
+    disabled.
+
+    Parameters
+    ----------
+    name : str
+        Name of the table.
+    inputs : tuple
+        Numbers and strings the table is computed from.
+    directory : str {None]
+        Directory the table is stored in. If None, ``cache_directory()`` is
+        used.
+
+    Returns
+    -------
+    path : str or None
+        Path of the ``.npy`` file.
+    """
+    if directory is None:
+        directory = cache_directory()
+    if directory is None:
+        return None
+    key = hashlib.sha256(repr((_FORMAT_VERSION, name, inputs)).encode())
+    return os.path.join(directory, "{}-{}.npy".format(name, key.hexdigest()[:16]))
+
+
+def cached_table(name, inputs, compute, directory=None):
+    """
+    Returns a stored table, computing and storing it if needed.
+
+    Parameters
+    ----------
+    name : str
+        Name of the table.
+    inputs : tuple
+        Numbers and strings the table is computed from. Together with the
+        name, they identify the table.
+    compute : callable
+        Function without arguments returning the table as a float64 array.
+    directory : str {None]
+        Directory the table is stored in. If None, ``cache_directory()`` is
+        used.
+
+    Returns
+    -------
+    table : np.ndarray
+        The table. Stored tables are memory-mapped copy-on-write.
+    """
+    path = table_path(name, inputs, directory)
+
+    if path is not None:
+        try:
+            return np.load(path, mmap_mode="c")
+        except (OSError, ValueError):
+            pass
+
+    table = np.ascontiguousarray(compute(), dtype=np.float64)
+
+    if path is not None:
+        # Write to a temporary file which is then renamed, so that other
+        # processes never load a partially written table.
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, table)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+    return table
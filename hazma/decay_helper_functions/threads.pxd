@@ -0,0 +1 @@
+cdef int num_threads(Py_ssize_t num_points) except -1
@@ -0,0 +1,59 @@
+"""
+Module for choosing the number of OpenMP threads of the loops evaluating
+spectra on arrays of photon energies and compiled matrix elements on phase
+space points.
+
+Description:
+    The points of a spectrum are independent, so the loops over them are
+    ``prange`` loops which are split over OpenMP threads when the extension
+    modules are compiled with OpenMP (see ``setup.py``). Otherwise they run
+    serially. The number of threads is set with
+    ``hazma.parallel.set_num_threads``. Short loops use fewer threads, so
+    that every thread gets at least ``MIN_POINTS_PER_THREAD`` points.
+"""
+from hazma import parallel
+
+cdef extern from *:
+    """
+    #ifdef _OPENMP
+    #define HAZMA_OPENMP 1
+    #else
+    #define HAZMA_OPENMP 0
+    #endif
+    """
+    bint HAZMA_OPENMP
+
+# Smallest number of points evaluated by each thread
+MIN_POINTS_PER_THREAD = 32
+
+
+def openmp_enabled():
+    """
+    Returns whether the extension modules were compiled with OpenMP.
+
+    Returns
+    -------
+    enabled : bool
+        True if loops over photon energies can run on several threads.
+    """
+    return bool(HAZMA_OPENMP)
+
+
+cdef int num_threads(Py_ssize_t num_points) except -1:
+    """
+    Returns the number of threads to use for a loop over independent points.
+
+    Parameters
+    ----------
+    num_points : Py_ssize_t
+        Number of iterations of the loop.
+
+    Returns
+    -------
+    num_threads : int
+        Number of threads, between 1 and ``parallel.get_num_threads()``.
+    """
+    if not HAZMA_OPENMP:
+        return 1
+    return max(1, min(parallel.get_num_threads(),
+                      num_points // MIN_POINTS_PER_THREAD))
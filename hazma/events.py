@@ -0,0 +1,402 @@
+"""
+Module for generating unweighted events and storing them on disk.
+
+The phase space points of ``hazma.rambo`` carry weights. Tools which apply
+cuts to individual events (e.g. detector acceptances) usually want
+unweighted events instead, which are distributed according to the matrix
+element. ``generate_unweighted_events`` produces these with the hit-or-miss
+method: a point with weight ``w`` is kept with probability
+``w / max_weight``, where the maximum weight is estimated from a pilot run.
+
+Events are written in chunks to a compact binary file by ``EventWriter``
+and can be read back, memory-mapped, with ``read_events``. A file holds:
+
+* the magic bytes ``HAZMAEV1`` and the length of the header as a
+  little-endian 32-bit integer,
+* a JSON header with the masses, center of mass energy, seed, data type
+  and number of events, as well as the unweighting efficiency, padded such
+  that the events start at a multiple of 64 bytes,
+* the four-momenta of the events as little-endian float32 or float64
+  numbers in an array of shape (num_events, num_fsp, 4).
+
+Examples
+--------
+
+Generate 10^6 unweighted muon decay events with single precision momenta
+and read them back::
+
+    from hazma.events import generate_unweighted_events, read_events
+    events, report = generate_unweighted_events(
+        masses, mmu, 10**6, mat_elem_sqrd=msqrd, seed=1,
+        filename="mu_decay.evt", dtype=np.float32)
+    events, header = read_events("mu_decay.evt")
+
+"""
+# author : Logan Morrison and Adam Coogan
+# date : October 2026
+
+import json
+import struct
+import warnings
+
+import numpy as np
+
+from hazma import rambo
+from hazma.hazma_errors import HazmaWarning
+
+_MAGIC = b"HAZMAEV1"
+_FORMAT_VERSION = 1
+_ALIGNMENT = 64
+# Room left in the header for the values only known once all events are
+# written (number of events, efficiency, ...).
+_HEADER_SPARE = 512
+
+
+def _seed_to_json(seed):
+    """
+    Returns a JSON-serializable description of a seed from which the
+    ``numpy.random.SeedSequence`` can be rebuilt.
+    """
+    if seed is None:
+        return None
+    return {
+        "entropy": seed.entropy,
+        "spawn_key": list(seed.spawn_key),
+        "n_children_spawned": seed.n_children_spawned,
+    }
+
+
+def _pad_header(header, size=None):
+    """
+    Encodes the header, padded with spaces such that the events start at a
+    multiple of ``_ALIGNMENT`` bytes (or such that it has length ``size``).
+    """
+    text = json.dumps(header).encode("ascii")
+    prefix = len(_MAGIC) + 4
+    if size is None:
+        size = len(text) + _HEADER_SPARE
+        size += -(prefix + size) % _ALIGNMENT
+    if len(text) > size:
+        raise ValueError("Header does not fit into the space reserved for it.")
+    return text + b" " * (size - len(text))
+
+
+class EventWriter(object):
+    """
+    Writes events to a binary file, one chunk at a time.
+
+    Parameters
+    ----------
+    filename : str
+        Name of the file to write. An existing file is overwritten.
+    masses : numpy.ndarray
+        Masses of the final state particles.
+    cme : double
+        Center of mass energy.
+    seed : numpy.random.SeedSequence, optional
+        Seed used to generate the events, stored in the header.
+    dtype : {numpy.float64, numpy.float32}
+        Data type used to store the momenta. Single precision halves the
+        size of the file.
+
+    Attributes
+    ----------
+    header : dict
+        Header written to the file. Entries added before the writer is
+        closed are stored as well.
+
+    Examples
+    --------
+
+    Write events in chunks::
+
+        with EventWriter("events.evt", masses, cme) as writer:
+            for events in chunks:
+                writer.write(events)
+
+    """
+
+    def __init__(self, filename, masses, cme, seed=None, dtype=np.float64):
+        dtype = np.dtype(dtype).newbyteorder("<")
+        if dtype.kind != "f" or dtype.itemsize not in (4, 8):
+            raise ValueError("dtype must be float32 or float64.")
+
+        masses = np.atleast_1d(np.array(masses, dtype=np.float64))
+        self.num_fsp = len(masses)
+        self.dtype = dtype
+        self.header = {
+            "format_version": _FORMAT_VERSION,
+            "dtype": dtype.str,
+            "num_fsp": self.num_fsp,
+            "num_events": 0,
+            "masses": masses.tolist(),
+            "cme": float(cme),
+            "seed": _seed_to_json(seed),
+        }
+        self._header_size = len(_pad_header(self.header))
+        self._file = open(filename, "wb")
+        self._write_header()
+
+    def _write_header(self):
+        self._file.seek(0)
+        self._file.write(_MAGIC)
+        self._file.write(struct.pack("<I", self._header_size))
+        self._file.write(_pad_header(self.header, self._header_size))
+
+    def write(self, events):
+        """
+        Appends events to the file.
+
+        Parameters
+        ----------
+        events : numpy.ndarray
+            Four-momenta of the events with shape (num_events, num_fsp, 4)
+            or (num_events, 4 * num_fsp).
+        """
+        events = np.asarray(events)
+        events = events.reshape((events.shape[0], 4 * self.num_fsp))
+        self._file.seek(0, 2)
+        self._file.write(np.ascontiguousarray(events, dtype=self.dtype).tobytes())
+        self.header["num_events"] += events.shape[0]
+
+    def close(self):
+        """
+        Writes the final header and closes the file.
+        """
+        if not self._file.closed:
+            self._write_header()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def read_events(filename, mmap=True):
+    """
+    Reads events written by ``EventWriter``.
+
+    Parameters
+    ----------
+    filename : str
+        Name of the file.
+    mmap : bool {True]
+        If True, the events are memory-mapped rather than loaded, so only
+        the parts which are accessed are read from disk.
+
+    Returns
+    -------
+    events : numpy.ndarray or numpy.memmap
+        Four-momenta of the events with shape (num_events, num_fsp, 4).
+    header : dict
+        Header of the file, with the masses, center of mass energy, seed
+        and, for files written by ``generate_unweighted_events``, the
+        unweighting report.
+    """
+    with open(filename, "rb") as f:
+        if f.read(len(_MAGIC)) != _MAGIC:
+            raise ValueError("{} is not a hazma event file.".format(filename))
+        (header_size,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(header_size).decode("ascii"))
+
+    offset = len(_MAGIC) + 4 + header_size
+    shape = (header["num_events"], header["num_fsp"], 4)
+    dtype = np.dtype(header["dtype"])
+
+    if shape[0] == 0:
+        return np.empty(shape, dtype=dtype), header
+    if mmap:
+        events = np.memmap(filename, dtype=dtype, mode="r", offset=offset, shape=shape)
+    else:
+        events = np.fromfile(filename, dtype=dtype, offset=offset).reshape(shape)
+    return events, header
+
+
+def estimate_max_weight(
+    masses,
+    cme,
+    mat_elem_sqrd=rambo.msqrd_flat,
+    num_ps_pts=10000,
+    num_cpus=None,
+    seed=None,
+):
+    """
+    Estimates the largest weight of the phase space points from a pilot
+    run.
+
+    Parameters
+    ----------
+    masses : numpy.ndarray
+        Masses of the final state particles.
+    cme : double
+        Center of mass energy.
+    mat_elem_sqrd : (double)(numpy.ndarray) {msqrd_flat]
+        Function for the matrix element squared, see
+        ``rambo.generate_phase_space``.
+    num_ps_pts : int {10000]
+        Number of points in the pilot run.
+    num_cpus : int {None]
+        Number of cpus to use, see ``rambo.generate_phase_space``.
+    seed : {None, int, array_like[ints], numpy.random.SeedSequence}
+        Seed for the pilot run.
+
+    Returns
+    -------
+    max_weight : double
+        Largest weight in the pilot run.
+    """
+    points = rambo.generate_phase_space(
+        masses, cme, num_ps_pts, mat_elem_sqrd, num_cpus, seed=seed
+    )
+    return np.max(points[:, -1])
+
+
+def generate_unweighted_events(
+    masses,
+    cme,
+    num_events,
+    mat_elem_sqrd=rambo.msqrd_flat,
+    num_cpus=None,
+    seed=None,
+    chunk_size=100000,
+    max_weight=None,
+    num_max_weight_pts=10000,
+    max_weight_factor=1.2,
+    filename=None,
+    dtype=np.float64,
+):
+    """
+    Generates unweighted events with the hit-or-miss method.
+
+    Phase space points are generated ``chunk_size`` at a time with RAMBO and
+    each point is kept with probability ``w / max_weight``. Points with
+    weights above ``max_weight`` are always kept and counted in the report;
+    since they are underrepresented, a warning is issued if there are any.
+
+    Parameters
+    ----------
+    masses : numpy.ndarray
+        Masses of the final state particles.
+    cme : double
+        Center of mass energy.
+    num_events : int
+        Number of events to generate.
+    mat_elem_sqrd : (double)(numpy.ndarray) {msqrd_flat]
+        Function for the matrix element squared, see
+        ``rambo.generate_phase_space``.
+    num_cpus : int {None]
+        Number of cpus to use, see ``rambo.generate_phase_space``.
+    seed : {None, int, array_like[ints], numpy.random.SeedSequence}
+        Seed for the random number generators. If None, fresh entropy is
+        used. The seed is stored in the header of the event file.
+    chunk_size : int {100000]
+        Number of phase space points generated at once.
+    max_weight : double {None]
+        Maximum weight to unweight against. If None, it is estimated with
+        ``estimate_max_weight``.
+    num_max_weight_pts : int {10000]
+        Number of points used to estimate the maximum weight.
+    max_weight_factor : double {1.2]
+        Factor the estimated maximum weight is multiplied with, since the
+        largest weight of a finite sample underestimates it.
+    filename : str {None]
+        If given, the events are written to this file as they are
+        generated (see ``EventWriter``) and are returned memory-mapped, so
+        the memory used does not grow with ``num_events``.
+    dtype : {numpy.float64, numpy.float32}
+        Data type of the returned (or stored) momenta.
+
+    Returns
+    -------
+    events : numpy.ndarray or numpy.memmap
+        Four-momenta of the events with shape (num_events, num_fsp, 4).
+    report : dict
+        Unweighting report with the maximum weight ("max_weight"), the
+        number of phase space points generated ("num_generated"), the
+        fraction of them that were accepted ("efficiency") and the number of
+        points with weights above the maximum ("num_overweight").
+    """
+    if not hasattr(masses, "__len__"):
+        masses = [masses]
+
+    masses = np.array(masses, dtype=np.float64)
+    num_fsp = len(masses)
+
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1.")
+
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    seed_json = _seed_to_json(seed)
+    # Independent streams for the pilot run, the points and the acceptance.
+    seed_max, seed_gen, seed_accept = seed.spawn(3)
+
+    if max_weight is None:
+        max_weight = max_weight_factor * estimate_max_weight(
+            masses, cme, mat_elem_sqrd, num_max_weight_pts, num_cpus, seed_max
+        )
+    if not max_weight > 0.0:
+        raise ValueError("The maximum weight must be positive.")
+
+    rng = np.random.Generator(np.random.Philox(seed_accept))
+
+    if filename is None:
+        events = np.empty((num_events, num_fsp, 4), dtype=dtype)
+        writer = None
+    else:
+        writer = EventWriter(filename, masses, cme, dtype=dtype)
+        writer.header["seed"] = seed_json
+
+    num_kept = 0
+    num_accepted = 0
+    num_generated = 0
+    num_overweight = 0
+
+    try:
+        # The stream is consumed lazily, so its length only has to be large.
+        chunks = rambo.generate_phase_space_chunks(
+            masses, cme, 2 ** 62, mat_elem_sqrd, num_cpus, seed_gen, chunk_size
+        )
+        for points in chunks:
+            if num_kept >= num_events:
+                break
+            weights = points[:, -1]
+            accept = rng.random(len(weights)) * max_weight < weights
+            num_generated += len(weights)
+            num_accepted += np.count_nonzero(accept)
+            num_overweight += np.count_nonzero(weights > max_weight)
+
+            kept = points[accept, : 4 * num_fsp][: num_events - num_kept]
+            kept = kept.reshape((-1, num_fsp, 4))
+            if writer is None:
+                events[num_kept : num_kept + len(kept)] = kept
+            else:
+                writer.write(kept)
+            num_kept += len(kept)
+
+        report = {
+            "max_weight": float(max_weight),
+            "num_generated": num_generated,
+            "efficiency": num_accepted / num_generated if num_generated else 0.0,
+            "num_overweight": num_overweight,
+        }
+        if writer is not None:
+            writer.header.update(report)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if num_overweight > 0:
+        warnings.warn(
+            "{} phase space points had weights above the maximum weight, "
+            "so the events underrepresent them. Pass a larger "
+            "max_weight.".format(num_overweight),
+            HazmaWarning,
+        )
+
+    if writer is not None:
+        events = read_events(filename)[0]
+
+    return events, report
@@ -9,29 +9,29 @@ import numpy as np
 cimport numpy as np
 import cython
 
-cdef np.ndarray metric_diag = np.array([1.0, -1.0, -1.0, -1.0])
 
-
-@cython.boundscheck(False)
-@cython.wraparound(False)
-def minkowski_dot(np.ndarray[double, ndim=1] fv1,
-                  np.ndarray[double, ndim=1] fv2):
+def minkowski_dot(fv1, fv2):
     """
     Returns the dot product of two four vectors using the west coast metric.
+    The four vectors may also be arrays of four vectors of shape (..., 4), in
+    which case the dot products are broadcast over the leading axes.
 
     Paramaters
     ----------
-    fv1 : numpy.ndarray[double, ndim=1]
-        First four vector.
-    fv2 : numpy.ndarray[double, ndim=1]
-        Second four vector.
+    fv1 : numpy.ndarray
+        First four vector(s) with shape (..., 4).
+    fv2 : numpy.ndarray
+        Second four vector(s) with shape (..., 4).
 
     Returns
     -------
-    dot_product : double
+    dot_product : double or numpy.ndarray
         Returns fv1 * fv2.
     """
-    return np.sum(metric_diag[:] * fv1[:] * fv2[:])
+    fv1 = np.asarray(fv1)
+    fv2 = np.asarray(fv2)
+    return (fv1[..., 0] * fv2[..., 0] - fv1[..., 1] * fv2[..., 1] -
+            fv1[..., 2] * fv2[..., 2] - fv1[..., 3] * fv2[..., 3])
 
 
 
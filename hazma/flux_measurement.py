@@ -1,5 +1,7 @@
 import numpy as np
 
+from hazma.parameters import load_table
+
 
 class FluxMeasurement:
     """
@@ -48,9 +50,9 @@ class FluxMeasurement:
         target : TargetParams
             The target of the analysis
         """
-        self.e_lows, self.e_highs, self.fluxes, self.upper_errors, self.lower_errors = np.loadtxt(
-            obs_rf, delimiter=","
-        ).T
+        self.e_lows, self.e_highs, self.fluxes, self.upper_errors, self.lower_errors = load_table(
+            obs_rf
+        )
 
         # Get bin central values
         self._e_bins = 0.5 * (self.e_lows + self.e_highs)
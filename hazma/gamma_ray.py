@@ -5,7 +5,11 @@
 # date : December 2017
 
 from hazma import rambo
-from hazma.gamma_ray_helper_functions.gamma_ray_generator import gamma, gamma_point
+from hazma.gamma_ray_helper_functions.gamma_ray_generator import (
+    gamma,
+    gamma_multi_cme,
+    gamma_point,
+)
 from hazma.field_theory_helper_functions.common_functions import cross_section_prefactor
 import numpy as np
 
@@ -14,10 +18,15 @@ def gamma_ray_decay(
     particles,
     cme,
     photon_energies,
-    mat_elem_sqrd=lambda k_list: 1.0,
+    mat_elem_sqrd=rambo.msqrd_flat,
     num_ps_pts=1000,
     num_bins=25,
     verbose=False,
+    seed=None,
+    chunk_size=None,
+    sampler=None,
+    binning="linear",
+    energy_hist=None,
 ):
     r"""Returns gamma ray spectrum from the decay of a set of particles.
 
@@ -31,8 +40,11 @@ def gamma_ray_decay(
     particles : `array_like`
         List of particle names. Available particles are 'muon', 'electron'
         'charged_pion', 'neutral pion', 'charged_kaon', 'long_kaon', 'short_kaon'.
-    cme : double
-        Center of mass energy of the final state in MeV.
+    cme : double or np.ndarray[double, ndim=1]
+        Center of mass energy of the final state in MeV. If an array is
+        given, the spectrum is computed at each energy, which is cheaper than
+        separate calls since the phase space points are shared between the
+        energies (see ``gamma_multi_cme``).
     photon_energies : np.ndarray[double, ndim=1]
         List of photon energies in MeV to evaluate spectra at.
     mat_elem_sqrd : double(\*func)(np.ndarray, )
@@ -46,11 +58,39 @@ def gamma_ray_decay(
     verbose: Bool
         If true, additional output is displayed while the function is computing
         spectra.
+    seed : {None, int, array_like[ints], numpy.random.SeedSequence}, optional
+        Seed for the phase space generator. Calls with the same seed produce
+        identical spectra. If None, fresh entropy is used.
+    chunk_size : int {None}, optional
+        If specified, the phase space points are generated and binned
+        ``chunk_size`` at a time, so that memory use does not grow with
+        ``num_ps_pts``. See ``hazma.rambo.generate_energy_histogram``.
+    sampler : str, optional
+        How phase space is sampled: "flat" (Monte Carlo, the default),
+        "quadrature" (deterministic, for two or three particles, without
+        using ``num_ps_pts`` or ``seed``) or "qmc" (quasi-Monte Carlo), which
+        gives much less noisy spectra than "flat" for the same
+        ``num_ps_pts``. See ``hazma.rambo.generate_energy_histogram``.
+    binning : str {"linear"}, optional
+        How the energy bins of the final state particles are spaced:
+        "linear", "log", "endpoint" (refined towards the kinematic
+        endpoints) or "quantile" (equal probability). The non-uniform
+        binnings resolve steep energy distributions with fewer bins, and
+        hence fewer evaluations of the decay spectra. See
+        ``hazma.rambo.generate_energy_histogram``.
+    energy_hist : tuple {None}, optional
+        Energy histograms ``(probs, errs, bins)`` of the final state
+        particles to use instead of running RAMBO, e.g. from
+        ``hazma.rambo.generate_observables``, so that a single set of phase
+        space points can provide the gamma ray and positron spectra as well
+        as other observables. Requires a single ``cme``.
 
     Returns
     -------
     spec : np.ndarray
-        Total gamma ray spectrum from all final state particles.
+        Total gamma ray spectrum from all final state particles. If ``cme``
+        is an array, the spectra at each energy are stacked along the first
+        axis.
 
     Notes
     -----
@@ -86,6 +126,24 @@ def gamma_ray_decay(
 
     particles = np.array(particles)
 
+    if np.ndim(cme) > 0:
+        if energy_hist is not None:
+            raise ValueError("energy_hist requires a single cme.")
+        spec = gamma_multi_cme(
+            particles,
+            np.array(cme, dtype=np.float64),
+            np.atleast_1d(np.array(photon_energies, dtype=np.float64)),
+            mat_elem_sqrd=mat_elem_sqrd,
+            num_ps_pts=num_ps_pts,
+            num_bins=num_bins,
+            verbose=verbose,
+            seed=seed,
+            chunk_size=chunk_size,
+            sampler=sampler,
+            binning=binning,
+        )
+        return spec if hasattr(photon_energies, "__len__") else spec[:, 0]
+
     if hasattr(photon_energies, "__len__"):
         return gamma(
             particles,
@@ -95,9 +153,30 @@ def gamma_ray_decay(
             num_ps_pts=num_ps_pts,
             num_bins=num_bins,
             verbose=verbose,
+            seed=seed,
+            chunk_size=chunk_size,
+            sampler=sampler,
+            binning=binning,
+            energy_hist=energy_hist,
         )
+    if energy_hist is not None:
+        return gamma(
+            particles,
+            cme,
+            np.array([photon_energies], dtype=np.float64),
+            energy_hist=energy_hist,
+        )[0]
     return gamma_point(
-        particles, cme, photon_energies, mat_elem_sqrd, num_ps_pts, num_bins
+        particles,
+        cme,
+        photon_energies,
+        mat_elem_sqrd,
+        num_ps_pts,
+        num_bins,
+        seed,
+        chunk_size,
+        sampler,
+        binning,
     )
 
 
@@ -105,10 +184,13 @@ def gamma_ray_fsr(
     isp_masses,
     fsp_masses,
     cme,
-    mat_elem_sqrd_tree=lambda k_list: 1.0,
-    mat_elem_sqrd_rad=lambda k_list: 1.0,
+    mat_elem_sqrd_tree=rambo.msqrd_flat,
+    mat_elem_sqrd_rad=rambo.msqrd_flat,
     num_ps_pts=1000,
     num_bins=25,
+    seed=None,
+    chunk_size=None,
+    binning="linear",
 ):
     r"""Returns the FSR spectrum for a user-specified particle physics process.
 
@@ -139,6 +221,15 @@ def gamma_ray_fsr(
         Number of Monte Carlo events to generate.
     num_bins : int
         Number of gamma ray energies to use.
+    seed : {None, int, array_like[ints], numpy.random.SeedSequence}, optional
+        Seed for the phase space generator. If None, fresh entropy is used.
+    chunk_size : int {None}, optional
+        If specified, the phase space points are generated ``chunk_size`` at
+        a time, so that memory use does not grow with ``num_ps_pts``.
+    binning : str {"linear"}, optional
+        How the gamma ray energies are spaced, e.g. "log" to resolve the
+        soft part of the spectrum. See
+        ``hazma.rambo.generate_energy_histogram``.
 
     Returns
     -------
@@ -204,9 +295,19 @@ def gamma_ray_fsr(
                       msqrds.radiative, num_ps_pts, num_bins)
 
     """
+    # Use independent random streams for the tree and radiative processes.
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    seed_tree, seed_rad = seed.spawn(2)
+
     if len(isp_masses) == 1:
         cross_section = rambo.compute_decay_width(
-            num_ps_pts, fsp_masses[0:-1], cme, mat_elem_sqrd=mat_elem_sqrd_tree
+            fsp_masses[0:-1],
+            cme,
+            num_ps_pts=num_ps_pts,
+            mat_elem_sqrd=mat_elem_sqrd_tree,
+            seed=seed_tree,
+            chunk_size=chunk_size,
         )[0]
 
         pre_factor = 1.0 / (2.0 * cme)
@@ -217,6 +318,8 @@ def gamma_ray_fsr(
             cme,
             num_ps_pts=num_ps_pts,
             mat_elem_sqrd=mat_elem_sqrd_tree,
+            seed=seed_tree,
+            chunk_size=chunk_size,
         )[0]
 
         m1 = isp_masses[0]
@@ -229,6 +332,9 @@ def gamma_ray_fsr(
         num_ps_pts=num_ps_pts,
         mat_elem_sqrd=mat_elem_sqrd_rad,
         num_bins=num_bins,
+        seed=seed_rad,
+        chunk_size=chunk_size,
+        binning=binning,
     )[0]
 
     photon_energies = eng_hists[-1, 0]
@@ -6,11 +6,12 @@
 import numpy as np
 cimport numpy as np
 import cython
-import multiprocessing as mp
 
 from hazma import rambo
+from hazma.phase_space_helper_functions import histogram
 from hazma.rambo import compute_annihilation_cross_section
 from hazma.rambo import compute_decay_width
+from hazma.rambo import msqrd_flat
 
 from hazma.decay import muon as dm
 from hazma.decay import electron as de
@@ -57,15 +58,6 @@ cdef np.ndarray names_to_masses(np.ndarray names):
         masses[i] = cmass_dict[names[i]]
     return masses
 
-def __gen_spec(name, eng, eng_gams, norm, verbose=False):
-    """
-    c-function used by ``gamma`` and ``gamma_point`` to generate spectrum
-    values.
-    """
-    if verbose is True:
-        print("creating {} spectrum with energy {}".format(name, eng))
-    return norm * cspec_dict[name](eng_gams, eng)
-
 def __gen_spec_2body(particles, cme, eng_gams):
     masses = names_to_masses(particles)
 
@@ -80,11 +72,41 @@ def __gen_spec_2body(particles, cme, eng_gams):
 
     return spec
 
+def __spec_from_hist(particles, hist, bins, eng_gams, verbose=False):
+    """
+    Convolves the energy distributions of the final state particles with
+    their gamma ray spectra, used by ``gamma`` and ``gamma_multi_cme``.
+
+    The spectra of each kind of particle are computed at the energies of all
+    of its bins in a single call, giving a matrix of shape
+    (num_energies, len(eng_gams)). The convolution is then a matrix-vector
+    product with the probabilities of the bins.
+    """
+    cdef np.ndarray spec = np.zeros(len(eng_gams), dtype=np.float64)
+
+    # Normalize spectra: Need to multiply by the probability of the particle
+    # having a given energy. Since we are essentially integrating over the
+    # energy probability distribution, we need to multiply the probability
+    # density by the width of the bin.
+    norms = np.diff(bins, axis=1) * hist[:, 1, :]
+
+    for name in np.unique(particles):
+        engs = hist[particles == name, 0, :].ravel()
+        if verbose is True:
+            print("creating {} spectra at {} energies".format(
+                name, len(engs)))
+        spec += norms[particles == name].ravel() @ \
+            cspec_dict[name](eng_gams, engs)
+
+    return spec
+
 @cython.boundscheck(False)
 @cython.wraparound(False)
 def gamma(np.ndarray particles, double cme,
-          np.ndarray eng_gams, mat_elem_sqrd=lambda k_list: 1.0,
-          int num_ps_pts=10000, int num_bins=25, verbose=False):
+          np.ndarray eng_gams, mat_elem_sqrd=msqrd_flat,
+          int num_ps_pts=10000, int num_bins=25, verbose=False,
+          seed=None, chunk_size=None, sampler=None,
+          binning="linear", energy_hist=None):
     """Returns total gamma ray spectrum from final state particles.
 
     Parameters
@@ -105,6 +127,26 @@ def gamma(np.ndarray particles, double cme,
         Number of phase space points to use.
     num_bins : int
         Number of bins to use.
+    seed : {None, int, array_like[ints], numpy.random.SeedSequence}
+        Seed for the phase space generator. If None, fresh entropy is used.
+    chunk_size : int {None]
+        If specified, the phase space points are generated and binned
+        ``chunk_size`` at a time, see ``rambo.generate_energy_histogram``.
+    sampler : str {None]
+        Phase space sampler, "flat" (the default), "quadrature"
+        (deterministic, for two or three particles) or "qmc" (quasi-Monte
+        Carlo), see ``rambo.generate_energy_histogram``.
+    binning : str {"linear"]
+        How the energy bins are spaced: "linear", "log", "endpoint" or
+        "quantile", see ``rambo.generate_energy_histogram``. Bins refined
+        where the energy distributions are steep reach a given accuracy with
+        fewer bins, and hence fewer evaluations of the decay spectra.
+    energy_hist : tuple {None]
+        Energy histograms ``(probs, errs, bins)`` of the final state
+        particles, e.g. from ``rambo.generate_observables`` with an
+        ``EnergyHistogram`` observable. If given, they are normalized to
+        unit area and used instead of running RAMBO, so that one set of
+        phase space points can feed several spectra and observables.
 
     Returns
     -------
@@ -130,38 +172,23 @@ def gamma(np.ndarray particles, double cme,
     num_fsp = len(masses)
     num_engs = len(eng_gams)
 
-    hist = rambo.generate_energy_histogram(masses, cme, num_ps_pts, mat_elem_sqrd, num_bins, density=True)[0]
-
-    cpdef int num_cpus = int(np.floor(mp.cpu_count() * 0.75))
-
-    p = mp.Pool(num_cpus)
-    specs = []
+    if energy_hist is not None:
+        hist, bins = histogram.check_energy_hist(energy_hist, num_fsp)
+    else:
+        hist, _, bins = rambo.generate_energy_histogram(
+            masses, cme, num_ps_pts, mat_elem_sqrd, num_bins, density=True,
+            seed=seed, chunk_size=chunk_size, sampler=sampler,
+            binning=binning, return_bins=True)
 
-    for i in range(num_bins):
-        for j in range(num_fsp):
-            part = particles[j]  # particle name
-            part_eng = hist[j, 0, i]  # particle energy
-
-            # Normalize spectrum: Need to multiply by the probability of
-            # particle having energy part_eng. Since we are essentially
-            # integrating over the energy probability distribution, we need to
-            # multiply by (b - a) / N, where a = e_min, b = e_max and
-            # N = num_bins.
-            norm = (hist[j, 0, -1] - hist[j, 0, 0]) / num_bins * hist[j, 1, i]
-
-            specs.append(p.apply_async(__gen_spec, \
-                                       (part, part_eng, eng_gams, norm, verbose)))
-
-    p.close()
-    p.join()
-
-    return sum([spec.get() for spec in specs])
+    return __spec_from_hist(particles, hist, bins, eng_gams, verbose)
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
 def gamma_point(np.ndarray particles, double cme,
-                double eng_gam, mat_elem_sqrd=lambda k_list: 1.0,
-                int num_ps_pts=1000, int num_bins=25):
+                double eng_gam, mat_elem_sqrd=msqrd_flat,
+                int num_ps_pts=1000, int num_bins=25, seed=None,
+                chunk_size=None, sampler=None,
+                binning="linear"):
     """Returns total gamma ray spectrum from final state particles.
 
     Parameters
@@ -182,52 +209,98 @@ def gamma_point(np.ndarray particles, double cme,
         Number of phase space points to use.
     num_bins : int
         Number of bins to use.
+    seed : {None, int, array_like[ints], numpy.random.SeedSequence}
+        Seed for the phase space generator. If None, fresh entropy is used.
+    chunk_size : int {None]
+        If specified, the phase space points are generated and binned
+        ``chunk_size`` at a time, see ``rambo.generate_energy_histogram``.
+    sampler : str {None]
+        Phase space sampler, "flat" (the default), "quadrature"
+        (deterministic, for two or three particles) or "qmc" (quasi-Monte
+        Carlo), see ``rambo.generate_energy_histogram``.
+    binning : str {"linear"]
+        How the energy bins are spaced: "linear", "log", "endpoint" or
+        "quantile", see ``rambo.generate_energy_histogram``. Bins refined
+        where the energy distributions are steep reach a given accuracy with
+        fewer bins, and hence fewer evaluations of the decay spectra.
 
     Returns
     -------
     spec : double
         Spectrum evaluated at ``eng_gam``.
     """
-    cdef int i, j
-    cdef int num_fsp
     cdef np.ndarray masses
-    cdef np.ndarray hist
-    cdef double spec_val = 0.0
-    cdef double prefactor
+    cdef np.ndarray hist, bins
 
     masses = names_to_masses(particles)
 
-    num_fsp = len(masses)
+    hist, _, bins = rambo.generate_energy_histogram(
+        masses, cme, num_ps_pts, mat_elem_sqrd, num_bins, density=True,
+        seed=seed, chunk_size=chunk_size, sampler=sampler, binning=binning,
+        return_bins=True)
+
+    return __spec_from_hist(particles, hist, bins, np.array([eng_gam]))[0]
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def gamma_multi_cme(np.ndarray particles, np.ndarray cmes,
+              np.ndarray eng_gams, mat_elem_sqrd=msqrd_flat,
+              int num_ps_pts=10000, int num_bins=25, verbose=False,
+              seed=None, chunk_size=None, sampler=None,
+              binning="linear"):
+    """Returns total gamma ray spectra from final state particles at several
+    center of mass energies.
+
+    When RAMBO is used (see ``sampler``), the phase space points at all
+    energies are built from one set of massless configurations (see
+    ``rambo.generate_energy_histogram_multi_cme``). Otherwise, the spectra
+    are computed one energy at a time with ``gamma``.
+
+    Parameters
+    ----------
+    particles : np.ndarray[string, ndim=1]
+        1-D array of strings containing the final state particle names.
+    cmes : np.ndarray[double, ndim=1]
+        Center of mass energies of the final state.
+    eng_gams : np.ndarray[double, ndim=1]
+        List of gamma ray energies to compute spectra at.
+    mat_elem_sqrd : double(*)(np.ndarray)
+        Function for the matrix element squared of the proccess.
+    num_ps_pts : int
+        Number of phase space points to use at each energy.
+    num_bins : int
+        Number of bins to use.
+    seed : {None, int, array_like[ints], numpy.random.SeedSequence}
+        Seed for the phase space generator. If None, fresh entropy is used.
+    chunk_size : int {None]
+        Maximum number of phase space points generated at once at each
+        energy. Defaults to 100000 when the points are shared.
+    sampler : str {None]
+        Phase space sampler, see ``gamma``.
+    binning : str {"linear"]
+        How the energy bins are spaced, see ``gamma``.
+
+    Returns
+    -------
+    spec : np.ndarray[double, ndim=2]
+        Array of shape (len(cmes), len(eng_gams)) with the total gamma ray
+        spectrum at each center of mass energy.
+    """
+    cdef np.ndarray masses
+
+    if (len(particles) <= 2 or
+            rambo._resolve_sampler(sampler, len(particles)) != "flat"):
+        return np.array([gamma(particles, cme, eng_gams, mat_elem_sqrd,
+                               num_ps_pts, num_bins, verbose, seed,
+                               chunk_size, sampler, binning)
+                         for cme in cmes])
+
+    masses = names_to_masses(particles)
+    hists, _, bins = rambo.generate_energy_histogram_multi_cme(
+        masses, cmes, num_ps_pts, mat_elem_sqrd, num_bins, density=True,
+        seed=seed, chunk_size=100000 if chunk_size is None else chunk_size,
+        binning=binning, return_bins=True)
 
-    hist = rambo.generate_energy_histogram(masses, cme, num_ps_pts, mat_elem_sqrd, num_bins)[0]
-
-    for i in range(num_bins):
-        for j in range(num_fsp):
-            if particles[j] is 'electron':
-                spec_val += 0.0
-            if particles[j] is 'muon':
-                spec_val += hist[j, 1, i] * \
-                            dm(eng_gam, hist[j, 0, i]) * \
-                            (hist[j, 0, -1] - hist[j, 0, 0]) / num_bins
-            if particles[j] is 'charged_pion':
-                spec_val += hist[j, 1, i] * \
-                            dcp(eng_gam, hist[j, 0, i], "total") * \
-                            (hist[j, 0, -1] - hist[j, 0, 0]) / num_bins
-            if particles[j] is 'neutral_pion':
-                spec_val += hist[j, 1, i] * \
-                            dnp(eng_gam, hist[j, 0, i]) * \
-                            (hist[j, 0, -1] - hist[j, 0, 0]) / num_bins
-            if particles[j] is 'charged_kaon':
-                spec_val += hist[j, 1, i] * \
-                            dck(eng_gam, hist[j, 0, i], "total") * \
-                            (hist[j, 0, -1] - hist[j, 0, 0]) / num_bins
-            if particles[j] is 'short_kaon':
-                spec_val += hist[j, 1, i] * \
-                            dsk(eng_gam, hist[j, 0, i], "total") * \
-                            (hist[j, 0, -1] - hist[j, 0, 0]) / num_bins
-            if particles[j] is 'long_kaon':
-                spec_val += hist[j, 1, i] * \
-                            dlk(eng_gam, hist[j, 0, i], "total") * \
-                            (hist[j, 0, -1] - hist[j, 0, 0]) / num_bins
-
-    return spec_val * prefactor
+    return np.array([__spec_from_hist(particles, hist, hist_bins, eng_gams, verbose)
+                     for hist, hist_bins in zip(hists, bins)])
@@ -0,0 +1,400 @@
+"""
+Module for managing the worker processes used by hazma.
+
+Phase space generation in ``hazma.rambo`` is distributed over a single,
+process-wide pool of workers. The pool is created the first time it is
+needed and stays alive across calls, so repeated calls (e.g. in a scan over
+dark matter masses) do not pay for starting and stopping processes.
+
+By default, 75% of the cpus are used. The number of workers can be changed
+globally with ``set_num_cpus`` or temporarily with the ``workers`` context
+manager. Using a single worker runs everything in the calling process, which
+is what should be used when hazma is called from within an outer parallel
+scan.
+
+Phase space generation can use one of two backends, selected globally with
+``set_backend`` or per call with the ``backend`` argument of the
+``hazma.rambo`` functions:
+
+* "threads" (the default): a pool of threads, each filling its own slice of
+  the output array with the GIL released. Nothing is pickled, and it also
+  works inside of daemonic workers.
+* "processes": the shared pool of worker processes, whose blocks of points
+  are pickled back to the calling process.
+
+Spectra are evaluated on arrays of photon energies with OpenMP threads when
+the extension modules are built with OpenMP support (see
+``hazma.decay_helper_functions.threads``). The number of threads can be
+changed globally with ``set_num_threads`` or temporarily with the ``threads``
+context manager. Inside of the workers of hazma's pools, spectra are always
+evaluated with a single thread, so that the cpus are not oversubscribed.
+
+Examples
+--------
+
+Run a scan serially inside of an outer pool::
+
+    from hazma import parallel
+    parallel.set_num_cpus(1)
+
+Temporarily use 8 workers::
+
+    from hazma import parallel
+    with parallel.workers(8):
+        spec = gamma_ray_decay(particles, cme, photon_energies)
+
+Evaluate spectra with 4 OpenMP threads::
+
+    from hazma import parallel
+    with parallel.threads(4):
+        dnde = sm.spectra(photon_energies, cme)
+
+Generate phase space points on the pool of processes::
+
+    from hazma import parallel
+    with parallel.workers(8, backend="processes"):
+        pts = rambo.generate_phase_space(masses, cme, 10**7)
+
+"""
+# author : Logan Morrison and Adam Coogan
+# date : October 2026
+
+import atexit
+import contextlib
+import multiprocessing as mp
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+BACKENDS = ("threads", "processes")
+
+_lock = threading.RLock()
+_num_cpus = None
+_backend = "threads"
+_pool = None
+_pool_size = 0
+# Shared pools of threads, by number of threads
+_thread_pools = {}
+_num_threads = None
+# Marks the threads of the shared pool of threads
+_worker = threading.local()
+
+
+def default_num_cpus():
+    """
+    Returns the number of workers used when none has been set: 75% of the
+    cpus, but at least one.
+
+    Returns
+    -------
+    num_cpus : int
+        Default number of workers.
+    """
+    return max(int(np.floor(mp.cpu_count() * 0.75)), 1)
+
+
+def get_num_cpus():
+    """
+    Returns the number of workers currently used by hazma.
+
+    Returns
+    -------
+    num_cpus : int
+        Number of workers.
+    """
+    if _num_cpus is None:
+        return default_num_cpus()
+    return _num_cpus
+
+
+def set_num_cpus(num_cpus):
+    """
+    Sets the number of workers used by hazma. If a pool of worker processes
+    of a different size is already running, it is shut down and a new one is
+    started on next use.
+
+    Parameters
+    ----------
+    num_cpus : int or None
+        Number of workers to use. A value of 1 runs all computations in the
+        calling process. If None, the default (75% of the cpus) is restored.
+    """
+    global _num_cpus
+
+    if num_cpus is not None:
+        num_cpus = int(num_cpus)
+        if num_cpus < 1:
+            raise ValueError("num_cpus must be at least 1.")
+
+    with _lock:
+        _num_cpus = num_cpus
+        if _pool is not None and _pool_size != get_num_cpus():
+            _shutdown_process_pool()
+
+
+def get_backend():
+    """
+    Returns the backend used to parallelize phase space generation.
+
+    Returns
+    -------
+    backend : str
+        "threads" or "processes".
+    """
+    return _backend
+
+
+def set_backend(backend):
+    """
+    Sets the backend used to parallelize phase space generation.
+
+    Parameters
+    ----------
+    backend : str
+        "threads" to fill slices of a shared array from a pool of threads
+        with the GIL released, or "processes" to use the shared pool of
+        worker processes.
+    """
+    global _backend
+
+    if backend not in BACKENDS:
+        raise ValueError(
+            "Unknown backend '{}', expected one of {}.".format(backend, BACKENDS)
+        )
+    _backend = backend
+
+
+@contextlib.contextmanager
+def workers(num_cpus, backend=None):
+    """
+    Context manager which temporarily sets the number of workers used by
+    hazma.
+
+    Parameters
+    ----------
+    num_cpus : int or None
+        Number of workers to use inside of the context.
+    backend : str {None]
+        If given, the backend used for phase space generation inside of the
+        context (see ``set_backend``).
+    """
+    with _lock:
+        previous = _num_cpus
+        previous_backend = _backend
+        set_num_cpus(num_cpus)
+        if backend is not None:
+            set_backend(backend)
+    try:
+        yield
+    finally:
+        with _lock:
+            set_num_cpus(previous)
+            set_backend(previous_backend)
+
+
+def get_num_threads():
+    """
+    Returns the number of OpenMP threads used to evaluate spectra. Inside of
+    the workers of hazma's pools of processes and threads, this is always 1.
+
+    Returns
+    -------
+    num_threads : int
+        Number of threads.
+    """
+    if getattr(_worker, "active", False) or mp.current_process().daemon:
+        return 1
+    if _num_threads is None:
+        return default_num_cpus()
+    return _num_threads
+
+
+def set_num_threads(num_threads):
+    """
+    Sets the number of OpenMP threads used to evaluate spectra.
+
+    Parameters
+    ----------
+    num_threads : int or None
+        Number of threads to use. If None, the default (75% of the cpus) is
+        restored.
+    """
+    global _num_threads
+
+    if num_threads is not None:
+        num_threads = int(num_threads)
+        if num_threads < 1:
+            raise ValueError("num_threads must be at least 1.")
+    _num_threads = num_threads
+
+
+@contextlib.contextmanager
+def threads(num_threads):
+    """
+    Context manager which temporarily sets the number of OpenMP threads used
+    to evaluate spectra.
+
+    Parameters
+    ----------
+    num_threads : int or None
+        Number of threads to use inside of the context.
+    """
+    with _lock:
+        previous = _num_threads
+        set_num_threads(num_threads)
+    try:
+        yield
+    finally:
+        with _lock:
+            set_num_threads(previous)
+
+
+def get_pool():
+    """
+    Returns the shared pool of workers, creating it if needed.
+
+    Returns
+    -------
+    pool : multiprocessing.pool.Pool or None
+        The shared pool. None is returned if a single worker is requested or
+        if the calling process is itself a daemonic worker (which are not
+        allowed to have children), in which case computations should be run
+        in the calling process.
+    """
+    global _pool, _pool_size
+
+    num_cpus = get_num_cpus()
+    if num_cpus == 1 or mp.current_process().daemon:
+        return None
+
+    with _lock:
+        if _pool is None:
+            _pool = mp.Pool(num_cpus)
+            _pool_size = num_cpus
+        return _pool
+
+
+def get_thread_pool(num_threads):
+    """
+    Returns the shared pool of threads of a given size, creating it if
+    needed.
+
+    A pool is kept for each size which has been requested. Pools are never
+    resized, since other threads (or the threads of the pool itself, e.g.
+    for nested calls) may be using them.
+
+    Parameters
+    ----------
+    num_threads : int
+        Number of threads.
+
+    Returns
+    -------
+    pool : concurrent.futures.ThreadPoolExecutor
+        The shared pool of threads.
+    """
+    with _lock:
+        pool = _thread_pools.get(num_threads)
+        if pool is None:
+            pool = ThreadPoolExecutor(num_threads)
+            _thread_pools[num_threads] = pool
+        return pool
+
+
+def _shutdown_process_pool():
+    """
+    Terminates the shared pool of workers.
+    """
+    global _pool, _pool_size
+
+    with _lock:
+        if _pool is not None:
+            _pool.terminate()
+            _pool.join()
+        _pool = None
+        _pool_size = 0
+
+
+def shutdown():
+    """
+    Terminates the shared pools of workers and threads. New pools are
+    started the next time one is needed. The pools of threads finish the
+    tasks which were already submitted without blocking the caller.
+    """
+    with _lock:
+        _shutdown_process_pool()
+        for pool in _thread_pools.values():
+            pool.shutdown(wait=False)
+        _thread_pools.clear()
+
+
+def starmap(func, iterable, num_cpus=None):
+    """
+    Applies a function to each tuple of arguments in an iterable using the
+    shared pool of workers.
+
+    Parameters
+    ----------
+    func : callable
+        Function to apply. Must be picklable (i.e. defined at the top level
+        of a module) unless the computation is run in the calling process.
+    iterable : iterable of tuples
+        Arguments to call ``func`` with.
+    num_cpus : int, optional
+        If 1, the computation is run in the calling process. Otherwise, the
+        shared pool is used.
+
+    Returns
+    -------
+    results : list
+        List of ``func(*args)`` for each ``args`` in ``iterable``.
+    """
+    pool = None if num_cpus == 1 else get_pool()
+    if pool is None:
+        return [func(*args) for args in iterable]
+    return pool.starmap(func, iterable)
+
+
+def thread_starmap(func, iterable, num_threads):
+    """
+    Applies a function to each tuple of arguments in an iterable using the
+    shared pool of threads. Only functions which release the GIL, such as
+    the phase space kernels of ``hazma.phase_space_helper_functions``, run
+    concurrently.
+
+    Parameters
+    ----------
+    func : callable
+        Function to apply.
+    iterable : iterable of tuples
+        Arguments to call ``func`` with.
+    num_threads : int
+        Number of threads. If 1, or if called from a thread of a shared pool,
+        the computation is run in the calling thread.
+
+    Returns
+    -------
+    results : list
+        List of ``func(*args)`` for each ``args`` in ``iterable``.
+    """
+    # Waiting on a pool from one of its own threads could deadlock.
+    if num_threads == 1 or getattr(_worker, "active", False):
+        return [func(*args) for args in iterable]
+    pool = get_thread_pool(num_threads)
+    futures = [pool.submit(_run_in_worker, func, args) for args in iterable]
+    return [future.result() for future in futures]
+
+
+def _run_in_worker(func, args):
+    """
+    Calls a function in a thread of the shared pool of threads.
+    """
+    _worker.active = True
+    try:
+        return func(*args)
+    finally:
+        _worker.active = False
+
+
+atexit.register(shutdown)
@@ -1,3 +1,5 @@
+import os
+
 import numpy as np
 from scipy.integrate import trapz
 from scipy.interpolate import InterpolatedUnivariateSpline, interp1d
@@ -132,6 +134,94 @@ def convert_sigmav(sv, target):
         return sv / hbar2_c3
 
 
+def binary_table_path(rf_name):
+    """Returns the path of the binary copy of a data file.
+
+    Parameters
+    ----------
+    rf_name : resource_filename
+        Name of resource file.
+
+    Returns
+    -------
+    path : str
+        Name of the file with the extension replaced by ``.npy``.
+    """
+    return os.path.splitext(rf_name)[0] + ".npy"
+
+
+def load_table(rf_name, skiprows=0):
+    """Loads a comma-separated data file.
+
+    If the file has a binary copy (see ``save_table``), the copy is
+    memory-mapped instead of parsing the text. The pages of the copy are
+    only read when they are accessed and are shared between processes. The
+    text is parsed instead if the copy is older than the file or does not
+    have its shape, so that a stale copy is never used.
+
+    Parameters
+    ----------
+    rf_name : resource_filename
+        Name of resource file.
+    skiprows : int {0]
+        Number of header lines of the file which are not comments.
+
+    Returns
+    -------
+    table : np.ndarray
+        Array whose rows are the columns of the file. Memory-mapped arrays
+        are copy-on-write: modifying them does not change the file.
+    """
+    path = binary_table_path(rf_name)
+    try:
+        if os.path.getmtime(path) >= os.path.getmtime(rf_name):
+            table = np.load(path, mmap_mode="c")
+            if table.shape == _table_shape(rf_name, skiprows):
+                return table
+    except OSError:
+        pass
+    return np.loadtxt(rf_name, delimiter=",", skiprows=skiprows, ndmin=2).T
+
+
+def _table_shape(rf_name, skiprows=0):
+    """Returns the shape of the array ``load_table`` parses from a
+    comma-separated data file, without converting its values.
+    """
+    num_rows = 0
+    num_cols = 0
+    with open(rf_name) as f:
+        for i, line in enumerate(f):
+            line = line.split("#", 1)[0].strip()
+            if i < skiprows or not line:
+                continue
+            if num_rows == 0:
+                num_cols = line.count(",") + 1
+            num_rows += 1
+    return (num_cols, num_rows)
+
+
+def save_table(rf_name, skiprows=0):
+    """Writes the binary copy of a comma-separated data file which is loaded
+    by ``load_table``. It must be rewritten whenever the data file changes.
+
+    Parameters
+    ----------
+    rf_name : resource_filename
+        Name of resource file.
+    skiprows : int {0]
+        Number of header lines of the file which are not comments.
+
+    Returns
+    -------
+    path : str
+        Name of the binary copy.
+    """
+    table = np.loadtxt(rf_name, delimiter=",", skiprows=skiprows, ndmin=2).T
+    path = binary_table_path(rf_name)
+    np.save(path, np.ascontiguousarray(table, dtype=np.float64))
+    return path
+
+
 def load_interp(rf_name, bounds_error=False, fill_value=0.0):
     """Creates an interpolator from a data file.
 
@@ -147,7 +237,7 @@ def load_interp(rf_name, bounds_error=False, fill_value=0.0):
         values and second as the y values. interp will not raise a bounds error
         and uses a fill values of 0.0.
     """
-    xs, ys = np.loadtxt(rf_name, delimiter=",").T
+    xs, ys = load_table(rf_name)[:2]
     return interp1d(xs, ys, bounds_error=bounds_error, fill_value=fill_value)
 
 
@@ -0,0 +1,427 @@
+"""
+On-disk cache for the phase space points and energy histograms of
+``hazma.rambo``.
+
+Requests with identical inputs (masses, center of mass energy, number of
+points, squared matrix element, seed, ...) give identical results, so they
+can be stored and reused when a notebook or scan is restarted. Results are
+stored as ``.npy`` files named by a hash of the inputs and are loaded
+memory-mapped. When the cache grows beyond its size limit, the least
+recently used entries are removed.
+
+The cache is opt-in and is used through ``hazma.rambo.cache``. Monte Carlo
+results are only cached when a seed is given, since without one every call
+uses fresh random numbers. Deterministic quadrature results are always
+cached.
+
+The squared matrix element is identified by its code, default arguments and
+closure variables and, for methods, by the pickled object it is bound to
+(which is how model parameters enter). Changes to global variables used by
+a matrix element are not detected: call ``clear`` after changing them. A
+matrix element may instead define a ``cache_key`` attribute, which is then
+used as its identity. Requests involving objects which cannot be identified
+are not cached.
+
+Examples
+--------
+
+Enable the cache for a session::
+
+    from hazma import rambo
+    rambo.cache.enable()  # ~/.cache/hazma/rambo by default
+    hist = rambo.generate_energy_histogram(masses, cme, 10**6, seed=1)
+
+Skip it temporarily, or empty it::
+
+    with rambo.cache.bypass():
+        hist = rambo.generate_energy_histogram(masses, cme, 10**6, seed=1)
+    rambo.cache.clear()
+
+"""
+# author : Logan Morrison and Adam Coogan
+# date : October 2026
+
+import contextlib
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+import types
+
+import numpy as np
+
+_FORMAT_VERSION = 1
+
+_lock = threading.RLock()
+_directory = None
+_max_bytes = 0
+_bypass = False
+
+
+class _Uncacheable(Exception):
+    """Raised when an input of a request cannot be identified."""
+
+
+def default_directory():
+    """
+    Returns the directory used by the cache when none is given:
+    ``$XDG_CACHE_HOME/hazma/rambo``, or ``~/.cache/hazma/rambo``.
+
+    Returns
+    -------
+    directory : str
+        Default cache directory.
+    """
+    root = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(root, "hazma", "rambo")
+
+
+def enable(directory=None, max_bytes=2 ** 30):
+    """
+    Enables the cache.
+
+    Parameters
+    ----------
+    directory : str, optional
+        Directory the results are stored in. It is created if needed. If
+        None, ``default_directory()`` is used.
+    max_bytes : int {2**30]
+        Maximum total size of the stored results. The least recently used
+        results are removed when it is exceeded.
+    """
+    global _directory, _max_bytes
+
+    if max_bytes < 0:
+        raise ValueError("max_bytes must be non-negative.")
+    directory = default_directory() if directory is None else directory
+    os.makedirs(directory, exist_ok=True)
+
+    with _lock:
+        _directory = directory
+        _max_bytes = int(max_bytes)
+        _evict()
+
+
+def disable():
+    """
+    Disables the cache. Stored results are kept.
+    """
+    global _directory
+
+    with _lock:
+        _directory = None
+
+
+def is_enabled():
+    """
+    Returns whether results are currently looked up in and stored in the
+    cache.
+
+    Returns
+    -------
+    enabled : bool
+        True if the cache is enabled and not bypassed.
+    """
+    return _directory is not None and not _bypass
+
+
+@contextlib.contextmanager
+def bypass():
+    """
+    Context manager inside of which the cache is neither read nor written.
+    """
+    global _bypass
+
+    with _lock:
+        previous = _bypass
+        _bypass = True
+    try:
+        yield
+    finally:
+        _bypass = previous
+
+
+def clear():
+    """
+    Removes all stored results from the cache directory.
+    """
+    with _lock:
+        if _directory is None:
+            return
+        for name in os.listdir(_directory):
+            if name.endswith(".npy") or name.endswith(".json"):
+                _remove(os.path.join(_directory, name))
+
+
+def size():
+    """
+    Returns the total size of the stored results.
+
+    Returns
+    -------
+    num_bytes : int
+        Size of the stored results in bytes.
+    """
+    with _lock:
+        if _directory is None:
+            return 0
+        return sum(nbytes for _, _, nbytes in _entries())
+
+
+def _code_identity(code):
+    """
+    Returns the parts of a code object which determine its behavior.
+    """
+    consts = tuple(
+        _code_identity(c) if isinstance(c, types.CodeType) else c
+        for c in code.co_consts
+    )
+    return (code.co_code, consts, code.co_names, code.co_varnames)
+
+
+def _update(hasher, obj):
+    """
+    Adds an object to a hash. Raises ``_Uncacheable`` if it cannot be
+    identified.
+    """
+    if obj is None or isinstance(obj, (bool, int, float, complex, str, bytes)):
+        hasher.update(repr((type(obj).__name__, obj)).encode())
+    elif isinstance(obj, (np.ndarray, np.generic)):
+        obj = np.ascontiguousarray(obj)
+        hasher.update(repr(("ndarray", obj.dtype.str, obj.shape)).encode())
+        hasher.update(obj.tobytes())
+    elif isinstance(obj, (set, frozenset)):
+        hasher.update(repr((type(obj).__name__, len(obj))).encode())
+        for item in sorted(obj, key=repr):
+            _update(hasher, item)
+    elif isinstance(obj, (list, tuple)):
+        hasher.update(repr((type(obj).__name__, len(obj))).encode())
+        for item in obj:
+            _update(hasher, item)
+    elif isinstance(obj, dict):
+        hasher.update(repr(("dict", len(obj))).encode())
+        for key in sorted(obj, key=repr):
+            _update(hasher, key)
+            _update(hasher, obj[key])
+    elif isinstance(obj, np.random.SeedSequence):
+        hasher.update(b"SeedSequence")
+        _update(hasher, (obj.generate_state(4), obj.n_children_spawned))
+    elif callable(obj):
+        _update_callable(hasher, obj)
+    else:
+        try:
+            hasher.update(pickle.dumps(obj, protocol=4))
+        except Exception:
+            raise _Uncacheable()
+
+
+def _update_callable(hasher, func):
+    """
+    Adds the identity of a squared matrix element to a hash.
+    """
+    key = getattr(func, "cache_key", None)
+    if key is not None:
+        _update(hasher, ("cache_key", key))
+        return
+
+    owner = getattr(func, "__self__", None)
+    func = getattr(func, "__func__", func)
+    name = (getattr(func, "__module__", None), getattr(func, "__qualname__", None))
+    _update(hasher, ("callable", name, getattr(func, "vectorized", False)))
+
+    code = getattr(func, "__code__", None)
+    if isinstance(code, types.CodeType) and code.co_code:
+        _update(hasher, _code_identity(code))
+        _update(hasher, getattr(func, "__defaults__", None))
+        closure = getattr(func, "__closure__", None) or ()
+        _update(hasher, [cell.cell_contents for cell in closure])
+    elif name[1] is None:
+        # Neither python code nor a name (e.g. a callable object).
+        try:
+            hasher.update(pickle.dumps(func, protocol=4))
+        except Exception:
+            raise _Uncacheable()
+
+    if owner is not None and not isinstance(owner, types.ModuleType):
+        try:
+            hasher.update(pickle.dumps(owner, protocol=4))
+        except Exception:
+            raise _Uncacheable()
+
+
+def request_key(name, *inputs):
+    """
+    Returns the key of a request, a hash of the name of the function and its
+    inputs, or None if the inputs cannot be identified.
+
+    Parameters
+    ----------
+    name : str
+        Name of the function computing the result.
+    inputs : tuple
+        Inputs determining the result.
+
+    Returns
+    -------
+    key : str or None
+        Hexadecimal hash of the request.
+    """
+    hasher = hashlib.sha256()
+    try:
+        _update(hasher, (_FORMAT_VERSION, name, inputs))
+    except _Uncacheable:
+        return None
+    return hasher.hexdigest()
+
+
+def _meta_path(key):
+    return os.path.join(_directory, key + ".json")
+
+
+def _array_path(key, i):
+    return os.path.join(_directory, "{}-{}.npy".format(key, i))
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _entries():
+    """
+    Returns the key, time of last use and size of each stored result.
+    """
+    entries = []
+    for name in os.listdir(_directory):
+        if not name.endswith(".json"):
+            continue
+        key = name[: -len(".json")]
+        try:
+            with open(_meta_path(key)) as f:
+                meta = json.load(f)
+            last_used = os.path.getmtime(_meta_path(key))
+        except (OSError, ValueError):
+            continue
+        entries.append((key, last_used, meta.get("nbytes", 0)))
+    return entries
+
+
+def _evict():
+    """
+    Removes the least recently used results until the size limit is met.
+    """
+    entries = sorted(_entries(), key=lambda entry: entry[1])
+    total = sum(nbytes for _, _, nbytes in entries)
+    for key, _, nbytes in entries:
+        if total <= _max_bytes:
+            break
+        _discard(key)
+        total -= nbytes
+
+
+def _discard(key):
+    """
+    Removes a stored result.
+    """
+    try:
+        with open(_meta_path(key)) as f:
+            num_arrays = json.load(f)["num_arrays"]
+    except (OSError, ValueError, KeyError):
+        num_arrays = 0
+    _remove(_meta_path(key))
+    for i in range(num_arrays):
+        _remove(_array_path(key, i))
+
+
+def _load(key):
+    """
+    Loads a stored result, memory-mapped, or returns None if there is none.
+    """
+    try:
+        with open(_meta_path(key)) as f:
+            meta = json.load(f)
+        arrays = [
+            np.load(_array_path(key, i), mmap_mode="c")
+            for i in range(meta["num_arrays"])
+        ]
+    except (OSError, ValueError, KeyError):
+        return None
+    # Mark the result as recently used.
+    os.utime(_meta_path(key))
+    return tuple(arrays) if meta["is_tuple"] else arrays[0]
+
+
+def _store(key, result):
+    """
+    Stores a result. Each array is written to a temporary file which is then
+    renamed, and the metadata is written last, so readers never see partial
+    results.
+    """
+    is_tuple = isinstance(result, tuple)
+    arrays = [np.asarray(a) for a in (result if is_tuple else (result,))]
+    meta = {
+        "num_arrays": len(arrays),
+        "is_tuple": is_tuple,
+        "nbytes": int(sum(a.nbytes for a in arrays)),
+    }
+    if meta["nbytes"] > _max_bytes:
+        return
+
+    for i, array in enumerate(arrays):
+        fd, tmp = tempfile.mkstemp(dir=_directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp, _array_path(key, i))
+
+    fd, tmp = tempfile.mkstemp(dir=_directory, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp, _meta_path(key))
+    _evict()
+
+
+def cached(name, inputs, compute):
+    """
+    Returns the stored result of a request, computing and storing it if
+    needed. If the cache is disabled or the inputs cannot be identified,
+    the result is simply computed.
+
+    Parameters
+    ----------
+    name : str
+        Name of the function computing the result.
+    inputs : tuple
+        Inputs determining the result.
+    compute : callable
+        Function without arguments computing the result, an array or a
+        tuple of arrays.
+
+    Returns
+    -------
+    result : numpy.ndarray or tuple of numpy.ndarray
+        The result. Stored results are memory-mapped copy-on-write, so they
+        can be modified without changing the cache.
+    """
+    if not is_enabled():
+        return compute()
+
+    key = request_key(name, *inputs)
+    if key is None:
+        return compute()
+
+    with _lock:
+        result = _load(key)
+    if result is not None:
+        return result
+
+    result = compute()
+    with _lock:
+        if _directory is not None:
+            _store(key, result)
+    return result
@@ -0,0 +1,21 @@
+import numpy as np
+cimport numpy as np
+
+# Signature of a compiled squared matrix element. ``momenta`` points to the
+# 4 * num_fsp components {ke1, kx1, ky1, kz1, ..., keN, kxN, kyN, kzN} of a
+# phase space point and ``params`` to the parameter struct of the kernel.
+ctypedef double (*msqrd_kernel)(const double* momenta, int num_fsp,
+                                const void* params) nogil
+
+cdef class CompiledMatrixElement:
+    cdef msqrd_kernel kernel
+    cdef const void* c_params
+    cdef readonly str name
+    cdef readonly str module
+    cdef readonly np.ndarray params
+    cdef readonly int num_fsp
+
+cdef int register_kernel(str module, str name, msqrd_kernel kernel,
+                         int num_fsp, tuple param_names) except -1
+cdef int c_apply_compiled(CompiledMatrixElement msqrd, double[:, :] pts,
+                          int num_ps_pts, int num_fsp, int nt) nogil
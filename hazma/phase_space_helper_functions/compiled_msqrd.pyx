@@ -0,0 +1,277 @@
+"""
+Squared matrix elements compiled to C, which RAMBO can evaluate without the
+GIL.
+
+A compiled squared matrix element is a ``nogil`` Cython function with the
+signature ``msqrd_kernel`` (see ``compiled_msqrd.pxd``)::
+
+    double kernel(const double* momenta, int num_fsp, const void* params)
+
+where ``momenta`` holds the four-momenta of a single phase space point,
+``{ke1, kx1, ky1, kz1, ..., keN, kxN, kyN, kzN}``, and ``params`` points to a
+struct of doubles holding the parameters of the model. Kernels are
+registered under a name when the module defining them is imported::
+
+    from hazma.phase_space_helper_functions.compiled_msqrd cimport \\
+        register_kernel
+
+    ctypedef struct my_params:
+        double mx
+        double g
+
+    cdef double my_kernel(const double* momenta, int num_fsp,
+                          const void* params) nogil:
+        cdef const my_params* p = <const my_params*>params
+        ...
+
+    register_kernel(__name__, "my_kernel", my_kernel, 3, ("mx", "g"))
+
+and then bound to parameter values with ``compiled_matrix_element``. The
+resulting ``CompiledMatrixElement`` can be passed to the functions of
+``hazma.rambo`` in place of a python squared matrix element.
+
+* Author - Logan A. Morrison and Adam Coogan
+* Date - October 2026
+"""
+
+import importlib
+
+import numpy as np
+cimport numpy as np
+import cython
+from cython.parallel cimport prange
+from hazma.decay_helper_functions.threads cimport num_threads
+
+np.import_array()
+
+# Registered kernels: name -> (module, kernel address, num_fsp, param_names).
+_kernels = {}
+
+
+cdef int register_kernel(str module, str name, msqrd_kernel kernel,
+                         int num_fsp, tuple param_names) except -1:
+    """
+    Registers a compiled squared matrix element.
+
+    Parameters
+    ----------
+    module : str
+        Name of the module defining the kernel. It is imported when a
+        pickled ``CompiledMatrixElement`` using the kernel is loaded, e.g. by
+        the workers of ``hazma.parallel``.
+    name : str
+        Name of the kernel. Must be unique.
+    kernel : msqrd_kernel
+        The kernel.
+    num_fsp : int
+        Number of final state particles the kernel expects, or 0 if it
+        accepts any number.
+    param_names : tuple of str
+        Names of the fields of the parameter struct of the kernel, in order.
+    """
+    if name in _kernels and _kernels[name][0] != module:
+        raise ValueError(
+            "A kernel named '{}' is already registered by {}.".format(
+                name, _kernels[name][0]))
+    _kernels[name] = (module, <size_t>kernel, num_fsp, param_names)
+    return 0
+
+
+def registered_kernels():
+    """
+    Returns the names of the registered compiled squared matrix elements.
+
+    Returns
+    -------
+    names : list of str
+        Names of the kernels which can be passed to
+        ``compiled_matrix_element``.
+    """
+    return sorted(_kernels)
+
+
+def kernel_parameters(name):
+    """
+    Returns the names of the parameters of a compiled squared matrix element.
+
+    Parameters
+    ----------
+    name : str
+        Name of the kernel.
+
+    Returns
+    -------
+    param_names : tuple of str
+        Names of the parameters, in the order expected by
+        ``compiled_matrix_element``.
+    """
+    if name not in _kernels:
+        raise ValueError("Unknown compiled matrix element '{}'.".format(name))
+    return _kernels[name][3]
+
+
+def compiled_matrix_element(name, params):
+    """
+    Binds a registered compiled squared matrix element to parameter values.
+
+    Parameters
+    ----------
+    name : str
+        Name of the kernel.
+    params : dict or array_like
+        Values of the parameters: either a mapping from the names given by
+        ``kernel_parameters(name)`` to values, or the values in that order.
+
+    Returns
+    -------
+    msqrd : CompiledMatrixElement
+        The squared matrix element.
+    """
+    cdef CompiledMatrixElement msqrd
+
+    if name not in _kernels:
+        raise ValueError("Unknown compiled matrix element '{}'.".format(name))
+    module, address, num_fsp, param_names = _kernels[name]
+
+    if isinstance(params, dict):
+        missing = [p for p in param_names if p not in params]
+        if missing:
+            raise ValueError("Missing parameters: {}.".format(missing))
+        values = [params[p] for p in param_names]
+    else:
+        values = params
+    values = np.array(values, dtype=np.float64).ravel()
+    if values.shape[0] != len(param_names):
+        raise ValueError("'{}' expects the {} parameters {}.".format(
+            name, len(param_names), param_names))
+
+    msqrd = CompiledMatrixElement.__new__(CompiledMatrixElement)
+    msqrd.kernel = <msqrd_kernel><size_t>address
+    msqrd.name = name
+    msqrd.module = module
+    msqrd.num_fsp = num_fsp
+    msqrd.params = values
+    msqrd.c_params = np.PyArray_DATA(values)
+    return msqrd
+
+
+def _rebuild(module, name, params):
+    """
+    Recreates a pickled ``CompiledMatrixElement``, importing the module which
+    registers its kernel first.
+    """
+    importlib.import_module(module)
+    return compiled_matrix_element(name, params)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef int c_apply_compiled(CompiledMatrixElement msqrd, double[:, :] pts,
+                          int num_ps_pts, int num_fsp, int nt) nogil:
+    """
+    Multiplies the weights of phase space points by the squared matrix
+    element on ``nt`` threads. The rows of ``pts`` must be contiguous.
+    Returns the number of negative squared matrix elements.
+    """
+    cdef int i
+    cdef double mat_elem2
+    cdef int num_negative = 0
+
+    for i in prange(num_ps_pts, num_threads=nt, schedule="static"):
+        mat_elem2 = msqrd.kernel(&pts[i, 0], num_fsp, msqrd.c_params)
+        if mat_elem2 < 0:
+            num_negative += 1
+        pts[i, 4 * num_fsp] = pts[i, 4 * num_fsp] * mat_elem2
+
+    return num_negative
+
+
+cdef class CompiledMatrixElement:
+    """
+    Squared matrix element implemented by a compiled kernel. Create instances
+    with ``compiled_matrix_element``.
+
+    Instances can be called like the vectorized squared matrix elements of
+    ``hazma.rambo`` (see ``hazma.rambo.vectorized``), pickled, and are
+    identified by the ``hazma.rambo`` cache through their name and
+    parameters.
+
+    Attributes
+    ----------
+    name : str
+        Name of the kernel.
+    module : str
+        Module registering the kernel.
+    params : numpy.ndarray
+        Values of the parameters.
+    num_fsp : int
+        Number of final state particles, or 0 if any number is accepted.
+    """
+
+    def __cinit__(self):
+        self.kernel = NULL
+        self.c_params = NULL
+
+    def __init__(self, *args, **kwargs):
+        raise TypeError("Use compiled_matrix_element to create instances.")
+
+    @property
+    def vectorized(self):
+        return True
+
+    @property
+    def cache_key(self):
+        return ("compiled_msqrd", self.module, self.name, self.params)
+
+    def __reduce__(self):
+        return _rebuild, (self.module, self.name, self.params)
+
+    def __repr__(self):
+        return "CompiledMatrixElement('{}', {})".format(
+            self.name, self.params.tolist())
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    def __call__(self, momenta):
+        """
+        Evaluates the squared matrix element.
+
+        Parameters
+        ----------
+        momenta : numpy.ndarray
+            Momenta of the final state particles with shape
+            (..., num_fsp, 4).
+
+        Returns
+        -------
+        msqrd : numpy.ndarray
+            Squared matrix element for each set of momenta, with shape (...).
+        """
+        cdef int i
+        cdef int num_fsp
+        cdef int ndim
+        cdef double[:, ::1] flat
+        cdef double[:] out
+        cdef int nt
+
+        momenta = np.asarray(momenta, dtype=np.float64)
+        ndim = momenta.ndim
+        if ndim < 2 or momenta.shape[ndim - 1] != 4:
+            raise ValueError("momenta must have shape (..., num_fsp, 4).")
+        num_fsp = momenta.shape[ndim - 2]
+        if self.num_fsp != 0 and num_fsp != self.num_fsp:
+            raise ValueError("'{}' expects {} final state particles.".format(
+                self.name, self.num_fsp))
+
+        shape = momenta.shape[:ndim - 2]
+        flat = np.ascontiguousarray(momenta).reshape(-1, 4 * num_fsp)
+        result = np.empty(flat.shape[0], dtype=np.float64)
+        out = result
+        nt = num_threads(flat.shape[0])
+
+        with nogil:
+            for i in prange(flat.shape[0], num_threads=nt,
+                            schedule="static"):
+                out[i] = self.kernel(&flat[i, 0], num_fsp, self.c_params)
+
+        return result.reshape(shape)
@@ -8,45 +8,176 @@ Module for generating a relativistic phase space point.
 import numpy as np
 cimport numpy as np
 from libc.math cimport log, M_PI, sqrt, tgamma, fabs, pow, cos, sin
+from libc.stdlib cimport malloc, free
+from libc.stdint cimport uint32_t, uint64_t
 from libcpp cimport bool
 import cython
+from cython.parallel cimport parallel, prange
+from hazma.phase_space_helper_functions.compiled_msqrd cimport (
+    CompiledMatrixElement)
+from hazma.decay_helper_functions.threads cimport num_threads
 
 
+# Random numbers are drawn from the counter-based Philox4x32-10 generator of
+# Salmon et al. (2011). The random numbers for an event are a pure function
+# of a 96-bit key and the index of the event, so independent streams are
+# obtained from distinct keys and any subset of events may be generated by
+# any worker without the streams overlapping.
+DEF PHILOX_M0 = 0xD2511F53
+DEF PHILOX_M1 = 0xCD9E8D57
+DEF PHILOX_W0 = 0x9E3779B9
+DEF PHILOX_W1 = 0xBB67AE85
+DEF PHILOX_ROUNDS = 10
 
-cdef extern from "<random>" namespace "std":
-    cdef cppclass mt19937 nogil:
-        mt19937() nogil
-        mt19937(unsigned int seed) nogil
+ctypedef struct rng_state:
+    uint32_t key[2]
+    uint32_t stream
+    uint64_t event
 
-    cdef cppclass random_device nogil:
-        random_device() except +
-        unsigned int operator()()
 
-    cdef cppclass uniform_real_distribution[T] nogil:
-        uniform_real_distribution() nogil
-        uniform_real_distribution(T a, T b) nogil
-        T operator()(mt19937 gen) nogil
+@cython.cdivision(True)
+cdef inline void __philox4x32(uint32_t* ctr, uint32_t* key,
+                              uint32_t* out) nogil:
+    """
+    Applies the Philox4x32-10 bijection to a counter.
+
+    Parameters
+    ----------
+    ctr : uint32_t*
+        Four word counter.
+    key : uint32_t*
+        Two word key.
+    out : uint32_t*
+        Buffer of four words to store the random output in.
+    """
+    cdef int i
+    cdef uint64_t prod0, prod1
+    cdef uint32_t k0 = key[0]
+    cdef uint32_t k1 = key[1]
+    cdef uint32_t c0 = ctr[0]
+    cdef uint32_t c1 = ctr[1]
+    cdef uint32_t c2 = ctr[2]
+    cdef uint32_t c3 = ctr[3]
+
+    for i in range(PHILOX_ROUNDS):
+        prod0 = <uint64_t>PHILOX_M0 * c0
+        prod1 = <uint64_t>PHILOX_M1 * c2
+        c0 = <uint32_t>(prod1 >> 32) ^ c1 ^ k0
+        c1 = <uint32_t>prod1
+        c2 = <uint32_t>(prod0 >> 32) ^ c3 ^ k1
+        c3 = <uint32_t>prod0
+        k0 = k0 + <uint32_t>PHILOX_W0
+        k1 = k1 + <uint32_t>PHILOX_W1
+
+    out[0] = c0
+    out[1] = c1
+    out[2] = c2
+    out[3] = c3
 
-cdef uniform_real_distribution[double] uniform \
-    = uniform_real_distribution[double](0., 1.)
 
-cdef mt19937 rng
+@cython.cdivision(True)
+cdef inline double __to_unit_interval(uint32_t a, uint32_t b) nogil:
+    """
+    Converts two random words into a double uniformly distributed on the open
+    interval (0, 1) with 53 bits of precision.
+    """
+    return ((<uint64_t>(a >> 5) * 67108864 + (b >> 6)) + 0.5) \
+        / 9007199254740992.0
 
-cdef extern from "<vector>" namespace "std":
-    cdef cppclass vector[T]:
-        void push_back(T&) nogil except+
-        size_t size() nogil
-        T& operator[](size_t)
 
-cdef extern from "random" namespace "std":
-    cdef cppclass random
+@cython.cdivision(True)
+cdef void __event_uniforms(const rng_state* state, uint64_t event,
+                           int num_rands, double* rands) nogil:
+    """
+    Fills a buffer with the uniform random numbers of an event. The state is
+    not modified, so events can be generated in any order and by any thread.
+
+    Parameters
+    ----------
+    state : rng_state*
+        State of the random number generator.
+    event : uint64_t
+        Index of the event in the random stream.
+    num_rands : int
+        Number of random numbers to generate. Must be even.
+    rands : double*
+        Buffer to store the random numbers in.
+    """
+    cdef int i
+    cdef uint32_t ctr[4]
+    cdef uint32_t out[4]
+    cdef uint32_t key[2]
+
+    key[0] = state.key[0]
+    key[1] = state.key[1]
+    ctr[1] = <uint32_t>event
+    ctr[2] = <uint32_t>(event >> 32)
+    ctr[3] = state.stream
+
+    for i in range(num_rands // 2):
+        ctr[0] = i
+        __philox4x32(ctr, key, out)
+        rands[2 * i + 0] = __to_unit_interval(out[0], out[1])
+        rands[2 * i + 1] = __to_unit_interval(out[2], out[3])
+
+
+cdef void __generate_uniforms(rng_state* state, int num_rands,
+                              double* rands) nogil:
+    """
+    Fills a buffer with the uniform random numbers of the current event and
+    advances the state to the next event.
+
+    Parameters
+    ----------
+    state : rng_state*
+        State of the random number generator.
+    num_rands : int
+        Number of random numbers to generate. Must be even.
+    rands : double*
+        Buffer to store the random numbers in.
+    """
+    __event_uniforms(state, state.event, num_rands, rands)
+    state.event = state.event + 1
+
+
+def new_key():
+    """
+    Returns a fresh, randomly seeded key for the phase space generator.
+
+    Returns
+    -------
+    key : numpy.ndarray
+        Array of three 32-bit words.
+    """
+    return np.random.SeedSequence().generate_state(3, np.uint32)
+
+
+cdef rng_state __make_state(key, uint64_t offset) except *:
+    """
+    Creates a random number generator state from a key and the index of the
+    first event to generate.
+    """
+    cdef rng_state state
+    cdef np.uint32_t[:] words
+
+    if key is None:
+        key = new_key()
+    words = np.asarray(key, dtype=np.uint32)
+    if words.shape[0] != 3:
+        raise ValueError("key must contain three 32-bit words.")
+
+    state.key[0] = words[0]
+    state.key[1] = words[1]
+    state.stream = words[2]
+    state.event = offset
+    return state
 
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
 @cython.cdivision(True)
-cdef double __f_xi(double xi, vector[double] masses, double cme, int num_fsp,
-vector[double] ps) nogil:
+cdef double __f_xi(double xi, double[:] masses, double cme, int num_fsp,
+                   double* ps) nogil:
     """
     Function whose zero is the scaling factor to correct masses of massless
     four momenta.
@@ -59,7 +190,7 @@ vector[double] ps) nogil:
         List of masses of the final state particles.
     cme : double
         Center of mass energy of the process.
-    ps : double[:]
+    ps : double*
         List of the four momentum of the final state particles.
 
     Returns
@@ -78,8 +209,8 @@ vector[double] ps) nogil:
 @cython.boundscheck(False)
 @cython.wraparound(False)
 @cython.cdivision(True)
-cdef double __df_xi(double xi, vector[double] masses, double cme, int num_fsp,
-vector[double] ps) nogil:
+cdef double __df_xi(double xi, double[:] masses, double cme, int num_fsp,
+                    double* ps) nogil:
     """
     Derivative of the func_xi.
 
@@ -91,7 +222,7 @@ vector[double] ps) nogil:
         List of masses of the final state particles.
     cme : double
         Center of mass energy of the process.
-    ps : double[:]
+    ps : double*
         List of the four momentum of the final state particles.
 
     Returns
@@ -113,20 +244,19 @@ vector[double] ps) nogil:
 @cython.boundscheck(False)
 @cython.wraparound(False)
 @cython.cdivision(True)
-cdef double __find_root(vector[double] masses, double cme, int num_fsp, vector[double] ps, double tol=10**-4.0, int max_iter=50) nogil:
+cdef double __find_root(double[:] masses, double cme, int num_fsp, double* ps,
+                        double tol=10**-4.0, int max_iter=50) nogil:
     """
     Function for finding the scaling parameter to turn massless four-vectors
     the correct set of masses.
 
     Parameters
     ----------
-    xi : double
-        Scaling factor.
     masses : double[:]
         List of masses of the final state particles.
     cme : double
         Center of mass energy of the process.
-    ps : double[:]
+    ps : double*
         List of the four momentum of the final state particles.
 
     Returns
@@ -170,13 +300,13 @@ cdef double __find_root(vector[double] masses, double cme, int num_fsp, vector[d
 @cython.boundscheck(False)
 @cython.wraparound(False)
 @cython.cdivision(True)
-cdef double __get_mass(vector[double] fv) nogil:
+cdef double __get_mass(double* fv) nogil:
     """
     Computes mass of a four-vector.
 
     Parameters
     ----------
-    fv : double[:]
+    fv : double*
         Four-vector to compute mass of.
 
     Returns
@@ -191,80 +321,86 @@ cdef double __get_mass(vector[double] fv) nogil:
 @cython.boundscheck(False)
 @cython.wraparound(False)
 @cython.cdivision(True)
-cdef vector[double] __generate_qs(vector[double] masses, double cme, int num_fsp):
+cdef double __massless_weight(double cme, int num_fsp) nogil:
     """
-    Computes isotropic, random four-vectors with energies, q_0, distributed
-    according to q_0 * exp(-q_0).
+    Returns the (constant) phase space weight of a massless event.
 
     Parameters
     ----------
-    masses : double[:]
-        List of masses of the final state particles.
     cme : double
         Center of mass energy of the process.
-    rands : double[:]
-        List of the random numbers uniformly distributed on (0,1).
+    num_fsp : int
+        Number of final state particles.
 
     Returns
     -------
-    qs : double[:]
-        List of the massless four-momenta.
+    weight : double
+        Weight of every massless RAMBO event.
+    """
+    return pow(M_PI / 2.0, num_fsp - 1.0) \
+        * pow(cme, 2.0 * num_fsp - 4.0) \
+        / tgamma(num_fsp) \
+        / tgamma(num_fsp - 1) \
+        * pow(2.0 * M_PI, 4.0 - 3.0 * num_fsp)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef void __generate_qs(int num_fsp, double* rands, double* qs) nogil:
+    """
+    Computes isotropic, random four-vectors with energies, q_0, distributed
+    according to q_0 * exp(-q_0).
+
+    Parameters
+    ----------
+    num_fsp : int
+        Number of final state particles.
+    rands : double*
+        List of 4 * num_fsp random numbers uniformly distributed on (0,1).
+    qs : double*
+        Buffer of size 4 * num_fsp to store the massless four-momenta in.
     """
     cdef int i
     cdef double rho_1, rho_2, rho_3, rho_4
     cdef double c, phi
-    cdef double q_e, q_x, q_y, q_z
-
-    # cdef double[:] qs = np.empty(num_fsp * 4 + 1, dtype=np.float64)
-    cdef vector[double] qs
-
-    for _ in range(num_fsp * 4 + 1):
-        qs.push_back(0)
+    cdef double q_e
 
     for i in range(num_fsp):
-        rho_1 = uniform(rng)
-        rho_2 = uniform(rng)
-        rho_3 = uniform(rng)
-        rho_4 = uniform(rng)
+        rho_1 = rands[4 * i + 0]
+        rho_2 = rands[4 * i + 1]
+        rho_3 = rands[4 * i + 2]
+        rho_4 = rands[4 * i + 3]
 
         c = 2.0 * rho_1 - 1.0
         phi = 2.0 * M_PI * rho_2
 
         q_e = -log(rho_3 * rho_4)
-        q_x = q_e * sqrt(1.0 - pow(c, 2.)) * cos(phi)
-        q_y = q_e * sqrt(1.0 - pow(c, 2.)) * sin(phi)
-        q_z = q_e * c
 
         qs[4 * i + 0] = q_e
-        qs[4 * i + 1] = q_x
-        qs[4 * i + 2] = q_y
-        qs[4 * i + 3] = q_z
-
-    return qs
+        qs[4 * i + 1] = q_e * sqrt(1.0 - pow(c, 2.)) * cos(phi)
+        qs[4 * i + 2] = q_e * sqrt(1.0 - pow(c, 2.)) * sin(phi)
+        qs[4 * i + 3] = q_e * c
 
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
 @cython.cdivision(True)
-cdef vector[double] __generate_ps(vector[double] masses, double cme, int num_fsp, vector[double] qs):
+cdef void __generate_ps(double cme, int num_fsp, double* qs) nogil:
     """
-    Generates a list of four-momentum with correct center of mass energy from
-    isotropic, random four-momentum with energies, q_0,  distributed according
-    to q_0 * exp(-q_0).
+    Transforms, in place, isotropic, random four-momentum with energies, q_0,
+    distributed according to q_0 * exp(-q_0) into a list of massless
+    four-momentum with correct center of mass energy.
 
     Parameters
     ----------
-    masses : double[:]
-        List of masses of the final state particles.
     cme : double
         Center of mass energy of the process.
-    qs : double[:]
-        List of the random four-momenta.
-
-    Returns
-    -------
-    ps : double[:]
-        List of the massless four-momenta with correct center of mass energy.
+    num_fsp : int
+        Number of final state particles.
+    qs : double*
+        List of the random four-momenta. Overwritten with the massless
+        four-momenta with correct center of mass energy.
     """
     cdef int i
     cdef double mass_Q
@@ -272,12 +408,10 @@ cdef vector[double] __generate_ps(vector[double] masses, double cme, int num_fsp
     cdef double x, gamma, a
     cdef double qi_e, qi_x, qi_y, qi_z
     cdef double b_dot_qi
-    cdef double pi_e, pi_x, pi_y, pi_z
-
-    cdef vector[double] sum_qs
+    cdef double sum_qs[4]
 
     for i in range(4):
-        sum_qs.push_back(0)
+        sum_qs[i] = 0.0
 
     for i in range(num_fsp):
         sum_qs[0] = sum_qs[0] + qs[4 * i + 0]
@@ -302,33 +436,20 @@ cdef vector[double] __generate_ps(vector[double] masses, double cme, int num_fsp
 
         b_dot_qi = b_x * qi_x + b_y * qi_y + b_z * qi_z
 
-        pi_e = x * (gamma * qi_e + b_dot_qi)
-        pi_x = x * (qi_x + b_x * qi_e + a * b_dot_qi * b_x)
-        pi_y = x * (qi_y + b_y * qi_e + a * b_dot_qi * b_y)
-        pi_z = x * (qi_z + b_z * qi_e + a * b_dot_qi * b_z)
-
-        qs[4 * i + 0] = pi_e
-        qs[4 * i + 1] = pi_x
-        qs[4 * i + 2] = pi_y
-        qs[4 * i + 3] = pi_z
-
-
-    qs[4 * num_fsp] = pow(M_PI / 2.0, num_fsp - 1.0) \
-        * pow(cme, 2.0 * num_fsp - 4.0) \
-        / tgamma(num_fsp) \
-        / tgamma(num_fsp - 1) \
-        * pow(2.0 * M_PI, 4.0 - 3.0 * num_fsp)
-
-    return qs
+        qs[4 * i + 0] = x * (gamma * qi_e + b_dot_qi)
+        qs[4 * i + 1] = x * (qi_x + b_x * qi_e + a * b_dot_qi * b_x)
+        qs[4 * i + 2] = x * (qi_y + b_y * qi_e + a * b_dot_qi * b_y)
+        qs[4 * i + 3] = x * (qi_z + b_z * qi_e + a * b_dot_qi * b_z)
 
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
 @cython.cdivision(True)
-cdef vector[double] __generate_ks(vector[double] masses, double cme, int num_fsp, vector[double] ps):
+cdef double __generate_ks(double[:] masses, double cme, int num_fsp,
+                          double* ps) nogil:
     """
-    Generates a list of four-momentum with correct masses from massless
-    four-momenta.
+    Transforms, in place, a list of massless four-momentum into four-momentum
+    with correct masses.
 
     Parameters
     ----------
@@ -336,13 +457,17 @@ cdef vector[double] __generate_ks(vector[double] masses, double cme, int num_fsp
         List of masses of the final state particles.
     cme : double
         Center of mass energy of the process.
-    ps : double[:]
-        List of the massless four-momenta.
+    num_fsp : int
+        Number of final state particles.
+    ps : double*
+        List of the massless four-momenta. Overwritten with the massive
+        four-momenta.
 
     Returns
     -------
-    ks : double[:]
-        List of the massive four-momenta with correct masses.
+    weight_factor : double
+        Factor by which the massless event weight must be multiplied to obtain
+        the massive event weight.
     """
     cdef int i
     cdef double xi
@@ -375,17 +500,39 @@ cdef vector[double] __generate_ks(vector[double] masses, double cme, int num_fsp
     term1 = pow(term1, 2.0 * num_fsp - 3.0)
     term2 = pow(term2, -1.0)
 
-    ps[4 * num_fsp] = ps[4 * num_fsp] * term1 * term2 * term3 * cme
+    return term1 * term2 * term3 * cme
 
-    return ps
+
+@cython.cdivision(True)
+cdef inline double __two_body_momentum(double m, double m1, double m2) nogil:
+    """
+    Returns the momentum of the products of the two-body decay m -> m1 + m2
+    in the rest frame of m.
+    """
+    cdef double x = (m * m - (m1 + m2) * (m1 + m2)) * \
+        (m * m - (m1 - m2) * (m1 - m2))
+    if x <= 0.0:
+        return 0.0
+    return sqrt(x) / (2.0 * m)
 
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
 @cython.cdivision(True)
-def generate_point(vector[double] masses, double cme, int num_fsp):
+cdef double __generate_sequential(double[:] masses, double cme, int num_fsp,
+                                  double* rands, double* ks) nogil:
     """
-    Generate a single relativistic phase space point.
+    Maps 3 * num_fsp - 4 uniform random numbers to a phase space point using
+    a sequence of two-body decays (Raubold and Lynch; James, CERN 68-15).
+
+    The invariant mass M_k of the first k particles is drawn uniformly in
+    M_k^2 between sum(m_1, ..., m_k) and M_{k+1} - m_{k+1}, for
+    k = num_fsp - 1, ..., 2. Then, for k = 2, ..., num_fsp, particle k and
+    the system of the first k - 1 particles are produced back-to-back in the
+    rest frame of M_k, with cos(theta) and phi drawn uniformly. Unlike the
+    random numbers of RAMBO, each invariant mass is controlled by a single
+    random number, which makes this mapping suited to adaptive importance
+    sampling of resonances.
 
     Parameters
     ----------
@@ -393,72 +540,573 @@ def generate_point(vector[double] masses, double cme, int num_fsp):
         List of masses of the final state particles.
     cme : double
         Center of mass energy of the process.
-    rands : double[:]
-        List of random numbers.
+    num_fsp : int
+        Number of final state particles.
+    rands : double*
+        List of 3 * num_fsp - 4 random numbers uniformly distributed on
+        (0,1): first those for M_{num_fsp - 1}, ..., M_2, then
+        (cos(theta), phi) for each decay.
+    ks : double*
+        Buffer of size 4 * num_fsp to store the four-momenta in.
 
     Returns
     -------
-    phase_space_point : double[:]
-        List of four momenta and a event weight. The returned numpy array is of
-        the form {ke1, kx1, ky1, kz1, ..., keN, kxN, kyN, kzN, weight}.
+    weight : double
+        Weight of the event, normalized in the same way as RAMBO events.
+    """
+    cdef int i, k
+    cdef int r = 0
+    cdef double weight = 1.0
+    cdef double msum_low, mhigh, mlow2, mhigh2
+    cdef double pstar, ek, esub, cost, sint, phi
+    cdef double nx, ny, nz, gam, gbx, gby, gbz, gbp, e0
+    cdef double* msys = <double*>malloc(num_fsp * sizeof(double))
+
+    # Invariant masses of the first k particles.
+    msys[num_fsp - 1] = cme
+    msum_low = 0.0
+    for i in range(num_fsp):
+        msum_low += masses[i]
+    for k in range(num_fsp - 2, 0, -1):
+        msum_low -= masses[k + 1]
+        mhigh = msys[k + 1] - masses[k + 1]
+        mlow2 = msum_low * msum_low
+        mhigh2 = mhigh * mhigh if mhigh > msum_low else mlow2
+        msys[k] = sqrt(mlow2 + rands[r] * (mhigh2 - mlow2))
+        weight *= (mhigh2 - mlow2) / (2.0 * M_PI)
+        r += 1
+    msys[0] = masses[0]
+
+    for k in range(1, num_fsp):
+        pstar = __two_body_momentum(msys[k], msys[k - 1], masses[k])
+        weight *= pstar / (4.0 * M_PI * msys[k])
+
+        cost = 2.0 * rands[r] - 1.0
+        phi = 2.0 * M_PI * rands[r + 1]
+        r += 2
+        sint = sqrt(1.0 - cost * cost)
+        nx = sint * cos(phi)
+        ny = sint * sin(phi)
+        nz = cost
+
+        # Boost the first k particles from the rest frame of M_{k-1} into
+        # the rest frame of M_k, where the system moves along -n. The first
+        # particle is simply produced back-to-back with the second.
+        if k == 1:
+            ks[0] = sqrt(masses[0] * masses[0] + pstar * pstar)
+            ks[1] = -pstar * nx
+            ks[2] = -pstar * ny
+            ks[3] = -pstar * nz
+        elif msys[k - 1] > 0.0:
+            esub = sqrt(msys[k - 1] * msys[k - 1] + pstar * pstar)
+            gam = esub / msys[k - 1]
+            gbx = -pstar * nx / msys[k - 1]
+            gby = -pstar * ny / msys[k - 1]
+            gbz = -pstar * nz / msys[k - 1]
+            for i in range(k):
+                e0 = ks[4 * i + 0]
+                gbp = gbx * ks[4 * i + 1] + gby * ks[4 * i + 2] + \
+                    gbz * ks[4 * i + 3]
+                ks[4 * i + 0] = gam * e0 + gbp
+                ks[4 * i + 1] += gbx * (e0 + gbp / (gam + 1.0))
+                ks[4 * i + 2] += gby * (e0 + gbp / (gam + 1.0))
+                ks[4 * i + 3] += gbz * (e0 + gbp / (gam + 1.0))
+
+        ek = sqrt(masses[k] * masses[k] + pstar * pstar)
+        ks[4 * k + 0] = ek
+        ks[4 * k + 1] = pstar * nx
+        ks[4 * k + 2] = pstar * ny
+        ks[4 * k + 3] = pstar * nz
+
+    free(msys)
+
+    return weight
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef void c_generate_space_sequential(double[:, :, :] momenta,
+                                      double[:] weights, double[:] masses,
+                                      double cme,
+                                      double[:, :] uniforms) nogil:
+    """
+    Fills a momentum buffer and weight buffer with phase space points built
+    from user-supplied uniform random numbers using sequential two-body
+    decays. See ``__generate_sequential``.
     """
-    global rng
-    cdef random_device rd
-    rng = mt19937(rd())
-    return c_generate_point(masses, cme, num_fsp)
+    cdef int i, j, k
+    cdef int num_ps_pts = momenta.shape[0]
+    cdef int num_fsp = momenta.shape[1]
+    cdef int num_rands = 3 * num_fsp - 4
+    cdef double* rands = <double*>malloc(num_rands * sizeof(double))
+    cdef double* ks = <double*>malloc(4 * num_fsp * sizeof(double))
+
+    for i in range(num_ps_pts):
+        for j in range(num_rands):
+            rands[j] = uniforms[i, j]
+        weights[i] = __generate_sequential(masses, cme, num_fsp, rands, ks)
 
+        for j in range(num_fsp):
+            for k in range(4):
+                momenta[i, j, k] = ks[4 * j + k]
+
+    free(rands)
+    free(ks)
 
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
 @cython.cdivision(True)
-cdef vector[double] c_generate_point(vector[double] masses, double cme, int num_fsp):
+cdef void c_generate_space_inplace(double[:, :, :] momenta, double[:] weights,
+                                   double[:] masses, double cme,
+                                   rng_state* state) nogil:
     """
-    c version of generate_point.
+    Fills a momentum buffer and weight buffer with relativistic phase space
+    points. This is the nogil kernel used by all of the phase space
+    generation functions.
+
+    Parameters
+    ----------
+    momenta : double[:, :, :]
+        Buffer of shape (num_ps_pts, num_fsp, 4) to store the four-momenta in.
+    weights : double[:]
+        Buffer of shape (num_ps_pts,) to store the event weights in.
+    masses : double[:]
+        List of masses of the final state particles.
+    cme : double
+        Center of mass energy of the process.
+    state : rng_state*
+        State of the random number generator. On return, the state points to
+        the event following the last generated event.
     """
+    cdef int i, j, k
+    cdef int num_ps_pts = momenta.shape[0]
+    cdef int num_fsp = momenta.shape[1]
+    cdef double massless_weight = __massless_weight(cme, num_fsp)
+    cdef double* rands = <double*>malloc(4 * num_fsp * sizeof(double))
+    cdef double* ks = <double*>malloc(4 * num_fsp * sizeof(double))
+
+    for i in range(num_ps_pts):
+        __generate_uniforms(state, 4 * num_fsp, rands)
+        __generate_qs(num_fsp, rands, ks)
+        __generate_ps(cme, num_fsp, ks)
+        weights[i] = massless_weight * __generate_ks(masses, cme, num_fsp, ks)
+
+        for j in range(num_fsp):
+            for k in range(4):
+                momenta[i, j, k] = ks[4 * j + k]
 
-    return __generate_ks(masses, cme, num_fsp,
-                         __generate_ps(masses, cme, num_fsp,
-                                        __generate_qs(masses, cme, num_fsp)))
+    free(rands)
+    free(ks)
 
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
-def generate_space(int num_ps_pts, vector[double] masses, double cme, int num_fsp):
+@cython.cdivision(True)
+cdef int c_generate_weighted_space(double[:, :, :] momenta, double[:] weights,
+                                   double[:] masses, double cme,
+                                   CompiledMatrixElement msqrd,
+                                   const rng_state* state, int nt) nogil:
     """
-    Generate a specified number of phase space points given a set of
-    final state particles and a given center of mass energy.
+    Fills a momentum buffer and weight buffer with relativistic phase space
+    points weighted by a compiled squared matrix element. Generation and
+    weighting run in a single ``prange`` loop on ``nt`` threads: event ``i``
+    is the event ``state.event + i`` of the random stream, so the result
+    does not depend on the number of threads.
 
     Parameters
     ----------
-    num_ps_pts : int
-        Total number of phase space points to generate.
+    momenta : double[:, :, :]
+        Buffer of shape (num_ps_pts, num_fsp, 4) to store the four-momenta in.
+    weights : double[:]
+        Buffer of shape (num_ps_pts,) to store the event weights in.
+    masses : double[:]
+        List of masses of the final state particles.
+    cme : double
+        Center of mass energy of the process.
+    msqrd : CompiledMatrixElement
+        Squared matrix element.
+    state : rng_state*
+        State of the random number generator. It is not advanced.
+    nt : int
+        Number of threads.
+
+    Returns
+    -------
+    num_negative : int
+        Number of negative squared matrix elements encountered.
+    """
+    cdef int i, j, k
+    cdef int num_ps_pts = momenta.shape[0]
+    cdef int num_fsp = momenta.shape[1]
+    cdef int num_negative = 0
+    cdef double mat_elem2, weight
+    cdef double massless_weight = __massless_weight(cme, num_fsp)
+    cdef double* rands
+    cdef double* ks
+
+    with parallel(num_threads=nt):
+        # Every thread has its own buffers.
+        rands = <double*>malloc(4 * num_fsp * sizeof(double))
+        ks = <double*>malloc(4 * num_fsp * sizeof(double))
+
+        for i in prange(num_ps_pts, schedule="static"):
+            __event_uniforms(state, state.event + i, 4 * num_fsp, rands)
+            __generate_qs(num_fsp, rands, ks)
+            __generate_ps(cme, num_fsp, ks)
+            weight = massless_weight * __generate_ks(masses, cme, num_fsp, ks)
+            mat_elem2 = msqrd.kernel(ks, num_fsp, msqrd.c_params)
+            if mat_elem2 < 0:
+                num_negative += 1
+            weights[i] = weight * mat_elem2
+
+            for j in range(num_fsp):
+                for k in range(4):
+                    momenta[i, j, k] = ks[4 * j + k]
+
+        free(rands)
+        free(ks)
+
+    return num_negative
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef void c_generate_space_multi_cme(double[:, :, :, :] momenta,
+                                     double[:, :] weights, double[:] masses,
+                                     double[:] cmes, rng_state* state) nogil:
+    """
+    Fills momentum and weight buffers with relativistic phase space points
+    at several center of mass energies from one set of random numbers.
+
+    The massless momenta built by ``__generate_qs`` and ``__generate_ps``
+    only depend on the center of mass energy through an overall scale, so
+    they are generated once per event, at unit energy, and rescaled for each
+    energy before the masses are corrected by ``__generate_ks``. Event ``i``
+    at energy ``cmes[c]`` is identical (up to rounding) to the event
+    generated by ``c_generate_space_inplace`` at that energy from the same
+    state.
+
+    Parameters
+    ----------
+    momenta : double[:, :, :, :]
+        Buffer of shape (num_cmes, num_ps_pts, num_fsp, 4) to store the
+        four-momenta in.
+    weights : double[:, :]
+        Buffer of shape (num_cmes, num_ps_pts) to store the event weights in.
+    masses : double[:]
+        List of masses of the final state particles.
+    cmes : double[:]
+        Center of mass energies.
+    state : rng_state*
+        State of the random number generator. On return, the state points to
+        the event following the last generated event.
+    """
+    cdef int i, j, k, c
+    cdef int num_cmes = momenta.shape[0]
+    cdef int num_ps_pts = momenta.shape[1]
+    cdef int num_fsp = momenta.shape[2]
+    cdef double* rands = <double*>malloc(4 * num_fsp * sizeof(double))
+    cdef double* ps = <double*>malloc(4 * num_fsp * sizeof(double))
+    cdef double* ks = <double*>malloc(4 * num_fsp * sizeof(double))
+    cdef double* massless_weights = <double*>malloc(num_cmes * sizeof(double))
+
+    for c in range(num_cmes):
+        massless_weights[c] = __massless_weight(cmes[c], num_fsp)
+
+    for i in range(num_ps_pts):
+        __generate_uniforms(state, 4 * num_fsp, rands)
+        __generate_qs(num_fsp, rands, ps)
+        __generate_ps(1.0, num_fsp, ps)
+
+        for c in range(num_cmes):
+            for j in range(4 * num_fsp):
+                ks[j] = cmes[c] * ps[j]
+            weights[c, i] = massless_weights[c] * __generate_ks(
+                masses, cmes[c], num_fsp, ks)
+
+            for j in range(num_fsp):
+                for k in range(4):
+                    momenta[c, i, j, k] = ks[4 * j + k]
+
+    free(rands)
+    free(ps)
+    free(ks)
+    free(massless_weights)
+
+
+def generate_space_inplace(double[:, :, :] momenta, double[:] weights,
+                           double[:] masses, double cme, key=None,
+                           np.uint64_t offset=0):
+    """
+    Fill user-supplied buffers with relativistic phase space points given a
+    set of final state particles and a given center of mass energy. The GIL
+    is released while the points are generated.
+
+    Parameters
+    ----------
+    momenta : numpy.ndarray
+        Buffer of shape (num_ps_pts, num_fsp, 4) which will be filled with
+        the four-momenta of the final state particles. The buffer may be a
+        strided view, such as the momentum columns of an array of shape
+        (num_ps_pts, 4 * num_fsp + 1).
+    weights : numpy.ndarray
+        Buffer of shape (num_ps_pts,) which will be filled with the event
+        weights.
+    masses : numpy.ndarray
+        List of masses of the final state particles.
+    cme : double
+        Center-of-mass-energy of the process.
+    key : numpy.ndarray, optional
+        Three 32-bit words identifying the random stream. If None, a fresh
+        random key is used.
+    offset : int, optional
+        Index of the first event in the random stream. Events ``offset`` to
+        ``offset + num_ps_pts`` of the stream are generated.
+    """
+    if momenta.shape[2] != 4:
+        raise ValueError("momenta must have shape (num_ps_pts, num_fsp, 4).")
+    if momenta.shape[1] != masses.shape[0]:
+        raise ValueError("momenta and masses have inconsistent num_fsp.")
+    if momenta.shape[0] != weights.shape[0]:
+        raise ValueError("momenta and weights have inconsistent num_ps_pts.")
+
+    cdef rng_state state = __make_state(key, offset)
+
+    with nogil:
+        c_generate_space_inplace(momenta, weights, masses, cme, &state)
+
+
+def generate_weighted_space_inplace(double[:, :, :] momenta,
+                                    double[:] weights, double[:] masses,
+                                    double cme, CompiledMatrixElement msqrd,
+                                    key=None, np.uint64_t offset=0):
+    """
+    Fill user-supplied buffers with relativistic phase space points whose
+    weights include a compiled squared matrix element (see
+    ``hazma.phase_space_helper_functions.compiled_msqrd``). The points are
+    generated and weighted in a single loop without the GIL, which runs on
+    several threads when the extension is built with OpenMP. The points are
+    those of ``generate_space_inplace`` with the same key and offset.
+
+    Parameters
+    ----------
+    momenta : numpy.ndarray
+        Buffer of shape (num_ps_pts, num_fsp, 4) which will be filled with
+        the four-momenta of the final state particles.
+    weights : numpy.ndarray
+        Buffer of shape (num_ps_pts,) which will be filled with the event
+        weights times the squared matrix element.
     masses : numpy.ndarray
         List of masses of the final state particles.
     cme : double
         Center-of-mass-energy of the process.
-    mat_elem_sqrd : (double)(numpy.ndarray) {lambda klist: 1}
-        Function for the matrix element squared.
+    msqrd : CompiledMatrixElement
+        Squared matrix element.
+    key : numpy.ndarray, optional
+        Three 32-bit words identifying the random stream. If None, a fresh
+        random key is used.
+    offset : int, optional
+        Index of the first event in the random stream.
 
     Returns
     -------
-    phase_space_points : numpy.ndarray
-        List of phase space points. The phase space points are in the form
-        {{ke11, kx11, ky11, kz11, ..., keN1, kxN1, kyN1, kzN1, weight1},
-            .
-            .
-            .
-         {ke1N, kx1N, ky1N, kz1N, ..., keNN, kxNN, kyNN, kzNN, weightN}}
+    num_negative : int
+        Number of points with a negative squared matrix element.
     """
-    return c_generate_space(num_ps_pts, masses, cme, num_fsp)
+    cdef int num_negative
 
+    if momenta.shape[2] != 4:
+        raise ValueError("momenta must have shape (num_ps_pts, num_fsp, 4).")
+    if momenta.shape[1] != masses.shape[0]:
+        raise ValueError("momenta and masses have inconsistent num_fsp.")
+    if momenta.shape[0] != weights.shape[0]:
+        raise ValueError("momenta and weights have inconsistent num_ps_pts.")
+    if msqrd.num_fsp != 0 and msqrd.num_fsp != masses.shape[0]:
+        raise ValueError("'{}' expects {} final state particles.".format(
+            msqrd.name, msqrd.num_fsp))
 
+    cdef rng_state state = __make_state(key, offset)
+    cdef int nt = num_threads(momenta.shape[0])
 
-@cython.boundscheck(False)
-@cython.wraparound(False)
-cdef vector[vector[double]] c_generate_space(int num_ps_pts,
-                                             vector[double] masses,
-                                             double cme, int num_fsp):
+    with nogil:
+        num_negative = c_generate_weighted_space(momenta, weights, masses, cme,
+                                                 msqrd, &state, nt)
+
+    return num_negative
+
+
+def generate_space_multi_cme_inplace(double[:, :, :, :] momenta,
+                                     double[:, :] weights, double[:] masses,
+                                     double[:] cmes, key=None,
+                                     np.uint64_t offset=0):
+    """
+    Fill user-supplied buffers with relativistic phase space points at
+    several center of mass energies. The same massless configurations are
+    used at every energy, so the random numbers and boosts are only computed
+    once per event. The GIL is released while the points are generated.
+
+    Parameters
+    ----------
+    momenta : numpy.ndarray
+        Buffer of shape (num_cmes, num_ps_pts, num_fsp, 4) which will be
+        filled with the four-momenta of the final state particles.
+    weights : numpy.ndarray
+        Buffer of shape (num_cmes, num_ps_pts) which will be filled with the
+        event weights.
+    masses : numpy.ndarray
+        List of masses of the final state particles.
+    cmes : numpy.ndarray
+        Center-of-mass-energies.
+    key : numpy.ndarray, optional
+        Three 32-bit words identifying the random stream. If None, a fresh
+        random key is used.
+    offset : int, optional
+        Index of the first event in the random stream. The events at each
+        energy are those ``generate_space_inplace`` generates at that energy
+        from the same key and offset.
+    """
+    if momenta.shape[3] != 4:
+        raise ValueError(
+            "momenta must have shape (num_cmes, num_ps_pts, num_fsp, 4).")
+    if momenta.shape[0] != cmes.shape[0]:
+        raise ValueError("momenta and cmes have inconsistent num_cmes.")
+    if momenta.shape[2] != masses.shape[0]:
+        raise ValueError("momenta and masses have inconsistent num_fsp.")
+    if (momenta.shape[0] != weights.shape[0] or
+            momenta.shape[1] != weights.shape[1]):
+        raise ValueError("momenta and weights have inconsistent shapes.")
+
+    cdef rng_state state = __make_state(key, offset)
+
+    with nogil:
+        c_generate_space_multi_cme(momenta, weights, masses, cmes, &state)
+
+
+def generate_space_sequential(double[:, :, :] momenta, double[:] weights,
+                              double[:] masses, double cme,
+                              double[:, :] uniforms):
+    """
+    Fill user-supplied buffers with relativistic phase space points built
+    from the given uniform random numbers using a sequence of two-body
+    decays. The points have the same normalization as those of RAMBO, but
+    the invariant mass of the first ``k`` particles, for each ``k``, only
+    depends on a single random number. The GIL is released while the points
+    are generated.
+
+    Parameters
+    ----------
+    momenta : numpy.ndarray
+        Buffer of shape (num_ps_pts, num_fsp, 4) which will be filled with
+        the four-momenta of the final state particles.
+    weights : numpy.ndarray
+        Buffer of shape (num_ps_pts,) which will be filled with the event
+        weights.
+    masses : numpy.ndarray
+        List of masses of the final state particles.
+    cme : double
+        Center-of-mass-energy of the process.
+    uniforms : numpy.ndarray
+        Numbers on the open interval (0, 1) with shape
+        (num_ps_pts, 3 * num_fsp - 4). The first ``num_fsp - 2`` set the
+        squared invariant masses of the first ``num_fsp - 1``, ..., 2
+        particles and the others the directions of the decays.
+    """
+    if momenta.shape[2] != 4:
+        raise ValueError("momenta must have shape (num_ps_pts, num_fsp, 4).")
+    if momenta.shape[1] != masses.shape[0]:
+        raise ValueError("momenta and masses have inconsistent num_fsp.")
+    if momenta.shape[1] < 2:
+        raise ValueError("At least two final state particles are needed.")
+    if momenta.shape[0] != weights.shape[0]:
+        raise ValueError("momenta and weights have inconsistent num_ps_pts.")
+    if (uniforms.shape[0] != momenta.shape[0] or
+            uniforms.shape[1] != 3 * momenta.shape[1] - 4):
+        raise ValueError(
+            "uniforms must have shape (num_ps_pts, 3 * num_fsp - 4).")
+
+    with nogil:
+        c_generate_space_sequential(momenta, weights, masses, cme, uniforms)
+
+
+def generate_uniforms(int num_ps_pts, int num_dims, key=None,
+                      np.uint64_t offset=0):
+    """
+    Returns uniform random numbers from the counter-based random stream of
+    the generator. Row ``i`` only depends on ``key`` and ``offset + i``.
+
+    Parameters
+    ----------
+    num_ps_pts : int
+        Number of rows (events) to generate.
+    num_dims : int
+        Number of random numbers per event.
+    key : numpy.ndarray, optional
+        Three 32-bit words identifying the random stream. If None, a fresh
+        random key is used.
+    offset : int, optional
+        Index of the first event in the random stream.
+
+    Returns
+    -------
+    uniforms : numpy.ndarray
+        Numbers on the open interval (0, 1) with shape
+        (num_ps_pts, num_dims).
+    """
+    cdef int i, j
+    cdef rng_state state = __make_state(key, offset)
+    cdef np.ndarray[np.float64_t, ndim=2] uniforms
+    cdef double[:, :] view
+    cdef double* rands
+
+    uniforms = np.empty((num_ps_pts, num_dims), dtype=np.float64)
+    view = uniforms
+    # The stream produces random numbers in pairs, so round up.
+    rands = <double*>malloc((num_dims + 1) * sizeof(double))
+
+    with nogil:
+        for i in range(num_ps_pts):
+            __generate_uniforms(&state, num_dims + num_dims % 2, rands)
+            for j in range(num_dims):
+                view[i, j] = rands[j]
+
+    free(rands)
+
+    return uniforms
+
+
+def generate_point(double[:] masses, double cme, int num_fsp, key=None,
+                   np.uint64_t offset=0):
+    """
+    Generate a single relativistic phase space point.
+
+    Parameters
+    ----------
+    masses : double[:]
+        List of masses of the final state particles.
+    cme : double
+        Center of mass energy of the process.
+    num_fsp : int
+        Number of final state particles.
+    key : numpy.ndarray, optional
+        Three 32-bit words identifying the random stream. If None, a fresh
+        random key is used.
+    offset : int, optional
+        Index of the event in the random stream.
+
+    Returns
+    -------
+    phase_space_point : numpy.ndarray
+        List of four momenta and a event weight. The returned numpy array is of
+        the form {ke1, kx1, ky1, kz1, ..., keN, kxN, kyN, kzN, weight}.
+    """
+    return generate_space(1, masses, cme, num_fsp, key, offset)[0]
+
+
+def generate_space(int num_ps_pts, double[:] masses, double cme, int num_fsp,
+                   key=None, np.uint64_t offset=0):
     """
     Generate a specified number of phase space points given a set of
     final state particles and a given center of mass energy.
@@ -471,29 +1119,120 @@ cdef vector[vector[double]] c_generate_space(int num_ps_pts,
         List of masses of the final state particles.
     cme : double
         Center-of-mass-energy of the process.
-    mat_elem_sqrd : (double)(numpy.ndarray) {lambda klist: 1}
-        Function for the matrix element squared.
+    num_fsp : int
+        Number of final state particles.
+    key : numpy.ndarray, optional
+        Three 32-bit words identifying the random stream. If None, a fresh
+        random key is used.
+    offset : int, optional
+        Index of the first event in the random stream.
 
     Returns
     -------
     phase_space_points : numpy.ndarray
-        List of phase space points. The phase space points are in the form
+        Array of shape (num_ps_pts, 4 * num_fsp + 1) containing the phase
+        space points. The phase space points are in the form
         {{ke11, kx11, ky11, kz11, ..., keN1, kxN1, kyN1, kzN1, weight1},
             .
             .
             .
          {ke1N, kx1N, ky1N, kz1N, ..., keNN, kxNN, kyNN, kzNN, weightN}}
     """
-    cdef int i
-
-    global rng
-    cdef random_device rd
-    rng = mt19937(rd())
+    points = np.empty((num_ps_pts, 4 * num_fsp + 1), dtype=np.float64)
+    generate_space_inplace(
+        points[:, :4 * num_fsp].reshape(num_ps_pts, num_fsp, 4),
+        points[:, 4 * num_fsp],
+        masses,
+        cme,
+        key,
+        offset,
+    )
+    return points
+
+
+def generate_space_multi_cme(int num_ps_pts, double[:] masses, double[:] cmes,
+                             int num_fsp, key=None, np.uint64_t offset=0):
+    """
+    Generate a specified number of phase space points at each of several
+    center of mass energies from one set of massless configurations.
 
-    cdef vector[vector[double]] space
+    Parameters
+    ----------
+    num_ps_pts : int
+        Number of phase space points to generate at each energy.
+    masses : numpy.ndarray
+        List of masses of the final state particles.
+    cmes : numpy.ndarray
+        Center-of-mass-energies.
+    num_fsp : int
+        Number of final state particles.
+    key : numpy.ndarray, optional
+        Three 32-bit words identifying the random stream. If None, a fresh
+        random key is used.
+    offset : int, optional
+        Index of the first event in the random stream.
 
-    for i in range(num_ps_pts):
-        space.push_back(c_generate_point(masses, cme, num_fsp))
+    Returns
+    -------
+    phase_space_points : numpy.ndarray
+        Array of shape (num_cmes, num_ps_pts, 4 * num_fsp + 1) containing
+        the phase space points at each energy in the format of
+        ``generate_space``.
+    """
+    points = np.empty((cmes.shape[0], num_ps_pts, 4 * num_fsp + 1),
+                      dtype=np.float64)
+    generate_space_multi_cme_inplace(
+        points[:, :, :4 * num_fsp].reshape(
+            cmes.shape[0], num_ps_pts, num_fsp, 4),
+        points[:, :, 4 * num_fsp],
+        masses,
+        cmes,
+        key,
+        offset,
+    )
+    return points
+
+
+def generate_weighted_space(int num_ps_pts, double[:] masses, double cme,
+                            int num_fsp, CompiledMatrixElement msqrd,
+                            key=None, np.uint64_t offset=0):
+    """
+    Generate a specified number of phase space points whose weights include
+    a compiled squared matrix element. See
+    ``generate_weighted_space_inplace``.
 
+    Parameters
+    ----------
+    num_ps_pts : int
+        Total number of phase space points to generate.
+    masses : numpy.ndarray
+        List of masses of the final state particles.
+    cme : double
+        Center-of-mass-energy of the process.
+    num_fsp : int
+        Number of final state particles.
+    msqrd : CompiledMatrixElement
+        Squared matrix element.
+    key : numpy.ndarray, optional
+        Three 32-bit words identifying the random stream. If None, a fresh
+        random key is used.
+    offset : int, optional
+        Index of the first event in the random stream.
 
-    return space
+    Returns
+    -------
+    phase_space_points : numpy.ndarray
+        Array of shape (num_ps_pts, 4 * num_fsp + 1) containing the phase
+        space points in the format of ``generate_space``.
+    """
+    points = np.empty((num_ps_pts, 4 * num_fsp + 1), dtype=np.float64)
+    generate_weighted_space_inplace(
+        points[:, :4 * num_fsp].reshape(num_ps_pts, num_fsp, 4),
+        points[:, 4 * num_fsp],
+        masses,
+        cme,
+        msqrd,
+        key,
+        offset,
+    )
+    return points
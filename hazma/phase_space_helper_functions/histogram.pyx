@@ -1,77 +1,795 @@
 """
 Generate histograms of the energies of particles.
 
+The bins can be evenly spaced ("linear"), evenly spaced in the logarithm of
+the energy ("log"), refined towards both ends of the energy range
+("endpoint") or chosen such that each holds the same share of the
+distribution ("quantile").
+
 * Author - Logan A. Morrison and Adam Coogan
 * Date - December 2017
 """
 
 import numpy as np
 cimport numpy as np
+from libc.math cimport sqrt
 import cython
 
+BINNINGS = ("linear", "log", "endpoint", "quantile")
+
+# Smallest lower edge of log-spaced bins relative to the upper edge. The
+# lowest bin is extended down to the lower end of the energy range.
+_LOG_BINS_MIN_RATIO = 1e-3
+
+# Fraction of evenly spaced edges mixed into quantile edges, which keeps the
+# bins from collapsing where the distribution has no support.
+_QUANTILE_MIX = 0.01
+
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
 @cython.cdivision(True)
-def space_to_energy_hist(np.ndarray[np.float64_t, ndim=2] pts, int num_ps_pts,
-                         int num_fsp, int num_bins, density=False):
+cdef void __energy_ranges(double[:, :] pts, int num_ps_pts, int num_fsp,
+                          double[:] elows, double[:] ehighs) nogil:
     """
+    Finds the smallest and largest energy of each final state particle.
     """
     cdef int i, j
-    cdef int weight_index = 4 * num_fsp
+    cdef double eng
 
-    # Define arrays for various information.
-    cdef np.ndarray[np.float64_t, ndim=1] weights
-    cdef np.ndarray[np.float64_t, ndim=2] bins
-    cdef np.ndarray[np.float64_t, ndim=2] engs
-    cdef np.ndarray[np.float64_t, ndim=3] probs
+    for j in range(num_fsp):
+        elows[j] = pts[0, 4 * j]
+        ehighs[j] = pts[0, 4 * j]
+    for i in range(1, num_ps_pts):
+        for j in range(num_fsp):
+            eng = pts[i, 4 * j]
+            if eng < elows[j]:
+                elows[j] = eng
+            elif eng > ehighs[j]:
+                ehighs[j] = eng
 
-    cdef np.ndarray[np.float64_t, ndim=2] means
-    cdef np.ndarray[np.float64_t, ndim=2] vars
-    cdef np.ndarray[np.float64_t, ndim=2] errs
 
-    # Allocate arrays to store various information.
-    weights = np.zeros(num_ps_pts, dtype=np.float64)
-    bins = np.zeros((num_fsp, num_bins + 1), dtype=np.float64)
-    engs = np.zeros((num_fsp, num_bins), dtype=np.float64)
-    probs = np.zeros((num_fsp, 2, num_bins), dtype=np.float64)
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef void __fill_hist(double[:, :] values, double[:] weights, int num_pts,
+                      double[:, :] bins, bint uniform, long[:, :] counts,
+                      double[:, :] sums, double[:, :] sums2) nogil:
+    """
+    Adds weighted samples of several quantities to their histograms in a
+    single pass over the samples. ``values[i, j]`` is the value of quantity
+    ``j`` in sample ``i``, which is binned using ``bins[j]``. For each bin,
+    the number of samples and the sums of their weights and squared weights
+    are accumulated. If ``uniform`` is true, the bins must be evenly spaced
+    and the bin of a sample is computed directly, otherwise it is found by
+    bisection. As for ``numpy.histogram``, the last bin includes its upper
+    edge and samples outside of the bins are dropped.
+    """
+    cdef int i, j, k, lo, hi
+    cdef int num_vals = values.shape[1]
+    cdef int num_bins = bins.shape[1] - 1
+    cdef double val, weight, low, high
+
+    for i in range(num_pts):
+        weight = weights[i]
+        for j in range(num_vals):
+            val = values[i, j]
+            low = bins[j, 0]
+            high = bins[j, num_bins]
+            if not (val >= low and val <= high) or high <= low:
+                continue
+            if uniform:
+                k = <int>(num_bins * (val - low) / (high - low))
+                # Guard against rounding putting the sample in a
+                # neighbouring bin.
+                if k >= num_bins:
+                    k = num_bins - 1
+                if k > 0 and val < bins[j, k]:
+                    k -= 1
+                elif k < num_bins - 1 and val >= bins[j, k + 1]:
+                    k += 1
+            else:
+                lo = 0
+                hi = num_bins
+                while hi - lo > 1:
+                    k = (lo + hi) // 2
+                    if val < bins[j, k]:
+                        hi = k
+                    else:
+                        lo = k
+                k = lo
+            counts[j, k] += 1
+            sums[j, k] += weight
+            sums2[j, k] += weight * weight
+
+
+def _fill_values(values, weights, int num_pts,
+                 np.ndarray[np.float64_t, ndim=2] bins, uniform=True):
+    """
+    Returns the number of samples, the sum of the weights and the sum of the
+    squared weights in each bin of each quantity. ``values`` has shape
+    (num_pts, num_vals) and may be a strided view.
+    """
+    cdef int num_vals = bins.shape[0]
+    cdef int num_bins = bins.shape[1] - 1
+    cdef np.ndarray counts, sums, sums2
+    cdef double[:, :] values_view = values
+    cdef double[:] weights_view = weights
+    cdef double[:, :] bins_view = bins
+    cdef long[:, :] counts_view
+    cdef double[:, :] sums_view, sums2_view
+    cdef bint uniform_flag = uniform
 
-    means = np.zeros((num_fsp, num_bins), dtype=np.float64)
-    vars = np.zeros((num_fsp, num_bins), dtype=np.float64)
-    errs = np.zeros((num_fsp, num_bins), dtype=np.float64)
+    if values_view.shape[1] != num_vals:
+        raise ValueError("values and bins have inconsistent num_vals.")
+    if values_view.shape[0] < num_pts or weights_view.shape[0] < num_pts:
+        raise ValueError("num_pts is larger than the number of samples.")
+
+    counts = np.zeros((num_vals, num_bins), dtype=np.int_)
+    sums = np.zeros((num_vals, num_bins), dtype=np.float64)
+    sums2 = np.zeros((num_vals, num_bins), dtype=np.float64)
+    counts_view = counts
+    sums_view = sums
+    sums2_view = sums2
+
+    with nogil:
+        __fill_hist(values_view, weights_view, num_pts, bins_view,
+                    uniform_flag, counts_view, sums_view, sums2_view)
+
+    return counts, sums, sums2
+
+
+def _fill(np.ndarray[np.float64_t, ndim=2] pts, int num_ps_pts, int num_fsp,
+          np.ndarray[np.float64_t, ndim=2] bins, uniform=True):
+    """
+    Returns the number of points, the sum of the weights and the sum of the
+    squared weights in each energy bin of each final state particle.
+    """
+    # The energies are read in place through a strided view.
+    return _fill_values(pts[:, 0:4 * num_fsp:4], pts[:, 4 * num_fsp],
+                        num_ps_pts, bins, uniform)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef void __pair_values(double[:, :] pts, int num_ps_pts, int[:, :] pairs,
+                        bint angles, double[:, :] out) nogil:
+    """
+    Computes the invariant mass of pairs of final state particles or, if
+    ``angles`` is true, the cosine of their opening angle.
+    """
+    cdef int i, n, a, b
+    cdef double e, px, py, pz, m2, pa, pb
 
-    # Extract the weights from phase space points.
     for i in range(num_ps_pts):
-        weights[i] = pts[i, weight_index]
+        for n in range(pairs.shape[0]):
+            a = 4 * pairs[n, 0]
+            b = 4 * pairs[n, 1]
+            if angles:
+                pa = sqrt(pts[i, a + 1] * pts[i, a + 1] +
+                          pts[i, a + 2] * pts[i, a + 2] +
+                          pts[i, a + 3] * pts[i, a + 3])
+                pb = sqrt(pts[i, b + 1] * pts[i, b + 1] +
+                          pts[i, b + 2] * pts[i, b + 2] +
+                          pts[i, b + 3] * pts[i, b + 3])
+                if pa > 0.0 and pb > 0.0:
+                    out[i, n] = (pts[i, a + 1] * pts[i, b + 1] +
+                                 pts[i, a + 2] * pts[i, b + 2] +
+                                 pts[i, a + 3] * pts[i, b + 3]) / (pa * pb)
+                else:
+                    out[i, n] = 1.0
+            else:
+                e = pts[i, a] + pts[i, b]
+                px = pts[i, a + 1] + pts[i, b + 1]
+                py = pts[i, a + 2] + pts[i, b + 2]
+                pz = pts[i, a + 3] + pts[i, b + 3]
+                m2 = e * e - px * px - py * py - pz * pz
+                out[i, n] = sqrt(m2) if m2 > 0.0 else 0.0
 
-    for i in range(num_fsp):
 
-        means[i, :], bins[i, :] = np.histogram(pts[:, 4 * i], bins=num_bins,
-                                               weights=weights, density=density)
+def pair_values(np.ndarray[np.float64_t, ndim=2] pts, int num_ps_pts,
+                int num_fsp, pairs, quantity="invariant_mass"):
+    """
+    Computes the invariant masses or opening angles of pairs of final state
+    particles.
 
-        vars[i, :] = np.histogram(pts[:, 4 * i], bins=num_bins,
-                                  weights=weights * weights, density=density)[0]
+    Parameters
+    ----------
+    pts : numpy.ndarray
+        Phase space points with shape (num_ps_pts, 4 * num_fsp + 1).
+    num_ps_pts : int
+        Number of phase space points.
+    num_fsp : int
+        Number of final state particles.
+    pairs : array_like
+        Indices of the particles in each pair, with shape (num_pairs, 2).
+    quantity : str {"invariant_mass"]
+        "invariant_mass" or "cos_angle" (the cosine of the opening angle in
+        the center of mass frame).
 
-        errs[i, :] = np.sqrt((vars[i, :] - means[i, :]**2))
+    Returns
+    -------
+    values : numpy.ndarray
+        Values for each point and pair, with shape (num_ps_pts, num_pairs).
+    """
+    cdef np.ndarray values
+    cdef double[:, :] pts_view = pts
+    cdef double[:, :] values_view
+    cdef int[:, :] pairs_view
+    cdef bint angles
 
-        # Normalize the distributions by the number of phase space points,
-        # but only if density is False, otherwise the density is True case
-        # will not be normalized to 1.
-        if density is False:
-            means[i, :] = means[i, :] * (1.0 / num_ps_pts)
-            vars[i, :] = vars[i, :] * (1.0 / num_ps_pts)
-            errs[i, :] = errs[i, :] * (1.0 / num_ps_pts)
+    if quantity not in ("invariant_mass", "cos_angle"):
+        raise ValueError("Unknown quantity '{}', expected 'invariant_mass' "
+                         "or 'cos_angle'.".format(quantity))
+    if pts.shape[1] != 4 * num_fsp + 1:
+        raise ValueError("pts must have shape (num_ps_pts, 4 * num_fsp + 1).")
+    if num_ps_pts > pts.shape[0]:
+        raise ValueError("num_ps_pts is larger than the number of points.")
 
-    for i in range(num_fsp):
-        for j in range(num_bins):
-            engs[i, j] = (bins[i, j+1] + bins[i, j]) / 2
+    pairs = np.array(pairs, dtype=np.intc).reshape(-1, 2)
+    if np.any(pairs < 0) or np.any(pairs >= num_fsp):
+        raise ValueError("Particle indices must be between 0 and num_fsp.")
+
+    angles = quantity == "cos_angle"
+    pairs_view = pairs
+    values = np.empty((num_ps_pts, pairs.shape[0]), dtype=np.float64)
+    values_view = values
+
+    with nogil:
+        __pair_values(pts_view, num_ps_pts, pairs_view, angles, values_view)
+
+    return values
+
+
+def _spaced_edges(lows, highs, int num_bins, binning):
+    """
+    Returns bin edges between ``lows`` and ``highs`` for the binnings which
+    do not depend on the distribution being binned.
+    """
+    lows = np.asarray(lows, dtype=np.float64)[:, np.newaxis]
+    highs = np.asarray(highs, dtype=np.float64)[:, np.newaxis]
+    fracs = np.linspace(0.0, 1.0, num_bins + 1)
+
+    if binning == "linear":
+        edges = lows + (highs - lows) * fracs
+    elif binning == "endpoint":
+        edges = lows + (highs - lows) * (1.0 - np.cos(np.pi * fracs)) / 2.0
+    elif binning == "log":
+        if np.any(highs <= 0.0):
+            raise ValueError("log binning requires positive energies.")
+        starts = np.maximum(lows, highs * _LOG_BINS_MIN_RATIO)
+        edges = starts * (highs / starts)**fracs
+    elif binning == "quantile":
+        raise ValueError("quantile bins require the distribution to be "
+                         "known.")
+    else:
+        raise ValueError("Unknown binning '{}', expected one of {}.".format(
+            binning, BINNINGS))
+
+    edges[:, 0] = lows[:, 0]
+    edges[:, -1] = highs[:, 0]
+    return edges
+
+
+def quantile_bin_edges(xs, cdfs, int num_bins):
+    """
+    Returns bin edges such that each bin holds the same share of a
+    distribution.
+
+    Parameters
+    ----------
+    xs : numpy.ndarray
+        Increasing energies of each final state particle with shape
+        (num_fsp, num_xs). The edges span ``xs[:, 0]`` to ``xs[:, -1]``.
+    cdfs : numpy.ndarray
+        Cumulative (unnormalized) distributions at ``xs``, with the same
+        shape as ``xs``.
+    num_bins : int
+        Number of bins for each final state particle.
+
+    Returns
+    -------
+    bins : numpy.ndarray
+        Bin edges with shape (num_fsp, num_bins + 1). A small fraction of
+        evenly spaced edges is mixed in so that all bins have nonzero width.
+        If a distribution vanishes, its bins are evenly spaced.
+    """
+    xs = np.asarray(xs, dtype=np.float64)
+    cdfs = np.asarray(cdfs, dtype=np.float64)
+    linear = _spaced_edges(xs[:, 0], xs[:, -1], num_bins, "linear")
+    edges = linear.copy()
+    fracs = np.linspace(0.0, 1.0, num_bins + 1)
+
+    for i in range(xs.shape[0]):
+        total = cdfs[i, -1] - cdfs[i, 0]
+        if total > 0.0:
+            quantiles = np.interp(cdfs[i, 0] + fracs * total, cdfs[i], xs[i])
+            edges[i] = (1.0 - _QUANTILE_MIX) * quantiles + \
+                _QUANTILE_MIX * linear[i]
+
+    edges[:, 0] = xs[:, 0]
+    edges[:, -1] = xs[:, -1]
+    return edges
+
+
+def _sampled_quantile_edges(pts, int num_ps_pts, int num_fsp, lows, highs,
+                            int num_bins):
+    """
+    Returns quantile bin edges between ``lows`` and ``highs`` estimated from
+    the weighted energies of phase space points.
+    """
+    weights = pts[:num_ps_pts, 4 * num_fsp]
+    xs = np.empty((num_fsp, num_ps_pts + 2))
+    cdfs = np.empty((num_fsp, num_ps_pts + 2))
 
     for i in range(num_fsp):
-        for j in range(num_bins):
-            probs[i, 0, j] = engs[i, j]
-            if density is True:
-                probs[i, 1, j] = means[i, j]
-            else:
-                probs[i, 1, j] = means[i, j] / (bins[i, j+1] - bins[i, j])
+        engs = pts[:num_ps_pts, 4 * i]
+        order = np.argsort(engs)
+        xs[i, 0] = lows[i]
+        xs[i, 1:-1] = np.clip(engs[order], lows[i], highs[i])
+        xs[i, -1] = highs[i]
+        cdfs[i, 0] = 0.0
+        cdfs[i, 1:-1] = np.cumsum(weights[order])
+        cdfs[i, -1] = cdfs[i, -2] if num_ps_pts > 0 else 0.0
+
+    return quantile_bin_edges(xs, cdfs, num_bins)
+
+
+def space_to_energy_hist(np.ndarray[np.float64_t, ndim=2] pts, int num_ps_pts,
+                         int num_fsp, int num_bins, density=False,
+                         binning="linear", return_bins=False):
+    """
+    Generates histograms of the energies of the final state particles,
+    binned between the smallest and largest sampled energy of each particle.
+
+    Parameters
+    ----------
+    pts : numpy.ndarray
+        Phase space points with shape (num_ps_pts, 4 * num_fsp + 1).
+    num_ps_pts : int
+        Number of phase space points.
+    num_fsp : int
+        Number of final state particles.
+    num_bins : int
+        Number of bins for each final state particle.
+    density : bool
+        If True, the histograms are normalized to have unit area.
+    binning : str {"linear"]
+        How the bins are spaced: "linear", "log", "endpoint" or "quantile",
+        see the module documentation.
+    return_bins : bool {False]
+        If True, the bin edges are returned as well.
+
+    Returns
+    -------
+    probs : numpy.ndarray
+        Array of shape (num_fsp, 2, num_bins) with the bin centers and
+        the histogram values divided by the bin widths.
+    errs : numpy.ndarray
+        Standard errors of the (not width-divided) histogram values with
+        shape (num_fsp, num_bins).
+    bins : numpy.ndarray
+        Bin edges with shape (num_fsp, num_bins + 1). Only returned if
+        ``return_bins`` is True.
+    """
+    cdef np.ndarray[np.float64_t, ndim=3] probs
+    cdef np.ndarray[np.float64_t, ndim=2] bins, errs
+    cdef np.ndarray elows, ehighs, sums, sums2, norms
+    cdef double[:, :] pts_view
+    cdef double[:] elows_view, ehighs_view
+
+    if pts.shape[1] != 4 * num_fsp + 1:
+        raise ValueError("pts must have shape (num_ps_pts, 4 * num_fsp + 1).")
+    if num_ps_pts > pts.shape[0]:
+        raise ValueError("num_ps_pts is larger than the number of points.")
+
+    if binning not in BINNINGS:
+        raise ValueError("Unknown binning '{}', expected one of {}.".format(
+            binning, BINNINGS))
+
+    probs = np.zeros((num_fsp, 2, num_bins), dtype=np.float64)
+    if num_ps_pts == 0:
+        errs = np.zeros((num_fsp, num_bins), dtype=np.float64)
+        if return_bins:
+            return probs, errs, np.zeros((num_fsp, num_bins + 1))
+        return probs, errs
+
+    elows = np.empty(num_fsp, dtype=np.float64)
+    ehighs = np.empty(num_fsp, dtype=np.float64)
+    pts_view = pts
+    elows_view = elows
+    ehighs_view = ehighs
+
+    with nogil:
+        __energy_ranges(pts_view, num_ps_pts, num_fsp, elows_view,
+                        ehighs_view)
+
+    # Like numpy.histogram, widen empty ranges.
+    empty = elows == ehighs
+    elows[empty] -= 0.5
+    ehighs[empty] += 0.5
+
+    if binning == "quantile":
+        bins = _sampled_quantile_edges(pts, num_ps_pts, num_fsp, elows,
+                                       ehighs, num_bins)
+    else:
+        bins = _spaced_edges(elows, ehighs, num_bins, binning)
+
+    _, sums, sums2 = _fill(pts, num_ps_pts, num_fsp, bins,
+                           binning == "linear")
+
+    errs = np.sqrt(np.maximum(sums2 - sums**2 / num_ps_pts, 0.0)) / num_ps_pts
+    sums /= num_ps_pts
+
+    probs[:, 0, :] = (bins[:, 1:] + bins[:, :-1]) / 2
+    probs[:, 1, :] = sums / np.diff(bins, axis=1)
+
+    if density is True:
+        norms = np.sum(sums, axis=1, keepdims=True)
+        norms[norms == 0.0] = 1.0
+        probs[:, 1, :] /= norms
+        errs /= norms
+
+    if return_bins:
+        return probs, errs, bins
+    return probs, errs
+
+
+def energy_bin_edges(np.ndarray[np.float64_t, ndim=1] masses, double cme,
+                     int num_bins, binning="linear"):
+    """
+    Returns energy bins covering the kinematically allowed energies of each
+    final state particle.
+
+    Unlike ``space_to_energy_hist``, which bins between the smallest and
+    largest sampled energies, these edges are known before any phase space
+    points are generated, which allows histograms to be filled in chunks.
+
+    Parameters
+    ----------
+    masses : numpy.ndarray
+        Masses of the final state particles.
+    cme : double
+        Center of mass energy.
+    num_bins : int
+        Number of bins for each final state particle.
+    binning : str {"linear"]
+        How the bins are spaced: "linear", "log" or "endpoint", see the
+        module documentation. Quantile bins depend on the distribution and
+        are computed with ``quantile_bin_edges``.
+
+    Returns
+    -------
+    bins : numpy.ndarray
+        Bin edges with shape (num_fsp, num_bins + 1). The energy of particle
+        ``i`` ranges from ``m_i`` to
+        ``(cme^2 + m_i^2 - (sum(masses) - m_i)^2) / (2 cme)``.
+    """
+    cdef double msum = np.sum(masses)
+    cdef np.ndarray emaxs
+
+    emaxs = (cme**2 + masses**2 - (msum - masses)**2) / (2.0 * cme)
+
+    return _spaced_edges(masses, emaxs, num_bins, binning)
+
+
+def merge_moments(count, mean, m2, chunk_count, chunk_sum, chunk_sum2):
+    """
+    Merges the sums of a chunk of samples into a running mean and sum of
+    squared deviations (Welford's algorithm, in the pairwise form of Chan et
+    al.). Works elementwise on arrays.
+
+    Parameters
+    ----------
+    count : int
+        Number of samples accumulated so far.
+    mean : double or numpy.ndarray
+        Running mean of the samples.
+    m2 : double or numpy.ndarray
+        Running sum of squared deviations from the mean.
+    chunk_count : int
+        Number of samples in the chunk.
+    chunk_sum : double or numpy.ndarray
+        Sum of the samples in the chunk.
+    chunk_sum2 : double or numpy.ndarray
+        Sum of the squares of the samples in the chunk.
+
+    Returns
+    -------
+    count : int
+        Number of samples including the chunk.
+    mean : double or numpy.ndarray
+        Updated mean.
+    m2 : double or numpy.ndarray
+        Updated sum of squared deviations. The variance of the samples is
+        ``m2 / (count - 1)``.
+    """
+    if chunk_count == 0:
+        return count, mean, m2
+
+    chunk_mean = chunk_sum / chunk_count
+    chunk_m2 = np.maximum(chunk_sum2 - chunk_sum * chunk_mean, 0.0)
+
+    total = count + chunk_count
+    delta = chunk_mean - mean
+    mean = mean + delta * (chunk_count / total)
+    m2 = m2 + chunk_m2 + delta**2 * (count * chunk_count / total)
+
+    return total, mean, m2
+
+
+cdef class RunningEnergyHistogram:
+    """
+    Energy histograms of the final state particles which are filled one
+    chunk of phase space points at a time.
+
+    The bins are fixed by the kinematics (see ``energy_bin_edges``), so
+    chunks can be discarded once they are added. For each bin, the running
+    mean and sum of squared deviations of the per-point contributions are
+    kept, as are those of the weights themselves, which give the integral
+    over phase space. ``counts`` holds the number of points which fell into
+    each bin.
+
+    Parameters
+    ----------
+    masses : numpy.ndarray
+        Masses of the final state particles.
+    cme : double
+        Center of mass energy.
+    num_bins : int
+        Number of bins for each final state particle.
+    binning : str {"linear"]
+        How the bins are spaced: "linear", "log", "endpoint" or "quantile",
+        see the module documentation. Quantile bins are estimated from the
+        first chunk that is added.
+    """
+    cdef readonly int num_fsp
+    cdef readonly int num_bins
+    cdef readonly long count
+    cdef readonly str binning
+    cdef readonly np.ndarray bins
+    cdef readonly np.ndarray counts
+    cdef readonly np.ndarray means
+    cdef readonly np.ndarray m2s
+    cdef readonly double weight_mean
+    cdef readonly double weight_m2
+
+    def __init__(self, masses, double cme, int num_bins, binning="linear"):
+        masses = np.asarray(masses, dtype=np.float64)
+        self.num_fsp = len(masses)
+        self.num_bins = num_bins
+        self.count = 0
+        self.binning = binning
+        if binning == "quantile":
+            # The range is stored until the first chunk fixes the edges.
+            self.bins = energy_bin_edges(masses, cme, 1)
+        else:
+            self.bins = energy_bin_edges(masses, cme, num_bins, binning)
+        self.counts = np.zeros((self.num_fsp, num_bins), dtype=np.int_)
+        self.means = np.zeros((self.num_fsp, num_bins), dtype=np.float64)
+        self.m2s = np.zeros((self.num_fsp, num_bins), dtype=np.float64)
+        self.weight_mean = 0.0
+        self.weight_m2 = 0.0
+
+    def add(self, np.ndarray[np.float64_t, ndim=2] pts, int num_ps_pts):
+        """
+        Adds a chunk of phase space points to the histograms.
+
+        Parameters
+        ----------
+        pts : numpy.ndarray
+            Phase space points with shape (num_ps_pts, 4 * num_fsp + 1).
+        num_ps_pts : int
+            Number of points in the chunk.
+        """
+        cdef np.ndarray[np.float64_t, ndim=1] weights
+        cdef np.ndarray counts, sums, sums2
+
+        if pts.shape[1] != 4 * self.num_fsp + 1:
+            raise ValueError("pts must have shape (num_ps_pts, 4 * num_fsp + 1).")
+        if num_ps_pts > pts.shape[0]:
+            raise ValueError("num_ps_pts is larger than the number of points.")
+
+        if self.bins.shape[1] != self.num_bins + 1:
+            self.bins = _sampled_quantile_edges(
+                pts, num_ps_pts, self.num_fsp, self.bins[:, 0],
+                self.bins[:, -1], self.num_bins)
+
+        counts, sums, sums2 = _fill(pts, num_ps_pts, self.num_fsp, self.bins,
+                                    self.binning == "linear")
+        self.counts += counts
+
+        weights = pts[:num_ps_pts, 4 * self.num_fsp]
+
+        _, self.means, self.m2s = merge_moments(
+            self.count, self.means, self.m2s, num_ps_pts, sums, sums2)
+        self.count, self.weight_mean, self.weight_m2 = merge_moments(
+            self.count, self.weight_mean, self.weight_m2, num_ps_pts,
+            np.sum(weights), np.dot(weights, weights))
+
+    def integral(self):
+        """
+        Returns the average weight of the points added so far and its
+        standard error.
+
+        Returns
+        -------
+        integral : double
+            Average weight.
+        std : double
+            Standard error of the average weight.
+        """
+        if self.count == 0:
+            return 0.0, 0.0
+        return self.weight_mean, np.sqrt(self.weight_m2) / self.count
+
+    def energy_hist(self, density=False):
+        """
+        Returns the energy histograms in the same format as
+        ``space_to_energy_hist``.
+
+        Parameters
+        ----------
+        density : bool
+            If True, the histograms are normalized to have unit area.
+
+        Returns
+        -------
+        probs : numpy.ndarray
+            Array of shape (num_fsp, 2, num_bins) with the bin centers and
+            the histogram values divided by the bin widths.
+        errs : numpy.ndarray
+            Standard errors of the (not width-divided) histogram values with
+            shape (num_fsp, num_bins).
+        """
+        return _running_hist(self.bins, self.count, self.means, self.m2s,
+                             density)
+
+
+def _running_hist(bins, count, means, m2s, density):
+    """
+    Returns histograms in the format of ``space_to_energy_hist`` from the
+    running means and sums of squared deviations of the bin contents.
+    """
+    cdef np.ndarray[np.float64_t, ndim=3] probs
+    cdef np.ndarray[np.float64_t, ndim=2] errs
+    cdef np.ndarray norms
+
+    probs = np.zeros((means.shape[0], 2, means.shape[1]), dtype=np.float64)
+
+    if count == 0:
+        return probs, np.zeros(means.shape, dtype=np.float64)
+
+    errs = np.sqrt(m2s) / count
+
+    probs[:, 0, :] = (bins[:, 1:] + bins[:, :-1]) / 2
+    probs[:, 1, :] = means / np.diff(bins, axis=1)
+
+    if density is True:
+        norms = np.sum(means, axis=1, keepdims=True)
+        norms[norms == 0.0] = 1.0
+        probs[:, 1, :] /= norms
+        errs /= norms
 
     return probs, errs
+
+
+def check_energy_hist(energy_hist, int num_fsp):
+    """
+    Validates energy histograms passed to the gamma ray and positron spectra
+    and normalizes them to unit area.
+
+    Parameters
+    ----------
+    energy_hist : tuple
+        Histograms ``(probs, errs, bins)`` in the format of
+        ``space_to_energy_hist`` with ``return_bins=True``.
+    num_fsp : int
+        Expected number of final state particles.
+
+    Returns
+    -------
+    probs : numpy.ndarray
+        Copy of the histograms normalized to unit area.
+    bins : numpy.ndarray
+        Bin edges.
+    """
+    if len(energy_hist) != 3:
+        raise ValueError("energy_hist must be a tuple (probs, errs, bins).")
+    probs = np.array(energy_hist[0], dtype=np.float64)
+    bins = np.asarray(energy_hist[2], dtype=np.float64)
+
+    if probs.ndim != 3 or probs.shape[0] != num_fsp or probs.shape[1] != 2:
+        raise ValueError(
+            "energy_hist must have shape ({}, 2, num_bins).".format(num_fsp))
+    if bins.shape != (num_fsp, probs.shape[2] + 1):
+        raise ValueError(
+            "The bins of energy_hist must have shape ({}, {}).".format(
+                num_fsp, probs.shape[2] + 1))
+
+    norms = np.sum(probs[:, 1, :] * np.diff(bins, axis=1), axis=1,
+                   keepdims=True)
+    norms[norms == 0.0] = 1.0
+    probs[:, 1, :] /= norms
+
+    return probs, bins
+
+
+cdef class RunningHistogram:
+    """
+    Weighted histograms of several quantities which are filled one chunk of
+    samples at a time, such as the invariant masses of pairs of final state
+    particles. See ``RunningEnergyHistogram``, which does the same for the
+    energies of the final state particles.
+
+    Parameters
+    ----------
+    bins : numpy.ndarray
+        Bin edges of each quantity with shape (num_vals, num_bins + 1).
+    uniform : bool {False]
+        Whether the bins of every quantity are evenly spaced, which allows
+        the bins to be found without bisection.
+    """
+    cdef readonly int num_vals
+    cdef readonly int num_bins
+    cdef readonly long count
+    cdef readonly bint uniform
+    cdef readonly np.ndarray bins
+    cdef readonly np.ndarray counts
+    cdef readonly np.ndarray means
+    cdef readonly np.ndarray m2s
+
+    def __init__(self, bins, uniform=False):
+        self.bins = np.array(bins, dtype=np.float64, ndmin=2)
+        self.num_vals = self.bins.shape[0]
+        self.num_bins = self.bins.shape[1] - 1
+        if self.num_bins < 1:
+            raise ValueError("bins must have shape (num_vals, num_bins + 1).")
+        self.uniform = uniform
+        self.count = 0
+        self.counts = np.zeros((self.num_vals, self.num_bins), dtype=np.int_)
+        self.means = np.zeros((self.num_vals, self.num_bins), dtype=np.float64)
+        self.m2s = np.zeros((self.num_vals, self.num_bins), dtype=np.float64)
+
+    def add(self, values, weights):
+        """
+        Adds a chunk of weighted samples to the histograms.
+
+        Parameters
+        ----------
+        values : numpy.ndarray
+            Values of the quantities with shape (num_pts, num_vals).
+        weights : numpy.ndarray
+            Weights of the samples with shape (num_pts,).
+        """
+        cdef np.ndarray counts, sums, sums2
+        cdef int num_pts = len(weights)
+
+        counts, sums, sums2 = _fill_values(values, weights, num_pts, self.bins,
+                                           self.uniform)
+        self.counts += counts
+        self.count, self.means, self.m2s = merge_moments(
+            self.count, self.means, self.m2s, num_pts, sums, sums2)
+
+    def hist(self, density=False):
+        """
+        Returns the histograms in the same format as
+        ``space_to_energy_hist``.
+
+        Parameters
+        ----------
+        density : bool
+            If True, the histograms are normalized to have unit area.
+
+        Returns
+        -------
+        probs : numpy.ndarray
+            Array of shape (num_vals, 2, num_bins) with the bin centers and
+            the histogram values divided by the bin widths.
+        errs : numpy.ndarray
+            Standard errors of the (not width-divided) histogram values with
+            shape (num_vals, num_bins).
+        """
+        return _running_hist(self.bins, self.count, self.means, self.m2s,
+                             density)
@@ -2,6 +2,9 @@ import numpy as np
 cimport numpy as np
 import cython
 import warnings
+from hazma.phase_space_helper_functions.compiled_msqrd cimport (
+    CompiledMatrixElement, c_apply_compiled)
+from hazma.decay_helper_functions.threads cimport num_threads
 
 ctypedef np.float64_t DBL_T
 
@@ -24,6 +27,13 @@ cdef np.ndarray[DBL_T, ndim=2] split_point(np.ndarray[DBL_T, ndim=1] l,
     return kList
 
 
+def warn_negative_msqrd():
+    """
+    Warns that a squared matrix element was negative at some phase space
+    points.
+    """
+    warnings.warn('Negative matrix element squared encountered...')
+
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
@@ -31,13 +41,53 @@ def apply_matrix_elem(np.ndarray[DBL_T, ndim=2] pts, int num_ps_pts,
                       int num_fsp, mat_elem_sqrd):
     """
     Applies the matrix element squared to the weights.
+
+    If ``mat_elem_sqrd`` has a true ``vectorized`` attribute (see
+    ``hazma.rambo.vectorized``), it is called once with all of the momenta,
+    an array of shape (num_ps_pts, num_fsp, 4), and must return an array of
+    shape (num_ps_pts,). Otherwise it is called once per phase space point
+    with an array of shape (num_fsp, 4). A compiled squared matrix element
+    (see ``hazma.phase_space_helper_functions.compiled_msqrd``) is evaluated
+    without the GIL.
     """
     cdef int i
+    cdef int num_negative
+    cdef int nt
     cdef double mat_elem2
+    cdef np.ndarray momenta
+    cdef np.ndarray mat_elem2s
+    cdef double[:, :] pts_view
+    cdef CompiledMatrixElement compiled
+
+    if isinstance(mat_elem_sqrd, CompiledMatrixElement) and \
+            pts.strides[1] == sizeof(double):
+        compiled = mat_elem_sqrd
+        if compiled.num_fsp not in (0, num_fsp):
+            raise ValueError("'{}' expects {} final state particles.".format(
+                compiled.name, compiled.num_fsp))
+        pts_view = pts
+        nt = num_threads(num_ps_pts)
+        with nogil:
+            num_negative = c_apply_compiled(compiled, pts_view, num_ps_pts,
+                                            num_fsp, nt)
+        if num_negative > 0:
+            warn_negative_msqrd()
+        return pts
+
+    if getattr(mat_elem_sqrd, "vectorized", False):
+        momenta = pts[:num_ps_pts, :4 * num_fsp].reshape(
+            (num_ps_pts, num_fsp, 4))
+        mat_elem2s = np.broadcast_to(
+            np.asarray(mat_elem_sqrd(momenta), dtype=np.float64),
+            (num_ps_pts,))
+        if np.any(mat_elem2s < 0):
+            warn_negative_msqrd()
+        pts[:num_ps_pts, 4 * num_fsp] *= mat_elem2s
+        return pts
 
     for i in range(num_ps_pts):
         mat_elem2 = mat_elem_sqrd(split_point(pts[i], num_fsp))
         if mat_elem2 < 0:
-            warnings.warn('Negative matrix element squared encountered...')
+            warn_negative_msqrd()
         pts[i, 4 * num_fsp] = pts[i, 4 * num_fsp] * mat_elem2
     return pts
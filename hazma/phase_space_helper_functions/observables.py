@@ -0,0 +1,184 @@
+"""
+Observables which are accumulated from the phase space points of a single
+RAMBO run, see ``hazma.rambo.generate_observables``.
+
+An observable is an object with three methods:
+
+* ``start(masses, cme)``, called before any points are added,
+* ``add(pts, num_ps_pts)``, called with each chunk of phase space points in
+  the format of ``hazma.rambo.generate_phase_space``,
+* ``result(density)``, which returns the accumulated result.
+
+The observables defined here are histograms, whose results are tuples
+``(probs, errs, bins)`` in the format of
+``hazma.rambo.generate_energy_histogram`` with ``return_bins=True``: the bin
+centers and values divided by the bin widths, the errors of the bin
+contents and the bin edges, with one histogram per particle or per pair of
+particles.
+
+Examples
+--------
+
+Get the energy histograms and the pi+ pi- invariant mass distribution from
+the same phase space points::
+
+    from hazma import rambo
+    from hazma.phase_space_helper_functions import observables
+    results = rambo.generate_observables(
+        [mpi, mpi, mpi0], 1000.0,
+        {"energy": observables.EnergyHistogram(num_bins=25),
+         "mpipi": observables.InvariantMassHistogram([(0, 1)], num_bins=50)},
+        num_ps_pts=10**6, density=True)
+    probs, errs, bins = results["mpipi"]
+
+"""
+# author : Logan Morrison and Adam Coogan
+# date : October 2026
+
+import itertools
+
+import numpy as np
+
+from hazma.phase_space_helper_functions import histogram
+
+
+class EnergyHistogram:
+    """
+    Histograms of the energies of the final state particles, binned over the
+    kinematically allowed range (see ``histogram.energy_bin_edges``). The
+    result can be passed as ``energy_hist`` to ``hazma.gamma_ray`` and
+    ``hazma.positron_spectra`` functions.
+
+    Parameters
+    ----------
+    num_bins : int {25]
+        Number of bins for each final state particle.
+    binning : str {"linear"]
+        How the bins are spaced: "linear", "log", "endpoint" or "quantile",
+        see ``hazma.rambo.generate_energy_histogram``.
+    """
+
+    def __init__(self, num_bins=25, binning="linear"):
+        if binning not in histogram.BINNINGS:
+            raise ValueError(
+                "Unknown binning '{}', expected one of {}.".format(
+                    binning, histogram.BINNINGS
+                )
+            )
+        self.num_bins = num_bins
+        self.binning = binning
+        self._hist = None
+
+    def start(self, masses, cme):
+        self._hist = histogram.RunningEnergyHistogram(
+            np.asarray(masses, dtype=np.float64), cme, self.num_bins, self.binning
+        )
+
+    def add(self, pts, num_ps_pts):
+        self._hist.add(pts, num_ps_pts)
+
+    def result(self, density=False):
+        probs, errs = self._hist.energy_hist(density=density)
+        return probs, errs, self._hist.bins
+
+
+class _PairHistogram:
+    """
+    Histograms of a quantity computed from pairs of final state particles.
+    """
+
+    quantity = None
+    binnings = ("linear", "endpoint")
+
+    def __init__(self, pairs=None, num_bins=25, binning="linear"):
+        if binning not in self.binnings:
+            raise ValueError(
+                "Unknown binning '{}', expected one of {}.".format(
+                    binning, self.binnings
+                )
+            )
+        self.pairs = pairs
+        self.num_bins = num_bins
+        self.binning = binning
+        self._hist = None
+        self._pairs = None
+        self._num_fsp = 0
+
+    def _ranges(self, masses, cme, pairs):
+        raise NotImplementedError()
+
+    def start(self, masses, cme):
+        masses = np.asarray(masses, dtype=np.float64)
+        self._num_fsp = len(masses)
+        if self.pairs is None:
+            pairs = list(itertools.combinations(range(self._num_fsp), 2))
+        else:
+            pairs = self.pairs
+        self._pairs = np.array(pairs, dtype=np.intc).reshape(-1, 2)
+        if np.any(self._pairs < 0) or np.any(self._pairs >= self._num_fsp):
+            raise ValueError("Particle indices must be between 0 and num_fsp.")
+
+        lows, highs = self._ranges(masses, cme, self._pairs)
+        bins = histogram._spaced_edges(lows, highs, self.num_bins, self.binning)
+        self._hist = histogram.RunningHistogram(
+            bins, uniform=self.binning == "linear"
+        )
+
+    def add(self, pts, num_ps_pts):
+        values = histogram.pair_values(
+            pts, num_ps_pts, self._num_fsp, self._pairs, self.quantity
+        )
+        self._hist.add(values, pts[:num_ps_pts, 4 * self._num_fsp])
+
+    def result(self, density=False):
+        probs, errs = self._hist.hist(density=density)
+        return probs, errs, self._hist.bins
+
+
+class InvariantMassHistogram(_PairHistogram):
+    """
+    Histograms of the invariant masses of pairs of final state particles,
+    binned over the kinematically allowed range.
+
+    Parameters
+    ----------
+    pairs : array_like {None]
+        Indices of the particles in each pair, with shape (num_pairs, 2). If
+        None, all pairs are used, in the order (0, 1), (0, 2), ...,
+        (1, 2), ...
+    num_bins : int {25]
+        Number of bins for each pair.
+    binning : str {"linear"]
+        How the bins are spaced: "linear", "log" or "endpoint".
+    """
+
+    quantity = "invariant_mass"
+    binnings = ("linear", "log", "endpoint")
+
+    def _ranges(self, masses, cme, pairs):
+        lows = masses[pairs[:, 0]] + masses[pairs[:, 1]]
+        highs = cme - (np.sum(masses) - lows)
+        return lows, highs
+
+
+class OpeningAngleHistogram(_PairHistogram):
+    """
+    Histograms of the cosine of the opening angle between pairs of final
+    state particles in the center of mass frame.
+
+    Parameters
+    ----------
+    pairs : array_like {None]
+        Indices of the particles in each pair, with shape (num_pairs, 2). If
+        None, all pairs are used, in the order (0, 1), (0, 2), ...,
+        (1, 2), ...
+    num_bins : int {25]
+        Number of bins for each pair.
+    binning : str {"linear"]
+        How the bins are spaced: "linear" or "endpoint".
+    """
+
+    quantity = "cos_angle"
+
+    def _ranges(self, masses, cme, pairs):
+        return -np.ones(len(pairs)), np.ones(len(pairs))
@@ -0,0 +1,331 @@
+"""
+Deterministic phase space points for two and three final state particles.
+
+For two final state particles, the energies and magnitudes of the momenta
+are fixed and only the orientation of the event is free. For three, the
+phase space reduces to an integral over the Dalitz plane, parametrized by
+the invariant masses ``s = (p2 + p3)^2`` and ``t = (p1 + p3)^2`` (see
+``hazma.field_theory_helper_functions.three_body_phase_space``), and the
+orientation. Instead of sampling these randomly, the functions in this
+module place points at the nodes of Gauss-Legendre quadrature rules. The
+points are in the format of ``hazma.rambo.generate_phase_space``, except
+that the weights are quadrature weights: the integral over phase space is
+the *sum* of the weights times the squared matrix element.
+
+All points are generated in a fixed orientation. Matrix elements which
+depend on the orientation (e.g. on the angle to a beam axis) can be averaged
+over the rotations returned by ``rotations`` using ``rotate_space``.
+
+* Author - Logan A. Morrison and Adam Coogan
+* Date - October 2026
+"""
+
+import numpy as np
+cimport numpy as np
+import cython
+from numpy.polynomial.legendre import leggauss
+
+from hazma.field_theory_helper_functions.three_body_phase_space import (
+    phase_space_prefactor,
+    s_max,
+    s_min,
+)
+
+
+def gauss_legendre(int num_nodes, double a, double b):
+    """
+    Returns the nodes and weights of the Gauss-Legendre quadrature rule on
+    the interval [a, b].
+
+    Parameters
+    ----------
+    num_nodes : int
+        Number of nodes. The rule is exact for polynomials of degree up to
+        ``2 * num_nodes - 1``.
+    a, b : double
+        Limits of the interval.
+
+    Returns
+    -------
+    nodes : numpy.ndarray
+        Nodes of the rule.
+    weights : numpy.ndarray
+        Weights of the rule.
+    """
+    nodes, weights = leggauss(num_nodes)
+    return a + (b - a) * (nodes + 1.0) / 2.0, weights * (b - a) / 2.0
+
+
+def rotation_matrix(double alpha, double beta, double gamma):
+    """
+    Returns the rotation matrix R_z(alpha) R_y(beta) R_z(gamma).
+
+    Parameters
+    ----------
+    alpha, beta, gamma : double
+        Euler angles.
+
+    Returns
+    -------
+    rot : numpy.ndarray
+        Rotation matrix with shape (3, 3).
+    """
+    ca, sa = np.cos(alpha), np.sin(alpha)
+    cb, sb = np.cos(beta), np.sin(beta)
+    cg, sg = np.cos(gamma), np.sin(gamma)
+    rz_a = np.array([[ca, -sa, 0.0], [sa, ca, 0.0], [0.0, 0.0, 1.0]])
+    ry_b = np.array([[cb, 0.0, sb], [0.0, 1.0, 0.0], [-sb, 0.0, cb]])
+    rz_g = np.array([[cg, -sg, 0.0], [sg, cg, 0.0], [0.0, 0.0, 1.0]])
+    return rz_a.dot(ry_b).dot(rz_g)
+
+
+def rotations(int num_angles):
+    """
+    Returns rotations and weights for averaging over orientations.
+
+    The Euler angles alpha and gamma are placed on ``num_angles`` evenly
+    spaced nodes and cos(beta) on the nodes of a Gauss-Legendre rule, which
+    integrates functions of the orientation exactly up to angular momentum
+    ``num_angles - 1``.
+
+    Parameters
+    ----------
+    num_angles : int
+        Number of nodes for each Euler angle.
+
+    Returns
+    -------
+    rots : numpy.ndarray
+        Rotation matrices with shape (num_angles**3, 3, 3).
+    weights : numpy.ndarray
+        Weights of the rotations, which sum to one.
+    """
+    cdef int i, j, k, n
+    cdef np.ndarray rots, weights
+
+    angles = 2.0 * np.pi * np.arange(num_angles) / num_angles
+    cos_betas, beta_weights = gauss_legendre(num_angles, -1.0, 1.0)
+
+    rots = np.empty((num_angles**3, 3, 3), dtype=np.float64)
+    weights = np.empty(num_angles**3, dtype=np.float64)
+    n = 0
+    for i in range(num_angles):
+        for j in range(num_angles):
+            for k in range(num_angles):
+                rots[n] = rotation_matrix(
+                    angles[i], np.arccos(cos_betas[j]), angles[k])
+                weights[n] = beta_weights[j] / (2.0 * num_angles**2)
+                n += 1
+
+    return rots, weights
+
+
+def rotate_space(np.ndarray[np.float64_t, ndim=2] points, int num_fsp, rots):
+    """
+    Returns copies of phase space points rotated by each of the rotations.
+
+    Parameters
+    ----------
+    points : numpy.ndarray
+        Phase space points with shape (num_ps_pts, 4 * num_fsp + 1).
+    num_fsp : int
+        Number of final state particles.
+    rots : numpy.ndarray
+        Rotation matrices with shape (num_rots, 3, 3).
+
+    Returns
+    -------
+    rotated : numpy.ndarray
+        Rotated points with shape (num_rots * num_ps_pts, 4 * num_fsp + 1).
+        The points rotated by ``rots[k]`` are
+        ``rotated[k * num_ps_pts:(k + 1) * num_ps_pts]``. The weights are
+        copied unchanged.
+    """
+    cdef int num_ps_pts = points.shape[0]
+    cdef int num_rots = len(rots)
+    cdef np.ndarray momenta, rotated_momenta, rotated
+
+    momenta = points[:, :4 * num_fsp].reshape((num_ps_pts, num_fsp, 4))
+    rotated_momenta = np.empty((num_rots, num_ps_pts, num_fsp, 4))
+    rotated_momenta[..., 0] = momenta[..., 0]
+    rotated_momenta[..., 1:] = np.einsum("kab,npb->knpa", rots, momenta[..., 1:])
+
+    rotated = np.empty((num_rots * num_ps_pts, 4 * num_fsp + 1))
+    rotated[:, :4 * num_fsp] = rotated_momenta.reshape(
+        (num_rots * num_ps_pts, 4 * num_fsp))
+    rotated[:, 4 * num_fsp] = np.tile(points[:, 4 * num_fsp], num_rots)
+
+    return rotated
+
+
+def graded_edges(edges, int num_levels=6, double ratio=4.0):
+    """
+    Subdivides the first and last of a set of intervals geometrically towards
+    the ends of the full range.
+
+    Integrands over the Dalitz plane can vary on scales much smaller than an
+    energy bin near the ends of the range of ``s``, e.g. on the scale of a
+    small mass. Geometric subdivision resolves such boundary layers with a
+    fixed number of nodes per sub-interval.
+
+    Parameters
+    ----------
+    edges : numpy.ndarray
+        Increasing edges of the intervals.
+    num_levels : int
+        Number of subdivisions at each end.
+    ratio : double
+        Ratio of the widths of consecutive sub-intervals.
+
+    Returns
+    -------
+    new_edges : numpy.ndarray
+        Increasing edges of the sub-intervals.
+    starts : numpy.ndarray
+        Index of the first sub-interval of each of the original intervals,
+        e.g. for use with ``numpy.add.reduceat``.
+    """
+    edges = np.asarray(edges, dtype=np.float64)
+    cdef int num_intervals = len(edges) - 1
+    fracs = ratio**(-np.arange(num_levels, 0, -1, dtype=np.float64))
+    if num_intervals == 1:
+        fracs = fracs / 2.0
+
+    lower = edges[0] + (edges[1] - edges[0]) * fracs
+    upper = edges[-1] - (edges[-1] - edges[-2]) * fracs[::-1]
+    new_edges = np.concatenate([edges[:1], lower, edges[1:-1], upper, edges[-1:]])
+
+    starts = np.arange(num_intervals) + num_levels
+    starts[0] = 0
+    return new_edges, starts
+
+
+@cython.cdivision(True)
+def two_body_space(masses, double cme):
+    """
+    Returns the phase space point of a two-body final state.
+
+    Parameters
+    ----------
+    masses : numpy.ndarray
+        Masses of the two final state particles.
+    cme : double
+        Center of mass energy.
+
+    Returns
+    -------
+    points : numpy.ndarray
+        Array of shape (1, 9) with the momenta of the particles, back to
+        back along the z-axis, and the two-body phase space volume
+        ``|p| / (4 pi cme)`` as the weight.
+    """
+    cdef double m1 = masses[0]
+    cdef double m2 = masses[1]
+    cdef double e1 = (cme**2 + m1**2 - m2**2) / (2.0 * cme)
+    cdef double p = np.sqrt(max(e1**2 - m1**2, 0.0))
+
+    return np.array([[e1, 0.0, 0.0, p, cme - e1, 0.0, 0.0, -p,
+                      p / (4.0 * np.pi * cme)]])
+
+
+@cython.cdivision(True)
+def three_body_space(masses, double cme, int num_s, int num_t, s_edges=None,
+                     int particle=0):
+    """
+    Returns phase space points of a three-body final state at the nodes of
+    Gauss-Legendre rules over the Dalitz plane.
+
+    Parameters
+    ----------
+    masses : numpy.ndarray
+        Masses of the three final state particles.
+    cme : double
+        Center of mass energy.
+    num_s : int
+        Number of nodes in ``s = (P - p_particle)^2`` in each interval.
+    num_t : int
+        Number of nodes in ``t`` for each value of ``s``.
+    s_edges : numpy.ndarray, optional
+        Increasing edges of the intervals in ``s`` to use. By default, the
+        full range of ``s`` is a single interval. Since the energy of
+        ``particle`` is linear in ``s``, intervals can be chosen to match
+        energy bins.
+    particle : int
+        Index of the particle whose energy is fixed by ``s``.
+
+    Returns
+    -------
+    points : numpy.ndarray
+        Array of shape (num_intervals * num_s * num_t, 13). The points of
+        the ``k``-th interval are
+        ``points[k * num_s * num_t:(k + 1) * num_s * num_t]``.
+    """
+    cdef int num_intervals
+    cdef double m1, m2, m3, s_lo, s_hi
+    cdef np.ndarray s, t, weights
+
+    order = [particle] + [i for i in range(3) if i != particle]
+    m1, m2, m3 = [masses[i] for i in order]
+
+    s_lo = s_min(m1, m2, m3, cme)
+    s_hi = s_max(m1, m2, m3, cme)
+    if s_edges is None:
+        s_edges = [s_lo, s_hi]
+    num_intervals = len(s_edges) - 1
+
+    # The nodes in s are placed in theta, where
+    # s = s_lo + (s_hi - s_lo) * (1 - cos(theta)) / 2, which removes the
+    # square root behavior of the integrand at the ends of the range of s.
+    theta_edges = np.arccos(np.clip(
+        1.0 - 2.0 * (np.asarray(s_edges) - s_lo) / (s_hi - s_lo), -1.0, 1.0))
+    x, x_weights = leggauss(num_s)
+    half_widths = np.diff(theta_edges)[:, np.newaxis] / 2.0
+    thetas = (theta_edges[:-1, np.newaxis] + half_widths * (x + 1.0)).ravel()
+    s_weights = (half_widths * x_weights).ravel() * (
+        (s_hi - s_lo) / 2.0 * np.sin(thetas))
+    s_nodes = s_lo + (s_hi - s_lo) * (1.0 - np.cos(thetas)) / 2.0
+
+    # For each s, the nodes in t span the range between the boundary curves
+    # ``t_lim1`` and ``t_lim2``.
+    lam1 = np.maximum(cme**4 + (m1**2 - s_nodes)**2 -
+                      2.0 * cme**2 * (m1**2 + s_nodes), 0.0)
+    lam2 = np.maximum(m2**4 + (m3**2 - s_nodes)**2 -
+                      2.0 * m2**2 * (m3**2 + s_nodes), 0.0)
+    t_mid = ((cme**2 + m1**2 + m2**2 + m3**2) * s_nodes - s_nodes**2 -
+             (cme**2 - m1**2) * (m2**2 - m3**2)) / (2.0 * s_nodes)
+    t_half = np.sqrt(lam1 * lam2) / (2.0 * s_nodes)
+    y, y_weights = leggauss(num_t)
+
+    s = np.repeat(s_nodes, num_t)
+    t = (t_mid[:, np.newaxis] + t_half[:, np.newaxis] * y).ravel()
+    weights = phase_space_prefactor(cme) * (
+        (s_weights * t_half)[:, np.newaxis] * y_weights).ravel()
+
+    # Build the momenta with particle 1 along the z-axis and particle 2 in
+    # the x-z plane.
+    e1 = (cme**2 + m1**2 - s) / (2.0 * cme)
+    e2 = (cme**2 + m2**2 - t) / (2.0 * cme)
+    e3 = cme - e1 - e2
+    p1 = np.sqrt(np.maximum(e1**2 - m1**2, 0.0))
+    p2 = np.sqrt(np.maximum(e2**2 - m2**2, 0.0))
+    p3 = np.sqrt(np.maximum(e3**2 - m3**2, 0.0))
+    denom = 2.0 * p1 * p2
+    cos12 = np.clip((p3**2 - p1**2 - p2**2) / np.where(denom > 0.0, denom, 1.0),
+                    -1.0, 1.0)
+    sin12 = np.sqrt(1.0 - cos12**2)
+
+    momenta = np.zeros((len(s), 3, 4), dtype=np.float64)
+    momenta[:, order[0], 0] = e1
+    momenta[:, order[0], 3] = p1
+    momenta[:, order[1], 0] = e2
+    momenta[:, order[1], 1] = p2 * sin12
+    momenta[:, order[1], 3] = p2 * cos12
+    momenta[:, order[2], 0] = e3
+    momenta[:, order[2], 1] = -p2 * sin12
+    momenta[:, order[2], 3] = -p1 - p2 * cos12
+
+    points = np.empty((len(s), 13), dtype=np.float64)
+    points[:, :12] = momenta.reshape((len(s), 12))
+    points[:, 12] = weights
+
+    return points
@@ -0,0 +1,261 @@
+"""
+Adaptive importance sampling of the unit hypercube (VEGAS).
+
+The map of Lepage (J. Comput. Phys. 27, 192 (1978)) transforms uniformly
+distributed points y in the unit hypercube into points x whose density is
+concentrated where the integrand is large. Each dimension is split into
+increments which are resized between iterations so that every increment
+contributes equally to the variance of the integral. Used by ``hazma.rambo``
+to importance sample the random numbers fed to RAMBO.
+
+* Author - Logan A. Morrison and Adam Coogan
+* Date - October 2026
+"""
+
+import numpy as np
+cimport numpy as np
+from libc.math cimport log, pow
+import cython
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef void __map_points(double[:, :] grid, double[:, :] y, double[:, :] x,
+                       double[:] jac) nogil:
+    """
+    Maps points from the unit hypercube using the piecewise linear map
+    defined by the increment edges in ``grid``.
+    """
+    cdef int i, d, k
+    cdef int num_pts = y.shape[0]
+    cdef int num_dims = y.shape[1]
+    cdef int num_incs = grid.shape[1] - 1
+    cdef double yk, frac, width
+
+    for i in range(num_pts):
+        jac[i] = 1.0
+        for d in range(num_dims):
+            yk = y[i, d] * num_incs
+            k = <int>yk
+            if k >= num_incs:
+                k = num_incs - 1
+            frac = yk - k
+            width = grid[d, k + 1] - grid[d, k]
+            x[i, d] = grid[d, k] + width * frac
+            jac[i] *= width * num_incs
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef void __accumulate(double[:, :] y, double[:] fs, double[:, :] sums) nogil:
+    """
+    Adds the squared integrand values to the increments containing the
+    points.
+    """
+    cdef int i, d, k
+    cdef int num_pts = y.shape[0]
+    cdef int num_dims = y.shape[1]
+    cdef int num_incs = sums.shape[1]
+    cdef double f2
+
+    for i in range(num_pts):
+        f2 = fs[i] * fs[i]
+        for d in range(num_dims):
+            k = <int>(y[i, d] * num_incs)
+            if k >= num_incs:
+                k = num_incs - 1
+            sums[d, k] += f2
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef void __refine(double[:] edges, double[:] sums, double alpha,
+                   double[:] new_edges) nogil:
+    """
+    Computes new increment edges for a single dimension.
+
+    The accumulated values are smoothed over neighbouring increments,
+    compressed using the damping exponent ``alpha`` and then the edges are
+    moved so that each new increment holds the same share.
+    """
+    cdef int i, k
+    cdef int num_incs = sums.shape[0]
+    cdef double total = 0.0
+    cdef double share, acc, need, di
+
+    # Smooth the accumulated values and normalize them.
+    if num_incs == 1:
+        return
+    new_edges[0] = (3.0 * sums[0] + sums[1]) / 4.0
+    for i in range(1, num_incs - 1):
+        new_edges[i] = (sums[i - 1] + 6.0 * sums[i] + sums[i + 1]) / 8.0
+    new_edges[num_incs - 1] = (sums[num_incs - 2] +
+                               3.0 * sums[num_incs - 1]) / 4.0
+    for i in range(num_incs):
+        total += new_edges[i]
+    if total <= 0.0:
+        for i in range(num_incs + 1):
+            new_edges[i] = edges[i]
+        return
+
+    # Damp the weights to avoid rapid, unstable changes of the grid. The
+    # damped weights are stored in sums, which is reset afterwards anyways.
+    for i in range(num_incs):
+        di = new_edges[i] / total
+        if di > 0.0 and di < 1.0:
+            sums[i] = pow((1.0 - di) / log(1.0 / di), alpha)
+        elif di >= 1.0:
+            sums[i] = 1.0
+        else:
+            sums[i] = 0.0
+
+    total = 0.0
+    for i in range(num_incs):
+        total += sums[i]
+    share = total / num_incs
+
+    # Move the edges so that each increment holds the same damped weight.
+    new_edges[0] = edges[0]
+    new_edges[num_incs] = edges[num_incs]
+    k = 0
+    acc = 0.0
+    for i in range(1, num_incs):
+        need = share * i
+        while acc + sums[k] < need and k < num_incs - 1:
+            acc += sums[k]
+            k += 1
+        if sums[k] > 0.0:
+            new_edges[i] = edges[k] + (need - acc) / sums[k] * (
+                edges[k + 1] - edges[k])
+        else:
+            new_edges[i] = edges[k]
+
+
+cdef class VegasMap:
+    """
+    Adaptive map of the unit hypercube onto itself.
+
+    Parameters
+    ----------
+    num_dims : int
+        Number of dimensions.
+    num_incs : int
+        Number of increments in each dimension.
+
+    Examples
+    --------
+
+    Train a map on an integrand peaked at the center of the unit square::
+
+        import numpy as np
+        from hazma.phase_space_helper_functions.vegas import VegasMap
+        vmap = VegasMap(2)
+        f = lambda x: np.exp(-100 * np.sum((x - 0.5)**2, axis=1))
+        for _ in range(5):
+            y = np.random.rand(10000, 2)
+            x, jac = vmap.map(y)
+            vmap.add_training_data(y, f(x) * jac)
+            vmap.adapt()
+
+    """
+    cdef readonly int num_dims
+    cdef readonly int num_incs
+    cdef readonly np.ndarray grid
+    cdef np.ndarray sums
+
+    def __init__(self, int num_dims, int num_incs=50):
+        if num_dims < 1 or num_incs < 1:
+            raise ValueError("num_dims and num_incs must be positive.")
+        self.num_dims = num_dims
+        self.num_incs = num_incs
+        self.grid = np.tile(np.linspace(0.0, 1.0, num_incs + 1), (num_dims, 1))
+        self.sums = np.zeros((num_dims, num_incs), dtype=np.float64)
+
+    def map(self, y):
+        """
+        Maps points from the unit hypercube.
+
+        Parameters
+        ----------
+        y : numpy.ndarray
+            Points in the unit hypercube with shape (num_pts, num_dims).
+
+        Returns
+        -------
+        x : numpy.ndarray
+            Mapped points with shape (num_pts, num_dims).
+        jac : numpy.ndarray
+            Jacobian of the map, dx/dy, at each point. The integral of f(x)
+            over the hypercube is the average of f(x) * jac over uniformly
+            distributed y.
+        """
+        cdef double[:, :] y_view = np.asarray(y, dtype=np.float64)
+        cdef double[:, :] grid_view = self.grid
+        cdef double[:, :] x_view
+        cdef double[:] jac_view
+
+        if y_view.shape[1] != self.num_dims:
+            raise ValueError("y must have shape (num_pts, num_dims).")
+
+        x = np.empty((y_view.shape[0], self.num_dims), dtype=np.float64)
+        jac = np.empty(y_view.shape[0], dtype=np.float64)
+        x_view = x
+        jac_view = jac
+
+        with nogil:
+            __map_points(grid_view, y_view, x_view, jac_view)
+
+        return x, jac
+
+    def add_training_data(self, y, fs):
+        """
+        Accumulates integrand values used to refine the map in ``adapt``.
+
+        Parameters
+        ----------
+        y : numpy.ndarray
+            Points in the unit hypercube, before mapping, with shape
+            (num_pts, num_dims).
+        fs : numpy.ndarray
+            Integrand values times the Jacobian of the map at the points.
+        """
+        cdef double[:, :] y_view = np.asarray(y, dtype=np.float64)
+        cdef double[:] fs_view = np.asarray(fs, dtype=np.float64)
+        cdef double[:, :] sums_view = self.sums
+
+        if y_view.shape[1] != self.num_dims:
+            raise ValueError("y must have shape (num_pts, num_dims).")
+        if fs_view.shape[0] != y_view.shape[0]:
+            raise ValueError("y and fs have inconsistent num_pts.")
+
+        with nogil:
+            __accumulate(y_view, fs_view, sums_view)
+
+    def adapt(self, double alpha=0.5):
+        """
+        Refines the map using the accumulated training data, then discards
+        the training data.
+
+        Parameters
+        ----------
+        alpha : double
+            Damping exponent. Smaller values change the map more slowly;
+            ``alpha = 0`` leaves the map unchanged.
+        """
+        cdef int d
+        cdef double[:, :] grid_view = self.grid
+        cdef double[:, :] sums_view = self.sums
+        cdef np.ndarray new_grid = np.empty_like(self.grid)
+        cdef double[:, :] new_view = new_grid
+
+        if alpha > 0.0:
+            with nogil:
+                for d in range(self.num_dims):
+                    __refine(grid_view[d], sums_view[d], alpha, new_view[d])
+            if self.num_incs > 1:
+                self.grid = new_grid
+
+        self.sums[:, :] = 0.0
@@ -1,9 +1,11 @@
 from hazma.positron_helper_functions.positron_muon cimport CSpectrum as muspec
-from scipy.integrate import quad
+from hazma.decay_helper_functions.integrate cimport gauss_kronrod_points, interp
 from libc.math cimport sqrt, pow, log10
 import numpy as np
 cimport numpy as np
 import cython
+from cython.parallel cimport prange
+from hazma.decay_helper_functions.threads cimport num_threads
 
 include "parameters.pxd"
 
@@ -19,12 +21,23 @@ cdef double gamma_mu = eng_mu_pi_rf / mmu
 cdef double eng_p_max_mu_rf = (me * me + mmu * mmu) / (2.0 * mmu)
 cdef double eng_p_max_pi_rf = eng_p_max_mu_rf * gamma_mu * (1.0 + beta_mu)
 
-# TODO: Really?? 10000 pts?
+# Error goals and maximum number of bisections of the boost integral
+cdef double EPSABS = 1e-10
+cdef double EPSREL = 1e-6
+cdef int MAX_DEPTH = 20
+
+ctypedef struct __BoostParams:
+    double eng_p
+    double eng_pi
+
+# Positron spectrum of the muon in the pion rest frame
 eng_ps_mu = np.logspace(log10(me), log10(eng_p_max_pi_rf), num=500, dtype=np.float64)
 
 cdef np.ndarray __muspec = muspec(eng_ps_mu, eng_mu_pi_rf)
+cdef double[::1] __eng_ps_mu_view = eng_ps_mu
+cdef double[::1] __muspec_view = __muspec
 
-cdef double __muon_spectrum(double eng_p):
+cdef double __muon_spectrum(double eng_p) nogil:
     """
     Returns the muon spectrum in the pion rest frame.
 
@@ -38,19 +51,21 @@ cdef double __muon_spectrum(double eng_p):
     dnde_mu : double
         Value of muon positron spectrum at an positron energy of `eng_p`
     """
-    return np.interp(eng_p, eng_ps_mu, __muspec)
+    return interp(eng_p, &__eng_ps_mu_view[0], &__muspec_view[0],
+                  __eng_ps_mu_view.shape[0])
 
 @cython.cdivision(True)
-cdef double __integrand(double cl, double eng_p, double eng_pi):
+cdef double __integrand(double cl, void* params) nogil:
     """
     Returns the integrand of the boost integral at a given angle.
 
     Parameters
     ----------
-    eng_p : double
-        Energy of the positron.
-    eng_pi : double
-        Energy of the pion.
+    cl : double
+        Angle the positron makes with the z-axis.
+    params : void*
+        Pointer to a __BoostParams struct holding the energies of the
+        positron and of the pion.
 
     Returns
     -------
@@ -58,6 +73,9 @@ cdef double __integrand(double cl, double eng_p, double eng_pi):
         Integrand of the boost integral at angle `cl`, positron energy `eng_p`
         and pion energy `eng_pi`.
     """
+    cdef double eng_p = (<__BoostParams*>params).eng_p
+    cdef double eng_pi = (<__BoostParams*>params).eng_pi
+
     if eng_p < me:
         return 0.0
     cdef double p = sqrt(eng_p * eng_p - me * me)
@@ -72,7 +90,8 @@ cdef double __integrand(double cl, double eng_p, double eng_pi):
 
     return BR_PI_TO_MUNU * jac * __muon_spectrum(eng_p_pi_rf)
 
-cdef double CSpectrumPoint(double eng_p, double eng_pi):
+@cython.cdivision(True)
+cdef double CSpectrumPoint(double eng_p, double eng_pi) nogil:
     """
     Cythonized version of SpectrumPoint.
 
@@ -92,13 +111,26 @@ cdef double CSpectrumPoint(double eng_p, double eng_pi):
         Positron spectrum from a charged pion given positron energy `eng_p`
         and pion energy `eng_pi`.
     """
-    if eng_pi < mpi:
+    if eng_pi < mpi or eng_p < me:
         return 0.0
 
-    return quad(__integrand, -1.0, 1.0, points=[-1.0, 1.0],
-                args=(eng_p, eng_pi), epsabs=1e-10, epsrel=1e-4)[0]
+    cdef __BoostParams params
+    cdef double p = sqrt(eng_p * eng_p - me * me)
+    cdef double gamma = eng_pi / mpi
+    cdef double beta = sqrt(1.0 - pow(mpi / eng_pi, 2))
+    # Angles at which the rest frame energy crosses the ends of the spectrum
+    cdef double[2] points
 
-@cython.boundscheck(True)
+    points[0] = (eng_p - eng_p_max_pi_rf / gamma) / (p * beta)
+    points[1] = (eng_p - me / gamma) / (p * beta)
+
+    params.eng_p = eng_p
+    params.eng_pi = eng_pi
+
+    return gauss_kronrod_points(__integrand, &params, -1.0, 1.0, points, 2,
+                                EPSABS, EPSREL, MAX_DEPTH)
+
+@cython.boundscheck(False)
 @cython.wraparound(False)
 cdef np.ndarray CSpectrum(np.ndarray eng_ps, double eng_pi):
     """
@@ -122,10 +154,14 @@ cdef np.ndarray CSpectrum(np.ndarray eng_ps, double eng_pi):
     """
     cdef int num_pts = len(eng_ps)
     cdef np.ndarray spec = np.zeros(num_pts, dtype=np.float64)
+    cdef double[:] engs = eng_ps.astype(np.float64)
+    cdef double[:] spec_view = spec
+    cdef int nt = num_threads(num_pts)
     cdef int i = 0
 
-    for i in range(num_pts):
-        spec[i] = CSpectrumPoint(eng_ps[i], eng_pi)
+    with nogil:
+        for i in prange(num_pts, num_threads=nt, schedule="dynamic"):
+            spec_view[i] = CSpectrumPoint(engs[i], eng_pi)
 
     return spec
 
@@ -147,7 +183,7 @@ def SpectrumPoint(double eng_p, double eng_pi):
         Positron spectrum from a charged pion given positron energy `eng_p`
         and pion energy `eng_pi`.
     """
-    return CSpectrum(eng_p, eng_pi)
+    return CSpectrumPoint(eng_p, eng_pi)
 
 @cython.boundscheck(True)
 @cython.wraparound(False)
@@ -170,3 +206,46 @@ def Spectrum(np.ndarray eng_ps, double eng_pi):
         and pion energy `eng_pi`.
     """
     return CSpectrum(eng_ps, eng_pi)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def SpectrumMatrix(eng_ps, eng_pis):
+    """
+    Returns the positron spectrum from charged pions with many energies.
+
+    Parameters
+    ----------
+    eng_ps : float or np.ndarray
+        Positron energies.
+    eng_pis : float or np.ndarray
+        Charged pion energies.
+
+    Returns
+    -------
+    dnde : np.ndarray
+        Array of shape ``np.shape(eng_pis) + np.shape(eng_ps)`` with the
+        positron spectra of charged pions with energies `eng_pis` at the
+        positron energies `eng_ps`.
+    """
+    cdef double[::1] es = np.ascontiguousarray(
+        np.ravel(eng_ps), dtype=np.float64)
+    cdef double[::1] engs = np.ascontiguousarray(
+        np.ravel(eng_pis), dtype=np.float64)
+    cdef double[:, ::1] spec = np.zeros(
+        (engs.shape[0], es.shape[0]), dtype=np.float64)
+    cdef Py_ssize_t num_es = es.shape[0]
+    cdef Py_ssize_t n
+    cdef Py_ssize_t i
+    cdef Py_ssize_t j
+    cdef int nt = num_threads(engs.shape[0] * num_es)
+
+    with nogil:
+        for n in prange(engs.shape[0] * num_es, num_threads=nt,
+                        schedule="dynamic"):
+            i = n // num_es
+            j = n % num_es
+            spec[i, j] = CSpectrumPoint(es[j], engs[i])
+
+    return np.asarray(spec).reshape(np.shape(eng_pis) + np.shape(eng_ps))
@@ -6,11 +6,12 @@
 import numpy as np
 cimport numpy as np
 import cython
-import multiprocessing as mp
 
 from hazma import rambo
+from hazma.phase_space_helper_functions import histogram
 from hazma.rambo import compute_annihilation_cross_section
 from hazma.rambo import compute_decay_width
+from hazma.rambo import msqrd_flat
 
 from hazma.positron_helper_functions import positron_muon
 from hazma.positron_helper_functions import positron_charged_pion
@@ -24,6 +25,8 @@ cdef mass_dict = {'muon': MASS_MU, 'charged_pion': MASS_PI,
                   'neutral_pion': MASS_PI0, 'electron': MASS_E}
 
 cdef dict cspec_dict = spec_dict
+cdef dict cmatrix_dict = {'muon': positron_muon.SpectrumMatrix,
+                          'charged_pion': positron_charged_pion.SpectrumMatrix}
 cdef dict cmass_dict = mass_dict
 
 cdef np.ndarray names_to_masses(np.ndarray names):
@@ -48,18 +51,6 @@ cdef np.ndarray names_to_masses(np.ndarray names):
         masses[i] = cmass_dict[names[i]]
     return masses
 
-def __gen_spec(name, eng, eng_ps, norm, verbose=False):
-    """
-    c-function used by ``gamma`` and ``gamma_point`` to generate spectrum
-    values.
-    """
-    if verbose is True:
-        print("creating {} spectrum with energy {}".format(name, eng))
-    try:
-        return norm * cspec_dict[name](eng_ps, eng)
-    except:
-        return np.zeros(len(eng_ps), dtype=np.float64)
-
 def __gen_spec_2body(particles, cme, eng_ps):
     masses = names_to_masses(particles)
 
@@ -74,11 +65,44 @@ def __gen_spec_2body(particles, cme, eng_ps):
 
     return spec
 
+def __spec_from_hist(particles, hist, bins, eng_ps, verbose=False):
+    """
+    Convolves the energy distributions of the final state particles with
+    their positron spectra, used by ``positron`` and ``positron_multi_cme``.
+
+    The spectra of each kind of particle are computed at the energies of all
+    of its bins in a single call, giving a matrix of shape
+    (num_energies, len(eng_ps)). The convolution is then a matrix-vector
+    product with the probabilities of the bins.
+    """
+    cdef np.ndarray spec = np.zeros(len(eng_ps), dtype=np.float64)
+
+    # Normalize spectra: Need to multiply by the probability of the particle
+    # having a given energy. Since we are essentially integrating over the
+    # energy probability distribution, we need to multiply the probability
+    # density by the width of the bin.
+    norms = np.diff(bins, axis=1) * hist[:, 1, :]
+
+    for name in np.unique(particles):
+        # Only muons and charged pions produce positrons
+        if name not in cmatrix_dict:
+            continue
+        engs = hist[particles == name, 0, :].ravel()
+        if verbose is True:
+            print("creating {} spectra at {} energies".format(
+                name, len(engs)))
+        spec += norms[particles == name].ravel() @ \
+            cmatrix_dict[name](eng_ps, engs)
+
+    return spec
+
 @cython.boundscheck(False)
 @cython.wraparound(False)
 def positron(np.ndarray particles, double cme,
-             np.ndarray eng_ps, mat_elem_sqrd=lambda k_list: 1.0,
-             int num_ps_pts=10000, int num_bins=25, verbose=False):
+             np.ndarray eng_ps, mat_elem_sqrd=msqrd_flat,
+             int num_ps_pts=10000, int num_bins=25, verbose=False,
+             seed=None, chunk_size=None, sampler=None,
+             binning="linear", energy_hist=None):
     """Returns total gamma ray spectrum from final state particles.
 
     Parameters
@@ -98,6 +122,24 @@ def positron(np.ndarray particles, double cme,
         Number of phase space points to use.
     num_bins : int
         Number of bins to use.
+    seed : {None, int, array_like[ints], numpy.random.SeedSequence}
+        Seed for the phase space generator. If None, fresh entropy is used.
+    chunk_size : int {None]
+        If specified, the phase space points are generated and binned
+        ``chunk_size`` at a time, see ``rambo.generate_energy_histogram``.
+    sampler : str {None]
+        Phase space sampler, "flat" (the default), "quadrature"
+        (deterministic, for two or three particles) or "qmc" (quasi-Monte
+        Carlo), see ``rambo.generate_energy_histogram``.
+    binning : str {"linear"]
+        How the energy bins are spaced: "linear", "log", "endpoint" or
+        "quantile", see ``rambo.generate_energy_histogram``. Bins refined
+        where the energy distributions are steep reach a given accuracy with
+        fewer bins, and hence fewer evaluations of the decay spectra.
+    energy_hist : tuple {None]
+        Energy histograms ``(probs, errs, bins)`` of the final state
+        particles, e.g. from ``rambo.generate_observables``. If given, they
+        are normalized to unit area and used instead of running RAMBO.
 
     Returns
     -------
@@ -123,38 +165,23 @@ def positron(np.ndarray particles, double cme,
     num_fsp = len(masses)
     num_engs = len(eng_ps)
 
-    hist = rambo.generate_energy_histogram(masses, cme, num_ps_pts, mat_elem_sqrd, num_bins, density=True)[0]
-
-    cpdef int num_cpus = int(np.floor(mp.cpu_count() * 0.75))
-
-    p = mp.Pool(num_cpus)
-    specs = []
+    if energy_hist is not None:
+        hist, bins = histogram.check_energy_hist(energy_hist, num_fsp)
+    else:
+        hist, _, bins = rambo.generate_energy_histogram(
+            masses, cme, num_ps_pts, mat_elem_sqrd, num_bins, density=True,
+            seed=seed, chunk_size=chunk_size, sampler=sampler,
+            binning=binning, return_bins=True)
 
-    for i in range(num_bins):
-        for j in range(num_fsp):
-            part = particles[j]  # particle name
-            part_eng = hist[j, 0, i]  # particle energy
-
-            # Normalize spectrum: Need to multiply by the probability of
-            # particle having energy part_eng. Since we are essentially
-            # integrating over the energy probability distribution, we need to
-            # multiply by (b - a) / N, where a = e_min, b = e_max and
-            # N = num_bins.
-            norm = (hist[j, 0, -1] - hist[j, 0, 0]) / num_bins * hist[j, 1, i]
-
-            specs.append(p.apply_async(__gen_spec,
-                                       (part, part_eng, eng_ps, norm, verbose)))
-
-    p.close()
-    p.join()
-
-    return sum([spec.get() for spec in specs])
+    return __spec_from_hist(particles, hist, bins, eng_ps, verbose)
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
 def positron_point(np.ndarray particles, double cme,
-                   double eng_p, mat_elem_sqrd=lambda k_list: 1.0,
-                   int num_ps_pts=1000, int num_bins=25):
+                   double eng_p, mat_elem_sqrd=msqrd_flat,
+                   int num_ps_pts=1000, int num_bins=25, seed=None,
+                   chunk_size=None, sampler=None,
+                   binning="linear"):
     """
     Returns gamma ray spectrum at single gamma ray enegy from final state
     particles.
@@ -176,37 +203,98 @@ def positron_point(np.ndarray particles, double cme,
         Number of phase space points to use.
     num_bins : int
         Number of bins to use.
+    seed : {None, int, array_like[ints], numpy.random.SeedSequence}
+        Seed for the phase space generator. If None, fresh entropy is used.
+    chunk_size : int {None]
+        If specified, the phase space points are generated and binned
+        ``chunk_size`` at a time, see ``rambo.generate_energy_histogram``.
+    sampler : str {None]
+        Phase space sampler, "flat" (the default), "quadrature"
+        (deterministic, for two or three particles) or "qmc" (quasi-Monte
+        Carlo), see ``rambo.generate_energy_histogram``.
+    binning : str {"linear"]
+        How the energy bins are spaced: "linear", "log", "endpoint" or
+        "quantile", see ``rambo.generate_energy_histogram``. Bins refined
+        where the energy distributions are steep reach a given accuracy with
+        fewer bins, and hence fewer evaluations of the decay spectra.
 
     Returns
     -------
     spec : double
         Spectrum evaluated at ``eng_gam``.
     """
-    cdef int i, j
-    cdef int num_fsp
     cdef np.ndarray masses
-    cdef np.ndarray hist
-    cdef double spec_val = 0.0
-    cdef double prefactor
+    cdef np.ndarray hist, bins
 
     masses = names_to_masses(particles)
 
-    num_fsp = len(masses)
+    hist, _, bins = rambo.generate_energy_histogram(
+        masses, cme, num_ps_pts, mat_elem_sqrd, num_bins, density=True,
+        seed=seed, chunk_size=chunk_size, sampler=sampler, binning=binning,
+        return_bins=True)
+
+    return __spec_from_hist(particles, hist, bins, np.array([eng_p]))[0]
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def positron_multi_cme(np.ndarray particles, np.ndarray cmes,
+              np.ndarray eng_ps, mat_elem_sqrd=msqrd_flat,
+              int num_ps_pts=10000, int num_bins=25, verbose=False,
+              seed=None, chunk_size=None, sampler=None,
+              binning="linear"):
+    """Returns total positron spectra from final state particles at several
+    center of mass energies.
+
+    When RAMBO is used (see ``sampler``), the phase space points at all
+    energies are built from one set of massless configurations (see
+    ``rambo.generate_energy_histogram_multi_cme``). Otherwise, the spectra
+    are computed one energy at a time with ``positron``.
+
+    Parameters
+    ----------
+    particles : np.ndarray[string, ndim=1]
+        1-D array of strings containing the final state particle names.
+    cmes : np.ndarray[double, ndim=1]
+        Center of mass energies of the final state.
+    eng_ps : np.ndarray[double, ndim=1]
+        List of positron energies to compute spectra at.
+    mat_elem_sqrd : double(*)(np.ndarray)
+        Function for the matrix element squared of the proccess.
+    num_ps_pts : int
+        Number of phase space points to use at each energy.
+    num_bins : int
+        Number of bins to use.
+    seed : {None, int, array_like[ints], numpy.random.SeedSequence}
+        Seed for the phase space generator. If None, fresh entropy is used.
+    chunk_size : int {None]
+        Maximum number of phase space points generated at once at each
+        energy. Defaults to 100000 when the points are shared.
+    sampler : str {None]
+        Phase space sampler, see ``positron``.
+    binning : str {"linear"]
+        How the energy bins are spaced, see ``positron``.
+
+    Returns
+    -------
+    spec : np.ndarray[double, ndim=2]
+        Array of shape (len(cmes), len(eng_ps)) with the total positron
+        spectrum at each center of mass energy.
+    """
+    cdef np.ndarray masses
+
+    if (len(particles) <= 2 or
+            rambo._resolve_sampler(sampler, len(particles)) != "flat"):
+        return np.array([positron(particles, cme, eng_ps, mat_elem_sqrd,
+                               num_ps_pts, num_bins, verbose, seed,
+                               chunk_size, sampler, binning)
+                         for cme in cmes])
+
+    masses = names_to_masses(particles)
+    hists, _, bins = rambo.generate_energy_histogram_multi_cme(
+        masses, cmes, num_ps_pts, mat_elem_sqrd, num_bins, density=True,
+        seed=seed, chunk_size=100000 if chunk_size is None else chunk_size,
+        binning=binning, return_bins=True)
 
-    hist = rambo.generate_energy_histogram(masses, cme, num_ps_pts, mat_elem_sqrd, num_bins)[0]
-
-    for i in range(num_bins):
-        for j in range(num_fsp):
-            if particles[j] is 'muon':
-                spec_val += hist[j, 1, i] * \
-                            positron_muon.SpectrumPoint(eng_p, hist[j, 0, i]) * \
-                            (hist[j, 0, -1] - hist[j, 0, 0]) / num_bins
-            if particles[j] is 'charged_pion':
-                spec_val += hist[j, 1, i] * \
-                            positron_charged_pion.Spectrum(eng_p, hist[j, 0, i],
-                                                           "total") * \
-                            (hist[j, 0, -1] - hist[j, 0, 0]) / num_bins
-            else:
-                spec_val += 0.0
-
-    return spec_val * prefactor
+    return np.array([__spec_from_hist(particles, hist, hist_bins, eng_ps, verbose)
+                     for hist, hist_bins in zip(hists, bins)])
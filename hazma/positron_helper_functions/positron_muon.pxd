@@ -1,7 +1,7 @@
 import numpy as np
 cimport numpy as np
 
-cdef double __spectrum_rf(double)
-cdef double __integrand(double, double, double)
-cdef double CSpectrumPoint(double, double)
+cdef double __spectrum_rf(double) nogil
+cdef double __integrand(double, void*) nogil
+cdef double CSpectrumPoint(double, double) nogil
 cdef np.ndarray CSpectrum(np.ndarray, double)
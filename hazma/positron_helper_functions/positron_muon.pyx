@@ -1,17 +1,30 @@
+from hazma.decay_helper_functions.integrate cimport gauss_kronrod_points
 import numpy as np
 cimport numpy as np
 import cython
-from libc.math cimport sqrt
+from cython.parallel cimport prange
+from hazma.decay_helper_functions.threads cimport num_threads
+from libc.math cimport sqrt, pow
 
 include "parameters.pxd"
 
-from scipy.integrate import quad
-
 cdef double mmu = MASS_MU
 cdef double me = MASS_E
 
+# Maximum positron energy in the muon rest frame
+cdef double eng_p_max_mu_rf = (me * me + mmu * mmu) / (2.0 * mmu)
+
+# Error goals and maximum number of bisections of the boost integral
+cdef double EPSABS = 1e-10
+cdef double EPSREL = 1e-6
+cdef int MAX_DEPTH = 20
+
+ctypedef struct __BoostParams:
+    double eng_p
+    double eng_mu
+
 @cython.cdivision(True)
-cdef double __spectrum_rf(double eng_p):
+cdef double __spectrum_rf(double eng_p) nogil:
     """
     Returns the positron spectrum from a muon in the muon rest frame.
 
@@ -34,11 +47,11 @@ cdef double __spectrum_rf(double eng_p):
 
     return 2 * mmu * (2 * (pow(mmu, 4) * pow(-1 + r * r, 2) + mmu * mmu *
                            (1 + r * r) * s - 2 * s * s) *
-                      np.sqrt(pow(mmu, 4) * pow(-1 + r * r, 2) -
+                      sqrt(pow(mmu, 4) * pow(-1 + r * r, 2) -
                               2 * mmu**2 * (1 + r * r) * s + s * s)) / pow(mmu, 8)
 
 @cython.cdivision(True)
-cdef double __integrand(double cl, double eng_p, double eng_mu):
+cdef double __integrand(double cl, void* params) nogil:
     """
     Returns the integrand for the boost integral used to compute the postitron
     spectrum from the muon.
@@ -47,16 +60,18 @@ cdef double __integrand(double cl, double eng_p, double eng_mu):
     ----------
     cl : double
         Angle the electron makes with the z-axis.
-    eng_p : double
-        Energy of the positron.
-    eng_mu : double
-        Energy of the muon.
+    params : void*
+        Pointer to a __BoostParams struct holding the energies of the
+        positron and of the muon.
 
     Returns
     -------
     integrand : double
         Integral for the boost integral.
     """
+    cdef double eng_p = (<__BoostParams*>params).eng_p
+    cdef double eng_mu = (<__BoostParams*>params).eng_mu
+
     if eng_p < me:
         return 0.0
     cdef double p = sqrt(eng_p * eng_p - me * me)
@@ -71,7 +86,7 @@ cdef double __integrand(double cl, double eng_p, double eng_mu):
     return __spectrum_rf(emurf) * jac
 
 @cython.cdivision(True)
-cdef double CSpectrumPoint(double eng_p, double eng_mu):
+cdef double CSpectrumPoint(double eng_p, double eng_mu) nogil:
     """
     Returns the positron spectrum at a single electron energy from the muon
     given an arbitrary muon energy.
@@ -89,13 +104,26 @@ cdef double CSpectrumPoint(double eng_p, double eng_mu):
         Positron spectrum of the muon given an electron energy `eng_p` and a muon
         energy `eng_mu`.
     """
-    if eng_mu < mmu:
+    if eng_mu < mmu or eng_p < me:
         return 0.0
 
-    return quad(__integrand, -1., 1., points=[-1.0, 1.0],
-                args=(eng_p, eng_mu), epsabs=1e-10, epsrel=1e-4)[0]
+    cdef __BoostParams params
+    cdef double p = sqrt(eng_p * eng_p - me * me)
+    cdef double gamma = eng_mu / mmu
+    cdef double beta = sqrt(1.0 - pow(mmu / eng_mu, 2))
+    # Angles at which the rest frame energy crosses the ends of the spectrum
+    cdef double[2] points
 
-@cython.boundscheck(True)
+    points[0] = (eng_p - eng_p_max_mu_rf / gamma) / (p * beta)
+    points[1] = (eng_p - me / gamma) / (p * beta)
+
+    params.eng_p = eng_p
+    params.eng_mu = eng_mu
+
+    return gauss_kronrod_points(__integrand, &params, -1.0, 1.0, points, 2,
+                                EPSABS, EPSREL, MAX_DEPTH)
+
+@cython.boundscheck(False)
 @cython.wraparound(False)
 cdef np.ndarray CSpectrum(np.ndarray engs_p, double eng_mu):
     """
@@ -118,11 +146,15 @@ cdef np.ndarray CSpectrum(np.ndarray engs_p, double eng_mu):
     cdef int numpts = len(engs_p)
 
     cdef np.ndarray spec = np.zeros(numpts, dtype=np.float64)
+    cdef double[:] engs = engs_p.astype(np.float64)
+    cdef double[:] spec_view = spec
 
+    cdef int nt = num_threads(numpts)
     cdef int i = 0
 
-    for i in range(numpts):
-        spec[i] = CSpectrumPoint(engs_p[i], eng_mu)
+    with nogil:
+        for i in prange(numpts, num_threads=nt, schedule="dynamic"):
+            spec_view[i] = CSpectrumPoint(engs[i], eng_mu)
 
     return spec
 
@@ -167,3 +199,46 @@ def Spectrum(np.ndarray engs_p, double eng_mu):
         muon energy `eng_mu`.
     """
     return CSpectrum(engs_p, eng_mu)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def SpectrumMatrix(eng_ps, eng_mus):
+    """
+    Returns the positron spectrum from muons with many energies.
+
+    Parameters
+    ----------
+    eng_ps : float or np.ndarray
+        Positron energies.
+    eng_mus : float or np.ndarray
+        Muon energies.
+
+    Returns
+    -------
+    dnde : np.ndarray
+        Array of shape ``np.shape(eng_mus) + np.shape(eng_ps)`` with the
+        positron spectra of muons with energies `eng_mus` at the positron
+        energies `eng_ps`.
+    """
+    cdef double[::1] es = np.ascontiguousarray(
+        np.ravel(eng_ps), dtype=np.float64)
+    cdef double[::1] engs = np.ascontiguousarray(
+        np.ravel(eng_mus), dtype=np.float64)
+    cdef double[:, ::1] spec = np.zeros(
+        (engs.shape[0], es.shape[0]), dtype=np.float64)
+    cdef Py_ssize_t num_es = es.shape[0]
+    cdef Py_ssize_t n
+    cdef Py_ssize_t i
+    cdef Py_ssize_t j
+    cdef int nt = num_threads(engs.shape[0] * num_es)
+
+    with nogil:
+        for n in prange(engs.shape[0] * num_es, num_threads=nt,
+                        schedule="dynamic"):
+            i = n // num_es
+            j = n % num_es
+            spec[i, j] = CSpectrumPoint(es[j], engs[i])
+
+    return np.asarray(spec).reshape(np.shape(eng_mus) + np.shape(eng_ps))
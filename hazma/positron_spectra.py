@@ -8,7 +8,12 @@ Module for computing positron spectra.
 import numpy as np
 
 from hazma.positron_helper_functions import positron_charged_pion, positron_muon
-from hazma.positron_helper_functions.positron_decay import positron, positron_point
+from hazma.positron_helper_functions.positron_decay import (
+    positron,
+    positron_multi_cme,
+    positron_point,
+)
+from hazma.rambo import msqrd_flat
 
 
 def muon(positron_energies, muon_energy):
@@ -20,7 +25,9 @@ def muon(positron_energies, muon_energy):
     positron_energies : float or numpy.array
         Energy(ies) of the positron/electron.
     muon_energy : float or array-like
-        Energy of the muon.
+        Energy of the muon. If an array is given, the spectra of all of the
+        energies are computed in a single compiled loop and returned as an
+        array of shape ``(len(muon_energy), len(positron_energies))``.
 
     Returns
     -------
@@ -28,6 +35,8 @@ def muon(positron_energies, muon_energy):
         The value of the spectrum given a positron energy(ies)
         ``positron_energies`` and muon energy ``muon_energy``.
     """
+    if np.ndim(muon_energy) > 0:
+        return positron_muon.SpectrumMatrix(positron_energies, muon_energy)
     if hasattr(positron_energies, "__len__"):
         return positron_muon.Spectrum(positron_energies, muon_energy)
     return positron_muon.SpectrumPoint(positron_energies, muon_energy)
@@ -42,7 +51,9 @@ def charged_pion(positron_energies, pion_energy):
     positron_energies : float or numpy.array
         Energy(ies) of the positron/electron.
     pion_energy : float or numpy.array
-        Energy of the charged pion.
+        Energy of the charged pion. If an array is given, the spectra of all
+        of the energies are computed in a single compiled loop and returned
+        as an array of shape ``(len(pion_energy), len(positron_energies))``.
 
     Returns
     -------
@@ -50,6 +61,9 @@ def charged_pion(positron_energies, pion_energy):
         The value of the spectrum given a positron energy(ies)
         ``positron_energies`` and charged pion energy ``pion_energy``.
     """
+    if np.ndim(pion_energy) > 0:
+        return positron_charged_pion.SpectrumMatrix(
+            positron_energies, pion_energy)
     if hasattr(positron_energies, "__len__"):
         return positron_charged_pion.Spectrum(positron_energies, pion_energy)
     return positron_charged_pion.SpectrumPoint(positron_energies, pion_energy)
@@ -59,10 +73,15 @@ def positron_decay(
     particles,
     cme,
     positron_energies,
-    mat_elem_sqrd=lambda k_list: 1.0,
+    mat_elem_sqrd=msqrd_flat,
     num_ps_pts=1000,
     num_bins=25,
     verbose=False,
+    seed=None,
+    chunk_size=None,
+    sampler=None,
+    binning="linear",
+    energy_hist=None,
 ):
     r"""Returns total gamma ray spectrum from a set of particles.
 
@@ -71,8 +90,11 @@ def positron_decay(
     particles : array_like
         List of particle names. Available particles are 'muon', and
         'charged_pion'.
-    cme : double
-        Center of mass energy of the final state in MeV.
+    cme : double or np.ndarray[double, ndim=1]
+        Center of mass energy of the final state in MeV. If an array is
+        given, the spectrum is computed at each energy, which is cheaper than
+        separate calls since the phase space points are shared between the
+        energies (see ``positron_multi_cme``).
     positron_energies : np.ndarray[double, ndim=1]
         List of positron energies in MeV to evaluate spectra at.
     mat_elem_sqrd : double(\*func)(np.ndarray)
@@ -86,11 +108,37 @@ def positron_decay(
     verbose: Bool
         If True, then addition information about the runtime progress and state
         are displayed.
+    seed : {None, int, array_like[ints], numpy.random.SeedSequence}, optional
+        Seed for the phase space generator. Calls with the same seed produce
+        identical spectra. If None, fresh entropy is used.
+    chunk_size : int {None}, optional
+        If specified, the phase space points are generated and binned
+        ``chunk_size`` at a time, so that memory use does not grow with
+        ``num_ps_pts``. See ``hazma.rambo.generate_energy_histogram``.
+    sampler : str, optional
+        How phase space is sampled: "flat" (Monte Carlo, the default),
+        "quadrature" (deterministic, for two or three particles, without
+        using ``num_ps_pts`` or ``seed``) or "qmc" (quasi-Monte Carlo), which
+        gives much less noisy spectra than "flat" for the same
+        ``num_ps_pts``. See ``hazma.rambo.generate_energy_histogram``.
+    binning : str {"linear"}, optional
+        How the energy bins of the final state particles are spaced:
+        "linear", "log", "endpoint" (refined towards the kinematic
+        endpoints) or "quantile" (equal probability). The non-uniform
+        binnings resolve steep energy distributions with fewer bins, and
+        hence fewer evaluations of the decay spectra. See
+        ``hazma.rambo.generate_energy_histogram``.
+    energy_hist : tuple {None}, optional
+        Energy histograms ``(probs, errs, bins)`` of the final state
+        particles to use instead of running RAMBO, e.g. from
+        ``hazma.rambo.generate_observables``. Requires a single ``cme``.
 
     Returns
     -------
     spec : np.ndarray
-        Total gamma ray spectrum from all final state particles.
+        Total gamma ray spectrum from all final state particles. If ``cme``
+        is an array, the spectra at each energy are stacked along the first
+        axis.
 
     Notes
     -----
@@ -127,6 +175,24 @@ def positron_decay(
 
     particles = np.array(particles)
 
+    if np.ndim(cme) > 0:
+        if energy_hist is not None:
+            raise ValueError("energy_hist requires a single cme.")
+        spec = positron_multi_cme(
+            particles,
+            np.array(cme, dtype=np.float64),
+            np.atleast_1d(np.array(positron_energies, dtype=np.float64)),
+            mat_elem_sqrd=mat_elem_sqrd,
+            num_ps_pts=num_ps_pts,
+            num_bins=num_bins,
+            verbose=verbose,
+            seed=seed,
+            chunk_size=chunk_size,
+            sampler=sampler,
+            binning=binning,
+        )
+        return spec if hasattr(positron_energies, "__len__") else spec[:, 0]
+
     if hasattr(positron_energies, "__len__"):
         return positron(
             particles,
@@ -136,7 +202,28 @@ def positron_decay(
             num_ps_pts=num_ps_pts,
             num_bins=num_bins,
             verbose=verbose,
+            seed=seed,
+            chunk_size=chunk_size,
+            sampler=sampler,
+            binning=binning,
+            energy_hist=energy_hist,
         )
+    if energy_hist is not None:
+        return positron(
+            particles,
+            cme,
+            np.array([positron_energies], dtype=np.float64),
+            energy_hist=energy_hist,
+        )[0]
     return positron_point(
-        particles, cme, positron_energies, mat_elem_sqrd, num_ps_pts, num_bins
+        particles,
+        cme,
+        positron_energies,
+        mat_elem_sqrd,
+        num_ps_pts,
+        num_bins,
+        seed,
+        chunk_size,
+        sampler,
+        binning,
     )
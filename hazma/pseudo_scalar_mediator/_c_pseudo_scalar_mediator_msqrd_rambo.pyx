@@ -0,0 +1,148 @@
+"""
+Compiled versions of the squared matrix elements for RAMBO of
+``_pseudo_scalar_mediator_msqrd_rambo``, which are evaluated without the
+GIL (see ``hazma.phase_space_helper_functions.compiled_msqrd``).
+"""
+
+import cython
+from libc.math cimport sqrt
+
+from hazma.phase_space_helper_functions.compiled_msqrd cimport register_kernel
+from hazma.phase_space_helper_functions.compiled_msqrd import (
+    compiled_matrix_element)
+
+from hazma.parameters import charged_pion_mass as _mpi
+from hazma.parameters import neutral_pion_mass as _mpi0
+from hazma.parameters import up_quark_mass as _muq
+from hazma.parameters import down_quark_mass as _mdq
+from hazma.parameters import b0 as _b0, vh as _vh, fpi as _fpi
+
+cdef double mpi = _mpi
+cdef double mpi0 = _mpi0
+cdef double muq = _muq
+cdef double mdq = _mdq
+cdef double b0 = _b0
+cdef double vh = _vh
+cdef double fpi = _fpi
+
+PARAM_NAMES = ("mx", "mp", "gpxx", "gpuu", "gpdd", "gpGG", "beta", "width_p")
+
+ctypedef struct psm_params:
+    double mx
+    double mp
+    double gpxx
+    double gpuu
+    double gpdd
+    double gpGG
+    double beta
+    double width_p
+
+
+cdef inline double __mdot(const double* p, const double* q) nogil:
+    return p[0] * q[0] - p[1] * q[1] - p[2] * q[2] - p[3] * q[3]
+
+
+@cython.cdivision(True)
+cdef inline double __px_dot_pxbar(const double* momenta, int num_fsp,
+                                  double mx) nogil:
+    """
+    Returns (mx^2 + px.pxbar) for dark matter momenta along the z-axis
+    sharing the total energy of the final state.
+    """
+    cdef int i
+    cdef double e = 0.0
+    cdef double pxmag
+
+    for i in range(num_fsp):
+        e += momenta[4 * i]
+    pxmag = sqrt(e * e / 4.0 - mx * mx)
+
+    return mx * mx + e * e / 4.0 + pxmag * pxmag
+
+
+@cython.cdivision(True)
+cdef double __msqrd_xx_to_p_to_pm0(const double* momenta, int num_fsp,
+                                   const void* params) nogil:
+    """
+    Squared matrix element for xbar x -> p -> pi+ pi- pi0. See
+    ``PseudoScalarMediatorMSqrdRambo.msqrd_xx_to_p_to_pm0``.
+    """
+    cdef const psm_params* p = <const psm_params*>params
+    cdef const double* p1 = momenta
+    cdef const double* p2 = momenta + 4
+    cdef const double* p3 = momenta + 8
+    cdef double p12 = __mdot(p1, p2)
+    cdef double p13 = __mdot(p1, p3)
+    cdef double p23 = __mdot(p2, p3)
+    cdef double s = p12 + p13 + p23
+    cdef double mp2 = p.mp * p.mp
+    cdef double m2 = 2.0 * mpi * mpi + mpi0 * mpi0
+
+    # Coupling of p to the pions and the momentum-dependent mixing term.
+    cdef double a = b0 * fpi * (p.gpGG * (muq - mdq) + vh * (p.gpuu - p.gpdd))
+    cdef double b = vh * (b0 * (mdq + muq) + 2.0 * mpi * mpi -
+                          2.0 * mpi0 * mpi0 + 4.0 * p12 - 2.0 * p13 -
+                          2.0 * p23)
+    cdef double den = 9.0 * fpi ** 4 * vh * vh * (
+        (m2 - mp2) ** 2 + mp2 * p.width_p * p.width_p -
+        4.0 * (mp2 - m2 - s) * s)
+
+    return p.gpxx * p.gpxx * __px_dot_pxbar(momenta, num_fsp, p.mx) * (
+        a * a + 2.0 * p.beta * a * b +
+        p.beta * p.beta * (b * b - 5.0 * a * a)) / den
+
+
+@cython.cdivision(True)
+cdef double __msqrd_xx_to_p_to_000(const double* momenta, int num_fsp,
+                                   const void* params) nogil:
+    """
+    Squared matrix element for xbar x -> p -> pi0 pi0 pi0. See
+    ``PseudoScalarMediatorMSqrdRambo.msqrd_xx_to_p_to_000``.
+    """
+    cdef const psm_params* p = <const psm_params*>params
+    cdef const double* p1 = momenta
+    cdef const double* p2 = momenta + 4
+    cdef const double* p3 = momenta + 8
+    cdef double s = __mdot(p1, p2) + __mdot(p1, p3) + __mdot(p2, p3)
+    cdef double mp2 = p.mp * p.mp
+    cdef double m2 = 3.0 * mpi0 * mpi0
+
+    cdef double c = fpi * (p.gpGG * (mdq - muq) + vh * (p.gpdd - p.gpuu))
+    cdef double d = vh * (mdq + muq)
+    cdef double den = fpi ** 4 * vh * vh * (
+        (mp2 - m2) ** 2 + mp2 * p.width_p * p.width_p -
+        4.0 * (mp2 - m2 - s) * s)
+
+    return b0 * b0 * p.gpxx * p.gpxx * \
+        __px_dot_pxbar(momenta, num_fsp, p.mx) * (
+            c * c - 2.0 * p.beta * c * d +
+            p.beta * p.beta * (d * d - 11.0 * c * c)) / den
+
+
+register_kernel(__name__, "pseudo_scalar_mediator.xx_to_p_to_pm0",
+                __msqrd_xx_to_p_to_pm0, 3, PARAM_NAMES)
+register_kernel(__name__, "pseudo_scalar_mediator.xx_to_p_to_000",
+                __msqrd_xx_to_p_to_000, 3, PARAM_NAMES)
+
+
+def compiled_msqrd(name, model):
+    """
+    Binds one of the compiled pseudo-scalar mediator squared matrix elements
+    to the parameters of a model.
+
+    Parameters
+    ----------
+    name : str
+        Name of the process, "xx_to_p_to_pm0" or "xx_to_p_to_000".
+    model : PseudoScalarMediatorParameters or PseudoScalarMediator object
+        Parameter object for the pseudo-scalar mediator theory.
+
+    Returns
+    -------
+    msqrd : CompiledMatrixElement
+        The squared matrix element.
+    """
+    return compiled_matrix_element(
+        "pseudo_scalar_mediator." + name,
+        [getattr(model, param) for param in PARAM_NAMES],
+    )
@@ -5,35 +5,58 @@ from hazma.parameters import neutral_pion_mass as mpi0
 from hazma.parameters import up_quark_mass as muq
 from hazma.parameters import down_quark_mass as mdq
 from hazma.parameters import b0, vh, fpi, qe
+from hazma.rambo import vectorized
+from hazma.pseudo_scalar_mediator._c_pseudo_scalar_mediator_msqrd_rambo import (
+    compiled_msqrd,
+)
 
 import numpy as np
 
 
 class PseudoScalarMediatorMSqrdRambo:
+    def compiled_msqrd(self, process):
+        """
+        Returns a compiled squared matrix element for RAMBO, bound to the
+        current parameters of the model. It gives the same values as the
+        corresponding python method but is evaluated without the GIL.
+
+        Parameters
+        ----------
+        process : str
+            Name of the process: "xx_to_p_to_pm0" or "xx_to_p_to_000".
+
+        Returns
+        -------
+        msqrd : CompiledMatrixElement
+            The squared matrix element.
+        """
+        return compiled_msqrd(process, self)
+
+    @vectorized
     def msqrd_xx_to_p_to_pm0(self, momenta):
         """
         Returns the squared matrix element for dark matter annihilating into
         two charged pions and a netural pion through a scalar mediator.
-        This function is used for RAMBO.
+        This function is used for RAMBO and is vectorized.
 
         Parameters
         ----------
         momenta : numpy.array
-            List of momenta of the final state particles. The first momentum is
-            for the positively charged pion, the second is for the negatively
-            charged pion and the third is for the neutral pion.
+            Momenta of the final state particles with shape (..., num_fsp, 4).
+            The first momentum is for the positively charged pion, the second
+            is for the negatively charged pion and the third is for the neutral pion.
         self : PseudoScalarMediatorParameters or PseudoScalarMediator object
             Parameter object for the pseudo-scalar mediator theory.
 
         Returns
         -------
-        msqrd : float
-            The squared matrix element for a given set of momenta.
+        msqrd : float or numpy.array
+            The squared matrix element for each set of momenta.
         """
-        p1 = momenta[0]
-        p2 = momenta[1]
-        p3 = momenta[2]
-        P = sum(momenta)
+        p1 = momenta[..., 0, :]
+        p2 = momenta[..., 1, :]
+        p3 = momenta[..., 2, :]
+        P = np.sum(momenta, axis=-2)
 
         mx = self.mx
         mp = self.mp
@@ -44,10 +67,11 @@ class PseudoScalarMediatorMSqrdRambo:
         beta = self.beta
         widthp = self.width_p
 
-        pxmag = np.sqrt(P[0] ** 2 / 4.0 - mx ** 2)
+        pxmag = np.sqrt(P[..., 0] ** 2 / 4.0 - mx ** 2)
 
-        px = np.array([P[0] / 2.0, 0.0, 0.0, pxmag])
-        pxbar = np.array([P[0] / 2.0, 0.0, 0.0, -pxmag])
+        zero = np.zeros_like(pxmag)
+        px = np.stack([P[..., 0] / 2.0, zero, zero, pxmag], axis=-1)
+        pxbar = np.stack([P[..., 0] / 2.0, zero, zero, -pxmag], axis=-1)
 
         """ Order beta^0 """
         beta0 = (
@@ -183,26 +207,27 @@ class PseudoScalarMediatorMSqrdRambo:
 
         return msqrd
 
+    @vectorized
     def msqrd_xx_to_p_to_pm0g(self, momenta):
         """
         Returns the squared matrix element for dark matter annihilating into
         two charged pions, a netural pion and a photon through a scalar
-        mediator. This function is used for RAMBO.
+        mediator. This function is used for RAMBO and is vectorized.
 
         Parameters
         ----------
         momenta : numpy.array
-            List of momenta of the final state particles. The first momentum is
-            for the positively charged pion, the second is for the negatively
-            charged pion, the third is for the neutral pion and the last is
+            Momenta of the final state particles with shape (..., num_fsp, 4).
+            The first momentum is for the positively charged pion, the second
+            is for the negatively charged pion, the third is for the neutral pion and the last is
             for the photon.
         self : PseudoScalarMediatorParameters or PseudoScalarMediator object
             Parameter object for the pseudo-scalar mediator theory.
 
         Returns
         -------
-        msqrd : float
-            The squared matrix element for a given set of momenta.
+        msqrd : float or numpy.array
+            The squared matrix element for each set of momenta.
         """
         mx = self.mx
         mp = self.mp
@@ -213,17 +238,18 @@ class PseudoScalarMediatorMSqrdRambo:
         beta = self.beta
         widthp = self.width_p
 
-        p1 = momenta[0]
-        p2 = momenta[1]
-        p3 = momenta[2]
-        k = momenta[3]
+        p1 = momenta[..., 0, :]
+        p2 = momenta[..., 1, :]
+        p3 = momenta[..., 2, :]
+        k = momenta[..., 3, :]
 
-        P = sum(momenta)
+        P = np.sum(momenta, axis=-2)
 
-        pxmag = np.sqrt(P[0] ** 2 / 4.0 - mx ** 2)
+        pxmag = np.sqrt(P[..., 0] ** 2 / 4.0 - mx ** 2)
 
-        px = np.array([P[0] / 2.0, 0.0, 0.0, pxmag])
-        pxbar = np.array([P[0] / 2.0, 0.0, 0.0, -pxmag])
+        zero = np.zeros_like(pxmag)
+        px = np.stack([P[..., 0] / 2.0, zero, zero, pxmag], axis=-1)
+        pxbar = np.stack([P[..., 0] / 2.0, zero, zero, -pxmag], axis=-1)
 
         beta0 = -(
             gpxx ** 2
@@ -413,11 +439,12 @@ class PseudoScalarMediatorMSqrdRambo:
 
         return beta0 + beta1 + beta2
 
+    @vectorized
     def msqrd_xx_to_p_to_000(self, momenta):
         """
         Returns the squared matrix element for dark matter annihilating into
         three neutral pions through a scalar mediator. This function is used
-        for RAMBO.
+        for RAMBO and is vectorized.
 
         Parameters
         ----------
@@ -429,8 +456,8 @@ class PseudoScalarMediatorMSqrdRambo:
 
         Returns
         -------
-        msqrd : float
-            The squared matrix element for a given set of momenta.
+        msqrd : float or numpy.array
+            The squared matrix element for each set of momenta.
         """
         mx = self.mx
         mp = self.mp
@@ -441,16 +468,17 @@ class PseudoScalarMediatorMSqrdRambo:
         beta = self.beta
         widthp = self.width_p
 
-        p1 = momenta[0]
-        p2 = momenta[1]
-        p3 = momenta[2]
+        p1 = momenta[..., 0, :]
+        p2 = momenta[..., 1, :]
+        p3 = momenta[..., 2, :]
 
-        P = sum(momenta)
+        P = np.sum(momenta, axis=-2)
 
-        pxmag = np.sqrt(P[0] ** 2 / 4.0 - mx ** 2)
+        pxmag = np.sqrt(P[..., 0] ** 2 / 4.0 - mx ** 2)
 
-        px = np.array([P[0] / 2.0, 0.0, 0.0, pxmag])
-        pxbar = np.array([P[0] / 2.0, 0.0, 0.0, -pxmag])
+        zero = np.zeros_like(pxmag)
+        px = np.stack([P[..., 0] / 2.0, zero, zero, pxmag], axis=-1)
+        pxbar = np.stack([P[..., 0] / 2.0, zero, zero, -pxmag], axis=-1)
 
         beta0 = (
             b0 ** 2
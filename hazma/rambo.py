@@ -10,10 +10,19 @@ TODO: Code up specific functions for cross-section
       functions for 2->3 processes.
 
 """
+from hazma import parallel
+from hazma.phase_space_helper_functions import cache
+from hazma.phase_space_helper_functions import compiled_msqrd
 from hazma.phase_space_helper_functions import generator
 from hazma.phase_space_helper_functions import histogram
-from hazma.phase_space_helper_functions.modifiers import apply_matrix_elem
+from hazma.phase_space_helper_functions import quadrature
+from hazma.phase_space_helper_functions import vegas
+from hazma.phase_space_helper_functions.modifiers import (
+    apply_matrix_elem,
+    warn_negative_msqrd,
+)
 import numpy as np
+from scipy.stats import qmc
 import multiprocessing as mp
 import warnings
 
@@ -22,7 +31,665 @@ from hazma.hazma_errors import RamboCMETooSmall
 from hazma.field_theory_helper_functions.common_functions import cross_section_prefactor
 
 
-def generate_phase_space_point(masses, cme):
+def vectorized(mat_elem_sqrd):
+    """
+    Marks a squared matrix element as vectorized.
+
+    A vectorized squared matrix element is called once with the four-momenta
+    of all of the phase space points, an array of shape
+    (num_ps_pts, num_fsp, 4), and must return an array of shape
+    (num_ps_pts,). This avoids calling a python function for every phase
+    space point. Matrix elements written in terms of ``momenta[..., i, :]``
+    and ``minkowski_dot`` work for both a single point and many.
+
+    Parameters
+    ----------
+    mat_elem_sqrd : (numpy.ndarray)(numpy.ndarray)
+        Function for the matrix element squared.
+
+    Returns
+    -------
+    mat_elem_sqrd : (numpy.ndarray)(numpy.ndarray)
+        The same function, marked as vectorized.
+
+    Examples
+    --------
+
+    Squared matrix element for mu -> e nu nu::
+
+        from hazma.rambo import vectorized
+        from hazma.field_theory_helper_functions.common_functions import \
+            minkowski_dot as MDot
+        @vectorized
+        def msqrd(momenta):
+            pe = momenta[..., 0, :]
+            pve = momenta[..., 1, :]
+            pvmu = momenta[..., 2, :]
+            pmu = np.sum(momenta, axis=-2)
+            return 64. * GF**2 * MDot(pe, pvmu) * MDot(pmu, pve)
+
+    """
+    mat_elem_sqrd.vectorized = True
+    return mat_elem_sqrd
+
+
+@vectorized
+def msqrd_flat(momenta):
+    """
+    Flat squared matrix element, equal to one for all phase space points.
+
+    Parameters
+    ----------
+    momenta : numpy.ndarray
+        Four-momenta of the final state particles with shape (..., num_fsp, 4).
+
+    Returns
+    -------
+    mat_elem_sqrd : numpy.ndarray
+        Array of ones with shape momenta.shape[:-2].
+    """
+    return np.ones(np.shape(momenta)[:-2])
+
+
+def _generator_key(seed):
+    """
+    Returns the key identifying the random stream of the phase space
+    generator.
+
+    Parameters
+    ----------
+    seed : {None, int, array_like[ints], numpy.random.SeedSequence}
+        Seed for the random number generator. If None, fresh entropy is used.
+
+    Returns
+    -------
+    key : numpy.ndarray
+        Array of three 32-bit words. The generator is counter-based: the key
+        selects the stream and the event index selects the position in it, so
+        workers generating disjoint ranges of events never share random
+        numbers. Independent streams for separate runs (e.g. points in a scan
+        sharded across machines) are obtained from
+        ``numpy.random.SeedSequence(entropy).spawn(n)``.
+    """
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return seed.generate_state(3, np.uint32)
+
+
+def _split_points(points, num_fsp):
+    """
+    Returns views of the momenta and weights of an array of phase space
+    points.
+
+    Parameters
+    ----------
+    points : numpy.ndarray
+        Array of phase space points of shape (num_ps_pts, 4 * num_fsp + 1).
+    num_fsp : int
+        Number of final state particles.
+
+    Returns
+    -------
+    momenta : numpy.ndarray
+        View of the four-momenta with shape (num_ps_pts, num_fsp, 4).
+    weights : numpy.ndarray
+        View of the weights with shape (num_ps_pts,).
+    """
+    momenta = points[:, : 4 * num_fsp].view()
+    # Assigning the shape (rather than calling reshape) guarantees a view.
+    momenta.shape = (points.shape[0], num_fsp, 4)
+    weights = points[:, 4 * num_fsp]
+    return momenta, weights
+
+
+def _resolve_num_cpus(num_cpus):
+    """
+    Returns the number of cpus to use given the user's request.
+
+    Parameters
+    ----------
+    num_cpus : int or None
+        Requested number of cpus. If None, the process-wide setting of
+        ``hazma.parallel`` is used. If larger than the number of cpus
+        available, the default is used instead.
+
+    Returns
+    -------
+    num_cpus : int
+        Number of cpus to use.
+    """
+    # If the user doesn't specify the number of cpus to use, use the
+    # process-wide setting.
+    if num_cpus is None:
+        return parallel.get_num_cpus()
+    if num_cpus > mp.cpu_count():
+        num_cpus = parallel.default_num_cpus()
+        warnings.warn(
+            """You only have {} cpus.
+                      Using {} cpus instead.
+                      """.format(
+                mp.cpu_count(), num_cpus
+            )
+        )
+    return num_cpus
+
+
+def _resolve_backend(backend):
+    """
+    Returns the backend to use for phase space generation given the user's
+    request: the process-wide setting of ``hazma.parallel`` if ``backend`` is
+    None.
+    """
+    if backend is None:
+        return parallel.get_backend()
+    if backend not in parallel.BACKENDS:
+        raise ValueError(
+            "Unknown backend '{}', expected one of {}.".format(
+                backend, parallel.BACKENDS
+            )
+        )
+    return backend
+
+
+def _fill_phase_space(points, masses, cme, key, offset, num_cpus,
+                      mat_elem_sqrd=None, backend="threads"):
+    """
+    Fills an array with consecutive events of a phase space stream.
+
+    Parameters
+    ----------
+    points : numpy.ndarray
+        Output array of shape (num_ps_pts, 4 * num_fsp + 1).
+    masses : numpy.ndarray
+        Masses of the final state particles.
+    cme : double
+        Center-of-mass-energy of the process.
+    key : numpy.ndarray
+        Key of the random stream (see ``_generator_key``).
+    offset : int
+        Index of the first event to generate.
+    num_cpus : int
+        Number of blocks the events are split into. If 1, or if there is no
+        shared pool of processes, the events are generated in the calling
+        process.
+    mat_elem_sqrd : (double)(numpy.ndarray) {None]
+        Squared matrix element the weights are multiplied by. If it is
+        compiled (see ``compiled_msqrd``), the events are generated and
+        weighted in a single pass without the GIL.
+    backend : str {"threads"]
+        "threads" fills a slice of ``points`` per block from the shared pool
+        of threads. "processes" generates the blocks on the shared pool of
+        processes and copies them into ``points``.
+
+    Returns
+    -------
+    points : numpy.ndarray
+        The filled array.
+    """
+    num_ps_pts = points.shape[0]
+    num_fsp = len(masses)
+    num_cpus = max(min(num_cpus, num_ps_pts), 1)
+    fused = isinstance(mat_elem_sqrd, compiled_msqrd.CompiledMatrixElement)
+    # Every block draws from the same counter-based stream, starting at the
+    # index of its first event, so the result depends neither on num_cpus
+    # nor on the backend.
+    starts = np.linspace(0, num_ps_pts, num_cpus + 1).astype(np.int64)
+
+    if backend == "threads" or num_cpus == 1 or parallel.get_pool() is None:
+        momenta, weights = _split_points(points, num_fsp)
+        if fused:
+            num_negative = parallel.thread_starmap(
+                generator.generate_weighted_space_inplace,
+                [
+                    (momenta[start:stop], weights[start:stop], masses, cme,
+                     mat_elem_sqrd, key, offset + start)
+                    for start, stop in zip(starts[:-1], starts[1:])
+                ],
+                num_cpus,
+            )
+            if sum(num_negative) > 0:
+                warn_negative_msqrd()
+            return points
+        parallel.thread_starmap(
+            generator.generate_space_inplace,
+            [
+                (momenta[start:stop], weights[start:stop], masses, cme, key,
+                 offset + start)
+                for start, stop in zip(starts[:-1], starts[1:])
+            ],
+            num_cpus,
+        )
+    else:
+        # Have each of the shared workers generate its share of the points
+        # and copy the blocks into the output buffer.
+        if fused:
+            blocks = parallel.starmap(
+                generator.generate_weighted_space,
+                [
+                    (stop - start, masses, cme, num_fsp, mat_elem_sqrd, key,
+                     offset + start)
+                    for start, stop in zip(starts[:-1], starts[1:])
+                ],
+            )
+        else:
+            blocks = parallel.starmap(
+                generator.generate_space,
+                [
+                    (stop - start, masses, cme, num_fsp, key, offset + start)
+                    for start, stop in zip(starts[:-1], starts[1:])
+                ],
+            )
+        for start, block in zip(starts[:-1], blocks):
+            points[start : start + len(block)] = block
+        if fused:
+            if np.any(points[:, 4 * num_fsp] < 0):
+                warn_negative_msqrd()
+            return points
+
+    if mat_elem_sqrd is None:
+        return points
+    return apply_matrix_elem(points, num_ps_pts, num_fsp, mat_elem_sqrd)
+
+
+def _fill_phase_space_multi_cme(points, masses, cmes, key, offset, num_cpus,
+                                backend="threads"):
+    """
+    Fills an array with consecutive events of a phase space stream at
+    several center of mass energies, sharing the massless configurations
+    between the energies.
+
+    Parameters
+    ----------
+    points : numpy.ndarray
+        Output array of shape (num_cmes, num_ps_pts, 4 * num_fsp + 1).
+    masses : numpy.ndarray
+        Masses of the final state particles.
+    cmes : numpy.ndarray
+        Center-of-mass-energies.
+    key : numpy.ndarray
+        Key of the random stream (see ``_generator_key``).
+    offset : int
+        Index of the first event to generate.
+    num_cpus : int
+        Number of blocks the events are split into. If 1, or if there is no
+        shared pool of processes, the events are generated in the calling
+        process.
+    backend : str {"threads"]
+        Backend used to generate the blocks, see ``_fill_phase_space``.
+    """
+    num_cmes, num_ps_pts = points.shape[:2]
+    num_fsp = len(masses)
+    num_cpus = max(min(num_cpus, num_ps_pts), 1)
+    starts = np.linspace(0, num_ps_pts, num_cpus + 1).astype(np.int64)
+
+    if backend == "threads" or num_cpus == 1 or parallel.get_pool() is None:
+        momenta = points[:, :, : 4 * num_fsp].view()
+        # Assigning the shape (rather than calling reshape) guarantees a view.
+        momenta.shape = (num_cmes, num_ps_pts, num_fsp, 4)
+        weights = points[:, :, 4 * num_fsp]
+        parallel.thread_starmap(
+            generator.generate_space_multi_cme_inplace,
+            [
+                (momenta[:, start:stop], weights[:, start:stop], masses, cmes,
+                 key, offset + start)
+                for start, stop in zip(starts[:-1], starts[1:])
+            ],
+            num_cpus,
+        )
+        return
+
+    blocks = parallel.starmap(
+        generator.generate_space_multi_cme,
+        [
+            (stop - start, masses, cmes, num_fsp, key, offset + start)
+            for start, stop in zip(starts[:-1], starts[1:])
+        ],
+    )
+    for start, block in zip(starts[:-1], blocks):
+        points[:, start : start + block.shape[1]] = block
+
+
+def _qmc_chunks(masses, cme, num_ps_pts, mat_elem_sqrd, seed, chunk_size=None,
+                num_replicas=8, first_round=None):
+    """
+    Generates phase space points from scrambled Sobol' sequences.
+
+    The points are built from sequential two-body decays (see
+    ``generator.generate_space_sequential``), with the ``3 * num_fsp - 4``
+    random numbers of each event taken from a scrambled Sobol' sequence, so
+    that integration errors of smooth integrands fall nearly as
+    ``1 / num_ps_pts``. RAMBO itself is not used since its energies are
+    logarithms of the random numbers, which makes integrands unbounded on
+    the unit hypercube and spoils the convergence. The points are split into
+    ``num_replicas`` independently scrambled replicas, whose spread gives
+    the error.
+
+    Parameters
+    ----------
+    masses : numpy.ndarray
+        List of masses of the final state particles.
+    cme : double
+        Center-of-mass-energy of the process.
+    num_ps_pts : int
+        Total number of phase space points. The number of points per
+        replica is rounded down to a power of two, which the balance
+        properties of Sobol' sequences require.
+    mat_elem_sqrd : (double)(numpy.ndarray)
+        Function for the matrix element squared.
+    seed : {None, int, array_like[ints], numpy.random.SeedSequence}
+        Seed for the scrambling.
+    chunk_size : int, optional
+        Maximum number of points to generate at once. By default, each
+        replica is generated at once.
+    num_replicas : int
+        Number of independently scrambled replicas.
+    first_round : int, optional
+        If given, the replicas are extended in rounds, doubling the number
+        of points per replica each round starting from ``first_round``
+        (rounded down to a power of two). After each round all replicas hold
+        the same power of two of points, so the estimate can be checked.
+        By default, the replicas are generated one after the other. The
+        points themselves do not depend on this, only their order does.
+
+    Yields
+    ------
+    replica : int
+        Index of the replica the points belong to.
+    phase_space_points : numpy.ndarray
+        Chunk of phase space points in the format of
+        ``generate_phase_space``.
+    """
+    masses = np.array(masses, dtype=np.float64)
+    num_fsp = len(masses)
+    num_per_replica = 2 ** int(np.log2(max(num_ps_pts // num_replicas, 1)))
+    if chunk_size is None:
+        chunk_size = num_per_replica
+
+    # Number of points per replica after each round.
+    if first_round is None:
+        totals = [num_per_replica]
+    else:
+        totals = [min(2 ** int(np.log2(max(first_round, 1))), num_per_replica)]
+        while totals[-1] < num_per_replica:
+            totals.append(2 * totals[-1])
+
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+
+    sobols = [
+        qmc.Sobol(3 * num_fsp - 4, scramble=True, seed=np.random.default_rng(child))
+        for child in seed.spawn(num_replicas)
+    ]
+
+    previous = 0
+    for total in totals:
+        for replica, sobol in enumerate(sobols):
+            for start in range(previous, total, chunk_size):
+                num_pts = min(chunk_size, total - start)
+                with warnings.catch_warnings():
+                    # Only the full replica needs to be a power of two.
+                    warnings.filterwarnings("ignore", message="The balance properties")
+                    uniforms = sobol.random(num_pts)
+                points = np.empty((num_pts, 4 * num_fsp + 1), dtype=np.float64)
+                momenta, weights = _split_points(points, num_fsp)
+                generator.generate_space_sequential(
+                    momenta, weights, masses, cme, uniforms
+                )
+                yield replica, apply_matrix_elem(
+                    points, num_pts, num_fsp, mat_elem_sqrd
+                )
+        previous = total
+
+
+def _converged(integral, std, rtol, atol):
+    """
+    Returns True if the error of an integral meets the requested precision,
+    i.e. if ``std <= atol + rtol * |integral|``. Unset tolerances count as
+    zero and if neither is set, the precision is never met.
+    """
+    if rtol is None and atol is None:
+        return False
+    tol = (0.0 if atol is None else atol) + (0.0 if rtol is None else rtol) * abs(
+        integral
+    )
+    return std <= tol
+
+
+# Number of Gauss-Legendre nodes in s and in t for three-body final states,
+# nodes in s per energy bin for histograms, and nodes per Euler angle used to
+# average matrix elements over orientations.
+_QUAD_NUM_NODES = 32
+_QUAD_NUM_BIN_NODES = 4
+_QUAD_NUM_ANGLES = 6
+# Number of evenly spaced bins per quantile bin used to locate the quantiles.
+_QUAD_QUANTILE_REFINEMENT = 8
+
+# Rotation used to test whether a matrix element depends on the orientation.
+_PROBE_ROTATION = quadrature.rotation_matrix(1.1, 0.7, 2.3)[np.newaxis]
+
+
+def _resolve_sampler(sampler, num_fsp):
+    """
+    Returns the sampler to use for ``num_fsp`` final state particles. If
+    ``sampler`` is None, RAMBO is used.
+    """
+    if sampler is None:
+        return "flat"
+    if sampler == "quadrature" and not 2 <= num_fsp <= 3:
+        raise ValueError(
+            "The quadrature sampler requires two or three final state particles."
+        )
+    return sampler
+
+
+def _warn_unused_by_quadrature(num_ps_pts=None, seed=None):
+    """
+    Warns if arguments which the deterministic quadrature sampler does not
+    use were given.
+    """
+    unused = [
+        name
+        for name, value in [("num_ps_pts", num_ps_pts), ("seed", seed)]
+        if value is not None
+    ]
+    if unused:
+        warnings.warn(
+            "The quadrature sampler does not use {}.".format(" or ".join(unused))
+        )
+
+
+def _apply_matrix_elem_averaged(points, num_fsp, mat_elem_sqrd, num_angles):
+    """
+    Multiplies the weights of quadrature points by the squared matrix element
+    averaged over the orientation of the events.
+
+    The matrix element is first evaluated at the points and at a rotated
+    copy of them. If the two agree, the matrix element does not depend on
+    the orientation and nothing else is needed. Otherwise, it is averaged
+    over the rotations of ``quadrature.rotations(num_angles)``.
+
+    Returns
+    -------
+    points : numpy.ndarray
+        The points, modified in place.
+    num_evals : int
+        Number of matrix element evaluations (or of points, if the matrix
+        element is ``msqrd_flat``).
+    """
+    num_pts = points.shape[0]
+    if mat_elem_sqrd is msqrd_flat:
+        return points, num_pts
+
+    weights = points[:, 4 * num_fsp].copy()
+    probe = quadrature.rotate_space(points, num_fsp, _PROBE_ROTATION)
+    apply_matrix_elem(points, num_pts, num_fsp, mat_elem_sqrd)
+    apply_matrix_elem(probe, num_pts, num_fsp, mat_elem_sqrd)
+    scale = np.max(np.abs(points[:, 4 * num_fsp]))
+    if np.allclose(probe[:, -1], points[:, -1], rtol=1e-9, atol=1e-9 * scale):
+        return points, 2 * num_pts
+
+    rots, rot_weights = quadrature.rotations(num_angles)
+    rotated = quadrature.rotate_space(points, num_fsp, rots)
+    rotated[:, -1] = np.tile(weights, len(rots))
+    apply_matrix_elem(rotated, rotated.shape[0], num_fsp, mat_elem_sqrd)
+    points[:, -1] = rot_weights.dot(rotated[:, -1].reshape((len(rots), num_pts)))
+
+    return points, (2 + len(rots)) * num_pts
+
+
+def _quadrature_integral(masses, cme, mat_elem_sqrd, num_nodes, num_angles):
+    """
+    Returns the integral over two- or three-body phase space using
+    ``num_nodes`` Gauss-Legendre nodes in each of s and t and the number of
+    matrix element evaluations used.
+    """
+    if len(masses) == 2:
+        points = quadrature.two_body_space(masses, cme)
+    else:
+        points = quadrature.three_body_space(masses, cme, num_nodes, num_nodes)
+    points, num_evals = _apply_matrix_elem_averaged(
+        points, len(masses), mat_elem_sqrd, num_angles
+    )
+    return np.sum(points[:, -1]), num_evals
+
+
+def _integrate_quadrature(masses, cme, num_ps_pts, mat_elem_sqrd, rtol=None,
+                          atol=None):
+    """
+    Integrates over two- or three-body phase space with Gauss-Legendre
+    quadrature.
+
+    The error is estimated as the difference to the result of a rule with
+    half as many nodes. If ``rtol`` or ``atol`` is given, the number of nodes
+    is doubled until the error meets the target or the next rule would take
+    the number of matrix element evaluations past ``num_ps_pts``.
+
+    Returns
+    -------
+    integral : float
+        The result of the integral over phase space.
+    err : float
+        The estimated error of the integral.
+    num_evals : int
+        Number of matrix element evaluations used.
+    """
+    masses = np.array(masses, dtype=np.float64)
+    adaptive = rtol is not None or atol is not None
+    num_nodes, num_angles = _QUAD_NUM_NODES, _QUAD_NUM_ANGLES
+    coarse, prev_evals = _quadrature_integral(
+        masses, cme, mat_elem_sqrd, num_nodes // 2, num_angles // 2
+    )
+    num_used = prev_evals
+    while True:
+        integral, num_evals = _quadrature_integral(
+            masses, cme, mat_elem_sqrd, num_nodes, num_angles
+        )
+        num_used += num_evals
+        err = abs(integral - coarse)
+        # The cost of the next rule is extrapolated from the last two.
+        next_evals = num_evals * num_evals // prev_evals
+        if (
+            not adaptive
+            or _converged(integral, err, rtol, atol)
+            or num_used + next_evals > num_ps_pts
+        ):
+            break
+        prev_evals = num_evals
+        coarse = integral
+        num_nodes *= 2
+        num_angles *= 2
+
+    return integral, err, num_used
+
+
+def _quadrature_bin_integrals(masses, cme, mat_elem_sqrd, bins):
+    """
+    Integrates the phase space of a three-body final state over the energy
+    bins of each particle with Gauss-Legendre quadrature.
+
+    The energy of each particle fixes one invariant mass, so each bin is
+    integrated separately over its range of that invariant mass. The bins at
+    the ends of the range are subdivided further (see
+    ``quadrature.graded_edges``).
+    """
+    num_fsp = len(masses)
+    means = np.zeros((num_fsp, bins.shape[1] - 1))
+
+    for i in range(num_fsp):
+        # s = (P - p_i)^2 decreases linearly with the energy of particle i.
+        s_edges = (cme ** 2 + masses[i] ** 2 - 2.0 * cme * bins[i])[::-1]
+        s_edges, starts = quadrature.graded_edges(s_edges)
+        points = quadrature.three_body_space(
+            masses, cme, _QUAD_NUM_BIN_NODES, _QUAD_NUM_NODES, s_edges, i
+        )
+        _apply_matrix_elem_averaged(points, num_fsp, mat_elem_sqrd, _QUAD_NUM_ANGLES)
+        sub_sums = np.sum(points[:, -1].reshape((len(s_edges) - 1, -1)), axis=1)
+        means[i] = np.add.reduceat(sub_sums, starts)[::-1]
+
+    return means
+
+
+def _quadrature_energy_histogram(masses, cme, mat_elem_sqrd, num_bins,
+                                 density=False, binning="linear"):
+    """
+    Computes the energy histograms of a two- or three-body final state with
+    Gauss-Legendre quadrature.
+
+    For three particles, see ``_quadrature_bin_integrals``. Quantile bins
+    are found from a finer histogram with evenly spaced bins. For two
+    particles, the energies are fixed at the upper ends of the bins and all
+    of the weight is put in the last bin, whose energy is set to the fixed
+    energy rather than to the center of the bin.
+
+    Returns
+    -------
+    probs : numpy.ndarray
+        Histograms in the format of ``generate_energy_histogram``.
+    errs : numpy.ndarray
+        Errors of the histograms, which are zero.
+    bins : numpy.ndarray
+        Bin edges with shape (num_fsp, num_bins + 1).
+    """
+    masses = np.array(masses, dtype=np.float64)
+    num_fsp = len(masses)
+
+    if num_fsp == 2:
+        bins = histogram.energy_bin_edges(
+            masses, cme, num_bins, "linear" if binning == "quantile" else binning
+        )
+        means = np.zeros((num_fsp, num_bins))
+        points = quadrature.two_body_space(masses, cme)
+        _apply_matrix_elem_averaged(points, 2, mat_elem_sqrd, _QUAD_NUM_ANGLES)
+        means[:, -1] = points[0, -1]
+    else:
+        if binning == "quantile":
+            fine_bins = histogram.energy_bin_edges(
+                masses, cme, _QUAD_QUANTILE_REFINEMENT * num_bins
+            )
+            fine_means = _quadrature_bin_integrals(
+                masses, cme, mat_elem_sqrd, fine_bins
+            )
+            cdfs = np.zeros_like(fine_bins)
+            cdfs[:, 1:] = np.cumsum(fine_means, axis=1)
+            bins = histogram.quantile_bin_edges(fine_bins, cdfs, num_bins)
+        else:
+            bins = histogram.energy_bin_edges(masses, cme, num_bins, binning)
+        means = _quadrature_bin_integrals(masses, cme, mat_elem_sqrd, bins)
+
+    probs = np.zeros((num_fsp, 2, num_bins))
+    probs[:, 0, :] = (bins[:, 1:] + bins[:, :-1]) / 2.0
+    if num_fsp == 2:
+        probs[:, 0, -1] = bins[:, -1]
+    probs[:, 1, :] = means / np.diff(bins, axis=1)
+    if density is True:
+        norms = np.sum(means, axis=1, keepdims=True)
+        norms[norms == 0.0] = 1.0
+        probs[:, 1, :] /= norms
+
+    return probs, np.zeros((num_fsp, num_bins)), bins
+
+
+def generate_phase_space_point(masses, cme, seed=None):
     """
     Generate a phase space point given a set of final state particles and a
     given center of mass energy.
@@ -33,6 +700,8 @@ def generate_phase_space_point(masses, cme):
         List of masses of the final state particles.
     cme : double
         Center-of-mass-energy of the process.
+    seed : {None, int, array_like[ints], numpy.random.SeedSequence}
+        Seed for the random number generator. If None, fresh entropy is used.
 
     Returns
     -------
@@ -47,12 +716,18 @@ def generate_phase_space_point(masses, cme):
     if not hasattr(masses, "__len__"):
         masses = [masses]
 
-    masses = np.array(masses)
-    return generator.generate_point(masses, cme, len(masses))
+    masses = np.array(masses, dtype=np.float64)
+    return generator.generate_point(masses, cme, len(masses), _generator_key(seed))
 
 
 def generate_phase_space(
-    masses, cme, num_ps_pts=10000, mat_elem_sqrd=lambda klist: 1, num_cpus=None
+    masses,
+    cme,
+    num_ps_pts=10000,
+    mat_elem_sqrd=msqrd_flat,
+    num_cpus=None,
+    seed=None,
+    backend=None,
 ):
     """
     Generate a specified number of phase space points given a set of
@@ -67,11 +742,24 @@ def generate_phase_space(
         Center-of-mass-energy of the process.
     num_ps_pts : int {10000]
         Total number of phase space points to generate.
-    mat_elem_sqrd : (double)(numpy.ndarray) {lambda klist: 1]
-        Function for the matrix element squared.
+    mat_elem_sqrd : (double)(numpy.ndarray) {msqrd_flat]
+        Function for the matrix element squared. May be vectorized, see
+        ``vectorized``, or compiled, see ``compiled_msqrd``.
     num_cpus : int {None]
-        Number of cpus to use in parallel with rambo. If not specified, 75% of
-        the cpus will be used.
+        Number of cpus to use in parallel with rambo. The points are split
+        into ``num_cpus`` blocks which are generated by the shared pool of
+        ``hazma.parallel``. If not specified, the process-wide setting (75% of
+        the cpus by default, see ``hazma.parallel.set_num_cpus``) is used.
+    seed : {None, int, array_like[ints], numpy.random.SeedSequence}
+        Seed for the random number generator. Calls with the same seed
+        produce identical results, independently of ``num_cpus``. If None,
+        fresh entropy is used.
+    backend : str {None]
+        How the blocks are generated: "threads" fills slices of the output
+        from the shared pool of threads with the GIL released, "processes"
+        uses the shared pool of worker processes. The results do not depend
+        on the backend. If not specified, the process-wide setting ("threads"
+        by default, see ``hazma.parallel.set_backend``) is used.
 
     Returns
     -------
@@ -98,56 +786,216 @@ def generate_phase_space(
     if not hasattr(masses, "__len__"):
         masses = [masses]
 
+    masses = np.array(masses, dtype=np.float64)
+
     if cme < sum(masses):
         raise RamboCMETooSmall()
 
     num_fsp = len(masses)
-    # If the user doesn't specify the number of cpus to use,
-    # use 75% of them.
-    if num_cpus is not None:
-        if num_cpus > num_ps_pts:
-            num_cpus = num_ps_pts
-        if num_cpus > mp.cpu_count():
-            num_cpus = int(np.floor(mp.cpu_count() * 0.75))
-            warnings.warn(
-                """You only have {] cpus.
-                          Using {] cpus instead.
-                          """.format(
-                    mp.cpu_count(), num_cpus
-                )
-            )
-    if num_cpus is None:
-        # Use 75% of the cpu power.
-        num_cpus = int(np.floor(mp.cpu_count() * 0.75))
-        # If user wants a number of phase space points which is less
-        # than the number of cpus available, use num_ps_pts cpus instead.
-        if num_cpus > num_ps_pts:
-            num_cpus = num_ps_pts
-    # Instantiate `num_cpus` number of workers and divide num_ps_pts among the
-    # the workers to speed up phase space generation.
-    pool = mp.Pool(num_cpus)
-    num_ps_pts_per_cpu = int(num_ps_pts / num_cpus)
-    # If num_ps_pts % num_cpus !=0, then we need to compute the actual number
-    # of phase space points.
-    actual_num_ps_pts = num_ps_pts_per_cpu * num_cpus
-    # Create a container to store the results from the workers
-    job_results = []
-    # Run the jobs on 75% of the cpus.
-    for i in range(num_cpus):
-        job_results.append(
-            pool.apply_async(
-                generator.generate_space, (num_ps_pts_per_cpu, masses, cme, num_fsp)
-            )
+    num_cpus = _resolve_num_cpus(num_cpus)
+    backend = _resolve_backend(backend)
+    # If user wants a number of phase space points which is less
+    # than the number of cpus available, use num_ps_pts cpus instead.
+    num_cpus = max(min(num_cpus, num_ps_pts), 1)
+
+    def compute():
+        # Allocate the output once. The generator writes the momenta and
+        # weights directly into views of this buffer.
+        points = np.empty((num_ps_pts, 4 * num_fsp + 1), dtype=np.float64)
+        # Resize the weights to have the correct cross section.
+        return _fill_phase_space(
+            points,
+            masses,
+            cme,
+            _generator_key(seed),
+            0,
+            num_cpus,
+            mat_elem_sqrd,
+            backend,
+        )
+
+    # Without a seed, every call uses fresh random numbers.
+    if seed is None:
+        return compute()
+    return cache.cached(
+        "generate_phase_space",
+        (masses, float(cme), num_ps_pts, mat_elem_sqrd, seed),
+        compute,
+    )
+
+
+def generate_phase_space_chunks(
+    masses,
+    cme,
+    num_ps_pts=10000,
+    mat_elem_sqrd=msqrd_flat,
+    num_cpus=None,
+    seed=None,
+    chunk_size=100000,
+    sampler="flat",
+    backend=None,
+):
+    """
+    Generate phase space points in chunks of a fixed size, so that the
+    memory used does not grow with the number of points.
+
+    The chunks contain consecutive events of the same random stream as
+    ``generate_phase_space``, so for a given seed the union of the chunks
+    is independent of ``chunk_size``.
+
+    Parameters
+    ----------
+    masses : numpy.ndarray
+        List of masses of the final state particles.
+    cme : double
+        Center-of-mass-energy of the process.
+    num_ps_pts : int
+        Total number of phase space points to generate.
+    mat_elem_sqrd : (double)(numpy.ndarray) {msqrd_flat]
+        Function for the matrix element squared. May be vectorized, see
+        ``vectorized``, or compiled, see ``compiled_msqrd``.
+    num_cpus : int {None]
+        Number of cpus to use. Each chunk is split into ``num_cpus`` blocks
+        which are generated by the shared pool of ``hazma.parallel``.
+    seed : {None, int, array_like[ints], numpy.random.SeedSequence}
+        Seed for the random number generator. If None, fresh entropy is used.
+    chunk_size : int
+        Number of phase space points in each chunk. The last chunk may be
+        smaller.
+    sampler : str {"flat"]
+        "flat" uses pseudo-random numbers. "qmc" uses scrambled Sobol'
+        sequences (see ``generate_energy_histogram``), in which case the
+        number of points is rounded down to a multiple of a power of two
+        and the chunks are not generated on the shared pool.
+    backend : str {None]
+        Backend used to generate the points, see ``generate_phase_space``.
+
+    Yields
+    ------
+    phase_space_points : numpy.ndarray
+        Chunk of phase space points in the same format as the output of
+        ``generate_phase_space``. The chunks share a single buffer, which is
+        overwritten when the next chunk is generated: copy a chunk if it
+        needs to be kept.
+
+    Examples
+    --------
+
+    Average the weights of 10^8 points without storing them::
+
+        from hazma import rambo
+        import numpy as np
+        masses = np.array([100., 200., 0.0])
+        total = 0.0
+        for pts in rambo.generate_phase_space_chunks(masses, 1000.,
+                                                     num_ps_pts=10**8):
+            total += np.sum(pts[:, -1])
+        integral = total / 10**8
+
+    """
+    if not hasattr(masses, "__len__"):
+        masses = [masses]
+
+    masses = np.array(masses, dtype=np.float64)
+
+    if cme < sum(masses):
+        raise RamboCMETooSmall()
+
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1.")
+
+    if sampler == "qmc":
+        for _, points in _qmc_chunks(
+            masses, cme, num_ps_pts, mat_elem_sqrd, seed, chunk_size
+        ):
+            yield points
+        return
+    elif sampler != "flat":
+        raise ValueError("Unknown sampler '{}'.".format(sampler))
+
+    num_fsp = len(masses)
+    num_cpus = _resolve_num_cpus(num_cpus)
+    backend = _resolve_backend(backend)
+    key = _generator_key(seed)
+
+    buffer = np.empty((min(chunk_size, num_ps_pts), 4 * num_fsp + 1), dtype=np.float64)
+
+    for start in range(0, num_ps_pts, chunk_size):
+        num_pts = min(chunk_size, num_ps_pts - start)
+        points = buffer[:num_pts]
+        yield _fill_phase_space(
+            points, masses, cme, key, start, num_cpus, mat_elem_sqrd, backend
         )
-    # Close the pool and wait for results to finish
-    pool.close()
-    pool.join()
-    # Put results in a numpy array.
-    points = np.array([result.get() for result in job_results])
-    # Flatten the outer axis to have a list of phase space points.
-    points = points.reshape(actual_num_ps_pts, 4 * num_fsp + 1)
-    # Resize the weights to have the correct cross section.
-    points = apply_matrix_elem(points, actual_num_ps_pts, num_fsp, mat_elem_sqrd)
+
+
+def generate_phase_space_multi_cme(
+    masses,
+    cmes,
+    num_ps_pts=10000,
+    mat_elem_sqrd=msqrd_flat,
+    num_cpus=None,
+    seed=None,
+    backend=None,
+):
+    """
+    Generate phase space points at several center of mass energies.
+
+    RAMBO builds massless momenta whose only dependence on the energy is an
+    overall scale, and then corrects them for the masses. The massless
+    momenta are therefore generated once and reused at every energy, which
+    saves the random numbers and boosts when scanning over energies (e.g.
+    dark matter masses). The points at each energy are those
+    ``generate_phase_space`` would give with the same seed (with
+    ``num_cpus`` dividing ``num_ps_pts``), so the energies are correlated.
+
+    Parameters
+    ----------
+    masses : numpy.ndarray
+        List of masses of the final state particles.
+    cmes : numpy.ndarray
+        Center-of-mass-energies.
+    num_ps_pts : int {10000]
+        Number of phase space points to generate at each energy.
+    mat_elem_sqrd : (double)(numpy.ndarray) {msqrd_flat]
+        Function for the matrix element squared. May be vectorized, see
+        ``vectorized``, or compiled, see ``compiled_msqrd``.
+    num_cpus : int {None]
+        Number of cpus to use in parallel with rambo (see
+        ``generate_phase_space``).
+    seed : {None, int, array_like[ints], numpy.random.SeedSequence}
+        Seed for the random number generator.
+    backend : str {None]
+        Backend used to generate the points, see ``generate_phase_space``.
+
+    Returns
+    -------
+    phase_space_points : numpy.ndarray
+        Array of shape (num_cmes, num_ps_pts, 4 * num_fsp + 1) with the
+        phase space points at each energy in the format of
+        ``generate_phase_space``.
+    """
+    if not hasattr(masses, "__len__"):
+        masses = [masses]
+
+    masses = np.array(masses, dtype=np.float64)
+    cmes = np.atleast_1d(np.array(cmes, dtype=np.float64))
+
+    if np.any(cmes < sum(masses)):
+        raise RamboCMETooSmall()
+
+    num_fsp = len(masses)
+    points = np.empty((len(cmes), num_ps_pts, 4 * num_fsp + 1), dtype=np.float64)
+    _fill_phase_space_multi_cme(
+        points,
+        masses,
+        cmes,
+        _generator_key(seed),
+        0,
+        _resolve_num_cpus(num_cpus),
+        _resolve_backend(backend),
+    )
+    for pts in points:
+        apply_matrix_elem(pts, num_ps_pts, num_fsp, mat_elem_sqrd)
 
     return points
 
@@ -155,33 +1003,84 @@ def generate_phase_space(
 def generate_energy_histogram(
     masses,
     cme,
-    num_ps_pts=10000,
-    mat_elem_sqrd=lambda klist: 1,
+    num_ps_pts=None,
+    mat_elem_sqrd=msqrd_flat,
     num_bins=25,
     num_cpus=None,
     density=False,
+    seed=None,
+    chunk_size=None,
+    sampler=None,
+    binning="linear",
+    return_bins=False,
+    backend=None,
 ):
     """
     Generate energy histograms for each of the final state particles.
 
     Parameters
     ----------
-    num_ps_pts : int
+    num_ps_pts : int {10000]
         Total number of phase space points to generate.
     masses : numpy.ndarray
         List of masses of the final state particles.
     cme : double
         Center-of-mass-energy of the process.
-    mat_elem_sqrd : (double)(numpy.ndarray) {lambda klist: 1]
-        Function for the matrix element squared.
+    mat_elem_sqrd : (double)(numpy.ndarray) {msqrd_flat]
+        Function for the matrix element squared. May be vectorized, see
+        ``vectorized``, or compiled, see ``compiled_msqrd``.
     num_bins : int
         Number of energy bins to use for each of the final state particles.
     num_cpus : int {None]
-        Number of cpus to use in parallel with rambo. If not specified, 75% of
-        the cpus will be used.
+        Number of cpus to use in parallel with rambo. The points are split
+        into ``num_cpus`` blocks which are generated by the shared pool of
+        ``hazma.parallel``. If not specified, the process-wide setting (75% of
+        the cpus by default, see ``hazma.parallel.set_num_cpus``) is used.
+    seed : {None, int, array_like[ints], numpy.random.SeedSequence}
+        Seed for the random number generator. Calls with the same seed
+        produce identical results, independently of ``num_cpus``. If None,
+        fresh entropy is used.
     density: Bool
         If true, the histograms will be normalized to have unit area underneath
         the curves, i.e. they will be probability density functions.
+    chunk_size : int {None]
+        If specified, the points are generated ``chunk_size`` at a time and
+        added to running histograms (see ``generate_phase_space_chunks``),
+        so the memory used does not grow with ``num_ps_pts``. The bins then
+        span the kinematically allowed energies of each particle rather than
+        the range of sampled energies, and exactly ``num_ps_pts`` points are
+        used.
+    sampler : str {None]
+        If None, "flat" is used, i.e. RAMBO with independent random numbers.
+        For two or three final state particles, "quadrature" integrates each
+        bin with Gauss-Legendre rules over the Dalitz plane instead of
+        sampling (see ``hazma.phase_space_helper_functions.quadrature``);
+        the result has no statistical noise and the bins span the
+        kinematically allowed energies. It does not use ``num_ps_pts`` or
+        ``seed`` and warns if they are given. Matrix elements which depend
+        on the orientation of the event are averaged over it, which takes
+        many evaluations unless they are vectorized or compiled. For two
+        particles, all of the weight is in the last bin, whose energy is the
+        fixed energy of the particle. "qmc" builds the
+        points from sequential two-body decays with random numbers taken
+        from 8 independently scrambled Sobol' sequences (quasi-Monte Carlo),
+        for which the noise in smooth histograms falls nearly as
+        ``1 / num_ps_pts`` rather than ``1 / sqrt(num_ps_pts)``. The number
+        of points per sequence is rounded down to a power of two and the
+        points are generated in the calling process.
+    binning : str {"linear"]
+        How the bins are spaced: "linear" (evenly), "log" (evenly in the
+        logarithm of the energy), "endpoint" (refined towards both ends of
+        the energy range) or "quantile" (each bin holds the same share of
+        the distribution). The latter three resolve steep parts of the
+        distributions with fewer bins. With ``chunk_size``, quantile bins
+        are estimated from the first chunk. See
+        ``hazma.phase_space_helper_functions.histogram``.
+    return_bins : bool {False]
+        If True, the bin edges are returned as well. These are needed to
+        recover the weight of each bin when the bins are not evenly spaced.
+    backend : str {None]
+        Backend used to generate the points, see ``generate_phase_space``.
 
     Returns
     -------
@@ -193,6 +1092,15 @@ def generate_energy_histogram(
              ...
              [[EN1, EN2, ....], [histM1, histN2, ...]]]
 
+        The energies are the centers of the bins, except for two particles
+        with the "quadrature" sampler (see ``sampler``).
+    errors : numpy.ndarray
+        Standard errors of the histograms (not divided by the bin widths)
+        with shape (num_fsp, num_bins).
+    bins : numpy.ndarray
+        Bin edges with shape (num_fsp, num_bins + 1). Only returned if
+        ``return_bins`` is True.
+
     Examples
     --------
 
@@ -220,18 +1128,481 @@ def generate_energy_histogram(
         raise RamboCMETooSmall()
 
     num_fsp = len(masses)
+    sampler = _resolve_sampler(sampler, num_fsp)
+
+    if binning not in histogram.BINNINGS:
+        raise ValueError(
+            "Unknown binning '{}', expected one of {}.".format(
+                binning, histogram.BINNINGS
+            )
+        )
+
+    masses = np.array(masses, dtype=np.float64)
+    inputs = (masses, float(cme), mat_elem_sqrd, num_bins, density, binning)
+
+    if sampler == "quadrature":
+        _warn_unused_by_quadrature(num_ps_pts, seed)
+        result = cache.cached(
+            "quadrature_energy_histogram",
+            inputs,
+            lambda: _quadrature_energy_histogram(
+                masses, cme, mat_elem_sqrd, num_bins, density=density, binning=binning
+            ),
+        )
+        return result if return_bins else result[:2]
+
+    if num_ps_pts is None:
+        num_ps_pts = 10000
+
+    def compute():
+        return _sampled_energy_histogram(
+            masses,
+            cme,
+            num_ps_pts,
+            mat_elem_sqrd,
+            num_bins,
+            num_cpus,
+            density,
+            seed,
+            chunk_size,
+            sampler,
+            binning,
+            backend,
+        )
 
-    pts = generate_phase_space(masses, cme, num_ps_pts, mat_elem_sqrd, num_cpus)
+    # Without a seed, every call uses fresh random numbers.
+    if seed is None:
+        result = compute()
+    else:
+        result = cache.cached(
+            "sampled_energy_histogram",
+            inputs + (num_ps_pts, seed, chunk_size, sampler),
+            compute,
+        )
+    return result if return_bins else result[:2]
+
+
+def _sampled_energy_histogram(
+    masses,
+    cme,
+    num_ps_pts,
+    mat_elem_sqrd,
+    num_bins,
+    num_cpus,
+    density,
+    seed,
+    chunk_size,
+    sampler,
+    binning,
+    backend=None,
+):
+    """
+    Computes the energy histograms of ``generate_energy_histogram`` from
+    sampled phase space points.
+
+    Returns
+    -------
+    probs : numpy.ndarray
+        Histograms in the format of ``generate_energy_histogram``.
+    errs : numpy.ndarray
+        Errors of the histograms.
+    bins : numpy.ndarray
+        Bin edges with shape (num_fsp, num_bins + 1).
+    """
+    num_fsp = len(masses)
+
+    if chunk_size is not None:
+        hist = histogram.RunningEnergyHistogram(masses, cme, num_bins, binning)
+        for pts in generate_phase_space_chunks(
+            masses,
+            cme,
+            num_ps_pts,
+            mat_elem_sqrd,
+            num_cpus,
+            seed,
+            chunk_size,
+            sampler=sampler,
+            backend=backend,
+        ):
+            hist.add(pts, pts.shape[0])
+        probs, errs = hist.energy_hist(density=density)
+        return probs, errs, hist.bins
+
+    if sampler == "qmc":
+        pts = np.concatenate(
+            [
+                points
+                for _, points in _qmc_chunks(
+                    masses, cme, num_ps_pts, mat_elem_sqrd, seed
+                )
+            ]
+        )
+    elif sampler == "flat":
+        # Only the histograms are worth storing, not the points.
+        with cache.bypass():
+            pts = generate_phase_space(
+                masses,
+                cme,
+                num_ps_pts,
+                mat_elem_sqrd,
+                num_cpus,
+                seed=seed,
+                backend=backend,
+            )
+    else:
+        raise ValueError("Unknown sampler '{}'.".format(sampler))
 
     actual_num_ps_pts = pts.shape[0]
 
     return histogram.space_to_energy_hist(
-        pts, actual_num_ps_pts, num_fsp, num_bins, density=density
+        pts,
+        actual_num_ps_pts,
+        num_fsp,
+        num_bins,
+        density=density,
+        binning=binning,
+        return_bins=True,
     )
 
 
+def generate_observables(
+    masses,
+    cme,
+    observables,
+    num_ps_pts=10000,
+    mat_elem_sqrd=msqrd_flat,
+    num_cpus=None,
+    density=False,
+    seed=None,
+    chunk_size=100000,
+    sampler="flat",
+    backend=None,
+):
+    """
+    Accumulate several observables from the same phase space points, so that
+    a single RAMBO run provides e.g. the energy histograms needed by the
+    gamma ray and positron spectra together with invariant mass and opening
+    angle distributions.
+
+    Parameters
+    ----------
+    masses : numpy.ndarray
+        List of masses of the final state particles.
+    cme : double
+        Center-of-mass-energy of the process.
+    observables : dict
+        Observables to accumulate, keyed by name. See
+        ``hazma.phase_space_helper_functions.observables`` for the available
+        observables and the interface they implement.
+    num_ps_pts : int {10000]
+        Total number of phase space points to generate.
+    mat_elem_sqrd : (double)(numpy.ndarray) {msqrd_flat]
+        Function for the matrix element squared. May be vectorized, see
+        ``vectorized``, or compiled, see ``compiled_msqrd``.
+    num_cpus : int {None]
+        Number of cpus to use (see ``generate_phase_space_chunks``).
+    density : bool {False]
+        If true, the histograms are normalized to have unit area.
+    seed : {None, int, array_like[ints], numpy.random.SeedSequence}
+        Seed for the random number generator. If None, fresh entropy is used.
+    chunk_size : int {100000]
+        Number of phase space points generated at a time.
+    sampler : str {"flat"]
+        "flat" or "qmc", see ``generate_energy_histogram``.
+    backend : str {None]
+        Backend used to generate the points, see ``generate_phase_space``.
+
+    Returns
+    -------
+    results : dict
+        Result of each observable, keyed by name. For the histograms of
+        ``hazma.phase_space_helper_functions.observables`` these are tuples
+        ``(probs, errs, bins)``.
+
+    Examples
+    --------
+
+    Energy histograms and pi+ pi- invariant masses for a three pion final
+    state::
+
+        from hazma import rambo
+        from hazma.phase_space_helper_functions import observables
+        results = rambo.generate_observables(
+            [mpi, mpi, mpi0], 1000.0,
+            {"energy": observables.EnergyHistogram(),
+             "mpipi": observables.InvariantMassHistogram([(0, 1)])},
+            num_ps_pts=10**6)
+
+    """
+    if not hasattr(masses, "__len__"):
+        masses = [masses]
+
+    masses = np.array(masses, dtype=np.float64)
+
+    if cme < sum(masses):
+        raise RamboCMETooSmall()
+
+    for observable in observables.values():
+        observable.start(masses, cme)
+
+    for pts in generate_phase_space_chunks(
+        masses,
+        cme,
+        num_ps_pts,
+        mat_elem_sqrd,
+        num_cpus,
+        seed,
+        chunk_size,
+        sampler=sampler,
+        backend=backend,
+    ):
+        for observable in observables.values():
+            observable.add(pts, pts.shape[0])
+
+    return {
+        name: observable.result(density=density)
+        for name, observable in observables.items()
+    }
+
+
+def generate_energy_histogram_multi_cme(
+    masses,
+    cmes,
+    num_ps_pts=10000,
+    mat_elem_sqrd=msqrd_flat,
+    num_bins=25,
+    num_cpus=None,
+    density=False,
+    seed=None,
+    chunk_size=100000,
+    binning="linear",
+    return_bins=False,
+    backend=None,
+):
+    """
+    Generate energy histograms for each of the final state particles at
+    several center of mass energies.
+
+    The phase space points are generated ``chunk_size`` at a time with
+    ``generate_phase_space_multi_cme``, so the massless configurations are
+    shared between the energies, and added to running histograms (see
+    ``generate_energy_histogram`` with ``chunk_size``).
+
+    Parameters
+    ----------
+    masses : numpy.ndarray
+        List of masses of the final state particles.
+    cmes : numpy.ndarray
+        Center-of-mass-energies.
+    num_ps_pts : int {10000]
+        Number of phase space points to use at each energy.
+    mat_elem_sqrd : (double)(numpy.ndarray) {msqrd_flat]
+        Function for the matrix element squared. May be vectorized, see
+        ``vectorized``, or compiled, see ``compiled_msqrd``.
+    num_bins : int {25]
+        Number of energy bins to use for each of the final state particles.
+        The bins span the kinematically allowed energies.
+    num_cpus : int {None]
+        Number of cpus to use in parallel with rambo (see
+        ``generate_phase_space``).
+    density: Bool {False]
+        If true, the histograms will be normalized to have unit area.
+    seed : {None, int, array_like[ints], numpy.random.SeedSequence}
+        Seed for the random number generator.
+    chunk_size : int {100000]
+        Maximum number of points generated at once at each energy.
+    binning : str {"linear"]
+        How the bins are spaced, see ``generate_energy_histogram``.
+    return_bins : bool {False]
+        If True, the bin edges are returned as well.
+    backend : str {None]
+        Backend used to generate the points, see ``generate_phase_space``.
+
+    Returns
+    -------
+    energy_histograms : numpy.ndarray
+        Array of shape (num_cmes, num_fsp, 2, num_bins) with the histograms
+        at each energy in the format of ``generate_energy_histogram``.
+    errors : numpy.ndarray
+        Array of shape (num_cmes, num_fsp, num_bins) with the errors of the
+        histograms.
+    bins : numpy.ndarray
+        Array of shape (num_cmes, num_fsp, num_bins + 1) with the bin edges.
+        Only returned if ``return_bins`` is True.
+
+    Examples
+    --------
+
+    Energy histograms of a four-body final state for a range of energies::
+
+        from hazma import rambo
+        import numpy as np
+        masses = np.array([100., 100., 0.0, 0.0])
+        cmes = np.linspace(300., 1000., 50)
+        hists, errs = rambo.generate_energy_histogram_multi_cme(masses, cmes)
+
+    """
+    if not hasattr(masses, "__len__"):
+        masses = [masses]
+
+    masses = np.array(masses, dtype=np.float64)
+    cmes = np.atleast_1d(np.array(cmes, dtype=np.float64))
+
+    if np.any(cmes < sum(masses)):
+        raise RamboCMETooSmall()
+
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1.")
+
+    num_fsp = len(masses)
+    num_cpus = _resolve_num_cpus(num_cpus)
+    backend = _resolve_backend(backend)
+    key = _generator_key(seed)
+    hists = [
+        histogram.RunningEnergyHistogram(masses, cme, num_bins, binning)
+        for cme in cmes
+    ]
+
+    buffer = np.empty(
+        (len(cmes), min(chunk_size, num_ps_pts), 4 * num_fsp + 1), dtype=np.float64
+    )
+    for start in range(0, num_ps_pts, chunk_size):
+        num_pts = min(chunk_size, num_ps_pts - start)
+        points = buffer[:, :num_pts]
+        _fill_phase_space_multi_cme(
+            points, masses, cmes, key, start, num_cpus, backend
+        )
+        for hist, pts in zip(hists, points):
+            apply_matrix_elem(pts, num_pts, num_fsp, mat_elem_sqrd)
+            hist.add(pts, num_pts)
+
+    results = [hist.energy_hist(density=density) for hist in hists]
+    probs = np.array([probs for probs, _ in results])
+    errs = np.array([errs for _, errs in results])
+    if return_bins:
+        return probs, errs, np.array([hist.bins for hist in hists])
+    return probs, errs
+
+
+def _integrate_vegas(
+    fsp_masses,
+    cme,
+    num_ps_pts,
+    mat_elem_sqrd,
+    seed,
+    chunk_size=None,
+    num_train_iter=5,
+    num_incs=50,
+    alpha=0.5,
+    num_train_pts=None,
+    rtol=None,
+    atol=None,
+):
+    """
+    Integrates over phase space using VEGAS importance sampling.
+
+    The phase space points are built from sequential two-body decays (see
+    ``generator.generate_space_sequential``) rather than with RAMBO, since
+    then each invariant mass ``(p_1 + ... + p_k)^2`` is controlled by a
+    single random number and a resonance in it can be learned by the
+    per-dimension grid of VEGAS.
+
+    Parameters
+    ----------
+    fsp_masses : numpy.ndarray
+        List of masses of the final state particles.
+    cme : double
+        Center-of-mass-energy of the process.
+    num_ps_pts : int
+        Total number of phase space points, i.e. matrix element evaluations.
+        By default, half of them are used to train the grid in
+        ``num_train_iter`` iterations and the other half to estimate the
+        integral.
+    mat_elem_sqrd : (double)(numpy.ndarray)
+        Function for the matrix element squared.
+    seed : {None, int, array_like[ints], numpy.random.SeedSequence}
+        Seed for the random number generator.
+    chunk_size : int, optional
+        Maximum number of points to generate at once.
+    num_train_iter : int
+        Number of iterations used to train the grid.
+    num_incs : int
+        Number of increments of the grid in each dimension.
+    alpha : double
+        Damping exponent of the grid refinement.
+    num_train_pts : int, optional
+        Number of points used in each training iteration.
+    rtol, atol : float, optional
+        Relative and absolute target errors. If either is given, the
+        estimation stops after the first chunk at which
+        ``std <= atol + rtol * |integral|``.
+
+    Returns
+    -------
+    integral : float
+        The result of the integral over phase space.
+    std : float
+        The estimated error in the integral over phase space.
+    num_used : int
+        Number of phase space points used, including the training.
+    """
+    masses = np.array(fsp_masses, dtype=np.float64)
+    num_fsp = len(masses)
+    num_dims = 3 * num_fsp - 4
+    key = _generator_key(seed)
+    vmap = vegas.VegasMap(num_dims, num_incs)
+
+    if num_train_pts is None:
+        num_train_pts = num_ps_pts // (2 * num_train_iter)
+    num_final_pts = num_ps_pts - num_train_iter * num_train_pts
+    if chunk_size is None:
+        chunk_size = max(num_train_pts, num_final_pts)
+    buffer = np.empty((min(chunk_size, num_final_pts), 4 * num_fsp + 1))
+
+    def integrand(offset, num_pts):
+        # Weights of the importance sampled events, i.e. the integrand
+        # in the unit hypercube, and the points they were drawn from.
+        y = generator.generate_uniforms(num_pts, num_dims, key, offset)
+        x, jac = vmap.map(y)
+        points = buffer[:num_pts]
+        momenta, weights = _split_points(points, num_fsp)
+        generator.generate_space_sequential(momenta, weights, masses, cme, x)
+        weights *= jac
+        apply_matrix_elem(points, num_pts, num_fsp, mat_elem_sqrd)
+        return y, weights
+
+    offset = 0
+    for _ in range(num_train_iter):
+        for start in range(0, num_train_pts, chunk_size):
+            num_pts = min(chunk_size, num_train_pts - start)
+            y, weights = integrand(offset, num_pts)
+            vmap.add_training_data(y, weights)
+            offset += num_pts
+        vmap.adapt(alpha)
+
+    count, integral, m2 = 0, 0.0, 0.0
+    for start in range(0, num_final_pts, chunk_size):
+        num_pts = min(chunk_size, num_final_pts - start)
+        weights = integrand(offset, num_pts)[1]
+        count, integral, m2 = histogram.merge_moments(
+            count, integral, m2, num_pts, np.sum(weights), np.dot(weights, weights)
+        )
+        offset += num_pts
+        if _converged(integral, np.sqrt(m2) / count, rtol, atol):
+            break
+
+    return integral, np.sqrt(m2) / count, offset
+
+
 def integrate_over_phase_space(
-    fsp_masses, cme, num_ps_pts=10000, mat_elem_sqrd=lambda momenta: 1, num_cpus=None
+    fsp_masses,
+    cme,
+    num_ps_pts=None,
+    mat_elem_sqrd=msqrd_flat,
+    num_cpus=None,
+    seed=None,
+    chunk_size=None,
+    sampler=None,
 ):
     """
     Returns the integral over phase space given a squared matrix element, a
@@ -245,11 +1616,47 @@ def integrate_over_phase_space(
         Center-of-mass-energy of the process.
     num_ps_pts : int {10000]
         Total number of phase space points to generate.
-    mat_elem_sqrd : (double)(numpy.ndarray) {lambda momenta: 1]
-        Function for the matrix element squared.
+    mat_elem_sqrd : (double)(numpy.ndarray) {msqrd_flat]
+        Function for the matrix element squared. May be vectorized, see
+        ``vectorized``, or compiled, see ``compiled_msqrd``.
     num_cpus : int {None]
-        Number of cpus to use in parallel with rambo. If not specified, 75% of
-        the cpus will be used.
+        Number of cpus to use in parallel with rambo. The points are split
+        into ``num_cpus`` blocks which are generated by the shared pool of
+        ``hazma.parallel``. If not specified, the process-wide setting (75% of
+        the cpus by default, see ``hazma.parallel.set_num_cpus``) is used.
+    seed : {None, int, array_like[ints], numpy.random.SeedSequence}
+        Seed for the random number generator. Calls with the same seed
+        produce identical results, independently of ``num_cpus``. If None,
+        fresh entropy is used.
+    chunk_size : int {None]
+        If specified, the points are generated ``chunk_size`` at a time and
+        only running sums of the weights are kept (see
+        ``generate_phase_space_chunks``), so the memory used does not grow
+        with ``num_ps_pts``.
+    sampler : str {None]
+        How phase space is sampled. If None, "flat" is used. For two or three
+        final state particles, "quadrature" is deterministic: two-body phase
+        space is known exactly and three-body phase space is integrated with
+        Gauss-Legendre rules over the Dalitz plane (see
+        ``hazma.phase_space_helper_functions.quadrature``). Matrix elements
+        which depend on the orientation of the event are also averaged over it
+        with quadrature, which takes many evaluations unless they are
+        vectorized or compiled. The error is estimated from a rule with half as
+        many nodes. ``seed`` and ``num_ps_pts`` are not used and a warning is
+        issued if they are given. "flat" uses RAMBO. "vegas" uses adaptive
+        importance sampling (see ``hazma.phase_space_helper_functions.vegas``)
+        of a parametrization of phase space in terms of the invariant masses of
+        the first 2, 3, ... final state particles and decay angles: half of the
+        points are used over several iterations to train the sampling grid and
+        the other half to estimate the integral. This is much more accurate for
+        matrix elements which are sharply peaked in these variables, e.g. with
+        a resonance in ``(p_1 + p_2)^2`` (so the resonant particles should be
+        listed first). "qmc" uses the same parametrization with random numbers
+        taken from 8 independently scrambled Sobol' sequences, whose spread
+        gives the error; for smooth integrands, the error then falls nearly as
+        ``1 / num_ps_pts``. The number of points per sequence is rounded down
+        to a power of two. The "vegas" and "qmc" samplers run in the calling
+        process.
 
     Returns
     -------
@@ -258,6 +1665,73 @@ def integrate_over_phase_space(
     std : float
         The estimated error in the integral over phase space.
 
+    """
+    return _integrate_over_phase_space(
+        fsp_masses, cme, num_ps_pts, mat_elem_sqrd, num_cpus, seed, chunk_size,
+        sampler
+    )[:2]
+
+
+def integrate_over_phase_space_to_precision(
+    fsp_masses,
+    cme,
+    num_ps_pts=None,
+    mat_elem_sqrd=msqrd_flat,
+    num_cpus=None,
+    seed=None,
+    chunk_size=None,
+    sampler=None,
+    rtol=None,
+    atol=None,
+):
+    """
+    Returns the integral over phase space given a squared matrix element, a
+    set of final state particle masses and a given energy, generating points
+    until the requested precision is reached.
+
+    The points are generated in batches of ``chunk_size`` (10000 by default)
+    and generation stops as soon as ``std <= atol + rtol * |integral|`` or
+    ``num_ps_pts`` points have been used. With "vegas", each training
+    iteration then also uses one batch. With "qmc", the points per sequence
+    are doubled until the target is met and with "quadrature", the number of
+    nodes is. See ``integrate_over_phase_space`` for the other arguments.
+
+    Parameters
+    ----------
+    num_ps_pts : int {10000]
+        Maximum number of phase space points to generate.
+    rtol : float {None]
+        Target error relative to the integral.
+    atol : float {None]
+        Target absolute error of the integral. At least one of ``rtol`` and
+        ``atol`` must be given.
+
+    Returns
+    -------
+    integral : float
+        The result of the integral over phase space.
+    std : float
+        The estimated error in the integral over phase space.
+    num_used : int
+        Number of phase space points used.
+
+    """
+    if rtol is None and atol is None:
+        raise ValueError("At least one of rtol and atol must be given.")
+
+    return _integrate_over_phase_space(
+        fsp_masses, cme, num_ps_pts, mat_elem_sqrd, num_cpus, seed, chunk_size,
+        sampler, rtol, atol
+    )
+
+
+def _integrate_over_phase_space(fsp_masses, cme, num_ps_pts, mat_elem_sqrd,
+                                num_cpus, seed, chunk_size, sampler, rtol=None,
+                                atol=None):
+    """
+    Returns the integral over phase space, its error and the number of points
+    used. If ``rtol`` or ``atol`` is given, ``num_ps_pts`` is the maximum
+    number of points (see ``integrate_over_phase_space_to_precision``).
     """
     if not hasattr(fsp_masses, "__len__"):
         fsp_masses = [fsp_masses]
@@ -265,23 +1739,88 @@ def integrate_over_phase_space(
     if cme < sum(fsp_masses):
         raise RamboCMETooSmall()
 
-    num_fsp = len(fsp_masses)
-    points = generate_phase_space(fsp_masses, cme, num_ps_pts, mat_elem_sqrd, num_cpus)
-    actual_num_ps_pts = len(points[:, 4 * num_fsp])
-    weights = points[:, 4 * num_fsp]
-    integral = np.average(weights)
-    std = np.std(weights) / np.sqrt(actual_num_ps_pts)
+    sampler = _resolve_sampler(sampler, len(fsp_masses))
+    adaptive = rtol is not None or atol is not None
+    if sampler == "quadrature":
+        _warn_unused_by_quadrature(None if adaptive else num_ps_pts, seed)
+    if num_ps_pts is None:
+        num_ps_pts = 10000
+    if adaptive and chunk_size is None:
+        chunk_size = min(num_ps_pts, 10000)
+
+    if sampler == "quadrature":
+        integral, std, num_used = _integrate_quadrature(
+            fsp_masses, cme, num_ps_pts, mat_elem_sqrd, rtol, atol
+        )
+    elif sampler == "vegas":
+        num_train_iter = 5
+        num_train_pts = num_ps_pts // (2 * num_train_iter)
+        if adaptive:
+            num_train_pts = min(num_train_pts, chunk_size)
+        integral, std, num_used = _integrate_vegas(
+            fsp_masses, cme, num_ps_pts, mat_elem_sqrd, seed, chunk_size,
+            num_train_iter=num_train_iter, num_train_pts=num_train_pts,
+            rtol=rtol, atol=atol
+        )
+    elif sampler == "qmc":
+        # Average each replica separately and use their spread as the error.
+        num_replicas = 8
+        first_round = chunk_size // num_replicas if adaptive else None
+        sums = np.zeros(num_replicas)
+        counts = np.zeros(num_replicas)
+        for replica, points in _qmc_chunks(
+            fsp_masses, cme, num_ps_pts, mat_elem_sqrd, seed, chunk_size,
+            num_replicas, first_round
+        ):
+            sums[replica] += np.sum(points[:, -1])
+            counts[replica] += len(points)
+            # Only check once every replica holds a power of two of points.
+            if replica == num_replicas - 1 and np.all(counts == counts[0]):
+                means = sums / counts
+                integral = np.mean(means)
+                std = np.std(means, ddof=1) / np.sqrt(num_replicas)
+                if _converged(integral, std, rtol, atol):
+                    break
+        num_used = int(np.sum(counts))
+    elif sampler != "flat":
+        raise ValueError("Unknown sampler '{}'.".format(sampler))
+    elif chunk_size is not None:
+        count, integral, m2 = 0, 0.0, 0.0
+        for points in generate_phase_space_chunks(
+            fsp_masses, cme, num_ps_pts, mat_elem_sqrd, num_cpus, seed, chunk_size
+        ):
+            weights = points[:, -1]
+            count, integral, m2 = histogram.merge_moments(
+                count, integral, m2, len(weights), np.sum(weights),
+                np.dot(weights, weights)
+            )
+            std = np.sqrt(m2) / count
+            if _converged(integral, std, rtol, atol):
+                break
+        num_used = count
+    else:
+        num_fsp = len(fsp_masses)
+        points = generate_phase_space(
+            fsp_masses, cme, num_ps_pts, mat_elem_sqrd, num_cpus, seed=seed
+        )
+        weights = _split_points(points, num_fsp)[1]
+        num_used = len(weights)
+        integral = np.average(weights)
+        std = np.std(weights) / np.sqrt(num_used)
 
-    return integral, std
+    return integral, std, num_used
 
 
 def compute_annihilation_cross_section(
     isp_masses,
     fsp_masses,
     cme,
-    num_ps_pts=10000,
-    mat_elem_sqrd=lambda momenta: 1,
+    num_ps_pts=None,
+    mat_elem_sqrd=msqrd_flat,
     num_cpus=None,
+    seed=None,
+    chunk_size=None,
+    sampler=None,
 ):
     """
     Computes the cross section for a given process.
@@ -294,13 +1833,27 @@ def compute_annihilation_cross_section(
         List of masses of the final state and particles.
     cme : double
         Center-of-mass-energy of the process.
-    num_ps_pts : int
+    num_ps_pts : int {10000]
         Total number of phase space points to generate.
-    mat_elem_sqrd : (double)(numpy.ndarray) {lambda momenta: 1]
-        Function for the matrix element squared.
+    mat_elem_sqrd : (double)(numpy.ndarray) {msqrd_flat]
+        Function for the matrix element squared. May be vectorized, see
+        ``vectorized``, or compiled, see ``compiled_msqrd``.
     num_cpus : int {None]
-        Number of cpus to use in parallel with rambo. If not specified, 75% of
-        the cpus will be used.
+        Number of cpus to use in parallel with rambo. The points are split
+        into ``num_cpus`` blocks which are generated by the shared pool of
+        ``hazma.parallel``. If not specified, the process-wide setting (75% of
+        the cpus by default, see ``hazma.parallel.set_num_cpus``) is used.
+    seed : {None, int, array_like[ints], numpy.random.SeedSequence}
+        Seed for the random number generator. Calls with the same seed
+        produce identical results, independently of ``num_cpus``. If None,
+        fresh entropy is used.
+    chunk_size : int {None]
+        If specified, the points are generated ``chunk_size`` at a time and
+        only running sums of the weights are kept (see
+        ``generate_phase_space_chunks``), so the memory used does not grow
+        with ``num_ps_pts``.
+    sampler : str {None]
+        How phase space is sampled (see ``integrate_over_phase_space``).
 
     Returns
     -------
@@ -348,25 +1901,95 @@ def compute_annihilation_cross_section(
             isp_masses, fsp_masses, cme, num_ps_pts=5000, mat_elem_sqrd=msqrd)
 
     """
-    integral, std = integrate_over_phase_space(
+    m1 = isp_masses[0]
+    m2 = isp_masses[1]
+    prefactor = cross_section_prefactor(m1, m2, cme)
+
+    result = integrate_over_phase_space(
         fsp_masses,
         cme,
         num_ps_pts=num_ps_pts,
         mat_elem_sqrd=mat_elem_sqrd,
         num_cpus=num_cpus,
+        seed=seed,
+        chunk_size=chunk_size,
+        sampler=sampler,
     )
 
+    cross_section = result[0] * prefactor
+    error = prefactor * result[1]
+
+    return cross_section, error
+
+
+def compute_annihilation_cross_section_to_precision(
+    isp_masses,
+    fsp_masses,
+    cme,
+    num_ps_pts=None,
+    mat_elem_sqrd=msqrd_flat,
+    num_cpus=None,
+    seed=None,
+    chunk_size=None,
+    sampler=None,
+    rtol=None,
+    atol=None,
+):
+    """
+    Computes the cross section for a given process, generating points until
+    the requested precision is reached (see
+    ``integrate_over_phase_space_to_precision``). See
+    ``compute_annihilation_cross_section`` for the other arguments.
+
+    Parameters
+    ----------
+    num_ps_pts : int {10000]
+        Maximum number of phase space points to generate.
+    rtol : float {None]
+        Target error relative to the cross section.
+    atol : float {None]
+        Target absolute error of the cross section. At least one of ``rtol``
+        and ``atol`` must be given.
+
+    Returns
+    -------
+    cross_section : double
+        Cross section for X -> final state particles.
+    std : double
+        Estimated error in cross section.
+    num_used : int
+        Number of phase space points used.
+
+    """
     m1 = isp_masses[0]
     m2 = isp_masses[1]
+    prefactor = cross_section_prefactor(m1, m2, cme)
 
-    cross_section = integral * cross_section_prefactor(m1, m2, cme)
-    error = cross_section_prefactor(m1, m2, cme) * std
+    integral, std, num_used = integrate_over_phase_space_to_precision(
+        fsp_masses,
+        cme,
+        num_ps_pts=num_ps_pts,
+        mat_elem_sqrd=mat_elem_sqrd,
+        num_cpus=num_cpus,
+        seed=seed,
+        chunk_size=chunk_size,
+        sampler=sampler,
+        rtol=rtol,
+        atol=None if atol is None else atol / prefactor,
+    )
 
-    return cross_section, error
+    return integral * prefactor, std * prefactor, num_used
 
 
 def compute_decay_width(
-    fsp_masses, cme, num_ps_pts=10000, mat_elem_sqrd=lambda momenta: 1, num_cpus=None
+    fsp_masses,
+    cme,
+    num_ps_pts=None,
+    mat_elem_sqrd=msqrd_flat,
+    num_cpus=None,
+    seed=None,
+    chunk_size=None,
+    sampler=None,
 ):
     r"""
     Computes the decay width for a given process.
@@ -377,13 +2000,27 @@ def compute_decay_width(
         List of masses of the final state particles.
     cme : double
         Center-of-mass-energy of the process.
-    num_ps_pts : int
+    num_ps_pts : int {10000]
         Total number of phase space points to generate.
-    mat_elem_sqrd : (double)(numpy.ndarray) {lambda momenta: 1]
-        Function for the matrix element squared.
+    mat_elem_sqrd : (double)(numpy.ndarray) {msqrd_flat]
+        Function for the matrix element squared. May be vectorized, see
+        ``vectorized``, or compiled, see ``compiled_msqrd``.
     num_cpus : int {None]
-        Number of cpus to use in parallel with rambo. If not specified, 75% of
-        the cpus will be used.
+        Number of cpus to use in parallel with rambo. The points are split
+        into ``num_cpus`` blocks which are generated by the shared pool of
+        ``hazma.parallel``. If not specified, the process-wide setting (75% of
+        the cpus by default, see ``hazma.parallel.set_num_cpus``) is used.
+    seed : {None, int, array_like[ints], numpy.random.SeedSequence}
+        Seed for the random number generator. Calls with the same seed
+        produce identical results, independently of ``num_cpus``. If None,
+        fresh entropy is used.
+    chunk_size : int {None]
+        If specified, the points are generated ``chunk_size`` at a time and
+        only running sums of the weights are kept (see
+        ``generate_phase_space_chunks``), so the memory used does not grow
+        with ``num_ps_pts``.
+    sampler : str {None]
+        How phase space is sampled (see ``integrate_over_phase_space``).
 
     Returns
     -------
@@ -422,15 +2059,72 @@ def compute_decay_width(
         cme = mmu
         compute_decay_width(fsp_masses, cme, mat_elem_sqrd=msqrd)
     """
-    integral, std = integrate_over_phase_space(
+    result = integrate_over_phase_space(
         fsp_masses,
         cme,
         num_ps_pts=num_ps_pts,
         mat_elem_sqrd=mat_elem_sqrd,
         num_cpus=num_cpus,
+        seed=seed,
+        chunk_size=chunk_size,
+        sampler=sampler,
     )
 
-    cross_section = integral / (2.0 * cme)
-    error = std / (2.0 * cme)
+    cross_section = result[0] / (2.0 * cme)
+    error = result[1] / (2.0 * cme)
 
     return cross_section, error
+
+
+def compute_decay_width_to_precision(
+    fsp_masses,
+    cme,
+    num_ps_pts=None,
+    mat_elem_sqrd=msqrd_flat,
+    num_cpus=None,
+    seed=None,
+    chunk_size=None,
+    sampler=None,
+    rtol=None,
+    atol=None,
+):
+    """
+    Computes the decay width for a given process, generating points until the
+    requested precision is reached (see
+    ``integrate_over_phase_space_to_precision``). See ``compute_decay_width``
+    for the other arguments.
+
+    Parameters
+    ----------
+    num_ps_pts : int {10000]
+        Maximum number of phase space points to generate.
+    rtol : float {None]
+        Target error relative to the decay width.
+    atol : float {None]
+        Target absolute error of the decay width. At least one of ``rtol``
+        and ``atol`` must be given.
+
+    Returns
+    -------
+    width : double
+        Decay width for X -> final state particles.
+    std : double
+        Estimated error in the decay width.
+    num_used : int
+        Number of phase space points used.
+
+    """
+    integral, std, num_used = integrate_over_phase_space_to_precision(
+        fsp_masses,
+        cme,
+        num_ps_pts=num_ps_pts,
+        mat_elem_sqrd=mat_elem_sqrd,
+        num_cpus=num_cpus,
+        seed=seed,
+        chunk_size=chunk_size,
+        sampler=sampler,
+        rtol=rtol,
+        atol=None if atol is None else atol * 2.0 * cme,
+    )
+
+    return integral / (2.0 * cme), std / (2.0 * cme), num_used
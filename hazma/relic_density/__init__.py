@@ -4,13 +4,13 @@ from scipy.integrate import quad  # simps
 from scipy.interpolate import UnivariateSpline
 from scipy.integrate import solve_ivp
 from scipy.optimize import root_scalar
-from hazma.parameters import plank_mass, rho_crit, sm_entropy_density_today
+from hazma.parameters import load_table, plank_mass, rho_crit, sm_entropy_density_today
 import os
 import warnings
 
 _this_dir, _ = os.path.split(__file__)
 _fname_sm_data = os.path.join(_this_dir, "smdof.dat")
-_sm_data = np.genfromtxt(_fname_sm_data, delimiter=",", skip_header=1).T
+_sm_data = load_table(_fname_sm_data, skiprows=1)
 _sm_tempetatures = _sm_data[0] * 1e3  # convert to MeV
 _sm_sqrt_gstars = _sm_data[1]
 _sm_heff = _sm_data[2]
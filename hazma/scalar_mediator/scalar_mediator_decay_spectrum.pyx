@@ -1,14 +1,18 @@
 from hazma.decay_helper_functions.decay_charged_pion \
-    cimport CSpectrum as cp_spec
-from hazma.decay_helper_functions.decay_neutral_pion \
-    cimport CSpectrum as np_spec
+    cimport CSpectrumPoint as cp_spec_pt, TOTAL as CP_TOTAL
+from hazma.decay_helper_functions.decay_charged_pion \
+    cimport eng_gam_max as cp_eng_gam_max, get_table as cp_get_table
 from hazma.decay_helper_functions.decay_neutral_pion cimport CSpectrumPoint
-from hazma.decay_helper_functions.decay_muon cimport CSpectrum as mu_spec
+from hazma.decay_helper_functions.decay_muon \
+    cimport CSpectrumPoint as mu_spec_pt
+from hazma.decay_helper_functions.boost cimport BoostTable
+from hazma.decay_helper_functions.boost import log_grid
 
 import cython
+from cython.parallel cimport prange
+from hazma.decay_helper_functions.threads cimport num_threads
 import numpy as np
 cimport numpy as np
-from scipy.integrate import quad
 
 from libc.math cimport exp, log, M_PI, log10, sqrt, abs, pow
 
@@ -20,50 +24,57 @@ cdef double mpi = MASS_PI
 cdef double qe = sqrt(4. * M_PI * ALPHA_EM)
 ctypedef np.ndarray ndarray
 
-cdef int n_interp_pts = 500
-
-cdef np.ndarray __e_gams = np.zeros((n_interp_pts,), dtype=np.float64)
-
-cdef np.ndarray __spec_cp = np.zeros((n_interp_pts,), dtype=np.float64)
-cdef np.ndarray __spec_np = np.zeros((n_interp_pts,), dtype=np.float64)
-cdef np.ndarray __spec_mu = np.zeros((n_interp_pts,), dtype=np.float64)
-
-cdef double __set_spectra(double ms):
-    global __e_gams
-    global __spec_cp
-    global __spec_np
-    global __spec_mu
+cdef double eng_gam_max_mu_rf = (mmu**2 - me**2) / (2. * mmu)
 
-    __e_gams = np.logspace(-1., np.log10(ms / 2.), num=n_interp_pts)
+# Final states of the gamma ray spectrum of the scalar mediator
+cdef enum FinalState:
+    TOTAL
+    E_E_G
+    PI_PI_G
+    PI_PI
+    PI0_PI0
+    MU_MU_G
+    MU_MU
+    G_G
+    NONE
 
-    __spec_cp = cp_spec(__e_gams, ms / 2., "total")
-    __spec_np = np_spec(__e_gams, ms / 2.)
-    __spec_mu = mu_spec(__e_gams, ms / 2.)
 
-cdef double __interp_spec(double eng_gam, str fs):
+cdef FinalState __final_state(str fs):
     """
-    Intepolation function for the short kaon data.
+    Converts the string specifying a final state into a FinalState.
 
     Parameters
     ----------
-    eng_gam : double
-        Energy of the photon.
-    fs : str {"total"}
-        String specifying which decay fs to use.
+    fs: str
+        String specifying the final state: 'total', 'e e g', 'pi pi g',
+        'pi pi', 'pi0 pi0', 'mu mu g', 'mu mu' or 'g g'.
+
+    Returns
+    -------
+    final_state: FinalState
+        Corresponding final state. NONE if the final state is unknown.
     """
-    if fs == "cp":
-        if eng_gam < 10**-1:
-            return __spec_cp[0] * __e_gams[0] / eng_gam
-        return np.interp(eng_gam, __e_gams, __spec_cp)
-    if fs == "mu":
-        if eng_gam < 10**-1:
-            return __spec_mu[0] * __e_gams[0] / eng_gam
-        return np.interp(eng_gam, __e_gams, __spec_mu)
-    else:
-        return 0.0
+    if fs == "total":
+        return TOTAL
+    if fs == "e e g":
+        return E_E_G
+    if fs == "pi pi g":
+        return PI_PI_G
+    if fs == "pi pi":
+        return PI_PI
+    if fs == "pi0 pi0":
+        return PI0_PI0
+    if fs == "mu mu g":
+        return MU_MU_G
+    if fs == "mu mu":
+        return MU_MU
+    if fs == "g g":
+        return G_G
+    return NONE
+
 
 @cython.cdivision(True)
-cdef double __dnde_fsr_cp_srf(double egam, double ms):
+cdef double __dnde_fsr_cp_srf(double egam, double ms) nogil:
     cdef double mupi = mpi / ms
     cdef double x = 2. * egam / ms
     cdef double xmin = 0.0
@@ -88,7 +99,7 @@ cdef double __dnde_fsr_cp_srf(double egam, double ms):
     return 2 * result / ms
 
 @cython.cdivision(True)
-cdef double __dnde_fsr_l_srf(double egam, double ml, double ms):
+cdef double __dnde_fsr_l_srf(double egam, double ml, double ms) nogil:
     cdef double mul = ml / ms
     cdef double x = 2. * egam / ms
 
@@ -116,78 +127,118 @@ cdef double __dnde_fsr_l_srf(double egam, double ml, double ms):
 
     return 2 * result / ms
 
-@cython.cdivision(True)
-@cython.boundscheck(True)
+@cython.boundscheck(False)
 @cython.wraparound(False)
-cdef double __integrand(double cl, double eng_gam, double eng_s,
-                        double ms, np.ndarray[double] pws, str fs):
+cdef double __dnde_srf(double eng_gam, double ms, double[:] pws,
+                       FinalState fs) nogil:
     """
-    Integrand of the boost integralself.
+    Continuum gamma ray spectrum from the decay of the scalar mediator in
+    its rest frame.
 
     Parameters
     ----------
-    cl : float
-        Angle the final state particle make with respect to the z-axis.
-    eng_gams : float
-        Gamma-ray energy to evaluate spectrum at.
-    eng_s : float
-        Energy of the scalar mediator.
-    params :
-        Scalar mediator model parameters.
+    eng_gam : float
+        Gamma-ray energy in the rest frame of the scalar mediator.
+    ms : float
+        Mass of the scalar mediator.
+    pws : double[:]
+        Branching fractions of the scalar mediator.
+    fs : FinalState
+        Final state whose spectrum is computed.
 
     Returns
     -------
-    integrand : float
-        The value of the boost integral.
+    dnde : float
+        The value of the rest frame spectrum.
     """
     cdef double pwee = pws[0]
     cdef double pwmumu = pws[1]
     cdef double pwpi0pi0 = pws[2]
     cdef double pwpipi = pws[3]
 
-    cdef double beta = sqrt(1. - (ms / eng_s)**2)
-    cdef double gamma = eng_s / ms
-
-    cdef double jac = 1. / (2. * gamma * abs(1. - beta * cl))
+    cdef double dnde_ee_f = pwee * __dnde_fsr_l_srf(eng_gam, me, ms)
+    cdef double dnde_mu_f = pwmumu * __dnde_fsr_l_srf(eng_gam, mmu, ms)
+
+    cdef double dnde_cp_f = pwpipi * __dnde_fsr_cp_srf(eng_gam, ms)
+
+    cdef double dnde_cp_d = 2. * pwpipi * cp_spec_pt(eng_gam, ms / 2., CP_TOTAL)
+    cdef double dnde_np_d = 2. * pwpi0pi0 * CSpectrumPoint(eng_gam, ms / 2.)
+    cdef double dnde_mu_d = 2. * pwmumu * mu_spec_pt(eng_gam, ms / 2.)
+
+    if fs == TOTAL:
+        return dnde_ee_f + dnde_mu_f + dnde_cp_f + \
+            dnde_cp_d + dnde_np_d + dnde_mu_d
+    if fs == E_E_G:
+        return dnde_ee_f
+    if fs == PI_PI_G:
+        return dnde_cp_f
+    if fs == PI_PI:
+        return dnde_cp_d
+    if fs == PI0_PI0:
+        return dnde_np_d
+    if fs == MU_MU_G:
+        return dnde_mu_f
+    if fs == MU_MU:
+        return dnde_mu_d
+    return 0.0
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef BoostTable __make_table(double ms, double[:] pws, FinalState fs):
+    """
+    Tabulates the continuum spectrum of the scalar mediator in its rest
+    frame, on a grid refined around the endpoints of each final state.
 
-    cdef double eng_gam_srf = eng_gam * gamma * (1. - beta * cl)
+    Parameters
+    ----------
+    ms : float
+        Mass of the scalar mediator.
+    pws : double[:]
+        Branching fractions of the scalar mediator.
+    fs : FinalState
+        Final state whose spectrum is tabulated.
 
-    cdef double dnde = 0.0
+    Returns
+    -------
+    table : BoostTable
+        The tabulated rest frame spectrum.
+    """
+    # Energy of each of the two final state particles
+    cdef double eng_fsp = ms / 2.
+    cdef double beta_fsp
+    cdef int i
 
-    cdef double dnde_ee_f = pwee * __dnde_fsr_l_srf(eng_gam_srf, me, ms)
-    cdef double dnde_mu_f = pwmumu * __dnde_fsr_l_srf(eng_gam_srf, mmu, ms)
+    # Endpoints of the FSR spectra
+    breakpoints = [eng_fsp * (1. - 4. * (ml / ms)**2) for ml in (me, mmu, mpi)]
+    if eng_fsp > mpi:
+        breakpoints.append(cp_eng_gam_max(eng_fsp))
+    if eng_fsp > mmu:
+        beta_fsp = sqrt(1. - (mmu / eng_fsp)**2)
+        breakpoints.append(eng_gam_max_mu_rf * eng_fsp / mmu * (1. + beta_fsp))
+    if eng_fsp > MASS_PI0:
+        beta_fsp = sqrt(1. - (MASS_PI0 / eng_fsp)**2)
+        breakpoints += [eng_fsp * (1. - beta_fsp) / 2.,
+                        eng_fsp * (1. + beta_fsp) / 2.]
+    breakpoints = [bp for bp in breakpoints if bp > 0.]
 
-    cdef double dnde_cp_f = pwpipi * __dnde_fsr_cp_srf(eng_gam_srf, ms)
+    cdef double[::1] xs = log_grid(max(breakpoints), breakpoints)
+    cdef double[::1] dndes = np.zeros(xs.shape[0], dtype=np.float64)
+    cdef int nt = num_threads(xs.shape[0])
 
-    cdef double dnde_cp_d = 2. * pwpipi * __interp_spec(eng_gam_srf, "cp")
-    cdef double dnde_np_d = 2. * pwpi0pi0 * CSpectrumPoint(eng_gam_srf, ms / 2.)
-    cdef double dnde_mu_d = 2. * pwmumu * __interp_spec(eng_gam_srf, "mu")
+    cp_get_table()
+    with nogil:
+        for i in prange(xs.shape[0], num_threads=nt, schedule="static"):
+            dndes[i] = __dnde_srf(xs[i], ms, pws, fs)
 
-    dnde = dnde_ee_f + dnde_mu_f + dnde_cp_f + \
-           dnde_cp_d + dnde_np_d + dnde_mu_d
+    return BoostTable(xs, dndes)
 
-    if fs == "total":
-        return jac * dnde
-    if fs == "e e g":
-        return jac * dnde_ee_f
-    if fs == "pi pi g":
-        return jac * dnde_cp_f
-    if fs == "pi pi":
-        return jac * dnde_cp_d
-    if fs == "pi0 pi0":
-        return jac * dnde_np_d
-    if fs == "mu mu g":
-        return jac * dnde_mu_f
-    if fs == "mu mu":
-        return jac * dnde_mu_d
-    if fs == "g g":
-        return 0.0
 
-@cython.boundscheck(True)
-@cython.wraparound(False)
 @cython.cdivision(True)
 cdef double __dnde_decay_s(double eng_gam, double eng_s, double ms,
-                           np.ndarray[double] pws, str fs):
+                           double pwgg, FinalState fs,
+                           BoostTable table) nogil:
     """
     Unvectorized dnde_decay_s
 
@@ -195,40 +246,48 @@ cdef double __dnde_decay_s(double eng_gam, double eng_s, double ms,
 
     Parameters
     ----------
-    eng_gams : float or array-like
-        Float or array of gamma-ray energies to evaluate spectrum at.
+    eng_gam : float
+        Gamma-ray energy to evaluate spectrum at.
     eng_s : float
         Energy of the scalar mediator.
-    params :
-        Scalar mediator model parameters.
+    ms : float
+        Mass of the scalar mediator.
+    pwgg : float
+        Branching fraction of the scalar mediator into photons.
+    fs : FinalState
+        Final state whose spectrum is computed.
+    table : BoostTable
+        Continuum spectrum in the rest frame of the scalar mediator (see
+        ``__make_table``). Only used if fs is not G_G.
 
     Returns
     -------
-    dnde : float or array-like
-        Values of dnde at gamma-ray energies `eng_gams`.
+    dnde : float
+        Value of dnde at gamma-ray energy `eng_gam`.
     """
     cdef double lines_contrib = 0.0
-    cdef double beta = sqrt(1. - pow(ms / eng_s, 2.))
-    cdef double gamma = eng_s / ms
+    cdef double beta
+    cdef double eplus
+    cdef double eminus
+    cdef double result = 0.0
 
     if eng_s < ms:
         return 0.
 
-    cdef double eplus = eng_s * (1. + beta) / 2.0
-    cdef double eminus = eng_s * (1. - beta) / 2.0
-    cdef double result = 0.0
+    beta = sqrt(1. - pow(ms / eng_s, 2.))
+    eplus = eng_s * (1. + beta) / 2.0
+    eminus = eng_s * (1. - beta) / 2.0
 
     if eminus <= eng_gam <= eplus:
-        lines_contrib = pws[4] * 1. / (eng_s * beta)
+        lines_contrib = pwgg * 1. / (eng_s * beta)
 
-    if fs == "g g":
+    if fs == G_G:
         return lines_contrib
 
-    if fs == "total":
-        result = quad(__integrand, -1.0, 1.0, points=[-1.0, 1.0],
-                      args=(eng_gam, eng_s, ms, pws, fs), epsabs=10**-10.,
-                      epsrel=10**-5.)[0]
+    if eng_gam > 0.:
+        result = table.lab(eng_gam, eng_s, ms)
 
+    if fs == TOTAL:
         return result + lines_contrib
 
     return result
@@ -254,10 +313,14 @@ def dnde_decay_s_pt(double eng_gam, double eng_s, double ms,
     dnde : float or array-like
         Value of dnde at gamma-ray energy `eng_gam`.
     """
-    __set_spectra(ms)
-    return __dnde_decay_s(eng_gam, eng_s, ms, pws, fs)
+    cdef FinalState cfs = __final_state(fs)
+    cdef BoostTable table = None
 
-@cython.boundscheck(True)
+    if cfs != G_G:
+        table = __make_table(ms, pws, cfs)
+    return __dnde_decay_s(eng_gam, eng_s, ms, pws[4], cfs, table)
+
+@cython.boundscheck(False)
 @cython.wraparound(False)
 def dnde_decay_s(np.ndarray[double] eng_gam, double eng_s, double ms,
                  np.ndarray[double] pws, str fs):
@@ -278,13 +341,20 @@ def dnde_decay_s(np.ndarray[double] eng_gam, double eng_s, double ms,
     dnde : float or array-like
         Value of dnde at gamma-ray energy `eng_gam`.
     """
-    __set_spectra(ms)
     cdef int num_pts = len(eng_gam)
     cdef int i
+    cdef FinalState cfs = __final_state(fs)
+    cdef double pwgg = pws[4]
+    cdef BoostTable table = None
+    cdef double[:] engs = eng_gam
+    cdef double[::1] spec = np.zeros(num_pts, dtype=np.float64)
+    cdef int nt = num_threads(num_pts)
 
-    spec = np.zeros(num_pts, dtype=np.float64)
+    if cfs != G_G:
+        table = __make_table(ms, pws, cfs)
 
-    for i in range(num_pts):
-        spec[i] = __dnde_decay_s(eng_gam[i], eng_s, ms, pws, fs)
+    with nogil:
+        for i in prange(num_pts, num_threads=nt, schedule="static"):
+            spec[i] = __dnde_decay_s(engs[i], eng_s, ms, pwgg, cfs, table)
 
-    return spec
+    return np.asarray(spec)
@@ -1,14 +1,18 @@
 from hazma.decay_helper_functions.decay_charged_pion \
-    cimport CSpectrum as cp_spec
-from hazma.decay_helper_functions.decay_neutral_pion \
-    cimport CSpectrum as np_spec
+    cimport CSpectrumPoint as cp_spec_pt, TOTAL as CP_TOTAL
+from hazma.decay_helper_functions.decay_charged_pion \
+    cimport eng_gam_max as cp_eng_gam_max, get_table as cp_get_table
 from hazma.decay_helper_functions.decay_neutral_pion cimport CSpectrumPoint
-from hazma.decay_helper_functions.decay_muon cimport CSpectrum as mu_spec
+from hazma.decay_helper_functions.decay_muon \
+    cimport CSpectrumPoint as mu_spec_pt
+from hazma.decay_helper_functions.boost cimport BoostTable
+from hazma.decay_helper_functions.boost import log_grid
 
 import cython
+from cython.parallel cimport prange
+from hazma.decay_helper_functions.threads cimport num_threads
 import numpy as np
 cimport numpy as np
-from scipy.integrate import quad
 
 from libc.math cimport exp, log, M_PI, log10, sqrt, abs, pow
 
@@ -21,47 +25,54 @@ cdef double mpi0 = MASS_PI0
 cdef double qe = sqrt(4. * M_PI * ALPHA_EM)
 ctypedef np.ndarray ndarray
 
-cdef int n_interp_pts = 500
-
-cdef np.ndarray __e_gams = np.zeros((n_interp_pts,), dtype=np.float64)
-
-cdef np.ndarray __spec_cp = np.zeros((n_interp_pts,), dtype=np.float64)
-cdef np.ndarray __spec_mu = np.zeros((n_interp_pts,), dtype=np.float64)
-
-cdef double __set_spectra(double mv):
-    global __e_gams
-    global __spec_cp
-    global __spec_mu
+cdef double eng_gam_max_mu_rf = (mmu**2 - me**2) / (2. * mmu)
 
-    __e_gams = np.logspace(-1., np.log10(mv / 2.), num=n_interp_pts)
+# Final states of the gamma ray spectrum of the vector mediator
+cdef enum FinalState:
+    TOTAL
+    E_E_G
+    PI_PI_G
+    PI_PI
+    PI0_G
+    MU_MU_G
+    MU_MU
+    NONE
 
-    __spec_cp = cp_spec(__e_gams, mv / 2., "total")
-    __spec_mu = mu_spec(__e_gams, mv / 2.)
 
-cdef double __interp_spec(double eng_gam, str mode):
+cdef FinalState __final_state(str mode):
     """
-    Intepolation function for the short kaon data.
+    Converts the string specifying a final state into a FinalState.
 
     Parameters
     ----------
-    eng_gam : double
-        Energy of the photon.
-    mode : str {"total"}
-        String specifying which decay mode to use.
+    mode: str
+        String specifying the final state: 'total', 'e e g', 'pi pi g',
+        'pi pi', 'pi0 g', 'mu mu g' or 'mu mu'.
+
+    Returns
+    -------
+    final_state: FinalState
+        Corresponding final state. NONE if the final state is unknown.
     """
-    if mode == "cp":
-        if eng_gam < 10**-1:
-            return __spec_cp[0] * __e_gams[0] / eng_gam
-        return np.interp(eng_gam, __e_gams, __spec_cp)
-    if mode == "mu":
-        if eng_gam < 10**-1:
-            return __spec_mu[0] * __e_gams[0] / eng_gam
-        return np.interp(eng_gam, __e_gams, __spec_mu)
-    else:
-        return 0.0
+    if mode == "total":
+        return TOTAL
+    if mode == "e e g":
+        return E_E_G
+    if mode == "pi pi g":
+        return PI_PI_G
+    if mode == "pi pi":
+        return PI_PI
+    if mode == "pi0 g":
+        return PI0_G
+    if mode == "mu mu g":
+        return MU_MU_G
+    if mode == "mu mu":
+        return MU_MU
+    return NONE
+
 
 @cython.cdivision(True)
-cdef double __dnde_fsr_cp_vrf(double egam, double mv):
+cdef double __dnde_fsr_cp_vrf(double egam, double mv) nogil:
     cdef double mupi = mpi / mv
     cdef double x = 2. * egam / mv
     cdef double xmin = 0.0
@@ -86,7 +97,7 @@ cdef double __dnde_fsr_cp_vrf(double egam, double mv):
     return 2 * result / mv
 
 @cython.cdivision(True)
-cdef double __dnde_fsr_l_vrf(double egam, double ml, double mv):
+cdef double __dnde_fsr_l_vrf(double egam, double ml, double mv) nogil:
     cdef double mul = ml / mv
     cdef double x = 2. * egam / mv
 
@@ -112,118 +123,169 @@ cdef double __dnde_fsr_l_vrf(double egam, double ml, double mv):
 
     return 2 * result / mv
 
-@cython.cdivision(True)
-@cython.boundscheck(True)
+@cython.boundscheck(False)
 @cython.wraparound(False)
-cdef double __integrand(double cl, double eng_gam, double eng_v,
-                        double mv, np.ndarray[double] pws, str mode):
+cdef double __dnde_vrf(double eng_gam, double mv, double[:] pws,
+                       FinalState mode) nogil:
     """
-    Integrand of the boost integralself.
+    Continuum gamma ray spectrum from the decay of the vector mediator in
+    its rest frame.
 
     Parameters
     ----------
-    cl : float
-        Angle the final state particle make with respect to the z-axis.
-    eng_gams : float
-        Gamma-ray energy to evaluate spectrum at.
-    eng_s : float
-        Energy of the scalar mediator.
-    params :
-        Scalar mediator model parameters.
+    eng_gam : float
+        Gamma-ray energy in the rest frame of the vector mediator.
+    mv : float
+        Mass of the vector mediator.
+    pws : double[:]
+        Branching fractions of the vector mediator.
+    mode : FinalState
+        Final state whose spectrum is computed.
 
     Returns
     -------
-    integrand : float
-        The value of the boost integral.
+    dnde : float
+        The value of the rest frame spectrum.
     """
     cdef double pwee = pws[0]
     cdef double pwmumu = pws[1]
     cdef double pwpi0g = pws[2]
     cdef double pwpipi = pws[3]
 
-    cdef double beta = sqrt(1. - (mv / eng_v)**2)
-    cdef double gamma = eng_v / mv
+    cdef double dnde_ee_f = pwee * __dnde_fsr_l_vrf(eng_gam, me, mv)
+    cdef double dnde_mu_f = pwmumu * __dnde_fsr_l_vrf(eng_gam, mmu, mv)
 
-    cdef double jac = 1. / (2. * gamma * abs(1. - beta * cl))
+    cdef double dnde_cp_f = pwpipi * __dnde_fsr_cp_vrf(eng_gam, mv)
 
-    cdef double eng_gam_vrf = eng_gam * gamma * (1. - beta * cl)
+    cdef double dnde_cp_d = 2. * pwpipi * cp_spec_pt(eng_gam, mv / 2., CP_TOTAL)
 
-    cdef double dnde = 0.0
+    # Neutral pion energy is:
+    cdef double e_pi0 = 0.5 * (mpi0**2 + mv**2) / mv
+    cdef double dnde_np_d = pwpi0g * CSpectrumPoint(eng_gam, e_pi0)
+
+    cdef double dnde_mu_d = 2. * pwmumu * mu_spec_pt(eng_gam, mv / 2.)
+
+    if mode == TOTAL:
+        return dnde_ee_f + dnde_mu_f + dnde_cp_f + \
+            dnde_cp_d + dnde_np_d + dnde_mu_d
+    if mode == E_E_G:
+        return dnde_ee_f
+    if mode == PI_PI_G:
+        return dnde_cp_f
+    if mode == PI_PI:
+        return dnde_cp_d
+    if mode == PI0_G:
+        return dnde_np_d
+    if mode == MU_MU_G:
+        return dnde_mu_f
+    if mode == MU_MU:
+        return dnde_mu_d
+    return 0.0
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef BoostTable __make_table(double mv, double[:] pws, FinalState mode):
+    """
+    Tabulates the continuum spectrum of the vector mediator in its rest
+    frame, on a grid refined around the endpoints of each final state.
 
-    cdef double dnde_ee_f = pwee * __dnde_fsr_l_vrf(eng_gam_vrf, me, mv)
-    cdef double dnde_mu_f = pwmumu * __dnde_fsr_l_vrf(eng_gam_vrf, mmu, mv)
+    Parameters
+    ----------
+    mv : float
+        Mass of the vector mediator.
+    pws : double[:]
+        Branching fractions of the vector mediator.
+    mode : FinalState
+        Final state whose spectrum is tabulated.
 
-    cdef double dnde_cp_f = pwpipi * __dnde_fsr_cp_vrf(eng_gam_vrf, mv)
+    Returns
+    -------
+    table : BoostTable
+        The tabulated rest frame spectrum.
+    """
+    # Energy of each of the two final state particles of V -> f f
+    cdef double eng_fsp = mv / 2.
+    cdef double e_pi0 = 0.5 * (mpi0**2 + mv**2) / mv
+    cdef double beta_fsp
+    cdef int i
 
-    cdef double dnde_cp_d = 2. * pwpipi * __interp_spec(eng_gam_vrf, "cp")
+    # Endpoints of the FSR spectra
+    breakpoints = [eng_fsp * (1. - 4. * (ml / mv)**2) for ml in (me, mmu, mpi)]
+    if eng_fsp > mpi:
+        breakpoints.append(cp_eng_gam_max(eng_fsp))
+    if eng_fsp > mmu:
+        beta_fsp = sqrt(1. - (mmu / eng_fsp)**2)
+        breakpoints.append(eng_gam_max_mu_rf * eng_fsp / mmu * (1. + beta_fsp))
+    if e_pi0 > mpi0:
+        beta_fsp = sqrt(1. - (mpi0 / e_pi0)**2)
+        breakpoints += [e_pi0 * (1. - beta_fsp) / 2.,
+                        e_pi0 * (1. + beta_fsp) / 2.]
+    breakpoints = [bp for bp in breakpoints if bp > 0.]
 
-    # Neutral pion energy is:
-    cdef double e_pi0 = 0.5 * (mpi0**2 + mv**2) / mv
-    cdef double dnde_np_d = pwpi0g * CSpectrumPoint(eng_gam_vrf, e_pi0)
+    cdef double[::1] xs = log_grid(max(breakpoints), breakpoints)
+    cdef double[::1] dndes = np.zeros(xs.shape[0], dtype=np.float64)
+    cdef int nt = num_threads(xs.shape[0])
 
-    cdef double dnde_mu_d = 2. * pwmumu * __interp_spec(eng_gam_vrf, "mu")
+    cp_get_table()
+    with nogil:
+        for i in prange(xs.shape[0], num_threads=nt, schedule="static"):
+            dndes[i] = __dnde_vrf(xs[i], mv, pws, mode)
 
-    dnde = dnde_ee_f + dnde_mu_f + dnde_cp_f + \
-           dnde_cp_d + dnde_np_d + dnde_mu_d
+    return BoostTable(xs, dndes)
 
-    if mode == "total":
-        return jac * dnde
-    if mode == "e e g":
-        return jac * dnde_ee_f
-    if mode == "pi pi g":
-        return jac * dnde_cp_f
-    if mode == "pi pi":
-        return jac * dnde_cp_d
-    if mode == "pi0 g":
-        return jac * dnde_np_d
-    if mode == "mu mu g":
-        return jac * dnde_mu_f
-    if mode == "mu mu":
-        return jac * dnde_mu_d
 
-@cython.boundscheck(True)
-@cython.wraparound(False)
 @cython.cdivision(True)
 cdef double __dnde_decay_v(double eng_gam, double eng_v, double mv,
-                           np.ndarray[double] pws, str mode):
+                           double pwpi0g, FinalState mode,
+                           BoostTable table) nogil:
     """
-    Unvectorized dnde_decay_s
+    Unvectorized dnde_decay_v
 
-    Compute the gamma ray spectrum from the decay of the scalar mediator.
+    Compute the gamma ray spectrum from the decay of the vector mediator.
 
     Parameters
     ----------
-    eng_gams : float or array-like
-        Float or array of gamma-ray energies to evaluate spectrum at.
-    eng_s : float
-        Energy of the scalar mediator.
-    params :
-        Scalar mediator model parameters.
+    eng_gam : float
+        Gamma-ray energy to evaluate spectrum at.
+    eng_v : float
+        Energy of the vector mediator.
+    mv : float
+        Mass of the vector mediator.
+    pwpi0g : float
+        Branching fraction of the vector mediator into pi0 g.
+    mode : FinalState
+        Final state whose spectrum is computed.
+    table : BoostTable
+        Continuum spectrum in the rest frame of the vector mediator (see
+        ``__make_table``).
 
     Returns
     -------
-    dnde : float or array-like
-        Values of dnde at gamma-ray energies `eng_gams`.
+    dnde : float
+        Value of dnde at gamma-ray energy `eng_gam`.
     """
     cdef double lines_contrib = 0.0
-    cdef double beta = sqrt(1. - pow(mv / eng_v, 2.))
-    cdef double gamma = eng_v / mv
+    cdef double beta
+    cdef double eplus
+    cdef double eminus
+    cdef double result = 0.0
 
     if eng_v < mv:
         return 0.
 
-    cdef double eplus = eng_v * (1. + beta) / 2.0
-    cdef double eminus = eng_v * (1. - beta) / 2.0
-    cdef double result = 0.0
+    beta = sqrt(1. - pow(mv / eng_v, 2.))
+    eplus = eng_v * (1. + beta) / 2.0
+    eminus = eng_v * (1. - beta) / 2.0
 
     if eminus <= eng_gam <= eplus:
-        lines_contrib = pws[2] / (eng_v * beta)
+        lines_contrib = pwpi0g / (eng_v * beta)
 
-    result = quad(__integrand, -1.0, 1.0, points=[-1.0, 1.0],
-                  args=(eng_gam, eng_v, mv, pws, mode), epsabs=10**-10.,
-                  epsrel=10**-5.)[0]
+    if eng_gam > 0.:
+        result = table.lab(eng_gam, eng_v, mv)
 
-    if mode == "pi0 g" or mode == "total":
+    if mode == PI0_G or mode == TOTAL:
         return result + lines_contrib
 
     else:
@@ -234,53 +296,58 @@ cdef double __dnde_decay_v(double eng_gam, double eng_v, double mv,
 def dnde_decay_v_pt(double eng_gam, double eng_v, double mv,
                     np.ndarray[double] pws, str mode):
     """
-    Compute the gamma ray spectrum from the decay of the scalar mediator.
+    Compute the gamma ray spectrum from the decay of the vector mediator.
 
     Parameters
     ----------
     eng_gams : float
         Gamma-ray energy to evaluate spectrum at.
-    eng_s : float
-        Energy of the scalar mediator.
+    eng_v : float
+        Energy of the vector mediator.
     params :
-        Scalar mediator model parameters.
+        Vector mediator model parameters.
 
     Returns
     -------
     dnde : float or array-like
         Value of dnde at gamma-ray energy `eng_gam`.
     """
-    __set_spectra(mv)
-    return __dnde_decay_v(eng_gam, eng_v, mv, pws, mode)
+    cdef FinalState cmode = __final_state(mode)
+    cdef BoostTable table = __make_table(mv, pws, cmode)
+    return __dnde_decay_v(eng_gam, eng_v, mv, pws[2], cmode, table)
 
-@cython.boundscheck(True)
+@cython.boundscheck(False)
 @cython.wraparound(False)
 def dnde_decay_v(np.ndarray[double] eng_gam, double eng_v, double mv,
                  np.ndarray[double] pws, str mode):
     """
-    Compute the gamma ray spectrum from the decay of the scalar mediator.
+    Compute the gamma ray spectrum from the decay of the vector mediator.
 
     Parameters
     ----------
     eng_gams : float
         Gamma-ray energy to evaluate spectrum at.
-    eng_s : float
-        Energy of the scalar mediator.
+    eng_v : float
+        Energy of the vector mediator.
     params :
-        Scalar mediator model parameters.
+        Vector mediator model parameters.
 
     Returns
     -------
     dnde : float or array-like
         Value of dnde at gamma-ray energy `eng_gam`.
     """
-    __set_spectra(mv)
     cdef int num_pts = len(eng_gam)
     cdef int i
+    cdef FinalState cmode = __final_state(mode)
+    cdef double pwpi0g = pws[2]
+    cdef BoostTable table = __make_table(mv, pws, cmode)
+    cdef double[:] engs = eng_gam
+    cdef double[::1] spec = np.zeros(num_pts, dtype=np.float64)
+    cdef int nt = num_threads(num_pts)
 
-    spec = np.zeros(num_pts, dtype=np.float64)
-
-    for i in range(num_pts):
-        spec[i] = __dnde_decay_v(eng_gam[i], eng_v, mv, pws, mode)
+    with nogil:
+        for i in prange(num_pts, num_threads=nt, schedule="static"):
+            spec[i] = __dnde_decay_v(engs[i], eng_v, mv, pwpi0g, cmode, table)
 
-    return spec
+    return np.asarray(spec)
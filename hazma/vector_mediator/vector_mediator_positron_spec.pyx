@@ -2,11 +2,12 @@ from hazma.positron_helper_functions.positron_muon \
     cimport CSpectrum as mu_spec
 from hazma.positron_helper_functions.positron_charged_pion \
     cimport CSpectrum as cp_spec
+from hazma.decay_helper_functions.integrate cimport gauss_kronrod_points, \
+    interp
 
 import cython
 import numpy as np
 cimport numpy as np
-from scipy.integrate import quad
 
 from libc.math cimport M_PI, sqrt, pow, log10
 
@@ -18,6 +19,19 @@ cdef double mpi = MASS_PI
 cdef double qe = sqrt(4. * M_PI * ALPHA_EM)
 ctypedef np.ndarray ndarray
 
+# Final states whose positron spectra can be computed
+cdef enum FinalState:
+    TOTAL
+    PI_PI
+    MU_MU
+    E_E
+    NONE
+
+# Error goals and maximum number of bisections of the boost integral
+cdef double EPSABS = 1e-10
+cdef double EPSREL = 1e-5
+cdef int MAX_DEPTH = 20
+
 # Cached values of the mediator mass and partial widths. If the mass of the
 # mediator or partial widths change, the spectra need to be recomputed.
 cdef double cache_mv = -1.0;
@@ -26,9 +40,42 @@ cdef np.ndarray cache_pws = np.array([-1.0, -1.0, -1.0])
 # Set up arrays for the interpolating positron spectra for the charged pion
 # and the muon.
 cdef int n_interp_pts = 500
-cdef np.ndarray __e_ps = np.zeros((n_interp_pts,), dtype=np.float64)
-cdef np.ndarray __spec_cp = np.zeros((n_interp_pts,), dtype=np.float64)
-cdef np.ndarray __spec_mu = np.zeros((n_interp_pts,), dtype=np.float64)
+cdef double[::1] __e_ps = np.zeros((n_interp_pts,), dtype=np.float64)
+cdef double[::1] __spec_cp = np.zeros((n_interp_pts,), dtype=np.float64)
+cdef double[::1] __spec_mu = np.zeros((n_interp_pts,), dtype=np.float64)
+
+ctypedef struct __BoostParams:
+    double eng_p
+    double gamma
+    double beta
+    double pwmumu
+    double pwpipi
+    FinalState fs
+
+cdef FinalState __final_state(str fs):
+    """
+    Converts the string specifying a final state into a FinalState.
+
+    Parameters
+    ----------
+    fs: str
+        String specifying the final state: 'total', 'pi pi', 'mu mu' or
+        'e e'.
+
+    Returns
+    -------
+    final_state: FinalState
+        Corresponding final state. NONE if the final state is unknown.
+    """
+    if fs == "total":
+        return TOTAL
+    if fs == "pi pi":
+        return PI_PI
+    if fs == "mu mu":
+        return MU_MU
+    if fs == "e e":
+        return E_E
+    return NONE
 
 cdef int __recompute_rf_spectra(double mv, np.ndarray[double] pws):
     """
@@ -53,6 +100,8 @@ cdef int __recompute_rf_spectra(double mv, np.ndarray[double] pws):
 
     if mv != cache_mv or pws[0] != cache_pws[0] or pws[1] != cache_pws[1] or \
             pws[2] != cache_pws[2]:
+        cache_mv = mv
+        cache_pws = pws.copy()
         return 1
     return 0
 
@@ -71,11 +120,12 @@ cdef void __set_spectra(double mv):
     global __spec_cp
     global __spec_mu
 
-    __e_ps = np.logspace(log10(me), log10(mv / 2.), num=n_interp_pts)
-    __spec_cp = cp_spec(__e_ps, mv / 2.)
-    __spec_mu = mu_spec(__e_ps, mv / 2.)
+    e_ps = np.logspace(log10(me), log10(mv / 2.), num=n_interp_pts)
+    __e_ps = e_ps
+    __spec_cp = cp_spec(e_ps, mv / 2.)
+    __spec_mu = mu_spec(e_ps, mv / 2.)
 
-cdef double __interp_spec(double eng_p, str fs):
+cdef double __interp_spec(double eng_p, FinalState fs) nogil:
     """
     Return the positron spectrum from the decay of the vector mediator into
     either a charged pion or muon for a given electron/positron energy.
@@ -84,9 +134,8 @@ cdef double __interp_spec(double eng_p, str fs):
     ----------
     eng_p: double
         Energy of the positron/electron
-    fs: str
-        String specifying the final state: 'cp' for charged pion and 'mu' for
-        the muon.
+    fs: FinalState
+        Final state: PI_PI for charged pion and MU_MU for the muon.
 
     Returns
     -------
@@ -95,18 +144,15 @@ cdef double __interp_spec(double eng_p, str fs):
         pions or muons.
 
     """
-    if fs == "cp":
-        return np.interp(eng_p, __e_ps, __spec_cp)
-    if fs == "mu":
-        return np.interp(eng_p, __e_ps, __spec_mu)
+    if fs == PI_PI:
+        return interp(eng_p, &__e_ps[0], &__spec_cp[0], n_interp_pts)
+    if fs == MU_MU:
+        return interp(eng_p, &__e_ps[0], &__spec_mu[0], n_interp_pts)
     else:
         return 0.0
 
 @cython.cdivision(True)
-@cython.boundscheck(True)
-@cython.wraparound(False)
-cdef double __integrand(double cl, double eng_p, double eng_v,
-                        double mv, np.ndarray[double] pws, str fs):
+cdef double __integrand(double cl, void* params) nogil:
     """
     Integrand of the boost integral.
 
@@ -114,32 +160,25 @@ cdef double __integrand(double cl, double eng_p, double eng_v,
     ----------
     cl : float
         Angle the final state particle make with respect to the z-axis.
-    eng_p : float
-        Gamma-ray energy to evaluate spectrum at.
-    eng_v : float
-        Energy of the vector mediator.
-    mv : double
-        Vector mediator mass.
-    pws: np.ndarray
-        Relevant partial widths: pws[0] = pw_ee, pws[1] = pw_mumu and
-        pws[2] = pw_pipi
-    fs: str
-        String specifying the final state to compute spectrum for.
+    params : void*
+        Pointer to a __BoostParams struct holding the positron energy, the
+        boost factors of the vector mediator, the relevant partial widths and
+        the final state to compute spectrum for.
 
     Returns
     -------
     integrand : float
         The value of the boost integral.
     """
+    cdef __BoostParams* ps = <__BoostParams*>params
+    cdef double eng_p = ps.eng_p
+
     if eng_p < me:
         return 0.0
 
-    cdef double pwmumu = pws[1]
-    cdef double pwpipi = pws[2]
-
+    cdef double gamma = ps.gamma
+    cdef double beta = ps.beta
     cdef double p = sqrt(eng_p * eng_p - me * me)
-    cdef double gamma = eng_v / mv
-    cdef double beta = sqrt(1. - pow(mv / eng_v, 2))
     cdef double eng_p_vrf = gamma * (eng_p - p * beta * cl)
     cdef double jac = p / (2. * sqrt((1 + pow(beta * cl, 2)) * eng_p * eng_p -
                                      (1 + beta * beta * (-1 + cl * cl)) *
@@ -149,28 +188,19 @@ cdef double __integrand(double cl, double eng_p, double eng_v,
     cdef double dnde_cp = 0.0
     cdef double dnde_mu = 0.0
 
-    if fs == "total":
-        dnde_cp = pwpipi * __interp_spec(eng_p_vrf, "cp")
-        dnde_mu = pwmumu * __interp_spec(eng_p_vrf, "mu")
-        return jac * (dnde_cp + dnde_mu)
-    if fs == "pi pi":
-        dnde_cp = pwpipi * __interp_spec(eng_p_vrf, "cp")
-        return jac * (dnde_cp + dnde_mu)
-    if fs == "mu mu":
-        dnde_mu = pwmumu * __interp_spec(eng_p_vrf, "mu")
-        return jac * (dnde_cp + dnde_mu)
-    if fs == "e e":
-        return 0.0
+    if ps.fs == TOTAL or ps.fs == PI_PI:
+        dnde_cp = ps.pwpipi * __interp_spec(eng_p_vrf, PI_PI)
+    if ps.fs == TOTAL or ps.fs == MU_MU:
+        dnde_mu = ps.pwmumu * __interp_spec(eng_p_vrf, MU_MU)
+    return jac * (dnde_cp + dnde_mu)
 
-@cython.boundscheck(True)
-@cython.wraparound(False)
 @cython.cdivision(True)
 cdef double __dnde_decay_v(double eng_p, double eng_v, double mv,
-                           np.ndarray[double] pws, str fs):
+                           double[:] pws, FinalState fs) nogil:
     """
-    Un-vectorized dnde_decay_s
+    Un-vectorized dnde_decay_v
 
-    Compute the gamma ray spectrum from the decay of the scalar mediator.
+    Compute the gamma ray spectrum from the decay of the vector mediator.
 
     Parameters
     ----------
@@ -180,37 +210,56 @@ cdef double __dnde_decay_v(double eng_p, double eng_v, double mv,
         Energy of the vector mediator.
     mv : double
         Mass of the vector mediator.
-    pws: np.ndarray[double]
+    pws: double[:]
         Array of the relevant partial widths: pws[0] = pw_ee,
         pws[1] = pw_mumu and pws[2] = pw_pipi
+    fs: FinalState
+        Final state to compute spectrum for.
 
     Returns
     -------
     dnde : float or array-like
         Values of dnde at positron/electron energy `eng_p`.
     """
-    cdef double lines_contrib = 0.0
-    cdef double beta = sqrt(1. - pow(mv / eng_v, 2.))
-    cdef double gamma = eng_v / mv
-
     if eng_v < mv:
         return 0.
 
+    cdef double lines_contrib = 0.0
+    cdef double beta = sqrt(1. - pow(mv / eng_v, 2.))
+    cdef double gamma = eng_v / mv
     cdef double r = sqrt(1.0 - 4.0 * me * me / (mv * mv))
     cdef double eplus = eng_v * (1. + r * beta) / 2.0
     cdef double eminus = eng_v * (1. - r * beta) / 2.0
     cdef double result = 0.0
+    cdef double p
+    cdef double[2] points
+    cdef __BoostParams params
 
     if eminus <= eng_p <= eplus:
         lines_contrib = pws[0] * 1. / (eng_v * beta)
 
-    if fs == "e e":
+    if fs == E_E:
         return lines_contrib
 
-    if fs == "total" or fs == "pi pi" or fs == "mu mu":
-        result = quad(__integrand, -1.0, 1.0, points=[-1.0, 1.0],
-                      args=(eng_p, eng_v, mv, pws, fs), epsabs=1e-10,
-                      epsrel=1e-5)[0]
+    if fs == TOTAL or fs == PI_PI or fs == MU_MU:
+        if eng_p < me:
+            return lines_contrib
+
+        # Angles at which the rest frame energy crosses the ends of the
+        # interpolating spectra
+        p = sqrt(eng_p * eng_p - me * me)
+        points[0] = (eng_p - __e_ps[n_interp_pts - 1] / gamma) / (p * beta)
+        points[1] = (eng_p - me / gamma) / (p * beta)
+
+        params.eng_p = eng_p
+        params.gamma = gamma
+        params.beta = beta
+        params.pwmumu = pws[1]
+        params.pwpipi = pws[2]
+        params.fs = fs
+
+        result = gauss_kronrod_points(__integrand, &params, -1.0, 1.0, points,
+                                      2, EPSABS, EPSREL, MAX_DEPTH)
 
         return result + lines_contrib
 
@@ -221,16 +270,16 @@ cdef double __dnde_decay_v(double eng_p, double eng_v, double mv,
 def dnde_decay_v_pt(double eng_p, double eng_v, double mv,
                     np.ndarray[double] pws, str fs):
     """
-    Compute the gamma ray spectrum from the decay of the scalar mediator.
+    Compute the gamma ray spectrum from the decay of the vector mediator.
 
     Parameters
     ----------
     eng_p : float
         Positron energy to evaluate spectrum at.
     eng_v : float
-        Energy of the scalar mediator.
+        Energy of the vector mediator.
     mv : double
-        Mass of the scalar mediator.
+        Mass of the vector mediator.
     pws: np.ndarray[double]
         Array of the relevant partial widths: pws[0] = pw_ee,
         pws[1] = pw_mumu and pws[2] = pw_pipi
@@ -244,23 +293,23 @@ def dnde_decay_v_pt(double eng_p, double eng_v, double mv,
     """
     if __recompute_rf_spectra(mv, pws) == 1:
         __set_spectra(mv)
-    return __dnde_decay_v(eng_p, eng_v, mv, pws, fs)
+    return __dnde_decay_v(eng_p, eng_v, mv, pws, __final_state(fs))
 
 @cython.boundscheck(True)
 @cython.wraparound(False)
 def dnde_decay_v(np.ndarray[double] eng_ps, double eng_v, double mv,
                  np.ndarray[double] pws, str fs):
     """
-    Compute the gamma ray spectrum from the decay of the scalar mediator.
+    Compute the gamma ray spectrum from the decay of the vector mediator.
 
     Parameters
     ----------
     eng_ps : float
         Positron energy to evaluate spectrum at.
     eng_v : float
-        Energy of the scalar mediator.
+        Energy of the vector mediator.
     mv : double
-        Mass of the scalar mediator.
+        Mass of the vector mediator.
     pws: np.ndarray[double]
         Array of the relevant partial widths: pws[0] = pw_ee,
         pws[1] = pw_mumu and pws[2] = pw_pipi
@@ -276,10 +325,16 @@ def dnde_decay_v(np.ndarray[double] eng_ps, double eng_v, double mv,
         __set_spectra(mv)
     cdef int num_pts = len(eng_ps)
     cdef int i
+    cdef FinalState final_state = __final_state(fs)
+    cdef double[:] engs = eng_ps
+    cdef double[:] pws_view = pws
 
     spec = np.zeros(num_pts, dtype=np.float64)
+    cdef double[:] spec_view = spec
 
-    for i in range(num_pts):
-        spec[i] = __dnde_decay_v(eng_ps[i], eng_v, mv, pws, fs)
+    with nogil:
+        for i in range(num_pts):
+            spec_view[i] = __dnde_decay_v(engs[i], eng_v, mv, pws_view,
+                                          final_state)
 
     return spec
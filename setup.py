@@ -1,5 +1,8 @@
 from setuptools import setup, Extension, find_packages
 
+import os
+import tempfile
+
 import numpy as np
 
 VERSION = "1.1"
@@ -13,6 +16,44 @@ def long_description():
     return "\n".join([str(l) for l in ld.split("\n")[4:]])
 
 
+def openmp_flags():
+    """Returns the compile and link flags enabling OpenMP. They are empty if
+    the compiler does not support OpenMP or if the environment variable
+    HAZMA_OPENMP is set to 0, in which case the ``prange`` loops of the
+    extensions run serially.
+    """
+    if os.environ.get("HAZMA_OPENMP", "1") == "0":
+        return [], []
+
+    from setuptools.command.build_ext import customize_compiler, new_compiler
+    from setuptools.errors import CompileError, LinkError
+
+    compiler = new_compiler()
+    customize_compiler(compiler)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        source = os.path.join(tmp_dir, "test_openmp.c")
+        with open(source, "w") as f:
+            f.write(
+                "#include <omp.h>\n"
+                "int main(void) { return omp_get_max_threads() < 1; }\n"
+            )
+        try:
+            objects = compiler.compile(
+                [source], output_dir=tmp_dir, extra_postargs=["-fopenmp"]
+            )
+            compiler.link_executable(
+                objects,
+                os.path.join(tmp_dir, "test_openmp"),
+                extra_postargs=["-fopenmp"],
+            )
+        except (CompileError, LinkError):
+            return [], []
+    return ["-fopenmp"], ["-fopenmp"]
+
+
+# Flags of the extensions with prange loops
+openmp_compile_args, openmp_link_args = openmp_flags()
+
 decay_dir = "hazma/decay_helper_functions/"
 gr_dir = "hazma/gamma_ray_helper_functions/"
 ps_dir = "hazma/phase_space_helper_functions/"
@@ -20,6 +61,7 @@ ft_dir = "hazma/field_theory_helper_functions/"
 pos_dir = "hazma/positron_helper_functions/"
 sm_dir = "hazma/scalar_mediator/"
 vm_dir = "hazma/vector_mediator/"
+psm_dir = "hazma/pseudo_scalar_mediator/"
 
 decay_pack = "hazma.decay_helper_functions"
 ft_pack = "hazma.field_theory_helper_functions"
@@ -52,36 +94,71 @@ packs = [
 extensions = []
 
 # Decay helper functions extensions
+extensions += [
+    Extension(
+        decay_pack + ".boost",
+        sources=[decay_dir + "boost.pyx"],
+        extra_compile_args=openmp_compile_args,
+        extra_link_args=openmp_link_args,
+    )
+]
+extensions += [
+    Extension(decay_pack + ".integrate", sources=[decay_dir + "integrate.pyx"])
+]
+extensions += [
+    Extension(
+        decay_pack + ".threads",
+        sources=[decay_dir + "threads.pyx"],
+        extra_compile_args=openmp_compile_args,
+        extra_link_args=openmp_link_args,
+    )
+]
 extensions += [
     Extension(
         decay_pack + ".decay_charged_pion",
         sources=[decay_dir + "decay_charged_pion.pyx"],
+        extra_compile_args=openmp_compile_args,
+        extra_link_args=openmp_link_args,
     )
 ]
 extensions += [
     Extension(
         decay_pack + ".decay_neutral_pion",
         sources=[decay_dir + "decay_neutral_pion.pyx"],
+        extra_compile_args=openmp_compile_args,
+        extra_link_args=openmp_link_args,
     )
 ]
 extensions += [
-    Extension(decay_pack + ".decay_muon",
-              sources=[decay_dir + "decay_muon.pyx"])
+    Extension(
+        decay_pack + ".decay_muon",
+        sources=[decay_dir + "decay_muon.pyx"],
+        extra_compile_args=openmp_compile_args,
+        extra_link_args=openmp_link_args,
+    )
 ]
 extensions += [
     Extension(
         decay_pack + ".decay_charged_kaon",
         sources=[decay_dir + "decay_charged_kaon.pyx"],
+        extra_compile_args=openmp_compile_args,
+        extra_link_args=openmp_link_args,
     )
 ]
 extensions += [
     Extension(
-        decay_pack + ".decay_long_kaon", sources=[decay_dir + "decay_long_kaon.pyx"]
+        decay_pack + ".decay_long_kaon",
+        sources=[decay_dir + "decay_long_kaon.pyx"],
+        extra_compile_args=openmp_compile_args,
+        extra_link_args=openmp_link_args,
     )
 ]
 extensions += [
     Extension(
-        decay_pack + ".decay_short_kaon", sources=[decay_dir + "decay_short_kaon.pyx"]
+        decay_pack + ".decay_short_kaon",
+        sources=[decay_dir + "decay_short_kaon.pyx"],
+        extra_compile_args=openmp_compile_args,
+        extra_link_args=openmp_link_args,
     )
 ]
 
@@ -93,11 +170,21 @@ extensions += [
 ]
 
 # Phase space helper functions extensions
+extensions += [
+    Extension(
+        ps_pack + ".compiled_msqrd",
+        sources=[ps_dir + "compiled_msqrd.pyx"],
+        extra_compile_args=["-g", "-std=c++11"] + openmp_compile_args,
+        extra_link_args=openmp_link_args,
+        language="c++",
+    )
+]
 extensions += [
     Extension(
         ps_pack + ".generator",
         sources=[ps_dir + "generator.pyx"],
-        extra_compile_args=["-g", "-std=c++11"],
+        extra_compile_args=["-g", "-std=c++11"] + openmp_compile_args,
+        extra_link_args=openmp_link_args,
         language="c++",
     )
 ]
@@ -113,6 +200,23 @@ extensions += [
     Extension(
         ps_pack + ".modifiers",
         sources=[ps_dir + "modifiers.pyx"],
+        extra_compile_args=["-g", "-std=c++11"] + openmp_compile_args,
+        extra_link_args=openmp_link_args,
+        language="c++",
+    )
+]
+extensions += [
+    Extension(
+        ps_pack + ".vegas",
+        sources=[ps_dir + "vegas.pyx"],
+        extra_compile_args=["-g", "-std=c++11"],
+        language="c++",
+    )
+]
+extensions += [
+    Extension(
+        ps_pack + ".quadrature",
+        sources=[ps_dir + "quadrature.pyx"],
         extra_compile_args=["-g", "-std=c++11"],
         language="c++",
     )
@@ -135,11 +239,17 @@ extensions += [
     Extension(
         pos_pack + ".positron_charged_pion",
         sources=[pos_dir + "positron_charged_pion.pyx"],
+        extra_compile_args=openmp_compile_args,
+        extra_link_args=openmp_link_args,
     )
 ]
 extensions += [
-    Extension(pos_pack + ".positron_muon",
-              sources=[pos_dir + "positron_muon.pyx"])
+    Extension(
+        pos_pack + ".positron_muon",
+        sources=[pos_dir + "positron_muon.pyx"],
+        extra_compile_args=openmp_compile_args,
+        extra_link_args=openmp_link_args,
+    )
 ]
 extensions += [
     Extension(pos_pack + ".positron_decay",
@@ -151,6 +261,8 @@ extensions += [
     Extension(
         sm_pack + ".scalar_mediator_decay_spectrum",
         sources=[sm_dir + "scalar_mediator_decay_spectrum.pyx"],
+        extra_compile_args=openmp_compile_args,
+        extra_link_args=openmp_link_args,
     )
 ]
 extensions += [
@@ -170,6 +282,8 @@ extensions += [
     Extension(
         vm_pack + ".vector_mediator_decay_spectrum",
         sources=[vm_dir + "vector_mediator_decay_spectrum.pyx"],
+        extra_compile_args=openmp_compile_args,
+        extra_link_args=openmp_link_args,
     )
 ]
 extensions += [
@@ -185,6 +299,14 @@ extensions += [
     )
 ]
 
+# Pseudo-scalar mediator
+extensions += [
+    Extension(
+        psm_pack + "._c_pseudo_scalar_mediator_msqrd_rambo",
+        sources=[psm_dir + "_c_pseudo_scalar_mediator_msqrd_rambo.pyx"],
+    )
+]
+
 
 setup(
     name="hazma",
@@ -208,17 +330,18 @@ setup(
     package_data={
         "hazma/decay_helper_functions": ["*.pxd"],
         "hazma/positron_helper_functions": ["*.pxd"],
+        "hazma/phase_space_helper_functions": ["*.pxd"],
     },
     setup_requires=["pytest-runner"],
     install_requires=[
         "pip>=9.0.1",
         "matplotlib>=2.2.3",
-        "scipy>=1.0.0",
-        "numpy>=1.13.3",
+        "scipy>=1.7.0",
+        "numpy>=1.17.0",
         "cython>=0.27.3",
         "numpydoc>=0.7.0",
         "scikit-image>=0.14",
-        "setuptools>=27.3",
+        "setuptools>=59.0",
         "flake8>=3.5.0",
     ],
     tests_require=["pytest>=3.2.5"],
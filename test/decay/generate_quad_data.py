@@ -0,0 +1,161 @@
+"""
+Generates reference spectra of the muon and the charged pion which are
+independent of the tabulated boost used by ``hazma.decay``.
+
+The rest frame spectra are reimplemented below from the same formulas and
+parameters as the compiled modules, and boosted into the laboratory frame by
+integrating them with ``scipy.integrate.quad``:
+
+    dN/dE = 1 / (2 gamma beta)
+            * int_{E gamma (1 - beta)}^{E gamma (1 + beta)} f(E') / E' dE'.
+
+The spectrum of the muon from pi -> mu nu, which enters the rest frame
+spectrum of the pion, is itself computed with this integral, so the pion
+spectra are nested integrals. The photon energies and particle energies are
+those of the regression data in ``mu_data`` and ``pi_data``.
+"""
+from os import path
+
+import numpy as np
+from scipy.integrate import quad
+
+# Parameters of hazma/decay_helper_functions/parameters.pxd
+MASS_E = 0.510998928
+MASS_MU = 105.6583715
+MASS_PI = 139.57018
+BR_PI_TO_MUNU = 0.9998
+BR_PI_TO_ENU = 0.000123
+ALPHA_EM = 1.0 / 137.0
+F_A_PI = 0.0119
+F_V_PI = 0.0254
+F_V_PI_SLOPE = 0.1
+DECAY_CONST_PI = 130.41
+
+EPSREL = 1e-10
+
+
+def boost(rest_spectrum, e_gam, eng, mass, breakpoints=()):
+    """Boosts a rest frame spectrum into the laboratory frame."""
+    if eng <= mass:
+        return rest_spectrum(e_gam)
+    gamma = eng / mass
+    beta = np.sqrt(1.0 - (mass / eng) ** 2)
+    e_min = e_gam * gamma * (1.0 - beta)
+    e_max = e_gam * gamma * (1.0 + beta)
+    points = [bp for bp in breakpoints if e_min < bp < e_max]
+    integral = quad(
+        lambda e_rf: rest_spectrum(e_rf) / e_rf,
+        e_min,
+        e_max,
+        points=points or None,
+        epsrel=EPSREL,
+        epsabs=0.0,
+        limit=500,
+    )[0]
+    return integral / (2.0 * gamma * beta)
+
+
+def muon_rest(e_gam):
+    """Spectrum of mu -> e nu nu gamma in the muon rest frame."""
+    r = (MASS_E / MASS_MU) ** 2
+    y = 2.0 * e_gam / MASS_MU
+    if not 0.0 < y < 1.0 - r:
+        return 0.0
+    yconj = 1.0 - y
+    lg = np.log(yconj / r)
+    j_plus = (ALPHA_EM * yconj / 6.0 / np.pi) * (
+        (3.0 * lg - 17.0 / 2.0)
+        + (-3.0 * lg + 7.0) * yconj
+        + (2.0 * lg - 13.0 / 3.0) * yconj ** 2
+    )
+    j_minus = (ALPHA_EM * yconj ** 2 / 6.0 / np.pi) * (
+        (3.0 * lg - 93.0 / 12.0)
+        + (-4.0 * lg + 29.0 / 3.0) * yconj
+        + (2.0 * lg - 55.0 / 12.0) * yconj ** 2
+    )
+    return (2.0 / MASS_MU) * (2.0 / y) * (j_plus + j_minus)
+
+
+E_MAX_MU_RF = (MASS_MU ** 2 - MASS_E ** 2) / (2.0 * MASS_MU)
+MUON_BREAKPOINTS = (E_MAX_MU_RF,)
+
+
+def muon(e_gam, eng):
+    """Spectrum of the muon in the laboratory frame."""
+    return boost(muon_rest, e_gam, eng, MASS_MU, MUON_BREAKPOINTS)
+
+
+def pi_to_lnug(e_gam, ml):
+    """Spectrum of pi -> l nu gamma in the pion rest frame."""
+    fpi = DECAY_CONST_PI / np.sqrt(2.0)
+    mpi = MASS_PI
+    x = 2.0 * e_gam / mpi
+    r = (ml / mpi) ** 2
+    if not 0.0 < x < 1.0 - r:
+        return 0.0
+    f_v = F_V_PI * (1.0 + F_V_PI_SLOPE * (1.0 - x))
+    f = (r + x - 1.0) * (
+        mpi ** 2 * x ** 4 * (F_A_PI ** 2 + f_v ** 2)
+        * (r ** 2 - r * x + r - 2.0 * (x - 1.0) ** 2)
+        - 12.0 * np.sqrt(2.0) * fpi * mpi * r * (x - 1.0) * x ** 2
+        * (F_A_PI * (r - 2.0 * x + 1.0) + f_v * x)
+        - 24.0 * fpi ** 2 * r * (x - 1.0)
+        * (4.0 * r * (x - 1.0) + (x - 2.0) ** 2)
+    )
+    g = 12.0 * np.sqrt(2.0) * fpi * r * (x - 1.0) ** 2 * np.log(r / (1.0 - x)) * (
+        mpi * x ** 2 * (F_A_PI * (x - 2.0 * r) - f_v * x)
+        + np.sqrt(2.0) * fpi * (2.0 * r ** 2 - 2.0 * r * x - x ** 2 + 2.0 * x - 2.0)
+    )
+    return ALPHA_EM * (f + g) / (
+        24.0 * np.pi * mpi * fpi ** 2 * (r - 1.0) ** 2 * (x - 1.0) ** 2 * r * x
+    )
+
+
+E_MU_PI_RF = (MASS_PI ** 2 + MASS_MU ** 2) / (2.0 * MASS_PI)
+_GAMMA_MU = E_MU_PI_RF / MASS_MU
+_BETA_MU = np.sqrt(1.0 - (MASS_MU / E_MU_PI_RF) ** 2)
+PION_BREAKPOINTS = (
+    E_MAX_MU_RF * _GAMMA_MU * (1.0 - _BETA_MU),
+    E_MAX_MU_RF * _GAMMA_MU * (1.0 + _BETA_MU),
+    0.5 * MASS_PI * (1.0 - (MASS_MU / MASS_PI) ** 2),
+    0.5 * MASS_PI * (1.0 - (MASS_E / MASS_PI) ** 2),
+)
+
+
+def charged_pion_rest(e_gam):
+    """Spectrum of the charged pion in its rest frame."""
+    return (
+        BR_PI_TO_MUNU * muon(e_gam, E_MU_PI_RF)
+        + BR_PI_TO_MUNU * pi_to_lnug(e_gam, MASS_MU)
+        + BR_PI_TO_ENU * pi_to_lnug(e_gam, MASS_E)
+    )
+
+
+def charged_pion(e_gam, eng):
+    """Spectrum of the charged pion in the laboratory frame."""
+    return boost(charged_pion_rest, e_gam, eng, MASS_PI, PION_BREAKPOINTS)
+
+
+def save_data(data_dir, ref_dir, dnde_func):
+    # Reuse the energies of the regression data
+    base_dir = path.dirname(__file__)
+    ref_dir = path.join(base_dir, ref_dir)
+    data_dir = path.join(base_dir, data_dir)
+    e_gams = np.load(path.join(ref_dir, "e_gams.npy"))
+    np.save(path.join(data_dir, "e_gams.npy"), e_gams)
+
+    for i in range(1, 4):
+        e = np.load(path.join(ref_dir, "e_{}.npy".format(i)))
+        np.save(path.join(data_dir, "e_{}.npy".format(i)), e)
+
+        dnde = np.array([dnde_func(e_gam, float(e)) for e_gam in e_gams])
+        np.save(path.join(data_dir, "dnde_{}.npy".format(i)), dnde)
+
+
+def generate_quad_data():
+    save_data("mu_quad_data", "mu_data", muon)
+    save_data("pi_quad_data", "pi_data", charged_pion)
+
+
+if __name__ == "__main__":
+    generate_quad_data()
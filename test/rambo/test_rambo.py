@@ -9,10 +9,32 @@ from hazma.parameters import electron_mass as me
 from hazma.parameters import muon_mass as mmu
 from hazma.parameters import qe
 from hazma.rambo import compute_annihilation_cross_section, compute_decay_width
+from hazma.rambo import vectorized
 
 mw = 80.385 * 10 ** 3  # W-mass
 mz = 91.1876 * 10 ** 3  # Z-Mass
 
+r_mu = me ** 2 / mmu ** 2
+width_mu_to_enunu = (
+    GF ** 2
+    * mmu ** 5
+    / (192.0 * np.pi ** 3)
+    * (1.0 - 8.0 * r_mu + 8 * r_mu ** 3 - r_mu ** 4 - 12.0 * r_mu ** 2 * np.log(r_mu))
+)
+
+
+@vectorized
+def msqrd_mu_to_enunu(momenta):
+    """
+    Matrix element squared for mu -> e nu nu.
+    """
+    pe = momenta[..., 0, :]
+    pve = momenta[..., 1, :]
+    pvmu = momenta[..., 2, :]
+    pmu = np.sum(momenta, axis=-2)
+
+    return 64.0 * GF ** 2 * MDot(pe, pvmu) * MDot(pmu, pve)
+
 
 class TestRambo(unittest.TestCase):
     def setUp(self):
@@ -116,3 +138,618 @@ class TestRambo(unittest.TestCase):
         analytic = num / den
 
         assert_allclose(rambo[0], analytic, rtol=5e-3)
+
+    def test_generate_space_inplace(self):
+        """
+        Test that the generator fills user-supplied buffers with on-shell,
+        momentum-conserving phase space points.
+        """
+        from hazma.phase_space_helper_functions.generator import (
+            generate_space_inplace,
+        )
+
+        masses = np.array([mmu, me, 0.0])
+        cme = 1000.0
+        momenta = np.zeros((100, 3, 4))
+        weights = np.zeros(100)
+
+        generate_space_inplace(momenta, weights, masses, cme)
+
+        assert_allclose(
+            np.sum(momenta, axis=1),
+            np.tile([cme, 0.0, 0.0, 0.0], (100, 1)),
+            atol=1e-6 * cme,
+        )
+        msqrds = momenta[:, :, 0] ** 2 - np.sum(momenta[:, :, 1:] ** 2, axis=2)
+        assert_allclose(msqrds, np.tile(masses ** 2, (100, 1)), atol=1e-6 * cme ** 2)
+        self.assertTrue(np.all(weights > 0.0))
+
+    def test_seed_reproducibility(self):
+        """
+        Test that seeded runs are reproducible and independent of how the
+        events are split between workers.
+        """
+        from hazma.phase_space_helper_functions.generator import (
+            generate_space_inplace,
+        )
+        from hazma.rambo import _generator_key, generate_phase_space
+
+        masses = np.array([mmu, me, 0.0])
+        pts1 = generate_phase_space(masses, 1000.0, 200, num_cpus=1, seed=1234)
+        pts2 = generate_phase_space(masses, 1000.0, 200, num_cpus=1, seed=1234)
+        pts3 = generate_phase_space(masses, 1000.0, 200, num_cpus=1, seed=4321)
+
+        assert_allclose(pts1, pts2, rtol=0.0, atol=0.0)
+        self.assertFalse(np.allclose(pts1, pts3))
+
+        # Filling uneven blocks at their offsets in the stream, as the
+        # workers do, gives the same events as a single block.
+        key = _generator_key(1234)
+        all_splits = [[0, 200], [0, 1, 200], [0, 67, 133, 200], [0, 3, 199, 200]]
+        for splits in all_splits:
+            momenta = np.empty((200, len(masses), 4))
+            weights = np.empty(200)
+            for start, stop in zip(splits[:-1], splits[1:]):
+                generate_space_inplace(
+                    momenta[start:stop], weights[start:stop], masses, 1000.0,
+                    key, start
+                )
+            assert_allclose(
+                momenta.reshape(200, -1), pts1[:, :-1], rtol=0.0, atol=0.0
+            )
+            assert_allclose(weights, pts1[:, -1], rtol=0.0, atol=0.0)
+
+    def test_backends(self):
+        """
+        Test that the thread and process backends give the same points as
+        the calling process.
+        """
+        from hazma import parallel
+        from hazma.rambo import generate_phase_space, generate_phase_space_multi_cme
+
+        masses = np.array([mmu, me, 0.0])
+        pts = generate_phase_space(masses, 1000.0, 300, num_cpus=1, seed=8)
+        multi = generate_phase_space_multi_cme(
+            masses, [500.0, 1000.0], 300, num_cpus=1, seed=8
+        )
+
+        for backend in parallel.BACKENDS:
+            with parallel.workers(3, backend=backend):
+                assert_allclose(
+                    generate_phase_space(masses, 1000.0, 300, seed=8),
+                    pts, rtol=0.0, atol=0.0
+                )
+                assert_allclose(
+                    generate_phase_space_multi_cme(
+                        masses, [500.0, 1000.0], 300, seed=8
+                    ),
+                    multi, rtol=0.0, atol=0.0
+                )
+        self.assertEqual(parallel.get_backend(), "threads")
+
+        with self.assertRaises(ValueError):
+            generate_phase_space(masses, 1000.0, 300, backend="gpu")
+
+    def test_num_points(self):
+        """
+        Test that exactly the requested number of points is generated when
+        it is not a multiple of the number of workers.
+        """
+        from hazma import parallel
+        from hazma.rambo import generate_phase_space
+
+        masses = np.array([mmu, me, 0.0])
+        pts = generate_phase_space(masses, 1000.0, 1001, num_cpus=1, seed=9)
+        self.assertEqual(pts.shape, (1001, 13))
+
+        for backend in parallel.BACKENDS:
+            for num_cpus in [3, 4]:
+                with parallel.workers(num_cpus, backend=backend):
+                    assert_allclose(
+                        generate_phase_space(masses, 1000.0, 1001, seed=9),
+                        pts, rtol=0.0, atol=0.0
+                    )
+
+    def test_vectorized_matrix_element(self):
+        """
+        Test that a vectorized matrix element gives the same weights as
+        calling it once per phase space point.
+        """
+        from hazma.rambo import generate_phase_space
+
+        def msqrd_scalar(momenta):
+            return msqrd_mu_to_enunu(momenta)
+
+        fsp_masses = np.array([me, 0.0, 0.0])
+        pts_vec = generate_phase_space(
+            fsp_masses, mmu, 1000, msqrd_mu_to_enunu, seed=1234
+        )
+        pts_loop = generate_phase_space(
+            fsp_masses, mmu, 1000, msqrd_scalar, seed=1234
+        )
+
+        assert_allclose(pts_vec, pts_loop, rtol=1e-12)
+
+    def test_chunked_generation(self):
+        """
+        Test that generating the points in chunks gives the same integral as
+        generating them at once and that the streamed histograms do not
+        depend on the chunk size.
+        """
+        from hazma.rambo import generate_energy_histogram, integrate_over_phase_space
+
+        masses = np.array([mmu, me, 0.0])
+        cme = 1000.0
+
+        integral, std = integrate_over_phase_space(
+            masses, cme, num_ps_pts=10000, num_cpus=1, seed=1234, sampler="flat"
+        )
+        integral_chunked, std_chunked = integrate_over_phase_space(
+            masses, cme, num_ps_pts=10000, num_cpus=1, seed=1234, chunk_size=3000,
+            sampler="flat",
+        )
+        assert_allclose(integral_chunked, integral, rtol=1e-12)
+        assert_allclose(std_chunked, std, rtol=1e-8)
+
+        probs, errs = generate_energy_histogram(
+            masses, cme, num_ps_pts=10000, num_bins=10, seed=1234, chunk_size=10000,
+            sampler="flat",
+        )
+        for chunk_size in [777, 3000]:
+            with self.subTest(chunk_size=chunk_size):
+                probs_chunked, errs_chunked = generate_energy_histogram(
+                    masses, cme, num_ps_pts=10000, num_bins=10, seed=1234,
+                    chunk_size=chunk_size, sampler="flat",
+                )
+                assert_allclose(probs_chunked, probs, rtol=1e-10)
+                assert_allclose(errs_chunked, errs, rtol=1e-8)
+
+    def test_vegas_resonance(self):
+        """
+        Test that the vegas sampler agrees with flat sampling for a resonant
+        matrix element and is more precise for the same number of points.
+        """
+        from hazma.rambo import integrate_over_phase_space, vectorized
+
+        mr, widthr = 400.0, 2.0
+
+        @vectorized
+        def msqrd(momenta):
+            q = momenta[..., 0, :] + momenta[..., 1, :]
+            return 1.0 / ((MDot(q, q) - mr ** 2) ** 2 + mr ** 2 * widthr ** 2)
+
+        masses = np.array([100.0, 100.0, 0.0])
+        flat, flat_std = integrate_over_phase_space(
+            masses, 1000.0, 50000, msqrd, num_cpus=1, seed=1234, sampler="flat"
+        )
+        vegas, vegas_std = integrate_over_phase_space(
+            masses, 1000.0, 50000, msqrd, num_cpus=1, seed=1234, sampler="vegas"
+        )
+
+        self.assertLess(vegas_std, 0.5 * flat_std)
+        self.assertLess(abs(vegas - flat), 4.0 * np.hypot(flat_std, vegas_std))
+
+    def test_decay_width_muon_samplers(self):
+        """
+        Test the samplers on mu -> e nu nu. The energy histograms built from
+        the same points should integrate to the decay width.
+        """
+        from hazma.rambo import generate_energy_histogram
+
+        fsp_masses = np.array([me, 0.0, 0.0])
+        cases = [
+            # sampler, keyword arguments, error bound, build a histogram
+            ("flat", dict(num_ps_pts=50000, seed=1234), 5e-3, True),
+            ("qmc", dict(num_ps_pts=2 ** 16, seed=1234), 1e-3, False),
+            ("quadrature", dict(), 1e-6, True),
+        ]
+        for sampler, kwargs, bound, histogram in cases:
+            with self.subTest(sampler=sampler):
+                width, std = compute_decay_width(
+                    fsp_masses, mmu, mat_elem_sqrd=msqrd_mu_to_enunu,
+                    sampler=sampler, **kwargs
+                )
+                self.assertLess(std, bound * width_mu_to_enunu)
+                assert_allclose(width, width_mu_to_enunu, rtol=5 * bound)
+
+                if not histogram:
+                    continue
+                probs, _, bins = generate_energy_histogram(
+                    fsp_masses, mmu, mat_elem_sqrd=msqrd_mu_to_enunu,
+                    num_bins=10, sampler=sampler, return_bins=True, **kwargs
+                )
+                assert_allclose(
+                    np.sum(probs[:, 1] * np.diff(bins), axis=1) / (2.0 * mmu),
+                    width, rtol=1e-6
+                )
+
+    def test_target_precision(self):
+        """
+        Test that the integration stops once the requested precision of the
+        decay width of mu -> e nu nu is reached.
+        """
+        from hazma.rambo import (
+            compute_annihilation_cross_section_to_precision,
+            compute_decay_width_to_precision,
+            cross_section_prefactor,
+            integrate_over_phase_space_to_precision,
+        )
+
+        fsp_masses = np.array([me, 0.0, 0.0])
+        budget = 10 ** 6
+        for sampler in ["flat", "vegas", "qmc"]:
+            integral, std, num_used = integrate_over_phase_space_to_precision(
+                fsp_masses, mmu, num_ps_pts=budget,
+                mat_elem_sqrd=msqrd_mu_to_enunu, seed=1234, chunk_size=5000,
+                sampler=sampler, rtol=1e-2,
+            )
+
+            self.assertLess(num_used, budget)
+            self.assertLessEqual(std, 1e-2 * integral)
+            assert_allclose(integral / (2.0 * mmu), width_mu_to_enunu, rtol=5e-2)
+
+            # The decay width and cross section stop at the same point.
+            kwargs = dict(
+                num_ps_pts=budget, mat_elem_sqrd=msqrd_mu_to_enunu, seed=1234,
+                chunk_size=5000, sampler=sampler,
+            )
+            width, width_std, width_num_used = compute_decay_width_to_precision(
+                fsp_masses, mmu, rtol=1e-2, **kwargs
+            )
+            assert_allclose(width, integral / (2.0 * mmu), rtol=1e-12)
+            assert_allclose(width_std, std / (2.0 * mmu), rtol=1e-12)
+            self.assertEqual(width_num_used, num_used)
+
+            prefactor = cross_section_prefactor(me, me, mmu)
+            cs, cs_std, cs_num_used = compute_annihilation_cross_section_to_precision(
+                [me, me], fsp_masses, mmu, atol=1e-2 * integral * prefactor,
+                **kwargs
+            )
+            assert_allclose(cs, integral * prefactor, rtol=1e-12)
+            assert_allclose(cs_std, std * prefactor, rtol=1e-12)
+            self.assertEqual(cs_num_used, num_used)
+
+        with self.assertRaises(ValueError):
+            integrate_over_phase_space_to_precision(fsp_masses, mmu)
+        with self.assertRaises(ValueError):
+            compute_decay_width_to_precision(fsp_masses, mmu)
+
+    def test_quadrature(self):
+        """
+        Test that two- and three-body final states are integrated with
+        deterministic quadrature when it is requested.
+        """
+        import warnings
+        from hazma.phase_space_helper_functions import histogram
+        from hazma.rambo import generate_energy_histogram, integrate_over_phase_space
+        from numpy.testing import assert_array_equal
+
+        # The energy histogram has no sampling error.
+        errs = generate_energy_histogram(
+            [me, 0.0, 0.0], mmu, mat_elem_sqrd=msqrd_mu_to_enunu, num_bins=10,
+            sampler="quadrature",
+        )[1]
+        assert_array_equal(errs, 0.0)
+
+        # Two-body phase space of massless particles is 1 / (8 pi).
+        integral, std = integrate_over_phase_space(
+            [0.0, 0.0], 10.0, sampler="quadrature"
+        )
+        assert_allclose(integral, 1.0 / (8.0 * np.pi))
+
+        # Two-body energies are fixed, so everything lands in the last bin,
+        # which ends at the kinematic maximum.
+        masses = np.array([100.0, 200.0])
+        probs, bins = generate_energy_histogram(
+            masses, 1000.0, num_bins=10, density=True, sampler="quadrature",
+            return_bins=True,
+        )[::2]
+        assert_array_equal(bins, histogram.energy_bin_edges(masses, 1000.0, 10))
+        assert_allclose(probs[:, 0, -1], bins[:, -1])
+
+        # Flat sampling stays the default and the quadrature sampler warns
+        # about the arguments it does not use.
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            integrate_over_phase_space(masses, 1000.0, num_ps_pts=100, seed=1234)
+            integrate_over_phase_space(masses, 1000.0, sampler="quadrature")
+            self.assertEqual(len(caught), 0)
+            integrate_over_phase_space(
+                masses, 1000.0, seed=1234, sampler="quadrature"
+            )
+            self.assertEqual(len(caught), 1)
+
+    def test_multi_cme(self):
+        """
+        Test that generating phase space at several center of mass energies at
+        once gives the same points and histograms as separate calls.
+        """
+        from hazma.rambo import (
+            generate_energy_histogram,
+            generate_energy_histogram_multi_cme,
+            generate_phase_space,
+            generate_phase_space_multi_cme,
+        )
+
+        masses = np.array([mmu, me, 0.0, 0.0])
+        cmes = np.array([500.0, 1000.0, 2000.0])
+
+        points = generate_phase_space_multi_cme(
+            masses, cmes, 5000, num_cpus=1, seed=3
+        )
+        probs, errs = generate_energy_histogram_multi_cme(
+            masses, cmes, 5000, num_bins=10, num_cpus=1, seed=3
+        )
+        for i, cme in enumerate(cmes):
+            assert_allclose(
+                points[i], generate_phase_space(masses, cme, 5000, num_cpus=1, seed=3)
+            )
+            probs_i, errs_i = generate_energy_histogram(
+                masses, cme, 5000, num_bins=10, num_cpus=1, seed=3,
+                chunk_size=100000, sampler="flat"
+            )
+            assert_allclose(probs[i], probs_i)
+            assert_allclose(errs[i], errs_i)
+
+    def test_space_to_energy_hist(self):
+        """
+        Test that the energy histograms agree with numpy.histogram and have
+        finite errors.
+        """
+        from hazma.phase_space_helper_functions import histogram
+        from hazma.rambo import generate_phase_space
+
+        masses = np.array([mmu, me, 0.0])
+        pts = generate_phase_space(masses, 1000.0, 10000, num_cpus=1, seed=4)
+        probs, errs = histogram.space_to_energy_hist(pts, 10000, 3, 20)
+
+        for i in range(3):
+            hist, edges = np.histogram(
+                pts[:, 4 * i], bins=20, weights=pts[:, 12]
+            )
+            assert_allclose(probs[i, 0], (edges[1:] + edges[:-1]) / 2)
+            assert_allclose(probs[i, 1], hist / 10000 / np.diff(edges))
+        self.assertTrue(np.all(np.isfinite(errs)))
+        self.assertTrue(np.all(errs > 0.0))
+
+    def test_binning(self):
+        """
+        Test that histograms with non-uniform bins are normalized and that
+        quantile bins hold equal shares of the distribution.
+        """
+        from hazma.phase_space_helper_functions import histogram
+        from hazma.rambo import generate_energy_histogram
+
+        masses = np.array([mmu, me, 0.0])
+        for binning in histogram.BINNINGS:
+            for kwargs in [{}, {"sampler": "flat"}, {"chunk_size": 3000}]:
+                probs, _, bins = generate_energy_histogram(
+                    masses, 500.0, 10000, num_bins=8, density=True, seed=5,
+                    binning=binning, return_bins=True, **kwargs
+                )
+                widths = np.diff(bins, axis=1)
+                self.assertTrue(np.all(widths > 0.0))
+                assert_allclose(np.sum(probs[:, 1] * widths, axis=1), 1.0)
+                if binning == "quantile":
+                    assert_allclose(probs[:, 1] * widths, 1.0 / 8, rtol=0.1)
+
+    def test_cache(self):
+        """
+        Test that cached results are reused, are keyed by the squared matrix
+        element and are evicted when the cache is full.
+        """
+        import os
+        import tempfile
+
+        from hazma import parallel, rambo
+        from hazma.rambo import generate_energy_histogram, generate_phase_space
+
+        masses = np.array([mmu, me, 0.0, 0.0])
+        directory = tempfile.mkdtemp()
+        rambo.cache.enable(directory)
+        try:
+            points = generate_phase_space(masses, 1000.0, 1000, num_cpus=1, seed=6)
+            cached = generate_phase_space(masses, 1000.0, 1000, num_cpus=1, seed=6)
+            self.assertIsInstance(cached, np.memmap)
+            assert_allclose(cached, points)
+
+            # Cached results can be modified without changing the cache.
+            cached[:] = 0.0
+            assert_allclose(
+                generate_phase_space(masses, 1000.0, 1000, num_cpus=1, seed=6),
+                points,
+            )
+
+            @vectorized
+            def msqrd(momenta):
+                return momenta[..., 0, 0]
+
+            probs = generate_energy_histogram(
+                masses, 1000.0, 1000, msqrd, num_cpus=1, seed=6
+            )[0]
+            self.assertFalse(np.allclose(probs, generate_energy_histogram(
+                masses, 1000.0, 1000, num_cpus=1, seed=6)[0]))
+
+            # Cached histograms match the computed ones for any number of cpus.
+            hists = {}
+            for num_cpus in [3, 4]:
+                with parallel.workers(num_cpus):
+                    hists[num_cpus] = generate_energy_histogram(
+                        masses, 1000.0, 10000, seed=6, sampler="flat"
+                    )[0]
+                    with rambo.cache.bypass():
+                        assert_allclose(
+                            hists[num_cpus],
+                            generate_energy_histogram(
+                                masses, 1000.0, 10000, seed=6, sampler="flat"
+                            )[0],
+                            rtol=0.0, atol=0.0,
+                        )
+            assert_allclose(hists[3], hists[4], rtol=0.0, atol=0.0)
+
+            # Shrinking the cache evicts the least recently used results.
+            size = rambo.cache.size()
+            rambo.cache.enable(directory, max_bytes=size - 1)
+            self.assertLess(rambo.cache.size(), size)
+
+            with rambo.cache.bypass():
+                self.assertFalse(rambo.cache.is_enabled())
+            rambo.cache.clear()
+            self.assertEqual(os.listdir(directory), [])
+        finally:
+            rambo.cache.disable()
+
+    def test_compiled_msqrd(self):
+        """
+        Test that compiled squared matrix elements agree with their python
+        versions, also when fused with the phase space generation.
+        """
+        import pickle
+
+        from hazma.parameters import charged_pion_mass as mpi
+        from hazma.parameters import neutral_pion_mass as mpi0
+        from hazma.pseudo_scalar_mediator import PseudoScalarMediator
+        from hazma.rambo import generate_phase_space
+
+        model = PseudoScalarMediator(200.0, 1000.0, 1.0, 1.0, 0.5, 1.0, 1.0, 1.0, 0.3, 1.0)
+        cme = 500.0
+
+        for process, masses in [
+            ("xx_to_p_to_pm0", [mpi, mpi, mpi0]),
+            ("xx_to_p_to_000", [mpi0, mpi0, mpi0]),
+        ]:
+            compiled = model.compiled_msqrd(process)
+            python = getattr(model, "msqrd_" + process)
+
+            momenta = generate_phase_space(masses, cme, 1000, num_cpus=1, seed=4)
+            momenta = momenta[:, :12].reshape(-1, 3, 4)
+            assert_allclose(compiled(momenta), python(momenta), rtol=1e-12)
+            assert_allclose(compiled(momenta[0]), python(momenta[0]), rtol=1e-12)
+            assert_allclose(
+                pickle.loads(pickle.dumps(compiled))(momenta), compiled(momenta)
+            )
+
+            assert_allclose(
+                generate_phase_space(
+                    masses, cme, 1000, mat_elem_sqrd=compiled, num_cpus=1, seed=5
+                ),
+                generate_phase_space(
+                    masses, cme, 1000, mat_elem_sqrd=python, num_cpus=1, seed=5
+                ),
+                rtol=1e-12,
+            )
+
+    def test_compiled_msqrd_threads(self):
+        """
+        Test that phase space generation fused with a compiled squared matrix
+        element runs on the number of threads set with hazma.parallel. The
+        threads started by OpenMP are counted in a fresh interpreter.
+        """
+        import os
+        import subprocess
+        import sys
+
+        import hazma
+        from hazma.decay_helper_functions.threads import openmp_enabled
+
+        if not openmp_enabled() or not os.path.isdir("/proc/self/task"):
+            self.skipTest("requires OpenMP and /proc")
+
+        script = "\n".join(
+            [
+                "import os, sys",
+                "from hazma import parallel",
+                "from hazma.parameters import neutral_pion_mass as mpi0",
+                "from hazma.pseudo_scalar_mediator import PseudoScalarMediator",
+                "from hazma.rambo import generate_phase_space",
+                "model = PseudoScalarMediator("
+                "200.0, 1000.0, 1.0, 1.0, 0.5, 1.0, 1.0, 1.0, 0.3, 1.0)",
+                "msqrd = model.compiled_msqrd('xx_to_p_to_000')",
+                "before = len(os.listdir('/proc/self/task'))",
+                "with parallel.threads(int(sys.argv[1])):",
+                "    generate_phase_space([mpi0] * 3, 500.0, 10000,",
+                "                         mat_elem_sqrd=msqrd, num_cpus=1)",
+                "print(len(os.listdir('/proc/self/task')) - before)",
+            ]
+        )
+        root = os.path.dirname(os.path.dirname(os.path.abspath(hazma.__file__)))
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(
+            [root] + [p for p in [env.get("PYTHONPATH")] if p]
+        )
+
+        started = {}
+        for num_threads in [1, 4]:
+            output = subprocess.run(
+                [sys.executable, "-c", script, str(num_threads)],
+                env=env,
+                stdout=subprocess.PIPE,
+                check=True,
+                universal_newlines=True,
+            ).stdout
+            started[num_threads] = int(output.split()[-1])
+
+        self.assertEqual(started[1], 0)
+        self.assertEqual(started[4], 3)
+
+    def test_generate_observables(self):
+        """
+        Test that several observables can be accumulated from one set of
+        phase space points and that the energy histograms feed the spectra.
+        """
+        from hazma.gamma_ray import gamma_ray_decay
+        from hazma.parameters import charged_pion_mass as mpi
+        from hazma.parameters import neutral_pion_mass as mpi0
+        from hazma.phase_space_helper_functions import observables
+        from hazma.positron_spectra import positron_decay
+        from hazma.rambo import generate_energy_histogram, generate_observables
+
+        masses = [mpi, mpi, mpi0]
+        cme = 1000.0
+        kwargs = dict(seed=7, chunk_size=3000)
+
+        results = generate_observables(
+            masses,
+            cme,
+            {
+                "energy": observables.EnergyHistogram(num_bins=20),
+                "mass": observables.InvariantMassHistogram([(0, 1)], num_bins=10),
+                "angle": observables.OpeningAngleHistogram(num_bins=10),
+            },
+            num_ps_pts=10000,
+            num_cpus=1,
+            density=True,
+            **kwargs
+        )
+
+        energy = generate_energy_histogram(
+            masses, cme, 10000, num_bins=20, num_cpus=1, density=True,
+            sampler="flat", return_bins=True, **kwargs
+        )
+        for result, expected in zip(results["energy"], energy):
+            assert_allclose(result, expected)
+
+        probs, _, bins = results["mass"]
+        assert_allclose(bins[0, [0, -1]], [2 * mpi, cme - mpi0])
+        assert_allclose(np.sum(probs[:, 1] * np.diff(bins), axis=1), 1.0)
+
+        probs, _, bins = results["angle"]
+        self.assertEqual(probs.shape, (3, 2, 10))
+        assert_allclose(np.sum(probs[:, 1] * np.diff(bins), axis=1), 1.0)
+
+        particles = ["charged_pion", "charged_pion", "neutral_pion"]
+        engs = np.logspace(0.0, 3.0, 5)
+        assert_allclose(
+            gamma_ray_decay(particles, cme, engs, energy_hist=results["energy"]),
+            gamma_ray_decay(
+                particles, cme, engs, num_ps_pts=10000, num_bins=20,
+                sampler="flat", **kwargs
+            ),
+        )
+        assert_allclose(
+            positron_decay(particles, cme, engs, energy_hist=results["energy"]),
+            positron_decay(
+                particles, cme, engs, num_ps_pts=10000, num_bins=20,
+                sampler="flat", **kwargs
+            ),
+        )
@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from numpy.testing import assert_allclose
+
+from hazma.events import generate_unweighted_events, read_events
+from hazma.rambo import generate_phase_space, vectorized
+
+
+@vectorized
+def msqrd_peaked(momenta):
+    # Favors configurations in which the first particle is energetic.
+    return momenta[..., 0, 0] ** 2
+
+
+class TestEvents(unittest.TestCase):
+    def setUp(self):
+        self.masses = np.array([10.0, 0.0, 0.0])
+        self.cme = 100.0
+
+    def test_unweighted_distribution(self):
+        events, report = generate_unweighted_events(
+            self.masses, self.cme, 50000, msqrd_peaked, num_cpus=1, seed=1
+        )
+        self.assertEqual(events.shape, (50000, 3, 4))
+        self.assertEqual(report["num_overweight"], 0)
+        self.assertTrue(0.0 < report["efficiency"] < 1.0)
+
+        # The unweighted energies follow the weighted distribution.
+        pts = generate_phase_space(
+            self.masses, self.cme, 200000, msqrd_peaked, num_cpus=1, seed=2
+        )
+        bins = np.linspace(10.0, 50.0, 6)
+        hist = np.histogram(events[:, 0, 0], bins=bins, density=True)[0]
+        expected = np.histogram(
+            pts[:, 0], bins=bins, weights=pts[:, -1], density=True
+        )[0]
+        assert_allclose(hist, expected, atol=0.03 * np.max(expected))
+
+    def test_event_file(self):
+        filename = os.path.join(tempfile.mkdtemp(), "events.evt")
+        events, report = generate_unweighted_events(
+            self.masses, self.cme, 1000, num_cpus=1, seed=3, chunk_size=300,
+            filename=filename, dtype=np.float32,
+        )
+        in_memory = generate_unweighted_events(
+            self.masses, self.cme, 1000, num_cpus=1, seed=3, chunk_size=300
+        )[0]
+        loaded, header = read_events(filename, mmap=False)
+
+        self.assertEqual(events.dtype, np.float32)
+        assert_allclose(loaded, in_memory, rtol=1e-6)
+        assert_allclose(header["masses"], self.masses)
+        self.assertEqual(header["cme"], self.cme)
+        self.assertEqual(header["num_events"], 1000)
+        self.assertEqual(header["efficiency"], report["efficiency"])
+        self.assertEqual(os.path.getsize(filename) % 4, 0)
+        del events
@@ -46,3 +46,63 @@ class TestGammaRay(unittest.TestCase):
     def test_np_mu_mu(self):
         particles = np.array(["neutral_pion", "muon", "muon"])
         gamma_ray.gamma_ray_decay(particles, self.cme, self.eng_gams)
+
+    def test_photon_multiplicity(self):
+        """Checks that the spectra of the final states integrate to the sum of
+        the multiplicities of their particles, which does not depend on the
+        energy distributions of the particles.
+        """
+        from hazma.decay import neutral_pion
+        from hazma.positron_spectra import muon, positron_decay
+
+        eng_gams = np.geomspace(1e-2, 1000.0, 20000)
+        spec = gamma_ray.gamma_ray_decay(
+            np.array(["neutral_pion"] * 3), 1000.0, eng_gams
+        )
+        multiplicity = np.trapz(neutral_pion(eng_gams, 300.0), eng_gams)
+        np.testing.assert_allclose(
+            np.trapz(spec, eng_gams), 3.0 * multiplicity, rtol=1e-3
+        )
+
+        eng_ps = np.geomspace(1e-3, 1000.0, 20000)
+        spec = positron_decay(np.array(["muon"] * 3), 1000.0, eng_ps)
+        multiplicity = np.trapz(muon(eng_ps, 300.0), eng_ps)
+        np.testing.assert_allclose(
+            np.trapz(spec, eng_ps), 3.0 * multiplicity, rtol=1e-3
+        )
+
+    def test_point_matches_spectrum(self):
+        """Checks that the spectra at a single energy match the spectra at an
+        array of energies.
+        """
+        from hazma.positron_spectra import positron_decay
+
+        particles = np.array(["charged_pion", "muon", "neutral_pion"])
+
+        for eng_gam in [5.0, 50.0, 500.0]:
+            np.testing.assert_allclose(
+                gamma_ray.gamma_ray_decay(
+                    particles, 1000.0, eng_gam, num_ps_pts=1000, seed=1234
+                ),
+                gamma_ray.gamma_ray_decay(
+                    particles,
+                    1000.0,
+                    np.array([eng_gam]),
+                    num_ps_pts=1000,
+                    seed=1234,
+                )[0],
+                rtol=1e-12,
+            )
+            np.testing.assert_allclose(
+                positron_decay(
+                    particles, 1000.0, eng_gam, num_ps_pts=1000, seed=1234
+                ),
+                positron_decay(
+                    particles,
+                    1000.0,
+                    np.array([eng_gam]),
+                    num_ps_pts=1000,
+                    seed=1234,
+                )[0],
+                rtol=1e-12,
+            )
@@ -0,0 +1,100 @@
+import threading
+import time
+import unittest
+
+from hazma import parallel
+
+
+def _square(x):
+    time.sleep(1e-4)
+    return x * x
+
+
+class TestParallel(unittest.TestCase):
+    def run_threads(self, targets, timeout=30.0):
+        """Runs functions in threads and returns the errors they raised."""
+        errors = []
+
+        def run(target):
+            try:
+                target()
+            except Exception as e:
+                errors.append(e)
+
+        workers = [
+            threading.Thread(target=run, args=(target,), daemon=True)
+            for target in targets
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(timeout)
+            self.assertFalse(worker.is_alive(), "thread did not finish")
+        return errors
+
+    def test_concurrent_thread_pool_sizes(self):
+        """
+        Test that pools of threads of different sizes can be used at the same
+        time without shutting each other down.
+        """
+        args = [(i,) for i in range(16)]
+        expected = [i * i for i in range(16)]
+
+        def use(num_threads):
+            def target():
+                for _ in range(50):
+                    results = parallel.thread_starmap(_square, args, num_threads)
+                    self.assertEqual(results, expected)
+
+            return target
+
+        errors = self.run_threads([use(2), use(3), use(4), use(3)])
+        self.assertEqual(errors, [])
+
+    def test_nested_thread_starmap(self):
+        """
+        Test that calling into the pool of threads from one of its threads
+        does not deadlock.
+        """
+        results = []
+
+        def outer(x):
+            return sum(parallel.thread_starmap(_square, [(x,), (x + 1,)], 3))
+
+        def target():
+            results.extend(
+                parallel.thread_starmap(outer, [(i,) for i in range(4)], 2)
+            )
+
+        self.assertEqual(self.run_threads([target]), [])
+        self.assertEqual(results, [i * i + (i + 1) ** 2 for i in range(4)])
+
+    def test_nested_contexts(self):
+        """
+        Test that nested contexts restore the settings they replaced, also
+        when they are used from several threads.
+        """
+        num_cpus = parallel.get_num_cpus()
+        backend = parallel.get_backend()
+        num_threads = parallel.get_num_threads()
+
+        def target():
+            for _ in range(100):
+                with parallel.workers(3, backend="processes"):
+                    with parallel.workers(2):
+                        with parallel.threads(2):
+                            pass
+
+        self.assertEqual(self.run_threads([target]), [])
+        with parallel.workers(4, backend="processes"):
+            with parallel.threads(3):
+                with parallel.workers(1, backend="threads"):
+                    self.assertEqual(parallel.get_num_cpus(), 1)
+                    self.assertEqual(parallel.get_backend(), "threads")
+                self.assertEqual(parallel.get_num_cpus(), 4)
+                self.assertEqual(parallel.get_backend(), "processes")
+                self.assertEqual(parallel.get_num_threads(), 3)
+
+        self.assertEqual(parallel.get_num_cpus(), num_cpus)
+        self.assertEqual(parallel.get_backend(), backend)
+        self.assertEqual(parallel.get_num_threads(), num_threads)